@@ -0,0 +1,352 @@
+# lambda_function.py for analyzeQuestionItemsFunction
+# quizItem ごとの古典的テスト理論の項目分析を計算し、QuestionItemStats の行に書くバッチ。
+#   difficulty     … 困難度 (正答率 p)
+#   discrimination … 識別力 (その項目の正誤と、残りの項目の得点との点双列相関。項目自身を含めない修正版)
+#   distractors    … 誤答の選択肢ごとの選択率と点双列相関。選ばれていて (DISTRACTOR_MIN_RATE 以上)
+#                    得点の低い人ほど選ぶ (相関が負) ものを functional とする
+# 質問ごとに回答ログ (QuestionIndex) を回答者 x 項目の行列に書き出し、NumPy でまとめて計算する。
+# 同じユーザーが同じ項目に何度も答えた場合は最初の回答だけを使う。
+# NumPy はレイヤーで入れること。入っていなければ同じ統計を Python のループで計算する
+# (item_statistics_py。回答者が多いと遅いが結果は同じ)。
+#
+# イベント:
+#   {"questionIds": [...]}  … 指定した質問だけ分析する
+#   {} / {"startKey": {...}} … QuestionStats を Scan し、前回の分析以降に回答が増えた質問を分析する
+#                              (EventBridge のスケジュールで呼ぶ。残り時間が少なくなったら開始キーを付けて自分を呼び直す)
+import json
+import math
+import os
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では item_statistics_py で計算する
+    np = None
+
+QUESTIONS_TABLE = os.environ.get("QUESTIONS_TABLE") or os.environ.get("QUESTIONS_TABLE_NAME")
+ANSWERS_TABLE = os.environ.get("ANSWERS_TABLE", "AnswersLog")
+ANSWERS_QUESTION_INDEX_NAME = os.environ.get("ANSWERS_QUESTION_INDEX_NAME", "QuestionIndex")
+# logAnswerFunction と同じテーブル
+QUESTION_STATS_TABLE = os.environ.get("QUESTION_STATS_TABLE")
+QUESTION_ITEM_STATS_TABLE = os.environ.get("QUESTION_ITEM_STATS_TABLE")
+# これより回答者が少ない質問は分析しない (相関がほとんど意味を持たない)
+ITEM_ANALYSIS_MIN_RESPONDENTS = int(os.environ.get("ITEM_ANALYSIS_MIN_RESPONDENTS", "20"))
+DISTRACTOR_MIN_RATE = float(os.environ.get("DISTRACTOR_MIN_RATE", "0.05"))
+# 残り時間がこれを下回ったら次の呼び出しに引き継ぐ
+TIME_MARGIN_MS = int(os.environ.get("TIME_MARGIN_MS", "30000"))
+SCAN_PAGE_SIZE = int(os.environ.get("SCAN_PAGE_SIZE", "100"))
+
+dynamodb = boto3.resource("dynamodb")
+lambda_client = boto3.client("lambda")
+
+
+def _load_quiz_items(question_id: str) -> Optional[List[Dict[str, Any]]]:
+    """質問の quizItems。質問が消されていれば None"""
+    item = dynamodb.Table(QUESTIONS_TABLE).get_item(
+        Key={"questionId": question_id},
+        ProjectionExpression="quizItems, quizItemsZ",
+    ).get("Item")
+    if item is None:
+        return None
+    packed = item.get("quizItemsZ")
+    if packed is not None:
+        return json.loads(zlib.decompress(bytes(getattr(packed, "value", packed))))
+    return item.get("quizItems") or []
+
+
+def _export_responses(question_id: str) -> Tuple[Dict[Tuple[str, str], Dict[str, Any]], Optional[str]]:
+    """((userId, quizItemId) -> 最初の回答, 最後の回答時刻)。quizItemId の無い回答は使えないので捨てる"""
+    kwargs: Dict[str, Any] = {
+        "IndexName": ANSWERS_QUESTION_INDEX_NAME,
+        "KeyConditionExpression": Key("questionId").eq(question_id),
+        "ProjectionExpression": "userId, quizItemId, selectedChoiceId, isCorrect, #ts",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    first: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    last_answered_at = None
+    while True:
+        resp = dynamodb.Table(ANSWERS_TABLE).query(**kwargs)
+        for log in resp.get("Items", []):
+            ts = log.get("timestamp") or ""
+            # timestamp は ISO 8601 の文字列なので文字列の順序 = 時刻の順序
+            if ts and (last_answered_at is None or ts > last_answered_at):
+                last_answered_at = ts
+            if not log.get("userId") or not log.get("quizItemId"):
+                continue
+            key = (log["userId"], log["quizItemId"])
+            seen = first.get(key)
+            if seen is None or ts < (seen.get("timestamp") or ""):
+                first[key] = log
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return first, last_answered_at
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _answer_matrix(responses: Dict[Tuple[str, str], Dict[str, Any]], quiz_items: List[Dict[str, Any]]):
+    """
+    回答者 x 項目の行列を作る (NumPy が無ければリストのリスト)。
+    correct: 正誤 (1.0 / 0.0、未回答は NaN)、choices: 選んだ選択肢の番号 (quizItem の choices の順、未回答は -1)。
+    質問の編集で無くなった項目や選択肢への回答は未回答として扱う
+    """
+    item_index = {qi["id"]: j for j, qi in enumerate(quiz_items)}
+    choice_index = [{c["id"]: k for k, c in enumerate(qi.get("choices") or [])} for qi in quiz_items]
+    user_index: Dict[str, int] = {}
+    for user_id, quiz_item_id in responses:
+        if quiz_item_id in item_index:
+            user_index.setdefault(user_id, len(user_index))
+
+    correct = [[math.nan] * len(quiz_items) for _ in user_index]
+    choices = [[-1] * len(quiz_items) for _ in user_index]
+    for (user_id, quiz_item_id), log in responses.items():
+        j = item_index.get(quiz_item_id)
+        if j is None:
+            continue
+        k = choice_index[j].get(str(log.get("selectedChoiceId")))
+        if k is None:
+            continue
+        i = user_index[user_id]
+        correct[i][j] = 1.0 if log.get("isCorrect") else 0.0
+        choices[i][j] = k
+    if np is None:
+        return correct, choices
+    shape = (len(user_index), len(quiz_items))
+    return np.array(correct, dtype=float).reshape(shape), np.array(choices, dtype=np.int64).reshape(shape)
+
+
+def _masked_corr(x: "np.ndarray", y: "np.ndarray", w: "np.ndarray") -> "np.ndarray":
+    """先頭の軸 (回答者) に沿って、w が 1 の行だけで x と y の相関係数を取る。分散が 0 なら NaN"""
+    n = w.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dx = (x - (w * x).sum(axis=0) / n) * w
+        dy = (y - (w * y).sum(axis=0) / n) * w
+        return (dx * dy).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+
+
+def item_statistics(correct: "np.ndarray", choices: "np.ndarray", n_choices: int) -> Dict[str, "np.ndarray"]:
+    """
+    回答者 x 項目の行列から項目統計を計算する (_answer_matrix と同じ形。書き出した行列にもそのまま使える)。
+    返り値は項目ごとの respondents / difficulty / discrimination と、項目 x 選択肢の choiceRate / choiceDiscrimination
+    """
+    answered = ~np.isnan(correct)
+    x = np.where(answered, correct, 0.0)
+    respondents = answered.sum(axis=0)
+    # 残りの項目の得点 (正答率)。他に1問も答えていない回答者は相関から外す
+    n_answered = answered.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        difficulty = x.sum(axis=0) / respondents
+        rest = (x.sum(axis=1, keepdims=True) - x) / (n_answered - 1)
+    usable = (answered & (n_answered > 1)).astype(float)
+    rest = np.where(usable > 0, rest, 0.0)
+    discrimination = _masked_corr(x, rest, usable)
+
+    # 選択肢の one-hot (回答者 x 項目 x 選択肢)
+    selected = (choices[:, :, None] == np.arange(n_choices)).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        choice_rate = selected.sum(axis=0) / respondents[:, None]
+    choice_discrimination = _masked_corr(selected, rest[:, :, None], usable[:, :, None])
+    return {
+        "respondents": respondents,
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "choiceRate": choice_rate,
+        "choiceDiscrimination": choice_discrimination,
+    }
+
+
+def _corr(pairs: List[Tuple[float, float]]) -> float:
+    """相関係数。分散が 0 (または組が無い) なら NaN (_masked_corr と同じ)"""
+    if not pairs:
+        return math.nan
+    mx = sum(x for x, _ in pairs) / len(pairs)
+    my = sum(y for _, y in pairs) / len(pairs)
+    sxy = sum((x - mx) * (y - my) for x, y in pairs)
+    sxx = sum((x - mx) ** 2 for x, _ in pairs)
+    syy = sum((y - my) ** 2 for _, y in pairs)
+    if sxx == 0 or syy == 0:
+        return math.nan
+    return sxy / math.sqrt(sxx * syy)
+
+
+def item_statistics_py(correct: List[List[float]], choices: List[List[int]], n_choices: int) -> Dict[str, list]:
+    """
+    item_statistics と同じ統計を Python のループで計算する (NumPy が無い環境用)。
+    返り値の形も同じで、配列の代わりにリスト (項目 x 選択肢はリストのリスト)
+    """
+    n_items = len(correct[0]) if correct else 0
+    respondents = [0] * n_items
+    sums = [0.0] * n_items
+    rest_rows = []
+    for row in correct:
+        answered = [j for j, v in enumerate(row) if not math.isnan(v)]
+        total = sum(row[j] for j in answered)
+        # 残りの項目の得点 (正答率)。他に1問も答えていない回答者は相関から外す (None)
+        rest_rows.append([
+            (total - row[j]) / (len(answered) - 1) if len(answered) > 1 and not math.isnan(row[j]) else None
+            for j in range(n_items)
+        ])
+        for j in answered:
+            respondents[j] += 1
+            sums[j] += row[j]
+
+    difficulty = [sums[j] / respondents[j] if respondents[j] else math.nan for j in range(n_items)]
+    discrimination = []
+    choice_rate = []
+    choice_discrimination = []
+    for j in range(n_items):
+        usable = [i for i, rest in enumerate(rest_rows) if rest[j] is not None]
+        discrimination.append(_corr([(correct[i][j], rest_rows[i][j]) for i in usable]))
+        rates = []
+        corrs = []
+        for k in range(n_choices):
+            picked = sum(1 for row in choices if row[j] == k)
+            rates.append(picked / respondents[j] if respondents[j] else math.nan)
+            corrs.append(_corr([(1.0 if choices[i][j] == k else 0.0, rest_rows[i][j]) for i in usable]))
+        choice_rate.append(rates)
+        choice_discrimination.append(corrs)
+    return {
+        "respondents": respondents,
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "choiceRate": choice_rate,
+        "choiceDiscrimination": choice_discrimination,
+    }
+
+
+def _num(value: float) -> Optional[Decimal]:
+    """DynamoDB に書ける数 (小数4桁)。計算できない値 (NaN) は None"""
+    if not math.isfinite(value):
+        return None
+    return Decimal(str(round(float(value), 4)))
+
+
+def _write_results(question_id: str, quiz_items: List[Dict[str, Any]], stats: Dict[str, Any], analyzed_at: str) -> int:
+    """項目ごとの行に結果を書く。logAnswerFunction が ADD で数えている属性には触れない"""
+    table = dynamodb.Table(QUESTION_ITEM_STATS_TABLE)
+    written = 0
+    for j, quiz_item in enumerate(quiz_items):
+        if not stats["respondents"][j]:
+            continue
+        distractors = {}
+        for k, choice in enumerate(quiz_item.get("choices") or []):
+            if choice["id"] == quiz_item.get("correctAnswerId"):
+                continue
+            rate = stats["choiceRate"][j][k]
+            corr = stats["choiceDiscrimination"][j][k]
+            distractors[choice["id"]] = {
+                "rate": _num(rate),
+                "pointBiserial": _num(corr),
+                "functional": bool(rate >= DISTRACTOR_MIN_RATE and math.isfinite(corr) and corr < 0),
+            }
+        values = {
+            ":n": int(stats["respondents"][j]),
+            ":p": _num(stats["difficulty"][j]),
+            ":r": _num(stats["discrimination"][j]),
+            ":d": distractors,
+            ":t": analyzed_at,
+        }
+        table.update_item(
+            Key={"questionId": question_id, "quizItemId": quiz_item["id"]},
+            UpdateExpression="SET respondents = :n, difficulty = :p, discrimination = :r, distractors = :d, analyzedAt = :t",
+            ExpressionAttributeValues=values,
+        )
+        written += 1
+    return written
+
+
+def _mark_analyzed(question_id: str, analyzed_through: str) -> None:
+    """どの回答まで分析したかを集計の行に残す (集計の行が無い質問には作らない)"""
+    if not QUESTION_STATS_TABLE:
+        return
+    try:
+        dynamodb.Table(QUESTION_STATS_TABLE).update_item(
+            Key={"questionId": question_id},
+            UpdateExpression="SET analyzedThrough = :t",
+            ConditionExpression="attribute_exists(questionId)",
+            ExpressionAttributeValues={":t": analyzed_through},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+def _analyze(question_id: str) -> int:
+    """1つの質問を分析して、書いた項目の数を返す"""
+    quiz_items = _load_quiz_items(question_id)
+    if not quiz_items:
+        return 0
+    responses, last_answered_at = _export_responses(question_id)
+    if last_answered_at is None:
+        return 0
+    correct, choices = _answer_matrix(responses, quiz_items)
+    written = 0
+    if len(correct) >= ITEM_ANALYSIS_MIN_RESPONDENTS:
+        n_choices = max(len(qi.get("choices") or []) for qi in quiz_items)
+        statistics = item_statistics if np is not None else item_statistics_py
+        stats = statistics(correct, choices, n_choices)
+        analyzed_at = datetime.now(timezone.utc).isoformat()
+        written = _write_results(question_id, quiz_items, stats, analyzed_at)
+    # 回答者が足りなくても、次に回答が増えるまでは分析し直さない
+    _mark_analyzed(question_id, last_answered_at)
+    return written
+
+
+def _invoke_self(context, payload: Dict[str, Any]) -> None:
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+
+
+def lambda_handler(event, context):
+    if not QUESTIONS_TABLE:
+        raise Exception("QUESTIONS_TABLE is not set")
+    if not QUESTION_ITEM_STATS_TABLE:
+        raise Exception("QUESTION_ITEM_STATS_TABLE is not set")
+    event = event or {}
+
+    if event.get("questionIds"):
+        analyzed = {qid: _analyze(qid) for qid in event["questionIds"]}
+        print(f"[item_analysis] done {analyzed}")
+        return {"done": True, "items": analyzed}
+
+    if not QUESTION_STATS_TABLE:
+        raise Exception("QUESTION_STATS_TABLE is not set")
+    scan_kwargs: Dict[str, Any] = {
+        "ProjectionExpression": "questionId",
+        # 前回の分析より後に回答がある質問だけ (lastAnsweredAt も analyzedThrough も回答ログの timestamp)
+        "FilterExpression": "attribute_exists(lastAnsweredAt) AND "
+        "(attribute_not_exists(analyzedThrough) OR analyzedThrough < lastAnsweredAt)",
+        "Limit": SCAN_PAGE_SIZE,
+    }
+    start_key = event.get("startKey")
+    if start_key:
+        scan_kwargs["ExclusiveStartKey"] = start_key
+
+    stats_table = dynamodb.Table(QUESTION_STATS_TABLE)
+    questions = 0
+    items = 0
+    while True:
+        resp = stats_table.scan(**scan_kwargs)
+        for row in resp.get("Items", []):
+            items += _analyze(row["questionId"])
+            questions += 1
+
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            print(f"[item_analysis] done. questions={questions} items={items}")
+            return {"done": True, "questions": questions, "items": items}
+        scan_kwargs["ExclusiveStartKey"] = lek
+
+        if context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+            print(f"[item_analysis] handing off at {lek}. questions={questions} items={items}")
+            _invoke_self(context, {"startKey": lek})
+            return {"done": False, "questions": questions, "startKey": lek}
@@ -0,0 +1,326 @@
+# lambda_function.py for backfillQuestionIndexesFunction
+# 既存の質問から派生インデックス (タグ転置インデックス、検索インデックスなど) を作り直すバッチ。
+# 同じ行を上書きするだけなので何度実行してもよい。
+# 残り時間が少なくなったら、続きの開始キーを付けて自分自身を非同期で呼び直す。
+# BACKFILL_SEGMENTS > 1 なら最初の呼び出しがセグメントごとの呼び出しに分かれて並列に進む。
+# SHARE_CODES_TABLE があれば、既存の shareCode を登録テーブルに条件付きで登録する
+# (別の質問がすでに登録しているコードは重複としてログに出す)。
+# イベントに {"convertQuizItems": "zlib"} を渡すと quizItems を圧縮形式 (quizItemsZ) に移行する
+# ("list" で元に戻す)。
+import json
+import os
+import decimal
+import hashlib
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+QUESTIONS_TABLE = os.environ.get("QUESTIONS_TABLE") or os.environ.get("QUESTIONS_TABLE_NAME")
+TAG_INDEX_TABLE = os.environ.get("TAG_INDEX_TABLE")
+PURPOSE_TAG_INDEX_TABLE = os.environ.get("PURPOSE_TAG_INDEX_TABLE")
+# shareCode -> questionId の登録テーブル (createQuestionFunction / getQuestionsFunction と同じ)。未設定なら登録しない
+SHARE_CODES_TABLE = os.environ.get("SHARE_CODES_TABLE")
+# 残り時間がこれを下回ったら次の呼び出しに引き継ぐ
+TIME_MARGIN_MS = int(os.environ.get("TIME_MARGIN_MS", "30000"))
+SCAN_PAGE_SIZE = int(os.environ.get("SCAN_PAGE_SIZE", "200"))
+# 並列 Scan のセグメント数 (イベントの totalSegments で上書きできる)
+BACKFILL_SEGMENTS = int(os.environ.get("BACKFILL_SEGMENTS", "1"))
+# createQuestionFunction / getQuestionsFunction と同じ値にすること
+FEED_SHARD_COUNT = int(os.environ.get("FEED_SHARD_COUNT", "4"))
+# 全文検索の転置インデックス (PK: gram, SK: questionId, tf)。未設定なら書かない
+SEARCH_INDEX_TABLE = os.environ.get("SEARCH_INDEX_TABLE")
+# 項目ごとの重み。getQuestionsFunction などと揃えること
+SEARCH_FIELD_WEIGHTS = {"title": 3, "tags": 2, "remarks": 1, "questionText": 1}
+_SEARCH_SPLIT = re.compile(r"[\W_]+")
+# createQuestionFunction と同じ圧縮レベル
+QUIZ_ITEMS_ZLIB_LEVEL = int(os.environ.get("QUIZ_ITEMS_ZLIB_LEVEL", "6"))
+
+dynamodb = boto3.resource("dynamodb")
+lambda_client = boto3.client("lambda")
+
+
+def _write_tag_index(items: List[Dict[str, Any]]) -> int:
+    if not TAG_INDEX_TABLE:
+        return 0
+    written = 0
+    tag_index_table = dynamodb.Table(TAG_INDEX_TABLE)
+    with tag_index_table.batch_writer(overwrite_by_pkeys=["tag", "sortKey"]) as batch:
+        for item in items:
+            created_at = item.get("createdAt")
+            if not isinstance(created_at, str) or not created_at:
+                continue
+            question_id = item["questionId"]
+            for tag in set(item.get("tags") or []):
+                batch.put_item(
+                    Item={
+                        "tag": tag,
+                        "sortKey": f"{created_at}#{question_id}",
+                        "questionId": question_id,
+                        "createdAt": created_at,
+                    }
+                )
+                written += 1
+    return written
+
+
+def _write_purpose_tag_index(items: List[Dict[str, Any]]) -> int:
+    if not PURPOSE_TAG_INDEX_TABLE:
+        return 0
+    written = 0
+    purpose_tag_table = dynamodb.Table(PURPOSE_TAG_INDEX_TABLE)
+    with purpose_tag_table.batch_writer(overwrite_by_pkeys=["purposeTag", "sortKey"]) as batch:
+        for item in items:
+            created_at = item.get("createdAt")
+            purpose = item.get("purpose")
+            if not isinstance(created_at, str) or not created_at or not purpose:
+                continue
+            question_id = item["questionId"]
+            for tag in set(item.get("tags") or []):
+                batch.put_item(
+                    Item={
+                        "purposeTag": f"{purpose}#{tag}",
+                        "sortKey": f"{created_at}#{question_id}",
+                        "questionId": question_id,
+                        "createdAt": created_at,
+                    }
+                )
+                written += 1
+    return written
+
+
+def _register_share_codes(items: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    既存の shareCode を登録テーブルに attribute_not_exists で登録し、(登録した数, 重複の数) を返す。
+    登録済みなら同じ質問のものか確かめ、違う質問のコードなら重複としてログに出す (どちらも書き換えない)。
+    questionId の無い予約行 (以前の createQuestionFunction のプールが残し、TTL で消えるもの) とぶつかった場合は、
+    予約を既存の質問で置き換える。
+    """
+    if not SHARE_CODES_TABLE:
+        return 0, 0
+    codes_table = dynamodb.Table(SHARE_CODES_TABLE)
+    registered = duplicates = 0
+    for item in items:
+        code = item.get("shareCode")
+        if not isinstance(code, str) or not code:
+            continue
+        row = {"shareCode": code, "questionId": item["questionId"]}
+        if item.get("createdAt"):
+            row["createdAt"] = item["createdAt"]
+        try:
+            codes_table.put_item(Item=row, ConditionExpression="attribute_not_exists(shareCode)")
+            registered += 1
+            continue
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+        existing = codes_table.get_item(Key={"shareCode": code}, ConsistentRead=True).get("Item") or {}
+        owner = existing.get("questionId")
+        if owner == item["questionId"]:
+            continue
+        if owner is None:
+            try:
+                codes_table.put_item(Item=row, ConditionExpression="attribute_not_exists(questionId)")
+                registered += 1
+                print(f"[backfill] shareCode {code} was reserved; registered it for {item['questionId']}")
+                continue
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                # 予約がその間に別の質問に使われた
+                owner = (codes_table.get_item(Key={"shareCode": code}, ConsistentRead=True).get("Item") or {}).get("questionId")
+        duplicates += 1
+        print(f"[backfill] DUPLICATE shareCode {code}: {item['questionId']} conflicts with registered {owner}")
+    return registered, duplicates
+
+
+def _search_bigrams(text: str) -> List[str]:
+    """NFKC + 小文字にして記号・空白で区切り、区間ごとの文字 bigram を返す (分かち書き不要)"""
+    grams: List[str] = []
+    for segment in _SEARCH_SPLIT.split(unicodedata.normalize("NFKC", text).lower()):
+        grams.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return grams
+
+
+def _search_terms(item: Dict[str, Any]) -> Dict[str, int]:
+    """質問1件の bigram -> 重み付き出現回数"""
+    terms: Dict[str, int] = {}
+
+    def add(text: Any, weight: int) -> None:
+        if isinstance(text, str):
+            for gram in _search_bigrams(text):
+                terms[gram] = terms.get(gram, 0) + weight
+
+    add(item.get("title"), SEARCH_FIELD_WEIGHTS["title"])
+    for tag in item.get("tags") or []:
+        add(tag, SEARCH_FIELD_WEIGHTS["tags"])
+    add(item.get("remarks"), SEARCH_FIELD_WEIGHTS["remarks"])
+    for quiz_item in item.get("quizItems") or []:
+        if isinstance(quiz_item, dict):
+            add(quiz_item.get("questionText"), SEARCH_FIELD_WEIGHTS["questionText"])
+    return terms
+
+
+def _write_search_index(items: List[Dict[str, Any]]) -> int:
+    if not SEARCH_INDEX_TABLE:
+        return 0
+    written = 0
+    search_table = dynamodb.Table(SEARCH_INDEX_TABLE)
+    with search_table.batch_writer(overwrite_by_pkeys=["gram", "questionId"]) as batch:
+        for item in items:
+            for gram, tf in _search_terms(item).items():
+                batch.put_item(Item={"gram": gram, "questionId": item["questionId"], "tf": tf})
+                written += 1
+    return written
+
+
+def _convert_quiz_items(questions_table, items: List[Dict[str, Any]], target: str) -> int:
+    """quizItems の保存形式を target ("zlib" / "list") に書き換える。読んだ時点の形式を条件にする"""
+    converted = 0
+    for item in items:
+        if target == "zlib" and isinstance(item.get("quizItems"), list):
+            packed = json.dumps(item["quizItems"], ensure_ascii=False, separators=(",", ":"), default=_json_default)
+            update = {
+                "UpdateExpression": "SET quizItemsZ = :z REMOVE quizItems",
+                "ConditionExpression": "attribute_exists(quizItems)",
+                "ExpressionAttributeValues": {":z": zlib.compress(packed.encode("utf-8"), QUIZ_ITEMS_ZLIB_LEVEL)},
+            }
+        elif target == "list" and item.get("quizItemsZ") is not None:
+            update = {
+                "UpdateExpression": "SET quizItems = :l REMOVE quizItemsZ",
+                "ConditionExpression": "attribute_exists(quizItemsZ)",
+                "ExpressionAttributeValues": {":l": _unpack_quiz_items(item["quizItemsZ"])},
+            }
+        else:
+            continue
+        try:
+            questions_table.update_item(Key={"questionId": item["questionId"]}, **update)
+            converted += 1
+        except ClientError as e:
+            # 読んだ後に削除・変換された質問はそのまま
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    return converted
+
+
+def _json_default(o: Any) -> Any:
+    # DynamoDB の数値 (Decimal) は整数なら int、それ以外は float にする
+    if type(o) is decimal.Decimal:
+        i = int(o)
+        return i if i == o else float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _unpack_quiz_items(packed: Any) -> List[Any]:
+    return json.loads(zlib.decompress(bytes(getattr(packed, "value", packed))))
+
+
+def _decode_quiz_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """圧縮して保存された quizItemsZ を quizItems に戻す (以降の処理はリストだけ見ればよい)"""
+    for item in items:
+        packed = item.pop("quizItemsZ", None)
+        if packed is not None:
+            item["quizItems"] = _unpack_quiz_items(packed)
+    return items
+
+
+def _feed_shard(question_id: str) -> str:
+    return str(int(hashlib.md5(question_id.encode("utf-8")).hexdigest(), 16) % FEED_SHARD_COUNT)
+
+
+def _write_question_attrs(questions_table, items: List[Dict[str, Any]]) -> int:
+    """後から追加した属性 (quizItemCount, feedShard) が無い質問に付ける"""
+    written = 0
+    for item in items:
+        updates: Dict[str, Any] = {}
+        if "quizItemCount" not in item and isinstance(item.get("quizItems"), list):
+            updates["quizItemCount"] = len(item["quizItems"])
+        if "feedShard" not in item and item.get("createdAt"):
+            updates["feedShard"] = _feed_shard(item["questionId"])
+        if not updates:
+            continue
+        questions_table.update_item(
+            Key={"questionId": item["questionId"]},
+            UpdateExpression="SET " + ", ".join(f"{k} = :{k}" for k in updates),
+            ConditionExpression="attribute_exists(questionId)",
+            ExpressionAttributeValues={f":{k}": v for k, v in updates.items()},
+        )
+        written += 1
+    return written
+
+
+def _invoke_self(context, payload: Dict[str, Any]) -> None:
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+
+
+def lambda_handler(event, context):
+    if not QUESTIONS_TABLE:
+        raise Exception("QUESTIONS_TABLE is not set")
+    questions_table = dynamodb.Table(QUESTIONS_TABLE)
+    event = event or {}
+
+    convert_to = event.get("convertQuizItems")
+    if convert_to not in (None, "zlib", "list"):
+        raise ValueError("convertQuizItems must be 'zlib' or 'list'")
+    options = {"convertQuizItems": convert_to} if convert_to else {}
+
+    total_segments = int(event.get("totalSegments") or BACKFILL_SEGMENTS)
+    segment = event.get("segment")
+    if total_segments > 1 and segment is None:
+        # セグメントごとに呼び出しを分ける (それぞれが自分のセグメントを最後まで引き継ぐ)
+        for seg in range(total_segments):
+            _invoke_self(context, {**options, "segment": seg, "totalSegments": total_segments})
+        print(f"[backfill] fanned out to {total_segments} segments")
+        return {"done": False, "segments": total_segments}
+
+    scan_kwargs: Dict[str, Any] = {
+        "ProjectionExpression": "questionId, title, remarks, purpose, tags, createdAt, quizItems, quizItemsZ, quizItemCount, feedShard, shareCode",
+        "Limit": SCAN_PAGE_SIZE,
+    }
+    handoff: Dict[str, Any] = dict(options)
+    if segment is not None:
+        scan_kwargs["Segment"] = handoff["segment"] = int(segment)
+        scan_kwargs["TotalSegments"] = handoff["totalSegments"] = total_segments
+    start_key = event.get("startKey")
+    if start_key:
+        scan_kwargs["ExclusiveStartKey"] = start_key
+
+    scanned = 0
+    tag_rows = 0
+    search_rows = 0
+    updated = 0
+    converted = 0
+    codes = 0
+    duplicates = 0
+    while True:
+        resp = questions_table.scan(**scan_kwargs)
+        items = resp.get("Items", [])
+        scanned += len(items)
+        if convert_to:
+            converted += _convert_quiz_items(questions_table, items, convert_to)
+        _decode_quiz_items(items)
+        tag_rows += _write_tag_index(items)
+        tag_rows += _write_purpose_tag_index(items)
+        search_rows += _write_search_index(items)
+        updated += _write_question_attrs(questions_table, items)
+        registered, duplicated = _register_share_codes(items)
+        codes += registered
+        duplicates += duplicated
+
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            print(f"[backfill] done{handoff}. scanned={scanned} tagRows={tag_rows} searchRows={search_rows} updated={updated} converted={converted} shareCodes={codes} duplicateShareCodes={duplicates}")
+            return {"done": True, "scanned": scanned, "converted": converted, "duplicateShareCodes": duplicates}
+        scan_kwargs["ExclusiveStartKey"] = lek
+
+        if context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+            print(f"[backfill] handing off at {lek}{handoff}. scanned={scanned} tagRows={tag_rows} searchRows={search_rows} updated={updated} converted={converted} shareCodes={codes} duplicateShareCodes={duplicates}")
+            _invoke_self(context, {**handoff, "startKey": lek})
+            return {"done": False, "scanned": scanned, "startKey": lek}
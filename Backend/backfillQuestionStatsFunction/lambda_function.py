@@ -0,0 +1,239 @@
+# lambda_function.py for backfillQuestionStatsFunction
+# 回答ログ (AnswersLog) から、質問ごとの集計 (QuestionStats)、ユーザー x 質問の行 (AnsweredQuestions)、
+# quizItem ごとの選択肢の分布 (QuestionItemStats) を作り直すバッチ。
+# 質問ごとに QuestionIndex をすべて読んで数え直し、行を上書きするので何度実行してもよい
+# (数え直しと書き込みの間に記録された回答は、もう一度実行すれば反映される)。
+# 残り時間が少なくなったら、続きの開始キーを付けて自分自身を非同期で呼び直す。
+# BACKFILL_SEGMENTS > 1 なら最初の呼び出しがセグメントごとの呼び出しに分かれて並列に進む。
+# すべてのセグメントが終わったら QuestionStats に完了の印 (questionId="#backfill" の行の completedAt) を書く。
+# getQuestionAnalyticsFunction は印が付くまで集計の行を信用せず回答ログを数える
+# (集計の導入後の最初の回答が ADD で作る行には、それより前の回答が入っていない)。
+# AnsweredQuestions にも同じ印 (userId = questionId = "#backfill" の行の completedAt) を書く。
+# checkAnswerStatusFunction / getQuestionsFunction は印が付くまで回答ログで回答済みかを調べる。
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+QUESTIONS_TABLE = os.environ.get("QUESTIONS_TABLE") or os.environ.get("QUESTIONS_TABLE_NAME")
+ANSWERS_TABLE = os.environ.get("ANSWERS_TABLE", "AnswersLog")
+ANSWERS_QUESTION_INDEX_NAME = os.environ.get("ANSWERS_QUESTION_INDEX_NAME", "QuestionIndex")
+# logAnswerFunction と同じテーブル
+QUESTION_STATS_TABLE = os.environ.get("QUESTION_STATS_TABLE")
+ANSWERED_QUESTIONS_TABLE = os.environ.get("ANSWERED_QUESTIONS_TABLE")
+QUESTION_ITEM_STATS_TABLE = os.environ.get("QUESTION_ITEM_STATS_TABLE")
+CHOICE_ATTR_PREFIX = "choice#"
+# 完了の印の行のキー (質問やユーザーの ID とは重ならない)
+BACKFILL_MARKER_ID = "#backfill"
+ANSWERED_MARKER_KEY = {"userId": "#backfill", "questionId": "#backfill"}
+# 残り時間がこれを下回ったら次の呼び出しに引き継ぐ
+TIME_MARGIN_MS = int(os.environ.get("TIME_MARGIN_MS", "30000"))
+SCAN_PAGE_SIZE = int(os.environ.get("SCAN_PAGE_SIZE", "100"))
+# 並列 Scan のセグメント数 (イベントの totalSegments で上書きできる)
+BACKFILL_SEGMENTS = int(os.environ.get("BACKFILL_SEGMENTS", "1"))
+
+dynamodb = boto3.resource("dynamodb")
+lambda_client = boto3.client("lambda")
+
+
+def _question_logs(answers_table, question_id: str) -> List[Dict[str, Any]]:
+    kwargs: Dict[str, Any] = {
+        "IndexName": ANSWERS_QUESTION_INDEX_NAME,
+        "KeyConditionExpression": Key("questionId").eq(question_id),
+        "ProjectionExpression": "userId, quizItemId, isCorrect, selectedChoiceId, #ts",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    logs: List[Dict[str, Any]] = []
+    while True:
+        resp = answers_table.query(**kwargs)
+        logs.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return logs
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _aggregate(question_id: str, logs: List[Dict[str, Any]]):
+    """(質問の集計, ユーザーごとの行のリスト, quizItem ごとの行のリスト)。logAnswerFunction が ADD で作るものと同じ形にする"""
+    per_user: Dict[str, Dict[str, Any]] = {}
+    per_item: Dict[str, Dict[str, Any]] = {}
+    correct = 0
+    last_answered_at = None
+    # timestamp は ISO 8601 の文字列なので文字列の順序 = 時刻の順序
+    for log in sorted(logs, key=lambda it: it.get("timestamp") or ""):
+        ts = log.get("timestamp")
+        if log.get("isCorrect"):
+            correct += 1
+        if ts:
+            last_answered_at = ts
+        quiz_item_id = log.get("quizItemId")
+        if quiz_item_id:
+            hist = per_item.get(quiz_item_id)
+            if hist is None:
+                hist = per_item[quiz_item_id] = {"questionId": question_id, "quizItemId": quiz_item_id, "answers": 0, "correctAnswers": 0}
+            hist["answers"] += 1
+            hist["correctAnswers"] += 1 if log.get("isCorrect") else 0
+            choice = CHOICE_ATTR_PREFIX + str(log.get("selectedChoiceId"))
+            hist[choice] = hist.get(choice, 0) + 1
+        user_id = log.get("userId")
+        if not user_id:
+            continue
+        row = per_user.get(user_id)
+        if row is None:
+            row = per_user[user_id] = {"userId": user_id, "questionId": question_id, "attempts": 0}
+            if ts:
+                row["firstAnsweredAt"] = ts
+        row["attempts"] += 1
+        if ts:
+            row["lastAnsweredAt"] = ts
+        row["lastIsCorrect"] = log.get("isCorrect")
+        row["lastSelectedChoiceId"] = log.get("selectedChoiceId")
+    stats: Dict[str, Any] = {
+        "questionId": question_id,
+        "totalAnswers": len(logs),
+        "correctAnswers": correct,
+        "uniqueAnswerers": len(per_user),
+    }
+    if last_answered_at:
+        stats["lastAnsweredAt"] = last_answered_at
+    return stats, list(per_user.values()), list(per_item.values())
+
+
+def _rebuild(question_ids: List[str]) -> Dict[str, int]:
+    answers_table = dynamodb.Table(ANSWERS_TABLE)
+    counts = {"questions": 0, "answers": 0, "answerers": 0}
+    stats_rows = []
+    marker_rows = []
+    item_rows = []
+    for question_id in question_ids:
+        logs = _question_logs(answers_table, question_id)
+        if not logs:
+            continue
+        stats, markers, item_stats = _aggregate(question_id, logs)
+        stats_rows.append(stats)
+        marker_rows.extend(markers)
+        item_rows.extend(item_stats)
+        counts["questions"] += 1
+        counts["answers"] += stats["totalAnswers"]
+        counts["answerers"] += stats["uniqueAnswerers"]
+    if QUESTION_STATS_TABLE and stats_rows:
+        with dynamodb.Table(QUESTION_STATS_TABLE).batch_writer(overwrite_by_pkeys=["questionId"]) as batch:
+            for row in stats_rows:
+                batch.put_item(Item=row)
+    if ANSWERED_QUESTIONS_TABLE and marker_rows:
+        with dynamodb.Table(ANSWERED_QUESTIONS_TABLE).batch_writer(overwrite_by_pkeys=["userId", "questionId"]) as batch:
+            for row in marker_rows:
+                batch.put_item(Item=row)
+    if QUESTION_ITEM_STATS_TABLE and item_rows:
+        # 項目分析の結果も消えるが、集計の行の analyzedThrough も消えるので analyzeQuestionItemsFunction が計算し直す
+        with dynamodb.Table(QUESTION_ITEM_STATS_TABLE).batch_writer(overwrite_by_pkeys=["questionId", "quizItemId"]) as batch:
+            for row in item_rows:
+                batch.put_item(Item=row)
+    return counts
+
+
+def _start_run(total_segments: int) -> str:
+    """実行の ID を決めて印の行に書く。前回の completedAt は残す (作り直している間も集計の行はおおむね正しい)"""
+    run_id = uuid.uuid4().hex
+    dynamodb.Table(QUESTION_STATS_TABLE).update_item(
+        Key={"questionId": BACKFILL_MARKER_ID},
+        UpdateExpression="SET runId = :r, totalSegments = :t, doneSegments = :z, startedAt = :now",
+        ExpressionAttributeValues={":r": run_id, ":t": total_segments, ":z": 0, ":now": datetime.utcnow().isoformat() + "Z"},
+    )
+    return run_id
+
+
+def _finish_segment(run_id: Optional[str]) -> bool:
+    """セグメントの完了を数え、全セグメントが終わったら completedAt を書く。後から別の実行が始まっていたら何もしない"""
+    if not run_id:
+        return False
+    table = dynamodb.Table(QUESTION_STATS_TABLE)
+    try:
+        marker = table.update_item(
+            Key={"questionId": BACKFILL_MARKER_ID},
+            UpdateExpression="ADD doneSegments :one",
+            ConditionExpression="runId = :r",
+            ExpressionAttributeValues={":one": 1, ":r": run_id},
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+        if marker["doneSegments"] < marker["totalSegments"]:
+            return False
+        now = datetime.utcnow().isoformat() + "Z"
+        table.update_item(
+            Key={"questionId": BACKFILL_MARKER_ID},
+            UpdateExpression="SET completedAt = :now",
+            ConditionExpression="runId = :r",
+            ExpressionAttributeValues={":now": now, ":r": run_id},
+        )
+        if ANSWERED_QUESTIONS_TABLE:
+            dynamodb.Table(ANSWERED_QUESTIONS_TABLE).put_item(Item={**ANSWERED_MARKER_KEY, "runId": run_id, "completedAt": now})
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        print(f"[backfill_stats] run {run_id} was superseded")
+        return False
+
+
+def _invoke_self(context, payload: Dict[str, Any]) -> None:
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+
+
+def lambda_handler(event, context):
+    if not QUESTIONS_TABLE:
+        raise Exception("QUESTIONS_TABLE is not set")
+    if not QUESTION_STATS_TABLE:
+        raise Exception("QUESTION_STATS_TABLE is not set")
+    questions_table = dynamodb.Table(QUESTIONS_TABLE)
+    event = event or {}
+
+    total_segments = int(event.get("totalSegments") or BACKFILL_SEGMENTS)
+    segment = event.get("segment")
+    start_key = event.get("startKey")
+    run_id = event.get("runId")
+    if not run_id and segment is None and not start_key:
+        run_id = _start_run(total_segments)
+    if total_segments > 1 and segment is None:
+        # セグメントごとに呼び出しを分ける (それぞれが自分のセグメントを最後まで引き継ぐ)
+        for seg in range(total_segments):
+            _invoke_self(context, {"runId": run_id, "segment": seg, "totalSegments": total_segments})
+        print(f"[backfill_stats] fanned out to {total_segments} segments")
+        return {"done": False, "segments": total_segments}
+
+    scan_kwargs: Dict[str, Any] = {"ProjectionExpression": "questionId", "Limit": SCAN_PAGE_SIZE}
+    handoff: Dict[str, Any] = {"runId": run_id} if run_id else {}
+    if segment is not None:
+        scan_kwargs["Segment"] = handoff["segment"] = int(segment)
+        scan_kwargs["TotalSegments"] = handoff["totalSegments"] = total_segments
+    if start_key:
+        scan_kwargs["ExclusiveStartKey"] = start_key
+
+    scanned = 0
+    totals = {"questions": 0, "answers": 0, "answerers": 0}
+    while True:
+        resp = questions_table.scan(**scan_kwargs)
+        items = resp.get("Items", [])
+        scanned += len(items)
+        for key, value in _rebuild([it["questionId"] for it in items]).items():
+            totals[key] += value
+
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            completed = _finish_segment(run_id)
+            print(f"[backfill_stats] done{handoff}. scanned={scanned} {totals} completed={completed}")
+            return {"done": True, "scanned": scanned, "completed": completed, **totals}
+        scan_kwargs["ExclusiveStartKey"] = lek
+
+        if context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+            print(f"[backfill_stats] handing off at {lek}{handoff}. scanned={scanned} {totals}")
+            _invoke_self(context, {**handoff, "startKey": lek})
+            return {"done": False, "scanned": scanned, "startKey": lek}
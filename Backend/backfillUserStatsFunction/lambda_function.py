@@ -0,0 +1,246 @@
+# lambda_function.py for backfillUserStatsFunction
+# 回答ログ (AnswersLog の UserIndex) から、ユーザーごとの通算・日・週の集計 (UserStatsBuckets) を作り直すバッチ。
+# ユーザー (Users テーブル) ごとに回答ログをすべて読んで数え直し、行を上書きする (ログに無い bucket の行は消す) ので
+# 何度実行してもよい (数え直しと書き込みの間に記録された回答は、もう一度実行すれば反映される)。
+# 残り時間が少なくなったら、続きの開始キーを付けて自分自身を非同期で呼び直す。
+# BACKFILL_SEGMENTS > 1 なら最初の呼び出しがセグメントごとの呼び出しに分かれて並列に進む。
+# {"userIds": [...]} を渡すとそのユーザーだけ作り直す (cascadeDeleteQuestionFunction が回答ログを消した後に呼ぶ)。
+# 全ユーザーの作り直しがすべてのセグメントで終わったら、UserStatsBuckets に完了の印
+# (userId="#backfill", bucket="all" の行の completedAt) を書く。getUserStatsFunction は印が付くまで回答ログを数える
+# (集計の導入後の最初の回答が ADD で作る行には、それより前の回答が入っていない)。
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+USERS_TABLE_NAME = os.environ.get("USERS_TABLE_NAME", "Users")
+ANSWERS_TABLE = os.environ.get("ANSWERS_TABLE", "AnswersLog")
+ANSWERS_USER_INDEX_NAME = os.environ.get("ANSWERS_USER_INDEX_NAME", "UserIndex")
+# logAnswerFunction と同じテーブルとタイムゾーン
+USER_STATS_BUCKETS_TABLE = os.environ.get("USER_STATS_BUCKETS_TABLE")
+STATS_UTC_OFFSET_HOURS = float(os.environ.get("STATS_UTC_OFFSET_HOURS", "9"))
+# 残り時間がこれを下回ったら次の呼び出しに引き継ぐ
+TIME_MARGIN_MS = int(os.environ.get("TIME_MARGIN_MS", "30000"))
+SCAN_PAGE_SIZE = int(os.environ.get("SCAN_PAGE_SIZE", "100"))
+# 並列 Scan のセグメント数 (イベントの totalSegments で上書きできる)
+BACKFILL_SEGMENTS = int(os.environ.get("BACKFILL_SEGMENTS", "1"))
+# 完了の印の行のキー (ユーザーの ID とは重ならない)
+BACKFILL_MARKER_KEY = {"userId": "#backfill", "bucket": "all"}
+
+dynamodb = boto3.resource("dynamodb")
+lambda_client = boto3.client("lambda")
+
+
+def _local_date(timestamp: str):
+    """回答の timestamp (UTC の ISO 8601 + "Z") を集計のタイムゾーンの日付にする"""
+    return (datetime.fromisoformat(timestamp.rstrip("Z")) + timedelta(hours=STATS_UTC_OFFSET_HOURS)).date()
+
+
+def _week_key(day) -> str:
+    year, week, _ = day.isocalendar()
+    return f"w#{year}-W{week:02d}"
+
+
+def _user_logs(answers_table, user_id: str) -> List[Dict[str, Any]]:
+    kwargs: Dict[str, Any] = {
+        "IndexName": ANSWERS_USER_INDEX_NAME,
+        "KeyConditionExpression": Key("userId").eq(user_id),
+        "ProjectionExpression": "questionId, isCorrect, #ts",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    logs: List[Dict[str, Any]] = []
+    while True:
+        resp = answers_table.query(**kwargs)
+        logs.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return logs
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _aggregate(user_id: str, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """bucket の行のリスト。logAnswerFunction が ADD で作るものと同じ形にする"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    seen: Dict[str, set] = {}
+    last_answered_at = None
+    for log in logs:
+        ts = log.get("timestamp")
+        buckets = ["all"]
+        if ts:
+            day = _local_date(ts)
+            buckets += [f"d#{day.isoformat()}", _week_key(day)]
+            # timestamp は ISO 8601 の文字列なので文字列の順序 = 時刻の順序
+            if last_answered_at is None or ts > last_answered_at:
+                last_answered_at = ts
+        for bucket in buckets:
+            row = rows.get(bucket)
+            if row is None:
+                row = rows[bucket] = {"userId": user_id, "bucket": bucket, "answers": 0, "correctAnswers": 0}
+            row["answers"] += 1
+            row["correctAnswers"] += 1 if log.get("isCorrect") else 0
+            seen.setdefault(bucket, set()).add(log.get("questionId"))
+    for bucket, row in rows.items():
+        row["distinctQuestions"] = len(seen[bucket])
+    if last_answered_at and "all" in rows:
+        rows["all"]["lastAnsweredAt"] = last_answered_at
+    return list(rows.values())
+
+
+def _existing_buckets(stats_table, user_id: str) -> List[str]:
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("userId").eq(user_id),
+        # bucket は予約語
+        "ProjectionExpression": "#b",
+        "ExpressionAttributeNames": {"#b": "bucket"},
+    }
+    buckets: List[str] = []
+    while True:
+        resp = stats_table.query(**kwargs)
+        buckets.extend(it["bucket"] for it in resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return buckets
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _rebuild(user_ids: List[str]) -> Dict[str, int]:
+    answers_table = dynamodb.Table(ANSWERS_TABLE)
+    stats_table = dynamodb.Table(USER_STATS_BUCKETS_TABLE)
+    counts = {"users": 0, "answers": 0, "buckets": 0, "removed": 0}
+    with stats_table.batch_writer(overwrite_by_pkeys=["userId", "bucket"]) as batch:
+        for user_id in user_ids:
+            rows = _aggregate(user_id, _user_logs(answers_table, user_id))
+            # 質問の削除などで回答ログが消えた bucket は行も消す
+            keep = {row["bucket"] for row in rows}
+            for bucket in _existing_buckets(stats_table, user_id):
+                if bucket not in keep:
+                    batch.delete_item(Key={"userId": user_id, "bucket": bucket})
+                    counts["removed"] += 1
+            for row in rows:
+                batch.put_item(Item=row)
+            if rows:
+                counts["users"] += 1
+                counts["answers"] += next(row["answers"] for row in rows if row["bucket"] == "all")
+                counts["buckets"] += len(rows)
+    return counts
+
+
+def _rebuild_listed(user_ids: List[str], context) -> Dict[str, Any]:
+    """指定されたユーザーだけ作り直す。残り時間が少なくなったら残りのユーザーを引き継ぐ"""
+    totals = {"users": 0, "answers": 0, "buckets": 0, "removed": 0}
+    pending = list(dict.fromkeys(user_ids))
+    while pending:
+        batch, pending = pending[:SCAN_PAGE_SIZE], pending[SCAN_PAGE_SIZE:]
+        for key, value in _rebuild(batch).items():
+            totals[key] += value
+        if pending and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+            print(f"[backfill_user_stats] handing off {len(pending)} listed users. {totals}")
+            _invoke_self(context, {"userIds": pending})
+            return {"done": False, "pending": len(pending), **totals}
+    print(f"[backfill_user_stats] done for {len(user_ids)} listed users. {totals}")
+    return {"done": True, **totals}
+
+
+def _start_run(total_segments: int) -> str:
+    """実行の ID を決めて印の行に書く。前回の completedAt は残す (作り直している間も集計の行はおおむね正しい)"""
+    run_id = uuid.uuid4().hex
+    dynamodb.Table(USER_STATS_BUCKETS_TABLE).update_item(
+        Key=BACKFILL_MARKER_KEY,
+        UpdateExpression="SET runId = :r, totalSegments = :t, doneSegments = :z, startedAt = :now",
+        ExpressionAttributeValues={":r": run_id, ":t": total_segments, ":z": 0, ":now": datetime.utcnow().isoformat() + "Z"},
+    )
+    return run_id
+
+
+def _finish_segment(run_id: Optional[str]) -> bool:
+    """セグメントの完了を数え、全セグメントが終わったら completedAt を書く。後から別の実行が始まっていたら何もしない"""
+    if not run_id:
+        return False
+    table = dynamodb.Table(USER_STATS_BUCKETS_TABLE)
+    try:
+        marker = table.update_item(
+            Key=BACKFILL_MARKER_KEY,
+            UpdateExpression="ADD doneSegments :one",
+            ConditionExpression="runId = :r",
+            ExpressionAttributeValues={":one": 1, ":r": run_id},
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+        if marker["doneSegments"] < marker["totalSegments"]:
+            return False
+        table.update_item(
+            Key=BACKFILL_MARKER_KEY,
+            UpdateExpression="SET completedAt = :now",
+            ConditionExpression="runId = :r",
+            ExpressionAttributeValues={":now": datetime.utcnow().isoformat() + "Z", ":r": run_id},
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        print(f"[backfill_user_stats] run {run_id} was superseded")
+        return False
+
+
+def _invoke_self(context, payload: Dict[str, Any]) -> None:
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+
+
+def lambda_handler(event, context):
+    if not USER_STATS_BUCKETS_TABLE:
+        raise Exception("USER_STATS_BUCKETS_TABLE is not set")
+    users_table = dynamodb.Table(USERS_TABLE_NAME)
+    event = event or {}
+
+    if event.get("userIds") is not None:
+        return _rebuild_listed(event["userIds"], context)
+
+    total_segments = int(event.get("totalSegments") or BACKFILL_SEGMENTS)
+    segment = event.get("segment")
+    start_key = event.get("startKey")
+    run_id = event.get("runId")
+    if not run_id and segment is None and not start_key:
+        run_id = _start_run(total_segments)
+    if total_segments > 1 and segment is None:
+        # セグメントごとに呼び出しを分ける (それぞれが自分のセグメントを最後まで引き継ぐ)
+        for seg in range(total_segments):
+            _invoke_self(context, {"runId": run_id, "segment": seg, "totalSegments": total_segments})
+        print(f"[backfill_user_stats] fanned out to {total_segments} segments")
+        return {"done": False, "segments": total_segments}
+
+    scan_kwargs: Dict[str, Any] = {"ProjectionExpression": "userId", "Limit": SCAN_PAGE_SIZE}
+    handoff: Dict[str, Any] = {"runId": run_id} if run_id else {}
+    if segment is not None:
+        scan_kwargs["Segment"] = handoff["segment"] = int(segment)
+        scan_kwargs["TotalSegments"] = handoff["totalSegments"] = total_segments
+    if start_key:
+        scan_kwargs["ExclusiveStartKey"] = start_key
+
+    scanned = 0
+    totals = {"users": 0, "answers": 0, "buckets": 0, "removed": 0}
+    while True:
+        resp = users_table.scan(**scan_kwargs)
+        items = resp.get("Items", [])
+        scanned += len(items)
+        for key, value in _rebuild([it["userId"] for it in items]).items():
+            totals[key] += value
+
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            completed = _finish_segment(run_id)
+            print(f"[backfill_user_stats] done{handoff}. scanned={scanned} {totals} completed={completed}")
+            return {"done": True, "scanned": scanned, "completed": completed, **totals}
+        scan_kwargs["ExclusiveStartKey"] = lek
+
+        if context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+            print(f"[backfill_user_stats] handing off at {lek}{handoff}. scanned={scanned} {totals}")
+            _invoke_self(context, {**handoff, "startKey": lek})
+            return {"done": False, "scanned": scanned, "startKey": lek}
@@ -0,0 +1,150 @@
+"""
+レスポンス本文の JSON 化のマイクロベンチマーク。
+
+従来の json.dumps(..., cls=DecimalEncoder) と、getQuestionsFunction の _dumps
+(orjson があれば orjson、無ければ標準 json + 軽い default) などを、
+質問一覧 (summary / full) と AnswersLog の行に近いデータで比べる。
+_dumps は Decimal ごとに default (Python) を呼ぶ。先に Decimal を変換しておく案 (to_plain+_dumps) とも比べる。
+
+    python Backend/benchmarks/bench_json_serialization.py [--questions 500] [--logs 5000]
+
+orjson を入れた環境と入れていない環境の両方で実行して比べること。
+"""
+import argparse
+import decimal
+import importlib.util
+import json
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+# Lambda モジュールは import 時に boto3.resource を作るのでリージョンだけ与えておく
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Lambda レイヤー (layers/common) のモジュール (Lambda では /opt/python)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "layers", "common", "python"))
+
+
+def _load_get_questions():
+    path = os.path.join(BACKEND_DIR, "getQuestionsFunction", "lambda_function.py")
+    spec = importlib.util.spec_from_file_location("get_questions_lambda", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# 変更前の実装 (比較の基準)
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            if o % 1 == 0:
+                return int(o)
+            return float(o)
+        return super().default(o)
+
+
+def _to_plain(o):
+    """Decimal を Python 側で1回走査して変換する案 (比較用)"""
+    t = type(o)
+    if t is dict:
+        return {k: _to_plain(v) for k, v in o.items()}
+    if t is list:
+        return [_to_plain(v) for v in o]
+    if t is Decimal:
+        i = int(o)
+        return i if i == o else float(o)
+    return o
+
+
+def make_questions(n, full):
+    rng = random.Random(1)
+    items = []
+    for i in range(n):
+        item = {
+            "questionId": f"{rng.getrandbits(128):032x}",
+            "title": f"英単語クイズ 第{i}回「よく出る前置詞」",
+            "purpose": rng.choice(["学習", "復習", "テスト対策"]),
+            "tags": rng.sample(["英語", "文法", "TOEIC", "前置詞", "初級", "中級"], 3),
+            "authorId": f"user-{rng.randint(1, 200)}",
+            "createdAt": f"2026-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:34:56.789012+00:00",
+            "quizItemCount": Decimal(5),
+        }
+        if full:
+            item["remarks"] = "間違えやすいものを中心に集めました。" * 2
+            item["shareCode"] = f"{rng.getrandbits(40):010x}"
+            item["quizItems"] = [
+                {
+                    "questionText": f"空欄に入る語を選んでください: I was born ___ {1990 + q}.",
+                    "choices": [{"id": Decimal(c), "text": w} for c, w in enumerate(["in", "on", "at", "for"])],
+                    "correctChoiceId": Decimal(0),
+                    "explanation": "年の前には in を使います。",
+                    "points": Decimal("1.5"),
+                }
+                for q in range(5)
+            ]
+        items.append(item)
+    return items
+
+
+def make_answer_logs(n):
+    rng = random.Random(2)
+    return [
+        {
+            "logId": f"{rng.getrandbits(128):032x}",
+            "userId": f"user-{rng.randint(1, 200)}",
+            "questionId": f"{rng.getrandbits(64):016x}",
+            "selectedChoiceId": Decimal(rng.randint(0, 3)),
+            "isCorrect": rng.random() < 0.6,
+            "timestamp": Decimal(1767225600 + rng.randint(0, 10_000_000)),
+            "elapsedSeconds": Decimal(str(round(rng.uniform(1, 60), 2))),
+        }
+        for _ in range(n)
+    ]
+
+
+def bench(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--logs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    lf = _load_get_questions()
+    backend = "orjson" if lf.orjson is not None else "json"
+    payloads = {
+        "questions(summary)": make_questions(args.questions, full=False),
+        "questions(full)": make_questions(args.questions, full=True),
+        "answersLog": make_answer_logs(args.logs),
+    }
+    candidates = {
+        "DecimalEncoder": lambda p: json.dumps(p, ensure_ascii=False, cls=DecimalEncoder),
+        "to_plain+json": lambda p: json.dumps(_to_plain(p), ensure_ascii=False, separators=(",", ":")),
+        "json+_json_default": lambda p: json.dumps(p, ensure_ascii=False, separators=(",", ":"), default=lf._json_default),
+        f"_dumps({backend})": lf._dumps,
+        # 読み込んだときに Decimal を変換しておく案 (default を呼ばずに済むが、全体をたどる分だけ遅い)
+        "to_plain+_dumps": lambda p: lf._dumps(_to_plain(p)),
+    }
+
+    print(f"{'payload':<20} {'serializer':<22} {'ms/call':>9} {'speedup':>8} {'bytes':>9}")
+    for payload_name, payload in payloads.items():
+        expected = json.loads(json.dumps(payload, ensure_ascii=False, cls=DecimalEncoder))
+        baseline = None
+        for name, fn in candidates.items():
+            out = fn(payload)
+            # 出力は空白の有無を除けば同じ JSON になること
+            assert json.loads(out) == expected, name
+            ms = bench(lambda: fn(payload), args.repeat, args.number)
+            baseline = baseline or ms
+            print(f"{payload_name:<20} {name:<22} {ms:>9.2f} {baseline / ms:>7.2f}x {len(out.encode('utf-8')):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+quizItems の保存形式のベンチマーク。
+
+従来の DynamoDB のリスト (L of M) と、QUIZ_ITEMS_STORAGE=zlib の圧縮バイナリ (quizItemsZ) で、
+質問1件のアイテムサイズ (RCU/WCU の課金単位) と、boto3 の型変換 (TypeDeserializer) を含む
+読み出しにかかる時間を比べる。
+
+    python Backend/benchmarks/bench_quiz_items_storage.py [--questions 200] [--items 5,10,30]
+
+orjson を入れた環境と入れていない環境の両方で実行して比べること。
+"""
+import argparse
+import json
+import math
+import random
+import timeit
+import zlib
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def make_question(rng, n_items):
+    quiz_items = []
+    for i in range(n_items):
+        choices = [{"id": f"c{j}", "text": rng.choice(["in", "on", "at", "for", "to", "by"]) + f" ({j})"} for j in range(4)]
+        quiz_items.append({
+            "id": f"q{i}",
+            "questionText": f"空欄に入る語を選んでください: I was born ___ {1990 + i}. 第{i}問の補足説明もここに入ります。",
+            "choices": choices,
+            "correctAnswerId": rng.choice(choices)["id"],
+        })
+    return {
+        "questionId": f"{rng.getrandbits(128):032x}",
+        "title": "英単語クイズ「よく出る前置詞」",
+        "purpose": "学習",
+        "tags": ["英語", "文法", "前置詞"],
+        "authorId": f"user-{rng.randint(1, 200)}",
+        "createdAt": "2026-05-01T12:34:56.789012+00:00",
+        "feedShard": "1",
+        "remarks": "間違えやすいものを中心に集めました。",
+        "shareCode": f"{rng.getrandbits(40):010x}",
+        "quizItemCount": n_items,
+        "quizItems": quiz_items,
+    }
+
+
+def to_zlib(item, level):
+    stored = {k: v for k, v in item.items() if k != "quizItems"}
+    packed = json.dumps(item["quizItems"], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    stored["quizItemsZ"] = zlib.compress(packed, level)
+    return stored
+
+
+def _value_size(av):
+    """DynamoDB のアイテムサイズの計算規則 (属性値ぶん)"""
+    (t, v), = av.items()
+    if t == "S":
+        return len(v.encode("utf-8"))
+    if t == "N":
+        digits = len(v.lstrip("-").replace(".", "").strip("0")) or 1
+        return math.ceil(digits / 2) + 1
+    if t == "B":
+        return len(v)
+    if t == "BOOL" or t == "NULL":
+        return 1
+    if t in ("SS", "NS", "BS"):
+        return sum(_value_size({t[0]: x}) for x in v)
+    if t == "L":
+        return 3 + sum(1 + _value_size(x) for x in v)
+    if t == "M":
+        return 3 + sum(1 + len(k.encode("utf-8")) + _value_size(x) for k, x in v.items())
+    raise ValueError(t)
+
+
+def item_size(wire):
+    return sum(len(k.encode("utf-8")) + _value_size(v) for k, v in wire.items())
+
+
+def to_wire(item):
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+
+def read_list(wire):
+    return {k: _deserializer.deserialize(v) for k, v in wire.items()}
+
+
+def read_zlib(wire):
+    item = {k: _deserializer.deserialize(v) for k, v in wire.items()}
+    raw = zlib.decompress(bytes(item.pop("quizItemsZ").value))
+    item["quizItems"] = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return item
+
+
+def bench(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--items", default="5,10,30", help="質問あたりの quizItems の数 (カンマ区切り)")
+    parser.add_argument("--level", type=int, default=6, help="zlib の圧縮レベル")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"json backend: {'orjson' if orjson is not None else 'json'}, zlib level {args.level}")
+    print(f"{'quizItems':>9} {'format':<6} {'bytes/item':>10} {'RCU(eventual)':>13} {'WCU':>5} {'read ms/page':>12} {'speedup':>8}")
+    for n_items in (int(x) for x in args.items.split(",")):
+        questions = [make_question(rng, n_items) for _ in range(args.questions)]
+        formats = {
+            "list": ([to_wire(q) for q in questions], read_list),
+            "zlib": ([to_wire(to_zlib(q, args.level)) for q in questions], read_zlib),
+        }
+        expected = json.loads(json.dumps(questions, default=int))
+        baseline = None
+        for name, (wires, read) in formats.items():
+            decoded = [read(w) for w in wires]
+            # どちらの形式でも同じ質問に戻ること
+            assert json.loads(json.dumps(decoded, default=int)) == expected, name
+            size = sum(item_size(w) for w in wires) / len(wires)
+            # 読み込みは 4KB、書き込みは 1KB 単位で切り上げ (結果整合性の読み込みは半分)
+            rcu = math.ceil(size / 4096) / 2
+            wcu = math.ceil(size / 1024)
+            ms = bench(lambda: [read(w) for w in wires], args.repeat, args.number)
+            baseline = baseline or ms
+            print(f"{n_items:>9} {name:<6} {size:>10.0f} {rcu:>13.1f} {wcu:>5} {ms:>12.2f} {baseline / ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
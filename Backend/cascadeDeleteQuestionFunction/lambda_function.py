@@ -0,0 +1,285 @@
+# lambda_function.py for cascadeDeleteQuestionFunction
+# 削除された質問にぶら下がる行 (派生インデックス、shareCode、ブックマーク、回答ログと集計) を消すジョブ。
+# deleteQuestionFunction が質問を消した直後に非同期 (InvocationType=Event) で呼ぶ。
+# 同じ行を消すだけなので何度実行してもよい (非同期呼び出しの自動リトライもそのまま受けられる)。
+# 残り時間が少なくなったら、いまのフェーズと開始キーを付けて自分自身を非同期で呼び直す。
+# 回答ログを消し終えたら、回答していたユーザーの集計 (UserStatsBuckets) を backfillUserStatsFunction で作り直す。
+# ユーザーが AFFECTED_USERS_MAX 人溜まったら、その時点で (引き継ぎの前でも) その分の作り直しを頼む。
+# その後のページにまた出てきたユーザーは、もう一度溜めて作り直させる (最後の作り直しはログを消した後になる)。
+#
+# イベント:
+#   {"questionId": "...", "shareCode": "...", "createdAt": "...", "purpose": "...", "tags": [...],
+#    "searchGrams": [...], "phase": "indexes" | "bookmarks" | "answers", "startKey": {...},
+#    "affectedUserIds": [...]}  (最後のものは引き継ぎ用)
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+SHARE_CODES_TABLE = os.environ.get("SHARE_CODES_TABLE")
+TAG_INDEX_TABLE = os.environ.get("TAG_INDEX_TABLE")
+PURPOSE_TAG_INDEX_TABLE = os.environ.get("PURPOSE_TAG_INDEX_TABLE")
+SEARCH_INDEX_TABLE = os.environ.get("SEARCH_INDEX_TABLE")
+# ブックマーク (PK: userId, SK: questionId) と questionId の GSI。
+# GSI が無ければブックマークは消さない (削除のたびにテーブル全体を Scan しない。残った行は一覧で読み飛ばされる)
+BOOKMARKS_TABLE = os.environ.get("BOOKMARKS_TABLE") or os.environ.get("BOOKMARKS_TABLE_NAME")
+BOOKMARKS_QUESTION_INDEX_NAME = os.environ.get("BOOKMARKS_QUESTION_INDEX_NAME")
+# 回答ログ (PK: logId) と questionId の GSI
+ANSWERS_TABLE = os.environ.get("ANSWERS_TABLE", "AnswersLog")
+ANSWERS_QUESTION_INDEX_NAME = os.environ.get("ANSWERS_QUESTION_INDEX_NAME", "QuestionIndex")
+# 回答の集計 (PK: questionId) とユーザー x 質問の行 (PK: userId, SK: questionId)。logAnswerFunction が書く
+QUESTION_STATS_TABLE = os.environ.get("QUESTION_STATS_TABLE")
+ANSWERED_QUESTIONS_TABLE = os.environ.get("ANSWERED_QUESTIONS_TABLE")
+# quizItem ごとの選択肢の分布と項目分析 (PK: questionId, SK: quizItemId)
+QUESTION_ITEM_STATS_TABLE = os.environ.get("QUESTION_ITEM_STATS_TABLE")
+# ユーザーごとの集計を作り直す関数 (backfillUserStatsFunction)。{"userIds": [...]} で非同期に呼ぶ
+USER_STATS_BACKFILL_FUNCTION = os.environ.get("USER_STATS_BACKFILL_FUNCTION")
+# 作り直しを1回で頼むユーザー数の上限。これだけ溜まったら途中でも頼む (引き継ぎのイベントの大きさもこれで抑える)
+AFFECTED_USERS_MAX = int(os.environ.get("AFFECTED_USERS_MAX", "2000"))
+
+# 残り時間がこれを下回ったら次の呼び出しに引き継ぐ
+TIME_MARGIN_MS = int(os.environ.get("TIME_MARGIN_MS", "20000"))
+# ブックマーク・回答ログを1回の Query で読む件数
+QUERY_PAGE_SIZE = int(os.environ.get("QUERY_PAGE_SIZE", "500"))
+# BatchWriteItem の1回あたりの上限 (DynamoDB の仕様)
+BATCH_WRITE_CHUNK = 25
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get("BATCH_WRITE_MAX_ATTEMPTS", "8"))
+BATCH_WRITE_BASE_DELAY = float(os.environ.get("BATCH_WRITE_BASE_DELAY", "0.05"))
+BATCH_WRITE_CONCURRENCY = int(os.environ.get("BATCH_WRITE_CONCURRENCY", "8"))
+
+PHASES = ["indexes", "bookmarks", "answers"]
+
+dynamodb = boto3.resource("dynamodb")
+lambda_client = boto3.client("lambda")
+
+
+def _write_chunk(table_name: str, requests: List[Dict[str, Any]]) -> None:
+    """BatchWriteItem を1チャンク (25件以下) 書く。UnprocessedItems は指数バックオフ (ジッター付き) で書き直す"""
+    pending = requests
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY * (2 ** attempt)))
+        try:
+            resp = dynamodb.meta.client.batch_write_item(RequestItems={table_name: pending})
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"):
+                raise
+            continue
+        pending = (resp.get("UnprocessedItems") or {}).get(table_name) or []
+        if not pending:
+            return
+    # 失敗させて非同期呼び出しのリトライに任せる (同じフェーズからやり直しても結果は同じ)
+    raise RuntimeError(f"BatchWriteItem left {len(pending)} requests unprocessed on {table_name}.")
+
+
+def _delete_keys(table_name: str, keys: List[Dict[str, Any]]) -> int:
+    """キーのリストを25件ずつに分けて並列に消す"""
+    # 同じキーが1回の BatchWriteItem に2回あると全体が弾かれる
+    unique = list({json.dumps(k, sort_keys=True): k for k in keys}.values())
+    requests = [{"DeleteRequest": {"Key": k}} for k in unique]
+    chunks = [requests[i:i + BATCH_WRITE_CHUNK] for i in range(0, len(requests), BATCH_WRITE_CHUNK)]
+    if len(chunks) <= 1:
+        for chunk in chunks:
+            _write_chunk(table_name, chunk)
+    else:
+        with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_CONCURRENCY, len(chunks))) as pool:
+            list(pool.map(lambda c: _write_chunk(table_name, c), chunks))
+    return len(unique)
+
+
+def _item_stats_keys(question_id: str) -> List[Dict[str, Any]]:
+    """質問の quizItem ごとの行のキー (1パーティションなので Query で足りる)"""
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("questionId").eq(question_id),
+        "ProjectionExpression": "questionId, quizItemId",
+    }
+    keys: List[Dict[str, Any]] = []
+    while True:
+        resp = dynamodb.Table(QUESTION_ITEM_STATS_TABLE).query(**kwargs)
+        keys.extend(resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return keys
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _delete_indexes(job: Dict[str, Any]) -> int:
+    """イベントで渡された属性から決まる行 (派生インデックス、集計、shareCode) を消す"""
+    question_id = job["questionId"]
+    created_at = job.get("createdAt")
+    purpose = job.get("purpose")
+    tags = set(job.get("tags") or [])
+    deleted = 0
+    if TAG_INDEX_TABLE and created_at and tags:
+        deleted += _delete_keys(TAG_INDEX_TABLE, [{"tag": t, "sortKey": f"{created_at}#{question_id}"} for t in tags])
+    if PURPOSE_TAG_INDEX_TABLE and created_at and purpose and tags:
+        deleted += _delete_keys(
+            PURPOSE_TAG_INDEX_TABLE,
+            [{"purposeTag": f"{purpose}#{t}", "sortKey": f"{created_at}#{question_id}"} for t in tags],
+        )
+    if SEARCH_INDEX_TABLE and job.get("searchGrams"):
+        deleted += _delete_keys(SEARCH_INDEX_TABLE, [{"gram": g, "questionId": question_id} for g in job["searchGrams"]])
+    if QUESTION_STATS_TABLE:
+        dynamodb.Table(QUESTION_STATS_TABLE).delete_item(Key={"questionId": question_id})
+        deleted += 1
+    if QUESTION_ITEM_STATS_TABLE:
+        deleted += _delete_keys(QUESTION_ITEM_STATS_TABLE, _item_stats_keys(question_id))
+    if SHARE_CODES_TABLE and job.get("shareCode"):
+        # 同じコードが別の質問に使われていたら (あり得ないはずだが) 消さない
+        try:
+            dynamodb.Table(SHARE_CODES_TABLE).delete_item(
+                Key={"shareCode": job["shareCode"]},
+                ConditionExpression="attribute_not_exists(questionId) OR questionId = :qid",
+                ExpressionAttributeValues={":qid": question_id},
+            )
+            deleted += 1
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    return deleted
+
+
+def _note_affected_users(job: Dict[str, Any], user_ids) -> None:
+    """集計を作り直すユーザーをジョブ (引き継ぎのイベント) に足す"""
+    if not USER_STATS_BACKFILL_FUNCTION:
+        return
+    affected = set(job.get("affectedUserIds") or [])
+    affected.update(user_ids)
+    if affected:
+        job["affectedUserIds"] = sorted(affected)
+
+
+def _rebuild_user_stats(job: Dict[str, Any], min_users: int = 1) -> None:
+    """
+    溜まったユーザーの集計を作り直させ (減算はせず、残ったログから数え直す)、ジョブから外す。
+    min_users 人に満たなければまだ頼まない。AFFECTED_USERS_MAX 人ずつに分けて呼ぶ
+    """
+    user_ids = job.get("affectedUserIds") or []
+    if not USER_STATS_BACKFILL_FUNCTION or not user_ids or len(user_ids) < min_users:
+        return
+    for i in range(0, len(user_ids), AFFECTED_USERS_MAX):
+        lambda_client.invoke(
+            FunctionName=USER_STATS_BACKFILL_FUNCTION,
+            InvocationType="Event",
+            Payload=json.dumps({"userIds": user_ids[i:i + AFFECTED_USERS_MAX]}).encode("utf-8"),
+        )
+    job.pop("affectedUserIds")
+    print(f"[cascade_delete] qid={job['questionId']} requested user stats rebuild users={len(user_ids)}")
+
+
+def _dependent_page(phase: str, job: Dict[str, Any], start_key: Optional[Dict[str, Any]]):
+    """[(テーブル名, 消すキーのリスト), ...] と続きの開始キー。対象のテーブルが無ければ None"""
+    question_id = job["questionId"]
+    if phase == "bookmarks":
+        if not BOOKMARKS_TABLE:
+            return None
+        if not BOOKMARKS_QUESTION_INDEX_NAME:
+            print(f"[cascade_delete] qid={question_id} skipping bookmarks: BOOKMARKS_QUESTION_INDEX_NAME is not set")
+            return None
+        table = dynamodb.Table(BOOKMARKS_TABLE)
+        kwargs: Dict[str, Any] = {
+            "IndexName": BOOKMARKS_QUESTION_INDEX_NAME,
+            "KeyConditionExpression": Key("questionId").eq(question_id),
+            "ProjectionExpression": "userId, questionId",
+            "Limit": QUERY_PAGE_SIZE,
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.query(**kwargs)
+        keys = [{"userId": it["userId"], "questionId": it["questionId"]} for it in resp.get("Items", [])]
+        return [(table.name, keys)], resp.get("LastEvaluatedKey")
+    else:
+        if not ANSWERS_TABLE:
+            return None
+        table = dynamodb.Table(ANSWERS_TABLE)
+        kwargs = {
+            "IndexName": ANSWERS_QUESTION_INDEX_NAME,
+            "KeyConditionExpression": Key("questionId").eq(question_id),
+            "ProjectionExpression": "logId, userId",
+            "Limit": QUERY_PAGE_SIZE,
+        }
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.query(**kwargs)
+        logs = resp.get("Items", [])
+        deletes = [(table.name, [{"logId": it["logId"]} for it in logs])]
+        users = {it["userId"] for it in logs if it.get("userId")}
+        _note_affected_users(job, users)
+        if ANSWERED_QUESTIONS_TABLE:
+            # 回答したユーザーの行も消す (同じユーザーは _delete_keys で1回にまとまる)
+            deletes.append((ANSWERED_QUESTIONS_TABLE, [{"userId": u, "questionId": question_id} for u in users]))
+        return deletes, resp.get("LastEvaluatedKey")
+
+
+def _json_default(o: Any) -> Any:
+    # 開始キーの数値 (Decimal)。整数なら int、それ以外は float にする (受け取った側で _restore_start_key が Decimal に戻す)
+    if isinstance(o, Decimal):
+        i = int(o)
+        return i if i == o else float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _restore_start_key(start_key: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """引き継ぎのイベントで受け取った開始キー。float は boto3 が受け付けないので Decimal に戻す"""
+    if not start_key:
+        return start_key
+    return json.loads(json.dumps(start_key), parse_float=Decimal)
+
+
+def _invoke_self(context, payload: Dict[str, Any]) -> None:
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload, default=_json_default).encode("utf-8"),
+    )
+
+
+def lambda_handler(event, context):
+    job = dict(event or {})
+    question_id = job.get("questionId")
+    if not question_id:
+        raise ValueError("questionId is required")
+    phase = job.get("phase") or PHASES[0]
+    if phase not in PHASES:
+        raise ValueError(f"unknown phase: {phase}")
+    start_key = _restore_start_key(job.get("startKey"))
+
+    deleted = 0
+    for phase in PHASES[PHASES.index(phase):]:
+        if phase == "indexes":
+            deleted += _delete_indexes(job)
+        else:
+            while True:
+                page = _dependent_page(phase, job, start_key)
+                if page is None:
+                    break
+                deletes, start_key = page
+                for table_name, keys in deletes:
+                    deleted += _delete_keys(table_name, keys)
+                if phase == "answers":
+                    # このページのログは消したので、溜まっていれば作り直しを頼んでおく
+                    _rebuild_user_stats(job, min_users=AFFECTED_USERS_MAX)
+                if not start_key:
+                    break
+                if context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                    print(f"[cascade_delete] qid={question_id} handing off at phase={phase} deleted={deleted}")
+                    _invoke_self(context, {**job, "phase": phase, "startKey": start_key})
+                    return {"done": False, "phase": phase, "deleted": deleted}
+            if phase == "answers":
+                _rebuild_user_stats(job)
+        start_key = None
+        if context.get_remaining_time_in_millis() < TIME_MARGIN_MS and phase != PHASES[-1]:
+            next_phase = PHASES[PHASES.index(phase) + 1]
+            print(f"[cascade_delete] qid={question_id} handing off before phase={next_phase} deleted={deleted}")
+            _invoke_self(context, {**job, "phase": next_phase, "startKey": None})
+            return {"done": False, "phase": next_phase, "deleted": deleted}
+
+    print(f"[cascade_delete] qid={question_id} done deleted={deleted}")
+    return {"done": True, "deleted": deleted}
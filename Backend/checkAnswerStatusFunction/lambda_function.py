@@ -1,56 +1,157 @@
-{\rtf1\ansi\ansicpg932\cocoartf2865
-\cocoatextscaling0\cocoaplatform0{\fonttbl\f0\fnil\fcharset0 Menlo-Regular;}
-{\colortbl;\red255\green255\blue255;\red157\green0\blue210;\red255\green255\blue255;\red45\green45\blue45;
-\red0\green0\blue0;\red144\green1\blue18;\red15\green112\blue1;\red0\green0\blue255;\red101\green76\blue29;
-\red0\green0\blue109;\red19\green118\blue70;\red32\green108\blue135;}
-{\*\expandedcolortbl;;\cssrgb\c68627\c0\c85882;\cssrgb\c100000\c100000\c100000;\cssrgb\c23137\c23137\c23137;
-\cssrgb\c0\c0\c0;\cssrgb\c63922\c8235\c8235;\cssrgb\c0\c50196\c0;\cssrgb\c0\c0\c100000;\cssrgb\c47451\c36863\c14902;
-\cssrgb\c0\c6275\c50196;\cssrgb\c3529\c52549\c34510;\cssrgb\c14902\c49804\c60000;}
-\paperw11900\paperh16840\margl1440\margr1440\vieww11520\viewh8400\viewkind0
-\deftab720
-\pard\pardeftab720\partightenfactor0
-
-\f0\fs24 \cf2 \cb3 \expnd0\expndtw0\kerning0
-\outl0\strokewidth0 \strokec2 import\cf4 \strokec4  json\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  boto3\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  boto3.dynamodb.conditions \cf2 \strokec2 import\cf4 \strokec4  Key, Attr\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 dynamodb \strokec5 =\strokec4  boto3.resource(\cf6 \strokec6 'dynamodb'\cf4 \strokec4 )\cb1 \
-\cb3 table \strokec5 =\strokec4  dynamodb.Table(\cf6 \strokec6 'AnswersLog'\cf4 \strokec4 )\cb1 \
-\cb3 user_index_name \strokec5 =\strokec4  \cf6 \strokec6 'UserIndex'\cf4 \strokec4  \cf7 \strokec7 # GSI\uc0\u21517 \cf4 \cb1 \strokec4 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf8 \cb3 \strokec8 def\cf4 \strokec4  \cf9 \strokec9 lambda_handler\cf4 \strokec4 (\cf10 \strokec10 event\cf4 \strokec4 , \cf10 \strokec10 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 try\cf4 \strokec4 :\cb1 \
-\cb3         \cf7 \strokec7 # Cognito\uc0\u35469 \u35388 \u24773 \u22577 \u12363 \u12425 \u12518 \u12540 \u12470 \u12540 ID\u12434 \u21462 \u24471 \cf4 \cb1 \strokec4 \
-\cb3         user_id \strokec5 =\strokec4  event[\cf6 \strokec6 'requestContext'\cf4 \strokec4 ][\cf6 \strokec6 'authorizer'\cf4 \strokec4 ][\cf6 \strokec6 'claims'\cf4 \strokec4 ][\cf6 \strokec6 'sub'\cf4 \strokec4 ]\cb1 \
-\cb3         \cb1 \
-\cb3         \cf7 \strokec7 # \uc0\u12463 \u12456 \u12522 \u12497 \u12521 \u12513 \u12540 \u12479 \u12363 \u12425 \u36074 \u21839 ID\u12434 \u21462 \u24471 \cf4 \cb1 \strokec4 \
-\cb3         question_id \strokec5 =\strokec4  event[\cf6 \strokec6 'queryStringParameters'\cf4 \strokec4 ][\cf6 \strokec6 'questionId'\cf4 \strokec4 ]\cb1 \
-\cb3         \cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf8 \strokec8 not\cf4 \strokec4  user_id \cf8 \strokec8 or\cf4 \strokec4  \cf8 \strokec8 not\cf4 \strokec4  question_id:\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \{\cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 400\cf4 \strokec4 , \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'error'\cf4 \strokec4 : \cf6 \strokec6 'userId and questionId are required'\cf4 \strokec4 \})\}\cb1 \
-\
-\cb3         \cf7 \strokec7 # UserIndex GSI\uc0\u12434 \u20351 \u12387 \u12390 \u12289 \u29305 \u23450 \u12398 \u12518 \u12540 \u12470 \u12540 \u12398 \u22238 \u31572 \u35352 \u37682 \u12434 \u12463 \u12456 \u12522 \cf4 \cb1 \strokec4 \
-\cb3         response \strokec5 =\strokec4  table.query(\cb1 \
-\cb3             \cf10 \strokec10 IndexName\cf4 \strokec5 =\strokec4 user_index_name,\cb1 \
-\cb3             \cf10 \strokec10 KeyConditionExpression\cf4 \strokec5 =\strokec4 Key(\cf6 \strokec6 'userId'\cf4 \strokec4 ).eq(user_id)\cb1 \
-\cb3         )\cb1 \
-\cb3         items \strokec5 =\strokec4  response.get(\cf6 \strokec6 'Items'\cf4 \strokec4 , [])\cb1 \
-\cb3         \cb1 \
-\cb3         \cf7 \strokec7 # \uc0\u12463 \u12456 \u12522 \u32080 \u26524 \u12398 \u20013 \u12363 \u12425 \u12289 \u25351 \u23450 \u12373 \u12428 \u12383 questionId\u12398 \u35352 \u37682 \u12364 \u23384 \u22312 \u12377 \u12427 \u12363 \u12434 \u12481 \u12455 \u12483 \u12463 \cf4 \cb1 \strokec4 \
-\cb3         has_answered \strokec5 =\strokec4  \cf9 \strokec9 any\cf4 \strokec4 (item.get(\cf6 \strokec6 'questionId'\cf4 \strokec4 ) \strokec5 ==\strokec4  question_id \cf2 \strokec2 for\cf4 \strokec4  item \cf2 \strokec2 in\cf4 \strokec4  items)\cb1 \
-\cb3         \cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 200\cf4 \strokec4 ,\cb1 \
-\cb3             \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'hasAnswered'\cf4 \strokec4 : has_answered\})\cb1 \
-\cb3         \}\cb1 \
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf12 \strokec12 KeyError\cf4 \strokec4 :\cb1 \
-\cb3          \cf7 \strokec7 # userId\uc0\u12420 questionId\u12364 \u35211 \u12388 \u12363 \u12425 \u12394 \u12356 \u22580 \u21512 \u12398 \u12456 \u12521 \u12540 \u12495 \u12531 \u12489 \u12522 \u12531 \u12464 \cf4 \cb1 \strokec4 \
-\cb3          \cf2 \strokec2 return\cf4 \strokec4  \{\cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 400\cf4 \strokec4 , \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'error'\cf4 \strokec4 : \cf6 \strokec6 'Missing required parameters in event data'\cf4 \strokec4 \})\}\cb1 \
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf12 \strokec12 Exception\cf4 \strokec4  \cf2 \strokec2 as\cf4 \strokec4  e:\cb1 \
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf6 \strokec6 "Error: \cf8 \strokec8 \{\cf4 \strokec4 e\cf8 \strokec8 \}\cf6 \strokec6 "\cf4 \strokec4 )\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 500\cf4 \strokec4 , \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'error'\cf4 \strokec4 : \cf12 \strokec12 str\cf4 \strokec4 (e)\})\}\cb1 \
-}
\ No newline at end of file
+import json
+import os
+import bisect
+import time
+from collections import OrderedDict
+import boto3
+from boto3.dynamodb.conditions import Key, Attr
+
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.environ.get('ANSWERS_TABLE', 'AnswersLog'))
+user_index_name = os.environ.get('ANSWERS_USER_INDEX_NAME', 'UserIndex') # GSI名
+# logAnswerFunction が書くユーザー x 質問の行 (PK: userId, SK: questionId)。
+# 設定されていれば回答済みかどうかはキーを指定した GetItem 1回で分かる (未設定なら回答ログを読む)
+# 導入前の回答の行は backfillQuestionStatsFunction が作るので、完了の印の行 (completedAt) が付くまでは回答ログを読む
+ANSWERED_QUESTIONS_TABLE = os.environ.get('ANSWERED_QUESTIONS_TABLE')
+ANSWERED_MARKER_KEY = {'userId': '#backfill', 'questionId': '#backfill'}
+# 一括確認 (questionIds) で一度に渡せる件数
+BULK_MAX_QUESTION_IDS = int(os.environ.get('BULK_MAX_QUESTION_IDS', '100'))
+# ユーザーごとの回答済み集合をコンテナ内に持つ件数と秒数 (一括確認だけが使う。この秒数だけ反映が遅れうる)
+ANSWERED_SET_CACHE_SIZE = int(os.environ.get('ANSWERED_SET_CACHE_SIZE', '512'))
+ANSWERED_SET_CACHE_TTL = float(os.environ.get('ANSWERED_SET_CACHE_TTL', '60'))
+
+
+class _SortedIds:
+    """ソート済みの id 配列。set よりメモリが小さく、bisect で引く"""
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids):
+        self._ids = sorted(set(ids))
+
+    def __contains__(self, key):
+        i = bisect.bisect_left(self._ids, key)
+        return i < len(self._ids) and self._ids[i] == key
+
+    def __len__(self):
+        return len(self._ids)
+
+
+# userId -> (読み込んだ時刻, _SortedIds)。ウォームスタート間で共有する LRU
+_answered_sets = OrderedDict()
+_answered_backfilled = False  # 印を見たらコンテナが生きている間は読み直さない
+
+
+def _answered_ready():
+    """AnsweredQuestions を信用してよいか (バックフィルの完了の印があるか)"""
+    global _answered_backfilled
+    if ANSWERED_QUESTIONS_TABLE and not _answered_backfilled:
+        marker = dynamodb.Table(ANSWERED_QUESTIONS_TABLE).get_item(
+            Key=ANSWERED_MARKER_KEY, ProjectionExpression='completedAt'
+        ).get('Item')
+        _answered_backfilled = bool(marker and marker.get('completedAt'))
+    return _answered_backfilled
+
+
+def _has_answered(user_id, question_id):
+    if _answered_ready():
+        item = dynamodb.Table(ANSWERED_QUESTIONS_TABLE).get_item(
+            Key={'userId': user_id, 'questionId': question_id},
+            ProjectionExpression='questionId'
+        ).get('Item')
+        return item is not None
+
+    # 回答ログを最後まで読む (1ページ目だけだと履歴の多いユーザーで見落とす)。見つかった時点で終える
+    query_kwargs = {
+        'IndexName': user_index_name,
+        'KeyConditionExpression': Key('userId').eq(user_id),
+        'FilterExpression': Attr('questionId').eq(question_id),
+        'ProjectionExpression': 'questionId'
+    }
+    while True:
+        response = table.query(**query_kwargs)
+        if response.get('Items'):
+            return True
+        lek = response.get('LastEvaluatedKey')
+        if not lek:
+            return False
+        query_kwargs['ExclusiveStartKey'] = lek
+
+
+def _answered_set(user_id):
+    """ユーザーが回答した questionId の集合 (キーだけを読む)。コンテナ内にキャッシュする"""
+    cached = _answered_sets.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < ANSWERED_SET_CACHE_TTL:
+        _answered_sets.move_to_end(user_id)
+        return cached[1]
+
+    if _answered_ready():
+        # 1質問1行のキーだけなので、回答ログ (回答ごとに1行) より読む量がずっと少ない
+        read_table = dynamodb.Table(ANSWERED_QUESTIONS_TABLE)
+        query_kwargs = {'KeyConditionExpression': Key('userId').eq(user_id), 'ProjectionExpression': 'questionId'}
+    else:
+        read_table = table
+        query_kwargs = {
+            'IndexName': user_index_name,
+            'KeyConditionExpression': Key('userId').eq(user_id),
+            'ProjectionExpression': 'questionId'
+        }
+    ids = []
+    while True:
+        response = read_table.query(**query_kwargs)
+        ids.extend(item['questionId'] for item in response.get('Items', []) if item.get('questionId'))
+        lek = response.get('LastEvaluatedKey')
+        if not lek:
+            break
+        query_kwargs['ExclusiveStartKey'] = lek
+
+    answered = _SortedIds(ids)
+    _answered_sets[user_id] = (time.monotonic(), answered)
+    _answered_sets.move_to_end(user_id)
+    while len(_answered_sets) > ANSWERED_SET_CACHE_SIZE:
+        _answered_sets.popitem(last=False)
+    return answered
+
+
+def lambda_handler(event, context):
+    try:
+        # Cognito認証情報からユーザーIDを取得
+        user_id = event['requestContext']['authorizer']['claims']['sub']
+        params = event.get('queryStringParameters') or {}
+
+        # 一括確認: ?questionIds=a,b,c -> {"answered": {"a": true, "b": false, ...}} (フィードの表示用)
+        if params.get('questionIds') is not None:
+            question_ids = [q.strip() for q in params['questionIds'].split(',') if q.strip()]
+            if not user_id or not question_ids:
+                return {'statusCode': 400, 'body': json.dumps({'error': 'userId and questionIds are required'})}
+            if len(question_ids) > BULK_MAX_QUESTION_IDS:
+                return {'statusCode': 400, 'body': json.dumps({'error': f'questionIds accepts at most {BULK_MAX_QUESTION_IDS} ids'})}
+            answered = _answered_set(user_id)
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'answered': {q: q in answered for q in question_ids}})
+            }
+
+        # クエリパラメータから質問IDを取得
+        question_id = params['questionId']
+
+        if not user_id or not question_id:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'userId and questionId are required'})}
+
+        has_answered = _has_answered(user_id, question_id)
+        if has_answered:
+            # キャッシュした集合より新しい回答なら、次の一括確認で読み直させる
+            cached = _answered_sets.get(user_id)
+            if cached is not None and question_id not in cached[1]:
+                _answered_sets.pop(user_id, None)
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'hasAnswered': has_answered})
+        }
+    except KeyError:
+         # userIdやquestionIdが見つからない場合のエラーハンドリング
+         return {'statusCode': 400, 'body': json.dumps({'error': 'Missing required parameters in event data'})}
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
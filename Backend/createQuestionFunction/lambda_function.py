@@ -1,15 +1,77 @@
 import json
 import os
+import decimal
+import hashlib
+import random
+import re
 import uuid
 import secrets
+import threading
+import time
+import unicodedata
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 import boto3
+from botocore.exceptions import ClientError
+
+# Lambda レイヤー (Backend/layers/common) の共通モジュール
+import response_compression
 
 dynamodb = boto3.resource("dynamodb")
 
 CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "*")
+# shareCode -> questionId の登録テーブル (PK: shareCode)。未設定なら登録しない
+SHARE_CODES_TABLE = os.environ.get("SHARE_CODES_TABLE")
+SHARE_CODE_MAX_ATTEMPTS = 5
+# タグ転置インデックス (PK: tag, SK: sortKey = "createdAt#questionId")。未設定なら書かない
+TAG_INDEX_TABLE = os.environ.get("TAG_INDEX_TABLE")
+# purpose とタグの複合インデックス (PK: purposeTag = "purpose#tag", SK: sortKey)。未設定なら書かない
+PURPOSE_TAG_INDEX_TABLE = os.environ.get("PURPOSE_TAG_INDEX_TABLE")
+# 新着フィード用 GSI (PK: feedShard, SK: createdAt) のシャード数。getQuestionsFunction と揃えること
+FEED_SHARD_COUNT = int(os.environ.get("FEED_SHARD_COUNT", "4"))
+# 全文検索の転置インデックス (PK: gram, SK: questionId, tf)。未設定なら書かない
+SEARCH_INDEX_TABLE = os.environ.get("SEARCH_INDEX_TABLE")
+# 項目ごとの重み。getQuestionsFunction などと揃えること
+SEARCH_FIELD_WEIGHTS = {"title": 3, "tags": 2, "remarks": 1, "questionText": 1}
+_SEARCH_SPLIT = re.compile(r"[\W_]+")
+# フィードのスナップショットを作り直す Lambda (getQuestionsFunction の materialize_handler)。未設定なら呼ばない
+FEED_MATERIALIZER_FUNCTION = os.environ.get("FEED_MATERIALIZER_FUNCTION")
+# 一覧キャッシュを無効にするためのカタログのバージョン (PK: metaKey = "catalog")。未設定なら上げない
+CATALOG_META_TABLE = os.environ.get("CATALOG_META_TABLE")
+# quizItems の保存形式。"zlib" なら JSON を zlib で圧縮したバイナリ属性 quizItemsZ に入れる (既定は従来のリスト)
+# 読む側 (getQuestions* / deleteQuestion / backfill) はどちらの形式も読める
+QUIZ_ITEMS_STORAGE = os.environ.get("QUIZ_ITEMS_STORAGE", "list").lower()
+QUIZ_ITEMS_ZLIB_LEVEL = int(os.environ.get("QUIZ_ITEMS_ZLIB_LEVEL", "6"))
+# 冪等キー (Idempotency-Key ヘッダー) の記録 (PK: idempotencyKey = "sub#key")。未設定ならヘッダーは無視する
+# TTL 属性に expiresAt を設定しておくこと
+IDEMPOTENCY_TABLE = os.environ.get("IDEMPOTENCY_TABLE")
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# 処理中の記録がこれより古ければ、前の呼び出しは失敗したものとして引き継ぐ (秒)
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# 一括作成 (POST /questions/batch)
+BATCH_CREATE_MAX_ITEMS = int(os.environ.get("BATCH_CREATE_MAX_ITEMS", "500"))
+# BatchWriteItem の1回あたりの上限 (DynamoDB の仕様)
+BATCH_WRITE_CHUNK = 25
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get("BATCH_WRITE_MAX_ATTEMPTS", "8"))
+BATCH_WRITE_BASE_DELAY = float(os.environ.get("BATCH_WRITE_BASE_DELAY", "0.05"))
+# チャンクや shareCode の確保を並列に流す数
+BATCH_WRITE_CONCURRENCY = int(os.environ.get("BATCH_WRITE_CONCURRENCY", "8"))
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "QuizApp")
+
+lambda_client = boto3.client("lambda")
+
+
+def _json_default(o: Any) -> Any:
+    # 保存済みの項目を返すとき (DynamoDB の数値は Decimal) 用。整数なら int、それ以外は float にする
+    if type(o) is decimal.Decimal:
+        i = int(o)
+        return i if i == o else float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
 
 
 def _resp(status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
@@ -24,7 +86,7 @@ def _resp(status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> D
     return {
         "statusCode": status,
         "headers": base_headers,
-        "body": json.dumps(body, ensure_ascii=False),
+        "body": json.dumps(body, ensure_ascii=False, default=_json_default),
     }
 
 
@@ -132,6 +194,531 @@ def _gen_share_code(length: int = 10) -> str:
     return "".join(secrets.choice(_ALPHABET) for _ in range(length))
 
 
+# shareCode の確保の統計 (次のメトリクス出力でまとめて出す)
+_share_code_stats = {"attempts": 0, "collisions": 0}
+_share_code_stats_lock = threading.Lock()
+
+
+def _put_unique_share_code(attrs: Dict[str, Any]) -> str:
+    """
+    shareCode を登録テーブルに条件付き書き込みで確保する。
+    既に使われているコードなら引き直す (SHARE_CODE_MAX_ATTEMPTS 回まで)
+    スレッドから並列に呼ぶので、スレッドセーフな client を使う
+    """
+    for _ in range(SHARE_CODE_MAX_ATTEMPTS):
+        code = _gen_share_code(10)
+        try:
+            dynamodb.meta.client.put_item(
+                TableName=SHARE_CODES_TABLE,
+                Item={"shareCode": code, **attrs},
+                ConditionExpression="attribute_not_exists(shareCode)",
+            )
+            with _share_code_stats_lock:
+                _share_code_stats["attempts"] += 1
+            return code
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            with _share_code_stats_lock:
+                _share_code_stats["attempts"] += 1
+                _share_code_stats["collisions"] += 1
+            print(f"[create_question] shareCode collision: {code}")
+    raise RuntimeError("Could not allocate a unique shareCode.")
+
+
+def _register_share_code(question_id: str, created_at: str) -> str:
+    return _put_unique_share_code({"questionId": question_id, "createdAt": created_at})
+
+
+def _emit_share_code_metrics(allocated: int) -> None:
+    """CloudWatch Embedded Metric Format でログに出す (衝突率)"""
+    with _share_code_stats_lock:
+        attempts = _share_code_stats["attempts"]
+        collisions = _share_code_stats["collisions"]
+        _share_code_stats["attempts"] = _share_code_stats["collisions"] = 0
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["FunctionName"]],
+                "Metrics": [
+                    {"Name": "ShareCodeAllocations", "Unit": "Count"},
+                    {"Name": "ShareCodeAttempts", "Unit": "Count"},
+                    {"Name": "ShareCodeCollisions", "Unit": "Count"},
+                ],
+            }],
+        },
+        "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+        "ShareCodeAllocations": allocated,
+        "ShareCodeAttempts": attempts,
+        "ShareCodeCollisions": collisions,
+    }))
+
+
+def _feed_shard(question_id: str) -> str:
+    # 書き込みを分散させつつ、同じ質問は常に同じシャードになるようにする
+    return str(int(hashlib.md5(question_id.encode("utf-8")).hexdigest(), 16) % FEED_SHARD_COUNT)
+
+
+def _write_chunk(table_name: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    BatchWriteItem を1チャンク (25件以下) 書く。UnprocessedItems は指数バックオフ (ジッター付き) で
+    書き直し、BATCH_WRITE_MAX_ATTEMPTS 回で書けなかった分を返す
+    """
+    pending = requests
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY * (2 ** attempt)))
+        try:
+            resp = dynamodb.meta.client.batch_write_item(RequestItems={table_name: pending})
+        except ClientError as e:
+            # スロットリングでチャンクごと弾かれたときも書き直す
+            if e.response["Error"]["Code"] not in ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"):
+                raise
+            continue
+        pending = (resp.get("UnprocessedItems") or {}).get(table_name) or []
+        if not pending:
+            return []
+    return pending
+
+
+def _batch_write(table_name: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """PutRequest / DeleteRequest を25件ずつに分けて並列に書き、書けなかったリクエストを返す"""
+    chunks = [requests[i:i + BATCH_WRITE_CHUNK] for i in range(0, len(requests), BATCH_WRITE_CHUNK)]
+    if len(chunks) <= 1:
+        return [r for chunk in chunks for r in _write_chunk(table_name, chunk)]
+    with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_CONCURRENCY, len(chunks))) as pool:
+        return [r for failed in pool.map(lambda c: _write_chunk(table_name, c), chunks) for r in failed]
+
+
+def _put_requests(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"PutRequest": {"Item": row}} for row in rows]
+
+
+def _write_tag_index(items: List[Dict[str, Any]]) -> None:
+    """タグ -> 質問の転置インデックスを書く (createdAt 順に並ぶよう SK を作る)"""
+    if not TAG_INDEX_TABLE:
+        return
+    rows = [
+        {
+            "tag": tag,
+            "sortKey": f"{item['createdAt']}#{item['questionId']}",
+            "questionId": item["questionId"],
+            "createdAt": item["createdAt"],
+        }
+        for item in items
+        for tag in set(item.get("tags") or [])
+    ]
+    failed = _batch_write(TAG_INDEX_TABLE, _put_requests(rows))
+    if failed:
+        print(f"[create_question] tag index: {len(failed)} rows not written")
+
+
+def _write_purpose_tag_index(items: List[Dict[str, Any]]) -> None:
+    """purpose#tag -> 質問の複合インデックスを書く (purpose とタグの両方があるときだけ)"""
+    if not PURPOSE_TAG_INDEX_TABLE:
+        return
+    rows = [
+        {
+            "purposeTag": f"{item['purpose']}#{tag}",
+            "sortKey": f"{item['createdAt']}#{item['questionId']}",
+            "questionId": item["questionId"],
+            "createdAt": item["createdAt"],
+        }
+        for item in items
+        if item.get("purpose")
+        for tag in set(item.get("tags") or [])
+    ]
+    failed = _batch_write(PURPOSE_TAG_INDEX_TABLE, _put_requests(rows))
+    if failed:
+        print(f"[create_question] purpose#tag index: {len(failed)} rows not written")
+
+
+def _search_bigrams(text: str) -> List[str]:
+    """NFKC + 小文字にして記号・空白で区切り、区間ごとの文字 bigram を返す (分かち書き不要)"""
+    grams: List[str] = []
+    for segment in _SEARCH_SPLIT.split(unicodedata.normalize("NFKC", text).lower()):
+        grams.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return grams
+
+
+def _search_terms(item: Dict[str, Any]) -> Dict[str, int]:
+    """質問1件の bigram -> 重み付き出現回数"""
+    terms: Dict[str, int] = {}
+
+    def add(text: Any, weight: int) -> None:
+        if isinstance(text, str):
+            for gram in _search_bigrams(text):
+                terms[gram] = terms.get(gram, 0) + weight
+
+    add(item.get("title"), SEARCH_FIELD_WEIGHTS["title"])
+    for tag in item.get("tags") or []:
+        add(tag, SEARCH_FIELD_WEIGHTS["tags"])
+    add(item.get("remarks"), SEARCH_FIELD_WEIGHTS["remarks"])
+    for quiz_item in item.get("quizItems") or []:
+        if isinstance(quiz_item, dict):
+            add(quiz_item.get("questionText"), SEARCH_FIELD_WEIGHTS["questionText"])
+    return terms
+
+
+def _write_search_index(items: List[Dict[str, Any]]) -> None:
+    """質問の bigram を検索インデックスに書く"""
+    if not SEARCH_INDEX_TABLE:
+        return
+    rows = [
+        {"gram": gram, "questionId": item["questionId"], "tf": tf}
+        for item in items
+        for gram, tf in _search_terms(item).items()
+    ]
+    failed = _batch_write(SEARCH_INDEX_TABLE, _put_requests(rows))
+    if failed:
+        print(f"[create_question] search index: {len(failed)} rows not written")
+
+
+def _bump_catalog_version() -> None:
+    """getQuestionsFunction のコンテナ内キャッシュを無効にする (失敗しても作成は成功扱い)"""
+    if not CATALOG_META_TABLE:
+        return
+    try:
+        dynamodb.Table(CATALOG_META_TABLE).update_item(
+            Key={"metaKey": "catalog"},
+            UpdateExpression="ADD #v :one",
+            ExpressionAttributeNames={"#v": "version"},
+            ExpressionAttributeValues={":one": 1},
+        )
+    except ClientError as e:
+        print(f"[create_question] catalog version bump failed: {e}")
+
+
+def _request_feed_refresh(requested_at: str) -> None:
+    """フィードのスナップショット再構築を非同期で依頼する (失敗しても作成は成功扱い)"""
+    if not FEED_MATERIALIZER_FUNCTION:
+        return
+    try:
+        lambda_client.invoke(
+            FunctionName=FEED_MATERIALIZER_FUNCTION,
+            InvocationType="Event",
+            Payload=json.dumps({"requestedAt": requested_at}).encode("utf-8"),
+        )
+    except Exception as e:
+        print(f"[create_question] feed refresh request failed: {e}")
+
+
+def _build_question(body: Dict[str, Any], user_sub: str) -> Dict[str, Any]:
+    """
+    リクエスト本文1件を検証して保存する項目を作る (shareCode は呼び出し側で付ける)。
+    入力の誤りは ValueError、authorId の不一致は PermissionError
+    """
+    if not isinstance(body, dict) or not body:
+        raise ValueError("Invalid JSON body.")
+
+    # 必須
+    title = _non_empty_str(body.get("title"), "title")
+    author_id = _non_empty_str(body.get("authorId"), "authorId")
+    quiz_items = _validate_quiz_items(body.get("quizItems"))
+
+    # 認可: authorId はトークンのsubと一致
+    if author_id != user_sub:
+        raise PermissionError("Forbidden: authorId does not match token subject.")
+
+    # 任意
+    purpose = _normalize_str_or_none(body.get("purpose"))
+    tags = _validate_tags(body.get("tags"))
+    remarks_raw = body.get("remarks", "")
+    if not isinstance(remarks_raw, str):
+        raise ValueError("remarks must be a string.")
+    remarks = remarks_raw.strip()
+
+    dm_invite_message = _normalize_str_or_none(body.get("dmInviteMessage"))
+
+    # questionId はクライアント提供を優先
+    question_id = body.get("questionId")
+    if question_id is not None:
+        question_id = _non_empty_str(question_id, "questionId")
+    else:
+        question_id = str(uuid.uuid4())
+
+    item: Dict[str, Any] = {
+        "questionId": question_id,
+        "title": title,
+        "authorId": author_id,
+        "quizItems": quiz_items,
+        "quizItemCount": len(quiz_items), # 一覧 (summary) 用
+        "createdAt": _iso_now(),
+        "feedShard": _feed_shard(question_id), # FeedIndex のパーティション
+        "remarks": remarks,
+        "tags": tags,
+    }
+    if purpose is not None:
+        item["purpose"] = purpose
+    if dm_invite_message is not None:
+        item["dmInviteMessage"] = dm_invite_message
+    return item
+
+
+def _stored_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """テーブルに書く形にする (QUIZ_ITEMS_STORAGE=zlib なら quizItems を圧縮する)。レスポンスは元の item を返す"""
+    if QUIZ_ITEMS_STORAGE != "zlib":
+        return item
+    stored = {k: v for k, v in item.items() if k != "quizItems"}
+    packed = json.dumps(item["quizItems"], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    stored["quizItemsZ"] = zlib.compress(packed, QUIZ_ITEMS_ZLIB_LEVEL)
+    return stored
+
+
+def _decode_quiz_items(item: Dict[str, Any]) -> Dict[str, Any]:
+    """保存済みの項目の quizItemsZ を quizItems に戻す (その場で書き換える)"""
+    packed = item.pop("quizItemsZ", None)
+    if packed is not None:
+        item["quizItems"] = json.loads(zlib.decompress(bytes(getattr(packed, "value", packed))))
+    return item
+
+
+def _write_derived(items: List[Dict[str, Any]]) -> None:
+    """質問の保存後に派生インデックスを書き、一覧キャッシュとフィードを更新する"""
+    _write_tag_index(items)
+    _write_purpose_tag_index(items)
+    _write_search_index(items)
+    _bump_catalog_version()
+    _request_feed_refresh(_iso_now())
+
+
+def _get_existing(table_name: str, question_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """BatchGetItem (100件ずつ) で既にある質問の authorId / shareCode を引く"""
+    found: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(question_ids), 100):
+        pending: Dict[str, Any] = {table_name: {
+            "Keys": [{"questionId": qid} for qid in question_ids[i:i + 100]],
+            "ProjectionExpression": "questionId, authorId, shareCode",
+            "ConsistentRead": True,
+        }}
+        for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY * (2 ** attempt)))
+            resp = dynamodb.meta.client.batch_get_item(RequestItems=pending)
+            for row in resp.get("Responses", {}).get(table_name, []):
+                found[row["questionId"]] = row
+            pending = resp.get("UnprocessedKeys") or {}
+            if not pending:
+                break
+        else:
+            raise RuntimeError("Could not check existing questionIds (throttled).")
+    return found
+
+
+def _create_batch(table, user_sub: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    POST /questions/batch: {"questions": [...]} をまとめて作成する。
+    1件ずつ検証し、失敗した質問は errors に入れて残りは作成する (バッチ全体は失敗させない)
+    BatchWriteItem は条件を付けられないので、クライアント指定の questionId は先に存在を確かめ、
+    本人の既存の質問なら作り直さずに replayed として返す
+    """
+    table_name = table.name
+    questions = body.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return _resp(400, {"message": "questions must be a non-empty array."})
+    if len(questions) > BATCH_CREATE_MAX_ITEMS:
+        return _resp(400, {"message": f"Too many questions: at most {BATCH_CREATE_MAX_ITEMS} per request."})
+
+    errors: List[Dict[str, Any]] = []
+    # index -> 項目 (入力順を保つ)
+    items: Dict[int, Dict[str, Any]] = {}
+    seen_ids: Dict[str, int] = {}
+    for index, question in enumerate(questions):
+        try:
+            item = _build_question(question, user_sub)
+        except (ValueError, PermissionError) as e:
+            errors.append({"index": index, "message": str(e)})
+            continue
+        # 同じキーが1回の BatchWriteItem に2回あると全体が弾かれるので、ここで落とす
+        if item["questionId"] in seen_ids:
+            errors.append({"index": index, "message": f"Duplicate questionId in batch (same as index {seen_ids[item['questionId']]})."})
+            continue
+        seen_ids[item["questionId"]] = index
+        items[index] = item
+
+    replayed: Dict[int, Dict[str, Any]] = {}
+    client_ids = [items[i]["questionId"] for i, q in enumerate(questions) if i in items and q.get("questionId") is not None]
+    if client_ids:
+        existing = _get_existing(table_name, client_ids)
+        for index in [i for i, item in items.items() if item["questionId"] in existing]:
+            row = existing[items.pop(index)["questionId"]]
+            if row.get("authorId") == user_sub:
+                replayed[index] = row
+            else:
+                errors.append({"index": index, "message": "Conflict: questionId is already in use."})
+
+    # shareCode: 登録テーブルがあれば条件付き書き込みで並列に確保する
+    if SHARE_CODES_TABLE and items:
+        def register(index: int) -> Optional[str]:
+            try:
+                return _register_share_code(items[index]["questionId"], items[index]["createdAt"])
+            except Exception as e:
+                errors.append({"index": index, "message": f"Could not allocate shareCode: {e}"})
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_CONCURRENCY, len(items))) as pool:
+            codes = dict(zip(list(items), pool.map(register, list(items))))
+        for index, code in codes.items():
+            if code is None:
+                del items[index]
+            else:
+                items[index]["shareCode"] = code
+        _emit_share_code_metrics(len(items))
+    else:
+        for item in items.values():
+            item["shareCode"] = _gen_share_code(10)
+
+    failed = _batch_write(table_name, _put_requests([_stored_item(item) for item in items.values()]))
+    if failed:
+        failed_ids = {r["PutRequest"]["Item"]["questionId"] for r in failed}
+        failed_items = [(i, item) for i, item in items.items() if item["questionId"] in failed_ids]
+        for index, item in failed_items:
+            errors.append({"index": index, "message": "Could not write question (throttled); retry this item."})
+            del items[index]
+        # 質問を保存できなかった分の shareCode を解放する
+        if SHARE_CODES_TABLE:
+            _batch_write(SHARE_CODES_TABLE, [{"DeleteRequest": {"Key": {"shareCode": item["shareCode"]}}} for _, item in failed_items])
+
+    created = list(items.values())
+    if created:
+        _write_derived(created)
+
+    results = [
+        {"index": i, "questionId": item["questionId"], "shareCode": item["shareCode"]}
+        for i, item in items.items()
+    ]
+    results += [
+        {"index": i, "questionId": row["questionId"], "shareCode": row.get("shareCode"), "replayed": True}
+        for i, row in replayed.items()
+    ]
+    results.sort(key=lambda r: r["index"])
+    errors.sort(key=lambda e: e["index"])
+    print(f"[create_question] batch user_sub={user_sub} requested={len(questions)} created={len(created)} replayed={len(replayed)} errors={len(errors)}")
+    return _resp(207 if errors else 201, {"created": results, "errors": errors})
+
+
+def _is_batch_request(event: Dict[str, Any]) -> bool:
+    path = event.get("resource") or event.get("path") or event.get("rawPath") or ""
+    return path.rstrip("/").endswith("/batch")
+
+
+# --- 冪等な作成 ---
+# クライアントが questionId を付けて再送した場合は、条件付き書き込み (attribute_not_exists) で上書きを防ぎ、
+# 保存済みの項目をそのまま返す。Idempotency-Key ヘッダーがあれば最初の応答を記録しておき、
+# 再送は記録の GetItem 1回で返す。
+def _replay_resp(item: Dict[str, Any], user_sub: str) -> Dict[str, Any]:
+    """既にある質問への再送。本人の質問なら最初と同じ 201 を返す"""
+    if item.get("authorId") != user_sub:
+        return _resp(409, {"message": "Conflict: questionId is already in use."})
+    return _resp(201, _decode_quiz_items(item), {"Idempotent-Replayed": "true"})
+
+
+def _create_one(table, user_sub: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        item = _build_question(body, user_sub)
+    except PermissionError as pe:
+        return _resp(403, {"message": str(pe)})
+    question_id = item["questionId"]
+    created_at = item["createdAt"]
+
+    if body.get("questionId") is not None:
+        # 再送なら shareCode を確保する前に、読むだけで返す
+        existing = table.get_item(Key={"questionId": question_id}, ConsistentRead=True).get("Item")
+        if existing:
+            print(f"[create_question] replay qid={question_id}")
+            return _replay_resp(existing, user_sub)
+
+    if SHARE_CODES_TABLE:
+        share_code = _register_share_code(question_id, created_at)
+        _emit_share_code_metrics(1)
+    else:
+        # 登録テーブルが無い環境では一意性を確かめられない
+        share_code = _gen_share_code(10)
+    item["shareCode"] = share_code
+
+    # デバッグログ（値が来ているか確認）
+    print(f"[create_question] user_sub={user_sub} qid={question_id} shareCode={share_code} has_dmInvite={'dmInviteMessage' in item}")
+
+    try:
+        table.put_item(Item=_stored_item(item), ConditionExpression="attribute_not_exists(questionId)")
+    except Exception as e:
+        # 質問を保存できなかったら確保した shareCode を解放する
+        if SHARE_CODES_TABLE:
+            dynamodb.Table(SHARE_CODES_TABLE).delete_item(Key={"shareCode": share_code})
+        if isinstance(e, ClientError) and e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            # 同じ questionId の同時送信に負けた
+            existing = table.get_item(Key={"questionId": question_id}, ConsistentRead=True).get("Item")
+            if existing:
+                return _replay_resp(existing, user_sub)
+        raise
+
+    _write_derived([item])
+
+    # 201 Created
+    return _resp(201, item)
+
+
+def _idempotency_key(event: Dict[str, Any]) -> Optional[str]:
+    headers = {str(k).lower(): v for k, v in (event.get("headers") or {}).items()}
+    key = (headers.get("idempotency-key") or "").strip()
+    return key or None
+
+
+def _request_hash(event: Dict[str, Any], body: Dict[str, Any]) -> str:
+    """同じキーで別の内容を送ってきたことを見分けるための指紋"""
+    path = event.get("resource") or event.get("path") or event.get("rawPath") or ""
+    canonical = json.dumps({"path": path, "body": body}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _with_idempotency_key(key: str, user_sub: str, request_hash: str, create) -> Dict[str, Any]:
+    """
+    キーを処理中として条件付きで確保してから作成し、応答を記録する。
+    記録済みなら記録した応答を返す。作成が失敗したら記録を消して再試行できるようにする
+    """
+    idem_table = dynamodb.Table(IDEMPOTENCY_TABLE)
+    record_key = {"idempotencyKey": f"{user_sub}#{key}"}
+    now = int(time.time())
+    try:
+        idem_table.put_item(
+            Item={**record_key, "requestHash": request_hash, "state": "IN_PROGRESS",
+                  "lockedUntil": now + IDEMPOTENCY_LOCK_SECONDS, "expiresAt": now + IDEMPOTENCY_TTL_SECONDS},
+            # TTL の削除は遅れるので、期限切れの記録や止まった処理中の記録は上書きしてよい
+            ConditionExpression="attribute_not_exists(idempotencyKey) OR expiresAt < :now OR (#s = :p AND lockedUntil < :now)",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={":now": now, ":p": "IN_PROGRESS"},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        record = idem_table.get_item(Key=record_key, ConsistentRead=True).get("Item") or {}
+        if record.get("requestHash") != request_hash:
+            return _resp(422, {"message": "Idempotency-Key was already used with a different request."})
+        if record.get("state") != "COMPLETED":
+            return _resp(409, {"message": "A request with this Idempotency-Key is still in progress."})
+        print(f"[create_question] idempotent replay key={key}")
+        return _resp(int(record["statusCode"]), json.loads(record["responseBody"]), {"Idempotent-Replayed": "true"})
+
+    try:
+        resp = create()
+    except Exception:
+        idem_table.delete_item(Key=record_key)
+        raise
+    if 200 <= resp["statusCode"] < 300:
+        idem_table.update_item(
+            Key=record_key,
+            UpdateExpression="SET #s = :c, statusCode = :sc, responseBody = :b REMOVE lockedUntil",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={":c": "COMPLETED", ":sc": resp["statusCode"], ":b": resp["body"]},
+        )
+    else:
+        # エラーは記録しない (直して同じキーで送り直せるように)
+        idem_table.delete_item(Key=record_key)
+    return resp
+
+
 def handler(event, context):
     # CORS preflight
     if event.get("httpMethod") == "OPTIONS":
@@ -155,57 +742,14 @@ def handler(event, context):
         return _resp(400, {"message": "Invalid JSON body."})
 
     try:
-        # 必須
-        title = _non_empty_str(body.get("title"), "title")
-        author_id = _non_empty_str(body.get("authorId"), "authorId")
-        quiz_items = _validate_quiz_items(body.get("quizItems"))
-
-        # 認可: authorId はトークンのsubと一致
-        if author_id != user_sub:
-            return _resp(403, {"message": "Forbidden: authorId does not match token subject."})
-
-        # 任意
-        purpose = _normalize_str_or_none(body.get("purpose"))
-        tags = _validate_tags(body.get("tags"))
-        remarks_raw = body.get("remarks", "")
-        if not isinstance(remarks_raw, str):
-            return _resp(400, {"message": "remarks must be a string."})
-        remarks = remarks_raw.strip()
-
-        dm_invite_message = _normalize_str_or_none(body.get("dmInviteMessage"))
-
-        # questionId はクライアント提供を優先
-        question_id = body.get("questionId")
-        if question_id is not None:
-            question_id = _non_empty_str(question_id, "questionId")
+        if _is_batch_request(event):
+            create = lambda: _create_batch(table, user_sub, body)
         else:
-            question_id = str(uuid.uuid4())
-
-        created_at = _iso_now()
-        share_code = _gen_share_code(10)
-
-        item: Dict[str, Any] = {
-            "questionId": question_id,
-            "title": title,
-            "authorId": author_id,
-            "quizItems": quiz_items,
-            "createdAt": created_at,
-            "remarks": remarks,
-            "tags": tags,
-            "shareCode": share_code,
-        }
-        if purpose is not None:
-            item["purpose"] = purpose
-        if dm_invite_message is not None:
-            item["dmInviteMessage"] = dm_invite_message
-
-        # デバッグログ（値が来ているか確認）
-        print(f"[create_question] user_sub={user_sub} qid={question_id} shareCode={share_code} has_dmInvite={dm_invite_message is not None}")
-
-        table.put_item(Item=item)
-
-        # 201 Created
-        return _resp(201, item)
+            create = lambda: _create_one(table, user_sub, body)
+        key = _idempotency_key(event)
+        if key and IDEMPOTENCY_TABLE:
+            return _with_idempotency_key(key, user_sub, _request_hash(event, body), create)
+        return create()
 
     except ValueError as ve:
         return _resp(400, {"message": str(ve)})
@@ -214,4 +758,4 @@ def handler(event, context):
 
 
 def lambda_handler(event, context):
-    return handler(event, context)
+    return response_compression.maybe_compress(handler(event, context), event)
@@ -1,125 +1,253 @@
-{\rtf1\ansi\ansicpg932\cocoartf2865
-\cocoatextscaling0\cocoaplatform0{\fonttbl\f0\fnil\fcharset0 Menlo-Regular;}
-{\colortbl;\red255\green255\blue255;\red15\green112\blue1;\red255\green255\blue255;\red45\green45\blue45;
-\red157\green0\blue210;\red0\green0\blue0;\red144\green1\blue18;\red0\green0\blue255;\red101\green76\blue29;
-\red0\green0\blue109;\red32\green108\blue135;\red19\green118\blue70;}
-{\*\expandedcolortbl;;\cssrgb\c0\c50196\c0;\cssrgb\c100000\c100000\c100000;\cssrgb\c23137\c23137\c23137;
-\cssrgb\c68627\c0\c85882;\cssrgb\c0\c0\c0;\cssrgb\c63922\c8235\c8235;\cssrgb\c0\c0\c100000;\cssrgb\c47451\c36863\c14902;
-\cssrgb\c0\c6275\c50196;\cssrgb\c14902\c49804\c60000;\cssrgb\c3529\c52549\c34510;}
-\paperw11900\paperh16840\margl1440\margr1440\vieww11520\viewh8400\viewkind0
-\deftab720
-\pard\pardeftab720\partightenfactor0
-
-\f0\fs24 \cf2 \cb3 \expnd0\expndtw0\kerning0
-\outl0\strokewidth0 \strokec2 # lambda_function.py for deleteQuestionFunction\cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf5 \cb3 \strokec5 import\cf4 \strokec4  json\cb1 \
-\cf5 \cb3 \strokec5 import\cf4 \strokec4  boto3\cb1 \
-\cf5 \cb3 \strokec5 import\cf4 \strokec4  os\cb1 \
-\cf5 \cb3 \strokec5 from\cf4 \strokec4  botocore.exceptions \cf5 \strokec5 import\cf4 \strokec4  ClientError\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf2 \cb3 \strokec2 # DynamoDB\uc0\u12486 \u12540 \u12502 \u12523 \u21517  (\u29872 \u22659 \u22793 \u25968 \u12363 \u12425 \u21462 \u24471 )\cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 QUESTIONS_TABLE_NAME \strokec6 =\strokec4  os.environ.get(\cf7 \strokec7 'QUESTIONS_TABLE_NAME'\cf4 \strokec4 , \cf7 \strokec7 'Questions'\cf4 \strokec4 ) \cf2 \strokec2 # \uc0\u12487 \u12501 \u12457 \u12523 \u12488 : Questions\cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf2 \cb3 \strokec2 # (\uc0\u12458 \u12503 \u12471 \u12519 \u12531 ) \u12418 \u12375 \u38306 \u36899 \u12487 \u12540 \u12479 \u12434 \u21066 \u38500 \u12377 \u12427 \u22580 \u21512 \cf4 \cb1 \strokec4 \
-\cf2 \cb3 \strokec2 # BOOKMARKS_TABLE_NAME = os.environ.get('BOOKMARKS_TABLE_NAME', 'Bookmarks')\cf4 \cb1 \strokec4 \
-\cf2 \cb3 \strokec2 # ANSWERS_TABLE_NAME = os.environ.get('ANSWERS_TABLE_NAME', 'Answers')\cf4 \cb1 \strokec4 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 dynamodb \strokec6 =\strokec4  boto3.resource(\cf7 \strokec7 'dynamodb'\cf4 \strokec4 )\cb1 \
-\cb3 questions_table \strokec6 =\strokec4  dynamodb.Table(QUESTIONS_TABLE_NAME)\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf8 \cb3 \strokec8 def\cf4 \strokec4  \cf9 \strokec9 lambda_handler\cf4 \strokec4 (\cf10 \strokec10 event\cf4 \strokec4 , \cf10 \strokec10 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "Received event: \cf8 \strokec8 \{\cf4 \strokec4 json.dumps(event)\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 ) \cf2 \strokec2 # \uc0\u12487 \u12496 \u12483 \u12464 \u29992 \u12395 \u12525 \u12464 \u20986 \u21147 \cf4 \cb1 \strokec4 \
-\
-\cb3     \cf5 \strokec5 try\cf4 \strokec4 :\cb1 \
-\cb3         \cf2 \strokec2 # 1. \uc0\u12497 \u12473 \u12497 \u12521 \u12513 \u12540 \u12479 \u12363 \u12425  questionId \u12434 \u21462 \u24471 \cf4 \cb1 \strokec4 \
-\cb3         path_params \strokec6 =\strokec4  event.get(\cf7 \strokec7 'pathParameters'\cf4 \strokec4 )\cb1 \
-\cb3         \cf5 \strokec5 if\cf4 \strokec4  \cf8 \strokec8 not\cf4 \strokec4  path_params \cf8 \strokec8 or\cf4 \strokec4  \cf7 \strokec7 'questionId'\cf4 \strokec4  \cf8 \strokec8 not\cf4 \strokec4  \cf8 \strokec8 in\cf4 \strokec4  path_params:\cb1 \
-\cb3             \cf5 \strokec5 raise\cf4 \strokec4  \cf11 \strokec11 ValueError\cf4 \strokec4 (\cf7 \strokec7 "Missing 'questionId' in path parameters"\cf4 \strokec4 )\cb1 \
-\cb3         question_id \strokec6 =\strokec4  path_params[\cf7 \strokec7 'questionId'\cf4 \strokec4 ]\cb1 \
-\
-\cb3         \cf2 \strokec2 # 2. \uc0\u35469 \u35388 \u24773 \u22577 \u12363 \u12425 \u23455 \u34892 \u12518 \u12540 \u12470 \u12540 ID (sub) \u12434 \u21462 \u24471 \cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 # API Gateway Cognito\uc0\u12458 \u12540 \u12477 \u12521 \u12452 \u12470 \u12540 \u12363 \u12425 \u12398 \u24773 \u22577 \u12434 \u24819 \u23450 \cf4 \cb1 \strokec4 \
-\cb3         request_context \strokec6 =\strokec4  event.get(\cf7 \strokec7 'requestContext'\cf4 \strokec4 , \{\})\cb1 \
-\cb3         authorizer_context \strokec6 =\strokec4  request_context.get(\cf7 \strokec7 'authorizer'\cf4 \strokec4 , \{\})\cb1 \
-\cb3         claims \strokec6 =\strokec4  authorizer_context.get(\cf7 \strokec7 'claims'\cf4 \strokec4 , \{\})\cb1 \
-\cb3         requesting_user_id \strokec6 =\strokec4  claims.get(\cf7 \strokec7 'sub'\cf4 \strokec4 ) \cf2 \strokec2 # Cognito\uc0\u12398 'sub'\u12463 \u12524 \u12540 \u12512 \cf4 \cb1 \strokec4 \
-\
-\cb3         \cf5 \strokec5 if\cf4 \strokec4  \cf8 \strokec8 not\cf4 \strokec4  requesting_user_id:\cb1 \
-\cb3             \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 "ERROR: Could not extract user ID (sub) from authorizer claims."\cf4 \strokec4 )\cb1 \
-\cb3             \cf5 \strokec5 return\cf4 \strokec4  \{\cb1 \
-\cb3                 \cf7 \strokec7 'statusCode'\cf4 \strokec4 : \cf12 \strokec12 403\cf4 \strokec4 , \cf2 \strokec2 # Forbidden (\uc0\u35469 \u35388 \u24773 \u22577 \u12364 \u12362 \u12363 \u12375 \u12356 )\cf4 \cb1 \strokec4 \
-\cb3                 \cf7 \strokec7 'body'\cf4 \strokec4 : json.dumps(\{\cf7 \strokec7 'error'\cf4 \strokec4 : \cf7 \strokec7 'Could not verify user identity.'\cf4 \strokec4 \})\cb1 \
-\cb3             \}\cb1 \
-\
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "Attempting delete for questionId: \cf8 \strokec8 \{\cf4 \strokec4 question_id\cf8 \strokec8 \}\cf7 \strokec7  by user: \cf8 \strokec8 \{\cf4 \strokec4 requesting_user_id\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 )\cb1 \
-\
-\cb3         \cf2 \strokec2 # 3. Questions\uc0\u12486 \u12540 \u12502 \u12523 \u12363 \u12425 \u36074 \u21839 \u24773 \u22577 \u12434 \u21462 \u24471 \u12375 \u12390 \u20316 \u25104 \u32773 \u12434 \u30906 \u35469 \cf4 \cb1 \strokec4 \
-\cb3         \cf5 \strokec5 try\cf4 \strokec4 :\cb1 \
-\cb3             response \strokec6 =\strokec4  questions_table.get_item(\cb1 \
-\cb3                 \cf10 \strokec10 Key\cf4 \strokec6 =\strokec4 \{\cf7 \strokec7 'questionId'\cf4 \strokec4 : question_id\},\cb1 \
-\cb3                 \cf10 \strokec10 ProjectionExpression\cf4 \strokec6 =\cf7 \strokec7 'authorId'\cf4 \strokec4  \cf2 \strokec2 # authorId\uc0\u12384 \u12369 \u21462 \u24471 \u12377 \u12428 \u12400 \u33391 \u12356 \cf4 \cb1 \strokec4 \
-\cb3             )\cb1 \
-\cb3         \cf5 \strokec5 except\cf4 \strokec4  ClientError \cf5 \strokec5 as\cf4 \strokec4  e:\cb1 \
-\cb3             \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "DynamoDB GetItem Error: \cf8 \strokec8 \{\cf4 \strokec4 e.response[\cf7 \strokec7 'Error'\cf4 \strokec4 ][\cf7 \strokec7 'Message'\cf4 \strokec4 ]\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 )\cb1 \
-\cb3             \cf5 \strokec5 raise\cf4 \strokec4  \cf11 \strokec11 Exception\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "Failed to get question details: \cf8 \strokec8 \{\cf4 \strokec4 e.response[\cf7 \strokec7 'Error'\cf4 \strokec4 ][\cf7 \strokec7 'Message'\cf4 \strokec4 ]\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 ) \cf2 \strokec2 # \uc0\u20877 \u35430 \u34892 \u19981 \u21487 \u33021 \u12394 \u12456 \u12521 \u12540 \u12392 \u12375 \u12390 \u25201 \u12358 \cf4 \cb1 \strokec4 \
-\
-\cb3         item \strokec6 =\strokec4  response.get(\cf7 \strokec7 'Item'\cf4 \strokec4 )\cb1 \
-\cb3         \cf5 \strokec5 if\cf4 \strokec4  \cf8 \strokec8 not\cf4 \strokec4  item:\cb1 \
-\cb3             \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 "Question not found."\cf4 \strokec4 )\cb1 \
-\cb3             \cf5 \strokec5 return\cf4 \strokec4  \{\cb1 \
-\cb3                 \cf7 \strokec7 'statusCode'\cf4 \strokec4 : \cf12 \strokec12 404\cf4 \strokec4 , \cf2 \strokec2 # Not Found\cf4 \cb1 \strokec4 \
-\cb3                 \cf7 \strokec7 'body'\cf4 \strokec4 : json.dumps(\{\cf7 \strokec7 'error'\cf4 \strokec4 : \cf7 \strokec7 'Question not found'\cf4 \strokec4 \})\cb1 \
-\cb3             \}\cb1 \
-\
-\cb3         author_id \strokec6 =\strokec4  item.get(\cf7 \strokec7 'authorId'\cf4 \strokec4 )\cb1 \
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "Question authorId: \cf8 \strokec8 \{\cf4 \strokec4 author_id\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 )\cb1 \
-\
-\cb3         \cf2 \strokec2 # 4. \uc0\u20316 \u25104 \u32773 \u12392 \u23455 \u34892 \u12518 \u12540 \u12470 \u12540 \u12364 \u19968 \u33268 \u12377 \u12427 \u12363 \u26908 \u35388 \cf4 \cb1 \strokec4 \
-\cb3         \cf5 \strokec5 if\cf4 \strokec4  author_id \strokec6 !=\strokec4  requesting_user_id:\cb1 \
-\cb3             \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 "ERROR: User is not the author of the question."\cf4 \strokec4 )\cb1 \
-\cb3             \cf5 \strokec5 return\cf4 \strokec4  \{\cb1 \
-\cb3                 \cf7 \strokec7 'statusCode'\cf4 \strokec4 : \cf12 \strokec12 403\cf4 \strokec4 , \cf2 \strokec2 # Forbidden (\uc0\u27177 \u38480 \u12394 \u12375 )\cf4 \cb1 \strokec4 \
-\cb3                 \cf7 \strokec7 'body'\cf4 \strokec4 : json.dumps(\{\cf7 \strokec7 'error'\cf4 \strokec4 : \cf7 \strokec7 'You do not have permission to delete this question.'\cf4 \strokec4 \})\cb1 \
-\cb3             \}\cb1 \
-\
-\cb3         \cf2 \strokec2 # 5. DynamoDB\uc0\u12363 \u12425 \u36074 \u21839 \u38917 \u30446 \u12434 \u21066 \u38500 \cf4 \cb1 \strokec4 \
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "User verified as author. Proceeding with deletion..."\cf4 \strokec4 )\cb1 \
-\cb3         questions_table.delete_item(\cb1 \
-\cb3             \cf10 \strokec10 Key\cf4 \strokec6 =\strokec4 \{\cf7 \strokec7 'questionId'\cf4 \strokec4 : question_id\}\cb1 \
-\cb3             \cf2 \strokec2 # (\uc0\u12458 \u12503 \u12471 \u12519 \u12531 ) \u26465 \u20214 \u20184 \u12365 \u21066 \u38500 : \u12418 \u12375 \u21066 \u38500 \u30452 \u21069 \u12395 authorId\u12364 \u22793 \u12431 \u12387 \u12390 \u12356 \u12383 \u12425 \u22833 \u25943 \u12373 \u12379 \u12427 \cf4 \cb1 \strokec4 \
-\cb3             \cf2 \strokec2 # ConditionExpression='attribute_exists(questionId) AND authorId = :uid',\cf4 \cb1 \strokec4 \
-\cb3             \cf2 \strokec2 # ExpressionAttributeValues=\{':uid': requesting_user_id\}\cf4 \cb1 \strokec4 \
-\cb3         )\cb1 \
-\
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 "Question deleted successfully from Questions table."\cf4 \strokec4 )\cb1 \
-\
-\cb3         \cf2 \strokec2 # --- (\uc0\u12458 \u12503 \u12471 \u12519 \u12531 ) \u38306 \u36899 \u12487 \u12540 \u12479 \u12398 \u12459 \u12473 \u12465 \u12540 \u12489 \u21066 \u38500  ---\cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 # \cf8 \strokec8 TODO\cf2 \strokec2 : Bookmarks\uc0\u12486 \u12540 \u12502 \u12523 \u12420 Answers\u12486 \u12540 \u12502 \u12523 \u12363 \u12425 \u12289 \u12371 \u12398 questionId\u12395 \u38306 \u36899 \u12377 \u12427 \u38917 \u30446 \u12434 \u21066 \u38500 \u12377 \u12427 \u20966 \u29702 \u12434 \u36861 \u21152 \cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 # \uc0\u20363 : bookmarks_table.query(...) \u12391 \u21462 \u24471 \u12375 \u12390  delete_item \u12523 \u12540 \u12503 \u12394 \u12393 \cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 # -----------------------------------------------\cf4 \cb1 \strokec4 \
-\
-\cb3         \cf2 \strokec2 # 6. \uc0\u25104 \u21151 \u12524 \u12473 \u12509 \u12531 \u12473  (204 No Content)\cf4 \cb1 \strokec4 \
-\cb3         \cf5 \strokec5 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf7 \strokec7 'statusCode'\cf4 \strokec4 : \cf12 \strokec12 204\cf4 \strokec4 ,\cb1 \
-\cb3             \cf7 \strokec7 'body'\cf4 \strokec4 : \cf7 \strokec7 ''\cf4 \cb1 \strokec4 \
-\cb3         \}\cb1 \
-\
-\cb3     \cf5 \strokec5 except\cf4 \strokec4  \cf11 \strokec11 ValueError\cf4 \strokec4  \cf5 \strokec5 as\cf4 \strokec4  ve: \cf2 \strokec2 # \uc0\u12497 \u12521 \u12513 \u12540 \u12479 \u19981 \u36275 \u12394 \u12393 \cf4 \cb1 \strokec4 \
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "Value Error: \cf8 \strokec8 \{\cf4 \strokec4 ve\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 )\cb1 \
-\cb3         \cf5 \strokec5 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf7 \strokec7 'statusCode'\cf4 \strokec4 : \cf12 \strokec12 400\cf4 \strokec4 , \cf2 \strokec2 # Bad Request\cf4 \cb1 \strokec4 \
-\cb3             \cf7 \strokec7 'body'\cf4 \strokec4 : json.dumps(\{\cf7 \strokec7 'error'\cf4 \strokec4 : \cf11 \strokec11 str\cf4 \strokec4 (ve)\})\cb1 \
-\cb3         \}\cb1 \
-\cb3     \cf5 \strokec5 except\cf4 \strokec4  \cf11 \strokec11 Exception\cf4 \strokec4  \cf5 \strokec5 as\cf4 \strokec4  e: \cf2 \strokec2 # DynamoDB\uc0\u12456 \u12521 \u12540 \u21547 \u12416 \u12381 \u12398 \u20182 \u12398 \u20104 \u26399 \u12379 \u12396 \u12456 \u12521 \u12540 \cf4 \cb1 \strokec4 \
-\cb3         \cf9 \strokec9 print\cf4 \strokec4 (\cf8 \strokec8 f\cf7 \strokec7 "Unexpected Error: \cf8 \strokec8 \{\cf4 \strokec4 e\cf8 \strokec8 \}\cf7 \strokec7 "\cf4 \strokec4 )\cb1 \
-\cb3         \cf5 \strokec5 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf7 \strokec7 'statusCode'\cf4 \strokec4 : \cf12 \strokec12 500\cf4 \strokec4 ,\cb1 \
-\cb3             \cf7 \strokec7 'body'\cf4 \strokec4 : json.dumps(\{\cf7 \strokec7 'error'\cf4 \strokec4 : \cf8 \strokec8 f\cf7 \strokec7 'An unexpected error occurred: \cf8 \strokec8 \{\cf11 \strokec11 str\cf4 \strokec4 (e)\cf8 \strokec8 \}\cf7 \strokec7 '\cf4 \strokec4 \})\cb1 \
-\cb3         \}\cb1 \
-}
\ No newline at end of file
+# lambda_function.py for deleteQuestionFunction
+import json
+import boto3
+import os
+import re
+import unicodedata
+import zlib
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+# DynamoDBテーブル名 (環境変数から取得)
+QUESTIONS_TABLE_NAME = os.environ.get('QUESTIONS_TABLE_NAME', 'Questions') # デフォルト: Questions
+# 関連データ (ブックマーク、回答ログ、shareCode、派生インデックス) を消すジョブ (cascadeDeleteQuestionFunction)。
+# 設定されていれば非同期で依頼してすぐ返す。未設定なら派生インデックスだけここで消す
+CASCADE_DELETE_FUNCTION = os.environ.get('CASCADE_DELETE_FUNCTION')
+# タグ転置インデックス (PK: tag, SK: sortKey = "createdAt#questionId")
+TAG_INDEX_TABLE_NAME = os.environ.get('TAG_INDEX_TABLE')
+# purpose とタグの複合インデックス (PK: purposeTag = "purpose#tag", SK: sortKey)
+PURPOSE_TAG_INDEX_TABLE_NAME = os.environ.get('PURPOSE_TAG_INDEX_TABLE')
+# フィードのスナップショットを作り直す Lambda (getQuestionsFunction の materialize_handler)
+FEED_MATERIALIZER_FUNCTION = os.environ.get('FEED_MATERIALIZER_FUNCTION')
+# 一覧キャッシュを無効にするためのカタログのバージョン (PK: metaKey = "catalog")
+CATALOG_META_TABLE_NAME = os.environ.get('CATALOG_META_TABLE')
+# 全文検索の転置インデックス (PK: gram, SK: questionId)。bigram の作り方は createQuestionFunction と揃えること
+SEARCH_INDEX_TABLE_NAME = os.environ.get('SEARCH_INDEX_TABLE')
+_SEARCH_SPLIT = re.compile(r'[\W_]+')
+
+dynamodb = boto3.resource('dynamodb')
+questions_table = dynamodb.Table(QUESTIONS_TABLE_NAME)
+lambda_client = boto3.client('lambda')
+
+
+def _delete_tag_index(question_id, item):
+    """タグ転置インデックスから、この質問の行を削除する"""
+    if not TAG_INDEX_TABLE_NAME:
+        return
+    created_at = item.get('createdAt')
+    tags = set(item.get('tags') or [])
+    if not created_at or not tags:
+        return
+    tag_index_table = dynamodb.Table(TAG_INDEX_TABLE_NAME)
+    with tag_index_table.batch_writer() as batch:
+        for tag in tags:
+            batch.delete_item(Key={'tag': tag, 'sortKey': f"{created_at}#{question_id}"})
+    print(f"Deleted {len(tags)} tag index rows.")
+
+
+def _delete_purpose_tag_index(question_id, item):
+    """purpose#tag の複合インデックスから、この質問の行を削除する"""
+    if not PURPOSE_TAG_INDEX_TABLE_NAME:
+        return
+    created_at = item.get('createdAt')
+    purpose = item.get('purpose')
+    tags = set(item.get('tags') or [])
+    if not created_at or not purpose or not tags:
+        return
+    purpose_tag_table = dynamodb.Table(PURPOSE_TAG_INDEX_TABLE_NAME)
+    with purpose_tag_table.batch_writer() as batch:
+        for tag in tags:
+            batch.delete_item(Key={'purposeTag': f"{purpose}#{tag}", 'sortKey': f"{created_at}#{question_id}"})
+    print(f"Deleted {len(tags)} purpose#tag index rows.")
+
+
+def _search_bigrams(text):
+    grams = set()
+    for segment in _SEARCH_SPLIT.split(unicodedata.normalize('NFKC', text).lower()):
+        grams.update(segment[i:i + 2] for i in range(len(segment) - 1))
+    return grams
+
+
+def _quiz_items(item):
+    """quizItems を返す。QUIZ_ITEMS_STORAGE=zlib で保存された質問は quizItemsZ (zlib + JSON) を戻す"""
+    packed = item.get('quizItemsZ')
+    if packed is not None:
+        return json.loads(zlib.decompress(bytes(getattr(packed, 'value', packed))))
+    return item.get('quizItems') or []
+
+
+def _search_grams(item):
+    """この質問が検索インデックスに持っている bigram"""
+    texts = [item.get('title'), item.get('remarks')] + list(item.get('tags') or [])
+    texts += [qi.get('questionText') for qi in _quiz_items(item) if isinstance(qi, dict)]
+    grams = set()
+    for text in texts:
+        if isinstance(text, str):
+            grams |= _search_bigrams(text)
+    return grams
+
+
+def _delete_search_index(question_id, item):
+    """検索インデックスから、この質問の bigram の行を削除する"""
+    if not SEARCH_INDEX_TABLE_NAME:
+        return
+    grams = _search_grams(item)
+    search_table = dynamodb.Table(SEARCH_INDEX_TABLE_NAME)
+    with search_table.batch_writer() as batch:
+        for gram in grams:
+            batch.delete_item(Key={'gram': gram, 'questionId': question_id})
+    print(f"Deleted {len(grams)} search index rows.")
+
+
+def _enqueue_cascade_delete(question_id, item):
+    """
+    関連データの削除ジョブを非同期で依頼する。依頼できたら True。
+    質問の行はもう無いので、消すキーを決めるのに必要な属性はイベントで渡す
+    """
+    if not CASCADE_DELETE_FUNCTION:
+        return False
+    job = {
+        'questionId': question_id,
+        'shareCode': item.get('shareCode'),
+        'createdAt': item.get('createdAt'),
+        'purpose': item.get('purpose'),
+        'tags': list(item.get('tags') or []),
+        'searchGrams': sorted(_search_grams(item)) if SEARCH_INDEX_TABLE_NAME else [],
+    }
+    try:
+        lambda_client.invoke(
+            FunctionName=CASCADE_DELETE_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps(job, ensure_ascii=False).encode('utf-8')
+        )
+        return True
+    except Exception as e:
+        print(f"Cascade delete request failed: {e}")
+        return False
+
+
+def _bump_catalog_version():
+    """getQuestionsFunction のコンテナ内キャッシュを無効にする (失敗しても削除は成功扱い)"""
+    if not CATALOG_META_TABLE_NAME:
+        return
+    try:
+        dynamodb.Table(CATALOG_META_TABLE_NAME).update_item(
+            Key={'metaKey': 'catalog'},
+            UpdateExpression='ADD #v :one',
+            ExpressionAttributeNames={'#v': 'version'},
+            ExpressionAttributeValues={':one': 1}
+        )
+    except ClientError as e:
+        print(f"Catalog version bump failed: {e}")
+
+
+def _request_feed_refresh():
+    """フィードのスナップショット再構築を非同期で依頼する (失敗しても削除は成功扱い)"""
+    if not FEED_MATERIALIZER_FUNCTION:
+        return
+    try:
+        lambda_client.invoke(
+            FunctionName=FEED_MATERIALIZER_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps({'requestedAt': datetime.now(timezone.utc).isoformat()}).encode('utf-8')
+        )
+    except Exception as e:
+        print(f"Feed refresh request failed: {e}")
+
+def lambda_handler(event, context):
+    print(f"Received event: {json.dumps(event)}") # デバッグ用にログ出力
+
+    try:
+        # 1. パスパラメータから questionId を取得
+        path_params = event.get('pathParameters')
+        if not path_params or 'questionId' not in path_params:
+            raise ValueError("Missing 'questionId' in path parameters")
+        question_id = path_params['questionId']
+
+        # 2. 認証情報から実行ユーザーID (sub) を取得
+        # API Gateway Cognitoオーソライザーからの情報を想定
+        request_context = event.get('requestContext', {})
+        authorizer_context = request_context.get('authorizer', {})
+        claims = authorizer_context.get('claims', {})
+        requesting_user_id = claims.get('sub') # Cognitoの'sub'クレーム
+
+        if not requesting_user_id:
+            print("ERROR: Could not extract user ID (sub) from authorizer claims.")
+            return {
+                'statusCode': 403, # Forbidden (認証情報がおかしい)
+                'body': json.dumps({'error': 'Could not verify user identity.'})
+            }
+
+        print(f"Attempting delete for questionId: {question_id} by user: {requesting_user_id}")
+
+        # 3. Questionsテーブルから質問情報を取得して作成者を確認
+        try:
+            response = questions_table.get_item(
+                Key={'questionId': question_id},
+                ProjectionExpression='authorId, purpose, tags, createdAt, title, remarks, quizItems, quizItemsZ, shareCode' # 作成者の確認と関連データの削除に必要な属性だけ
+            )
+        except ClientError as e:
+            print(f"DynamoDB GetItem Error: {e.response['Error']['Message']}")
+            raise Exception(f"Failed to get question details: {e.response['Error']['Message']}") # 再試行不可能なエラーとして扱う
+
+        item = response.get('Item')
+        if not item:
+            print("Question not found.")
+            return {
+                'statusCode': 404, # Not Found
+                'body': json.dumps({'error': 'Question not found'})
+            }
+
+        author_id = item.get('authorId')
+        print(f"Question authorId: {author_id}")
+
+        # 4. 作成者と実行ユーザーが一致するか検証
+        if author_id != requesting_user_id:
+            print("ERROR: User is not the author of the question.")
+            return {
+                'statusCode': 403, # Forbidden (権限なし)
+                'body': json.dumps({'error': 'You do not have permission to delete this question.'})
+            }
+
+        # 5. DynamoDBから質問項目を削除
+        print("User verified as author. Proceeding with deletion...")
+        questions_table.delete_item(
+            Key={'questionId': question_id}
+            # (オプション) 条件付き削除: もし削除直前にauthorIdが変わっていたら失敗させる
+            # ConditionExpression='attribute_exists(questionId) AND authorId = :uid',
+            # ExpressionAttributeValues={':uid': requesting_user_id}
+        )
+
+        print("Question deleted successfully from Questions table.")
+
+        # 一覧からはすぐ消えるようにする (残ったインデックスの行は読む側で質問が見つからず落ちる)
+        _bump_catalog_version()
+        _request_feed_refresh()
+
+        # 関連データのカスケード削除 (ジョブに任せてすぐ返す)
+        if _enqueue_cascade_delete(question_id, item):
+            print("Cascade delete job enqueued.")
+        else:
+            # ジョブが無い環境では派生インデックスだけここで消す
+            _delete_tag_index(question_id, item)
+            _delete_purpose_tag_index(question_id, item)
+            _delete_search_index(question_id, item)
+
+        # 6. 成功レスポンス (204 No Content)
+        return {
+            'statusCode': 204,
+            'body': ''
+        }
+
+    except ValueError as ve: # パラメータ不足など
+        print(f"Value Error: {ve}")
+        return {
+            'statusCode': 400, # Bad Request
+            'body': json.dumps({'error': str(ve)})
+        }
+    except Exception as e: # DynamoDBエラー含むその他の予期せぬエラー
+        print(f"Unexpected Error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'An unexpected error occurred: {str(e)}'})
+        }
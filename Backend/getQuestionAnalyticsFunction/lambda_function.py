@@ -1,74 +1,142 @@
-{\rtf1\ansi\ansicpg932\cocoartf2865
-\cocoatextscaling0\cocoaplatform0{\fonttbl\f0\fnil\fcharset0 Menlo-Regular;}
-{\colortbl;\red255\green255\blue255;\red157\green0\blue210;\red255\green255\blue255;\red45\green45\blue45;
-\red15\green112\blue1;\red0\green0\blue255;\red32\green108\blue135;\red101\green76\blue29;\red0\green0\blue109;
-\red0\green0\blue0;\red19\green118\blue70;\red144\green1\blue18;}
-{\*\expandedcolortbl;;\cssrgb\c68627\c0\c85882;\cssrgb\c100000\c100000\c100000;\cssrgb\c23137\c23137\c23137;
-\cssrgb\c0\c50196\c0;\cssrgb\c0\c0\c100000;\cssrgb\c14902\c49804\c60000;\cssrgb\c47451\c36863\c14902;\cssrgb\c0\c6275\c50196;
-\cssrgb\c0\c0\c0;\cssrgb\c3529\c52549\c34510;\cssrgb\c63922\c8235\c8235;}
-\paperw11900\paperh16840\margl1440\margr1440\vieww11520\viewh8400\viewkind0
-\deftab720
-\pard\pardeftab720\partightenfactor0
-
-\f0\fs24 \cf2 \cb3 \expnd0\expndtw0\kerning0
-\outl0\strokewidth0 \strokec2 import\cf4 \strokec4  json\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  boto3\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  decimal \cf2 \strokec2 import\cf4 \strokec4  Decimal\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  boto3.dynamodb.conditions \cf2 \strokec2 import\cf4 \strokec4  Key, Attr \cf5 \strokec5 # GSI\uc0\u12434 \u20351 \u12358 \u12398 \u12391 Key\u12418 \u12452 \u12531 \u12509 \u12540 \u12488 \cf4 \cb1 \strokec4 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf6 \cb3 \strokec6 class\cf4 \strokec4  \cf7 \strokec7 DecimalEncoder\cf4 \strokec4 (\cf7 \strokec7 json\cf4 \strokec4 .\cf7 \strokec7 JSONEncoder\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf6 \strokec6 def\cf4 \strokec4  \cf8 \strokec8 default\cf4 \strokec4 (\cf9 \strokec9 self\cf4 \strokec4 , \cf9 \strokec9 o\cf4 \strokec4 ):\cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf8 \strokec8 isinstance\cf4 \strokec4 (o, Decimal):\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \cf7 \strokec7 int\cf4 \strokec4 (o) \cf2 \strokec2 if\cf4 \strokec4  o \strokec10 %\strokec4  \cf11 \strokec11 1\cf4 \strokec4  \strokec10 ==\strokec4  \cf11 \strokec11 0\cf4 \strokec4  \cf2 \strokec2 else\cf4 \strokec4  \cf7 \strokec7 float\cf4 \strokec4 (o)\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \cf7 \strokec7 super\cf4 \strokec4 (DecimalEncoder, \cf6 \strokec6 self\cf4 \strokec4 ).default(o)\cb1 \
-\
-\cb3 dynamodb \strokec10 =\strokec4  boto3.resource(\cf12 \strokec12 'dynamodb'\cf4 \strokec4 )\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf5 \cb3 \strokec5 # AnswersLog\uc0\u12486 \u12540 \u12502 \u12523 \u12398 QuestionIndex GSI\u12434 \u20351 \u29992 \cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 table \strokec10 =\strokec4  dynamodb.Table(\cf12 \strokec12 'AnswersLog'\cf4 \strokec4 )\cb1 \
-\cb3 question_index_name \strokec10 =\strokec4  \cf12 \strokec12 'QuestionIndex'\cf4 \strokec4  \cf5 \strokec5 # GSI\uc0\u21517 \u12434 \u23450 \u32681 \cf4 \cb1 \strokec4 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf6 \cb3 \strokec6 def\cf4 \strokec4  \cf8 \strokec8 lambda_handler\cf4 \strokec4 (\cf9 \strokec9 event\cf4 \strokec4 , \cf9 \strokec9 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 try\cf4 \strokec4 :\cb1 \
-\cb3         \cf5 \strokec5 # \uc0\u12497 \u12473 \u12497 \u12521 \u12513 \u12540 \u12479 \u12363 \u12425 \u36074 \u21839 ID\u12434 \u21462 \u24471 \cf4 \cb1 \strokec4 \
-\cb3         question_id \strokec10 =\strokec4  event[\cf12 \strokec12 'pathParameters'\cf4 \strokec4 ][\cf12 \strokec12 'questionId'\cf4 \strokec4 ]\cb1 \
-\
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf6 \strokec6 not\cf4 \strokec4  question_id:\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \{\cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 400\cf4 \strokec4 , \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(\{\cf12 \strokec12 'error'\cf4 \strokec4 : \cf12 \strokec12 'questionId is required in path parameters'\cf4 \strokec4 \})\}\cb1 \
-\
-\cb3         \cf5 \strokec5 # QuestionIndex GSI\uc0\u12395 \u23550 \u12375 \u12390 \u12463 \u12456 \u12522 \u12434 \u23455 \u34892 \u12375 \u12289 \u29305 \u23450 \u12398 \u36074 \u21839 ID\u12434 \u25345 \u12388 \u22238 \u31572 \u12525 \u12464 \u12434 \u21462 \u24471 \cf4 \cb1 \strokec4 \
-\cb3         response \strokec10 =\strokec4  table.query(\cb1 \
-\cb3             \cf9 \strokec9 IndexName\cf4 \strokec10 =\strokec4 question_index_name,\cb1 \
-\cb3             \cf9 \strokec9 KeyConditionExpression\cf4 \strokec10 =\strokec4 Key(\cf12 \strokec12 'questionId'\cf4 \strokec4 ).eq(question_id)\cb1 \
-\cb3         )\cb1 \
-\cb3         items \strokec10 =\strokec4  response.get(\cf12 \strokec12 'Items'\cf4 \strokec4 , [])\cb1 \
-\
-\cb3         total_answers \strokec10 =\strokec4  \cf8 \strokec8 len\cf4 \strokec4 (items)\cb1 \
-\cb3         correct_answers \strokec10 =\strokec4  \cf8 \strokec8 sum\cf4 \strokec4 (\cf11 \strokec11 1\cf4 \strokec4  \cf2 \strokec2 for\cf4 \strokec4  item \cf2 \strokec2 in\cf4 \strokec4  items \cf2 \strokec2 if\cf4 \strokec4  item.get(\cf12 \strokec12 'isCorrect'\cf4 \strokec4 ))\cb1 \
-\
-\cb3         \cf5 \strokec5 # \uc0\u27491 \u35299 \u29575 \u12434 \u35336 \u31639  (0\u38500 \u31639 \u12434 \u36991 \u12369 \u12427 )\cf4 \cb1 \strokec4 \
-\cb3         accuracy \strokec10 =\strokec4  (correct_answers \strokec10 /\strokec4  total_answers \strokec10 *\strokec4  \cf11 \strokec11 100\cf4 \strokec4 ) \cf2 \strokec2 if\cf4 \strokec4  total_answers \strokec10 >\strokec4  \cf11 \strokec11 0\cf4 \strokec4  \cf2 \strokec2 else\cf4 \strokec4  \cf11 \strokec11 0\cf4 \cb1 \strokec4 \
-\
-\cb3         \cf5 \strokec5 # \uc0\u32080 \u26524 \u12434 \u12414 \u12392 \u12417 \u12427 \cf4 \cb1 \strokec4 \
-\cb3         analytics \strokec10 =\strokec4  \{\cb1 \
-\cb3             \cf12 \strokec12 'totalAnswers'\cf4 \strokec4 : total_answers,\cb1 \
-\cb3             \cf12 \strokec12 'correctAnswers'\cf4 \strokec4 : correct_answers,\cb1 \
-\cb3             \cf12 \strokec12 'accuracy'\cf4 \strokec4 : \cf8 \strokec8 round\cf4 \strokec4 (accuracy, \cf11 \strokec11 2\cf4 \strokec4 ) \cf5 \strokec5 # \uc0\u23567 \u25968 \u28857 \u20197 \u19979 2\u26689 \u12395 \u20024 \u12417 \u12427 \cf4 \cb1 \strokec4 \
-\cb3         \}\cb1 \
-\
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 200\cf4 \strokec4 ,\cb1 \
-\cb3             \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(analytics, \cf9 \strokec9 cls\cf4 \strokec10 =\strokec4 DecimalEncoder)\cb1 \
-\cb3         \}\cb1 \
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf7 \strokec7 KeyError\cf4 \strokec4 :\cb1 \
-\cb3          \cf5 \strokec5 # questionId\uc0\u12364 \u35211 \u12388 \u12363 \u12425 \u12394 \u12356 \u22580 \u21512 \u12398 \u12456 \u12521 \u12540 \u12495 \u12531 \u12489 \u12522 \u12531 \u12464 \cf4 \cb1 \strokec4 \
-\cb3          \cf2 \strokec2 return\cf4 \strokec4  \{\cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 400\cf4 \strokec4 , \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(\{\cf12 \strokec12 'error'\cf4 \strokec4 : \cf12 \strokec12 'Missing questionId in path parameters'\cf4 \strokec4 \})\}\cb1 \
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf7 \strokec7 Exception\cf4 \strokec4  \cf2 \strokec2 as\cf4 \strokec4  e:\cb1 \
-\cb3         \cf8 \strokec8 print\cf4 \strokec4 (\cf6 \strokec6 f\cf12 \strokec12 "Error: \cf6 \strokec6 \{\cf4 \strokec4 e\cf6 \strokec6 \}\cf12 \strokec12 "\cf4 \strokec4 )\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 500\cf4 \strokec4 , \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(\{\cf12 \strokec12 'error'\cf4 \strokec4 : \cf7 \strokec7 str\cf4 \strokec4 (e)\})\}\cb1 \
-}
\ No newline at end of file
+import json
+import os
+import boto3
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key # GSIを使うのでKeyをインポート
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return int(o) if o % 1 == 0 else float(o)
+        return super(DecimalEncoder, self).default(o)
+
+dynamodb = boto3.resource('dynamodb')
+# AnswersLogテーブルのQuestionIndex GSIを使用
+table = dynamodb.Table(os.environ.get('ANSWERS_TABLE', 'AnswersLog'))
+question_index_name = 'QuestionIndex' # GSI名を定義
+# logAnswerFunction が更新する質問ごとの集計 (PK: questionId)。設定されていれば GetItem 1回で返す
+QUESTION_STATS_TABLE = os.environ.get('QUESTION_STATS_TABLE')
+# backfillQuestionStatsFunction が最後まで終わると書く完了の印の行。
+# 印が付くまでは集計の行があっても回答ログを数える (導入前の回答が入っていない行を返さない)
+BACKFILL_MARKER_ID = '#backfill'
+_stats_backfilled = False # 印を見たらコンテナが生きている間は読み直さない
+# quizItem ごとの選択肢の分布と項目分析の結果 (PK: questionId, SK: quizItemId)。設定されていれば items として返す
+QUESTION_ITEM_STATS_TABLE = os.environ.get('QUESTION_ITEM_STATS_TABLE')
+CHOICE_ATTR_PREFIX = 'choice#'
+# analyzeQuestionItemsFunction が書く属性
+ITEM_ANALYSIS_FIELDS = ['respondents', 'difficulty', 'discrimination', 'distractors', 'analyzedAt']
+
+
+def _stats_from_logs(question_id):
+    """集計が無い質問 (集計の導入前・未回答) は回答ログを最後まで数える"""
+    query_kwargs = {
+        'IndexName': question_index_name,
+        'KeyConditionExpression': Key('questionId').eq(question_id),
+        'ProjectionExpression': 'userId, isCorrect'
+    }
+    total_answers = 0
+    correct_answers = 0
+    users = set()
+    while True:
+        response = table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            total_answers += 1
+            if item.get('isCorrect'):
+                correct_answers += 1
+            users.add(item.get('userId'))
+        lek = response.get('LastEvaluatedKey')
+        if not lek:
+            break
+        query_kwargs['ExclusiveStartKey'] = lek
+    return {'totalAnswers': total_answers, 'correctAnswers': correct_answers, 'uniqueAnswerers': len(users)}
+
+
+def _stats_ready():
+    global _stats_backfilled
+    if not _stats_backfilled:
+        marker = dynamodb.Table(QUESTION_STATS_TABLE).get_item(
+            Key={'questionId': BACKFILL_MARKER_ID},
+            ProjectionExpression='completedAt'
+        ).get('Item')
+        _stats_backfilled = bool(marker and marker.get('completedAt'))
+    return _stats_backfilled
+
+
+def _load_stats(question_id):
+    if QUESTION_STATS_TABLE and _stats_ready():
+        stats = dynamodb.Table(QUESTION_STATS_TABLE).get_item(
+            Key={'questionId': question_id},
+            ProjectionExpression='totalAnswers, correctAnswers, uniqueAnswerers'
+        ).get('Item')
+        if stats:
+            return {
+                'totalAnswers': int(stats.get('totalAnswers', 0)),
+                'correctAnswers': int(stats.get('correctAnswers', 0)),
+                'uniqueAnswerers': int(stats.get('uniqueAnswerers', 0)),
+            }
+    return _stats_from_logs(question_id)
+
+
+def _load_item_stats(question_id):
+    """質問の quizItem ごとの行 (1パーティション) を Query で読み、選択肢の分布にまとめる"""
+    query_kwargs = {'KeyConditionExpression': Key('questionId').eq(question_id)}
+    items = []
+    while True:
+        response = dynamodb.Table(QUESTION_ITEM_STATS_TABLE).query(**query_kwargs)
+        for row in response.get('Items', []):
+            answers = int(row.get('answers', 0))
+            correct_answers = int(row.get('correctAnswers', 0))
+            item = {
+                'quizItemId': row['quizItemId'],
+                'answers': answers,
+                'correctAnswers': correct_answers,
+                'accuracy': round(correct_answers / answers * 100, 2) if answers > 0 else 0,
+                'choiceCounts': {
+                    k[len(CHOICE_ATTR_PREFIX):]: int(v) for k, v in row.items() if k.startswith(CHOICE_ATTR_PREFIX)
+                },
+            }
+            for field in ITEM_ANALYSIS_FIELDS:
+                if field in row:
+                    item[field] = row[field]
+            items.append(item)
+        lek = response.get('LastEvaluatedKey')
+        if not lek:
+            return items
+        query_kwargs['ExclusiveStartKey'] = lek
+
+
+def lambda_handler(event, context):
+    try:
+        # パスパラメータから質問IDを取得
+        question_id = event['pathParameters']['questionId']
+
+        if not question_id:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'questionId is required in path parameters'})}
+
+        stats = _load_stats(question_id)
+        total_answers = stats['totalAnswers']
+        correct_answers = stats['correctAnswers']
+
+        # 正解率を計算 (0除算を避ける)
+        accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
+
+        # 結果をまとめる
+        analytics = {
+            'totalAnswers': total_answers,
+            'correctAnswers': correct_answers,
+            'uniqueAnswerers': stats['uniqueAnswerers'],
+            'accuracy': round(accuracy, 2) # 小数点以下2桁に丸める
+        }
+        if QUESTION_ITEM_STATS_TABLE:
+            analytics['items'] = _load_item_stats(question_id)
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(analytics, cls=DecimalEncoder)
+        }
+    except KeyError:
+         # questionIdが見つからない場合のエラーハンドリング
+         return {'statusCode': 400, 'body': json.dumps({'error': 'Missing questionId in path parameters'})}
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
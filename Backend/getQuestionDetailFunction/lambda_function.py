@@ -0,0 +1,117 @@
+import json
+import os
+import decimal
+import zlib
+from typing import Any, Dict
+
+import boto3
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # orjson が無い環境では標準の json を使う
+    orjson = None
+
+# Lambda レイヤー (Backend/layers/common) の共通モジュール
+import response_compression
+
+dynamodb = boto3.resource("dynamodb")
+
+CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "*")
+
+
+def _json_default(o: Any) -> Any:
+    # DynamoDB の数値 (Decimal) は整数なら int、それ以外は float にする
+    if type(o) is decimal.Decimal:
+        i = int(o)
+        return i if i == o else float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _dumps(body: Any) -> str:
+    """
+    レスポンス本文の JSON 化。orjson があれば使い、無ければ標準の json (C 実装) に任せる。
+    どちらも Decimal に出会うたびに default (Python) を呼ぶので、数値の多い行では1回のネイティブな走査にはならない。
+    それでも読み込んだ行を先に Python で全部たどって変換するより速い (benchmarks/bench_json_serialization.py)
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(body, default=_json_default).decode("utf-8")
+        except TypeError:
+            # orjson は 64bit を超える整数を扱えない
+            pass
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _decode_quiz_items(item: Dict[str, Any]) -> Dict[str, Any]:
+    """圧縮して保存された quizItemsZ (zlib + JSON) を quizItems に戻す"""
+    packed = item.pop("quizItemsZ", None)
+    if packed is not None:
+        raw = zlib.decompress(bytes(getattr(packed, "value", packed)))
+        item["quizItems"] = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return item
+
+
+def _resp(status: int, body: Any) -> Dict[str, Any]:
+    return {
+        "statusCode": status,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": CORS_ORIGIN,
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Allow-Methods": "OPTIONS,GET",
+        },
+        "body": _dumps(body),
+    }
+
+
+# 詳細 (GET /questions/{questionId}) は quizItems を含む全項目を返す
+DETAIL_FIELDS = [
+    "questionId",
+    "title",
+    "purpose",
+    "tags",
+    "remarks",
+    "authorId",
+    "quizItems",
+    "quizItemsZ", # QUIZ_ITEMS_STORAGE=zlib で保存された quizItems (_decode_quiz_items で戻す)
+    "quizItemCount",
+    "createdAt",
+    "dmInviteMessage",
+    "shareCode",
+]
+DETAIL_ATTRIBUTE_NAMES = {f"#{field}": field for field in DETAIL_FIELDS}
+DETAIL_EXPRESSION_STRING = ", ".join(DETAIL_ATTRIBUTE_NAMES.keys())
+
+
+def handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return _resp(200, {"ok": True})
+
+    table_name = os.environ.get("QUESTIONS_TABLE") or os.environ.get("QUESTIONS_TABLE_NAME")
+    if not table_name:
+        return _resp(500, {"message": "Server misconfiguration: QUESTIONS_TABLE is not set."})
+    table = dynamodb.Table(table_name)
+
+    path_params = event.get("pathParameters") or {}
+    question_id = (path_params.get("questionId") or "").strip()
+    if not question_id:
+        return _resp(400, {"message": "Bad Request: missing questionId in path."})
+
+    try:
+        resp = table.get_item(
+            Key={"questionId": question_id},
+            ProjectionExpression=DETAIL_EXPRESSION_STRING,
+            ExpressionAttributeNames=DETAIL_ATTRIBUTE_NAMES,
+        )
+        item = resp.get("Item")
+        if not item:
+            return _resp(404, {"message": "Question not found."})
+        return _resp(200, _decode_quiz_items(item))
+
+    except Exception as e:
+        print(f"[get_question_detail] error {e}")
+        return _resp(500, {"message": f"Internal error: {str(e)}"})
+
+
+def lambda_handler(event, context):
+    return response_compression.maybe_compress(handler(event, context), event)
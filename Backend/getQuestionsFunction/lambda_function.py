@@ -1,254 +1,1460 @@
-{\rtf1\ansi\ansicpg932\cocoartf2865
-\cocoatextscaling0\cocoaplatform0{\fonttbl\f0\fnil\fcharset0 Menlo-Regular;}
-{\colortbl;\red255\green255\blue255;\red157\green0\blue210;\red255\green255\blue255;\red45\green45\blue45;
-\red0\green0\blue0;\red144\green1\blue18;\red0\green0\blue255;\red32\green108\blue135;\red101\green76\blue29;
-\red0\green0\blue109;\red19\green118\blue70;\red15\green112\blue1;}
-{\*\expandedcolortbl;;\cssrgb\c68627\c0\c85882;\cssrgb\c100000\c100000\c100000;\cssrgb\c23137\c23137\c23137;
-\cssrgb\c0\c0\c0;\cssrgb\c63922\c8235\c8235;\cssrgb\c0\c0\c100000;\cssrgb\c14902\c49804\c60000;\cssrgb\c47451\c36863\c14902;
-\cssrgb\c0\c6275\c50196;\cssrgb\c3529\c52549\c34510;\cssrgb\c0\c50196\c0;}
-\paperw11900\paperh16840\margl1440\margr1440\vieww11520\viewh8400\viewkind0
-\deftab720
-\pard\pardeftab720\partightenfactor0
-
-\f0\fs24 \cf2 \cb3 \expnd0\expndtw0\kerning0
-\outl0\strokewidth0 \strokec2 import\cf4 \strokec4  json\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  os\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  decimal\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  typing \cf2 \strokec2 import\cf4 \strokec4  Any, Dict, List, Optional, Set\cb1 \
-\
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  boto3\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  boto3.dynamodb.conditions \cf2 \strokec2 import\cf4 \strokec4  Attr, Key\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 dynamodb \strokec5 =\strokec4  boto3.resource(\cf6 \strokec6 "dynamodb"\cf4 \strokec4 )\cb1 \
-\
-\cb3 CORS_ORIGIN \strokec5 =\strokec4  os.environ.get(\cf6 \strokec6 "CORS_ORIGIN"\cf4 \strokec4 , \cf6 \strokec6 "*"\cf4 \strokec4 )\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 class\cf4 \strokec4  \cf8 \strokec8 DecimalEncoder\cf4 \strokec4 (\cf8 \strokec8 json\cf4 \strokec4 .\cf8 \strokec8 JSONEncoder\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf7 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 default\cf4 \strokec4 (\cf10 \strokec10 self\cf4 \strokec4 , \cf10 \strokec10 o\cf4 \strokec4 ):\cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf9 \strokec9 isinstance\cf4 \strokec4 (o, decimal.Decimal):\cb1 \
-\cb3             \cf2 \strokec2 if\cf4 \strokec4  o \strokec5 %\strokec4  \cf11 \strokec11 1\cf4 \strokec4  \strokec5 ==\strokec4  \cf11 \strokec11 0\cf4 \strokec4 :\cb1 \
-\cb3                 \cf2 \strokec2 return\cf4 \strokec4  \cf8 \strokec8 int\cf4 \strokec4 (o)\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \cf8 \strokec8 float\cf4 \strokec4 (o)\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \cf8 \strokec8 super\cf4 \strokec4 ().default(o)\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 _resp\cf4 \strokec4 (\cf10 \strokec10 status\cf4 \strokec4 : \cf8 \strokec8 int\cf4 \strokec4 , \cf10 \strokec10 body\cf4 \strokec4 : Any) -> Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]:\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3         \cf6 \strokec6 "statusCode"\cf4 \strokec4 : status,\cb1 \
-\cb3         \cf6 \strokec6 "headers"\cf4 \strokec4 : \{\cb1 \
-\cb3             \cf6 \strokec6 "Content-Type"\cf4 \strokec4 : \cf6 \strokec6 "application/json"\cf4 \strokec4 ,\cb1 \
-\cb3             \cf6 \strokec6 "Access-Control-Allow-Origin"\cf4 \strokec4 : CORS_ORIGIN,\cb1 \
-\cb3             \cf6 \strokec6 "Access-Control-Allow-Headers"\cf4 \strokec4 : \cf6 \strokec6 "*"\cf4 \strokec4 ,\cb1 \
-\cb3             \cf6 \strokec6 "Access-Control-Allow-Methods"\cf4 \strokec4 : \cf6 \strokec6 "OPTIONS,GET"\cf4 \strokec4 ,\cb1 \
-\cb3         \},\cb1 \
-\cb3         \cf6 \strokec6 "body"\cf4 \strokec4 : json.dumps(body, \cf10 \strokec10 ensure_ascii\cf4 \strokec5 =\cf7 \strokec7 False\cf4 \strokec4 , \cf10 \strokec10 cls\cf4 \strokec5 =\strokec4 DecimalEncoder),\cb1 \
-\cb3     \}\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 _read_query\cf4 \strokec4 (\cf10 \strokec10 event\cf4 \strokec4 : Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]) -> Dict[\cf8 \strokec8 str\cf4 \strokec4 , \cf8 \strokec8 str\cf4 \strokec4 ]:\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     q \strokec5 =\strokec4  event.get(\cf6 \strokec6 "queryStringParameters"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  \{\}\cb1 \
-\cb3     \cf2 \strokec2 return\cf4 \strokec4  \{\cf8 \strokec8 str\cf4 \strokec4 (k): \cf8 \strokec8 str\cf4 \strokec4 (v) \cf2 \strokec2 for\cf4 \strokec4  k, v \cf2 \strokec2 in\cf4 \strokec4  q.items()\}\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf12 \cb3 \strokec12 # --- \uc0\u9733 \u9733 \u9733  \u12371 \u12371 \u12363 \u12425 \u20462 \u27491  \u9733 \u9733 \u9733  ---\cf4 \cb1 \strokec4 \
-\
-\cf12 \cb3 \strokec12 # \uc0\u12450 \u12503 \u12522 \u12364 \u24517 \u35201 \u12392 \u12377 \u12427 \u23646 \u24615 \u12398 \u12522 \u12473 \u12488  (shareCode \u12434 \u21547 \u12416 )\cf4 \cb1 \strokec4 \
-\cf12 \cb3 \strokec12 # GSI (PurposeIndex) \uc0\u12364 \u12371 \u12428 \u12425 \u12398 \u23646 \u24615 \u12434 \u12377 \u12409 \u12390 \u23556 \u24433 (Project)\u12375 \u12390 \u12356 \u12427 \u12363 \u30906 \u35469 \u12375 \u12390 \u12367 \u12384 \u12373 \u12356 \u12290 \cf4 \cb1 \strokec4 \
-\cf12 \cb3 \strokec12 # \uc0\u12418 \u12375 GSI\u12364 \u12461 \u12540 \u12398 \u12415 \u12434 \u23556 \u24433 \u12375 \u12390 \u12356 \u12427 \u22580 \u21512 \u12289 GSI\u12398 \u12463 \u12456 \u12522 (use_query=True)\u12391 \u12399 \cf4 \cb1 \strokec4 \
-\cf12 \cb3 \strokec12 # \uc0\u12371 \u12428 \u12425 \u12398 \u38917 \u30446 \u65288 quizItems\u12394 \u12393 \u65289 \u12399 \u21462 \u24471 \u12391 \u12365 \u12414 \u12379 \u12435 \u12290 \cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 PROJECTION_FIELDS \strokec5 =\strokec4  [\cb1 \
-\cb3     \cf6 \strokec6 "questionId"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "title"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "purpose"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "tags"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "remarks"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "authorId"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "quizItems"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "createdAt"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "dmInviteMessage"\cf4 \strokec4 ,\cb1 \
-\cb3     \cf6 \strokec6 "shareCode"\cf4 \strokec4  \cf12 \strokec12 # \uc0\u9733  shareCode \u12434 \u36861 \u21152 \cf4 \cb1 \strokec4 \
-\cb3 ]\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf12 \cb3 \strokec12 # \uc0\u23646 \u24615 \u21517 \u12434  # (\u20104 \u32004 \u35486 ) \u12503 \u12524 \u12540 \u12473 \u12507 \u12523 \u12480 \u12395 \u22793 \u25563 \u12377 \u12427 \cf4 \cb1 \strokec4 \
-\cf12 \cb3 \strokec12 # (\uc0\u20363 : "createdAt" -> "#createdAt")\cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 PROJECTION_ATTRIBUTE_NAMES \strokec5 =\strokec4  \{\cf7 \strokec7 f\cf6 \strokec6 "#\cf7 \strokec7 \{\cf4 \strokec4 field\cf7 \strokec7 \}\cf6 \strokec6 "\cf4 \strokec4 : field \cf2 \strokec2 for\cf4 \strokec4  field \cf2 \strokec2 in\cf4 \strokec4  PROJECTION_FIELDS\}\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf12 \cb3 \strokec12 # \uc0\u21462 \u24471 \u12377 \u12427 \u23646 \u24615 \u12398 \u12522 \u12473 \u12488 \u12434 \u25991 \u23383 \u21015 \u12395 \u22793 \u25563  (\u20363 : "#questionId, #title, ...")\cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 PROJECTION_EXPRESSION_STRING \strokec5 =\strokec4  \cf6 \strokec6 ", "\cf4 \strokec4 .join(PROJECTION_ATTRIBUTE_NAMES.keys())\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 _scan_all\cf4 \strokec4 (\cf10 \strokec10 table\cf4 \strokec4 , \cf10 \strokec10 scan_kwargs\cf4 \strokec4 : Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]) -> List[Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]]:\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     items: List[Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]] \strokec5 =\strokec4  []\cb1 \
-\cb3     kwargs \strokec5 =\strokec4  \cf8 \strokec8 dict\cf4 \strokec4 (scan_kwargs)\cb1 \
-\cb3     \cb1 \
-\cb3     \cf12 \strokec12 # \uc0\u9733  \u23646 \u24615 \u12434 \u26126 \u31034 \u30340 \u12395 \u25351 \u23450 \cf4 \cb1 \strokec4 \
-\cb3     kwargs[\cf6 \strokec6 "ProjectionExpression"\cf4 \strokec4 ] \strokec5 =\strokec4  PROJECTION_EXPRESSION_STRING\cb1 \
-\cb3     kwargs[\cf6 \strokec6 "ExpressionAttributeNames"\cf4 \strokec4 ] \strokec5 =\strokec4  PROJECTION_ATTRIBUTE_NAMES\cb1 \
-\cb3     \cb1 \
-\cb3     \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 f\cf6 \strokec6 "[DEBUG] Scan kwargs: \cf7 \strokec7 \{\cf4 \strokec4 kwargs\cf7 \strokec7 \}\cf6 \strokec6 "\cf4 \strokec4 ) \cf12 \strokec12 # \uc0\u12487 \u12496 \u12483 \u12464 \u12525 \u12464 \cf4 \cb1 \strokec4 \
-\
-\cb3     \cf2 \strokec2 while\cf4 \strokec4  \cf7 \strokec7 True\cf4 \strokec4 :\cb1 \
-\cb3         resp \strokec5 =\strokec4  table.scan(\strokec5 **\strokec4 kwargs)\cb1 \
-\cb3         items.extend(resp.get(\cf6 \strokec6 "Items"\cf4 \strokec4 , []))\cb1 \
-\cb3         lek \strokec5 =\strokec4  resp.get(\cf6 \strokec6 "LastEvaluatedKey"\cf4 \strokec4 )\cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  lek:\cb1 \
-\cb3             \cf2 \strokec2 break\cf4 \cb1 \strokec4 \
-\cb3         kwargs[\cf6 \strokec6 "ExclusiveStartKey"\cf4 \strokec4 ] \strokec5 =\strokec4  lek\cb1 \
-\cb3     \cf2 \strokec2 return\cf4 \strokec4  items\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 _query_all\cf4 \strokec4 (\cf10 \strokec10 table\cf4 \strokec4 , \cf10 \strokec10 query_kwargs\cf4 \strokec4 : Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]) -> List[Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]]:\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     items: List[Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any]] \strokec5 =\strokec4  []\cb1 \
-\cb3     kwargs \strokec5 =\strokec4  \cf8 \strokec8 dict\cf4 \strokec4 (query_kwargs)\cb1 \
-\
-\cb3     \cf12 \strokec12 # \uc0\u9733  \u23646 \u24615 \u12434 \u26126 \u31034 \u30340 \u12395 \u25351 \u23450 \cf4 \cb1 \strokec4 \
-\cb3     kwargs[\cf6 \strokec6 "ProjectionExpression"\cf4 \strokec4 ] \strokec5 =\strokec4  PROJECTION_EXPRESSION_STRING\cb1 \
-\cb3     kwargs[\cf6 \strokec6 "ExpressionAttributeNames"\cf4 \strokec4 ] \strokec5 =\strokec4  PROJECTION_ATTRIBUTE_NAMES\cb1 \
-\cb3     \cb1 \
-\cb3     \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 f\cf6 \strokec6 "[DEBUG] Query kwargs: \cf7 \strokec7 \{\cf4 \strokec4 kwargs\cf7 \strokec7 \}\cf6 \strokec6 "\cf4 \strokec4 ) \cf12 \strokec12 # \uc0\u12487 \u12496 \u12483 \u12464 \u12525 \u12464 \cf4 \cb1 \strokec4 \
-\
-\cb3     \cf2 \strokec2 while\cf4 \strokec4  \cf7 \strokec7 True\cf4 \strokec4 :\cb1 \
-\cb3         resp \strokec5 =\strokec4  table.query(\strokec5 **\strokec4 kwargs)\cb1 \
-\cb3         items.extend(resp.get(\cf6 \strokec6 "Items"\cf4 \strokec4 , []))\cb1 \
-\cb3         lek \strokec5 =\strokec4  resp.get(\cf6 \strokec6 "LastEvaluatedKey"\cf4 \strokec4 )\cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  lek:\cb1 \
-\cb3             \cf2 \strokec2 break\cf4 \cb1 \strokec4 \
-\cb3         kwargs[\cf6 \strokec6 "ExclusiveStartKey"\cf4 \strokec4 ] \strokec5 =\strokec4  lek\cb1 \
-\cb3     \cf2 \strokec2 return\cf4 \strokec4  items\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf12 \cb3 \strokec12 # --- \uc0\u9733 \u9733 \u9733  \u12371 \u12371 \u12414 \u12391 \u20462 \u27491  \u9733 \u9733 \u9733  ---\cf4 \cb1 \strokec4 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 handler\cf4 \strokec4 (\cf10 \strokec10 event\cf4 \strokec4 , \cf10 \strokec10 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 if\cf4 \strokec4  event.get(\cf6 \strokec6 "httpMethod"\cf4 \strokec4 ) \strokec5 ==\strokec4  \cf6 \strokec6 "OPTIONS"\cf4 \strokec4 :\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 200\cf4 \strokec4 , \{\cf6 \strokec6 "ok"\cf4 \strokec4 : \cf7 \strokec7 True\cf4 \strokec4 \})\cb1 \
-\
-\cb3     questions_table_name \strokec5 =\strokec4  os.environ.get(\cf6 \strokec6 "QUESTIONS_TABLE"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  os.environ.get(\cf6 \strokec6 "QUESTIONS_TABLE_NAME"\cf4 \strokec4 )\cb1 \
-\cb3     bookmarks_table_name \strokec5 =\strokec4  os.environ.get(\cf6 \strokec6 "BOOKMARKS_TABLE"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  os.environ.get(\cf6 \strokec6 "BOOKMARKS_TABLE_NAME"\cf4 \strokec4 )\cb1 \
-\cb3     purpose_index_name \strokec5 =\strokec4  os.environ.get(\cf6 \strokec6 "PURPOSE_INDEX_NAME"\cf4 \strokec4 , \cf6 \strokec6 "PurposeIndex"\cf4 \strokec4 )\cb1 \
-\
-\cb3     \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  questions_table_name:\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 500\cf4 \strokec4 , \{\cf6 \strokec6 "message"\cf4 \strokec4 : \cf6 \strokec6 "Server misconfiguration: QUESTIONS_TABLE is not set."\cf4 \strokec4 \})\cb1 \
-\
-\cb3     questions_table \strokec5 =\strokec4  dynamodb.Table(questions_table_name)\cb1 \
-\cb3     bookmarks_table \strokec5 =\strokec4  dynamodb.Table(bookmarks_table_name) \cf2 \strokec2 if\cf4 \strokec4  bookmarks_table_name \cf2 \strokec2 else\cf4 \strokec4  \cf7 \strokec7 None\cf4 \cb1 \strokec4 \
-\
-\cb3     \cf2 \strokec2 try\cf4 \strokec4 :\cb1 \
-\cb3         params \strokec5 =\strokec4  _read_query(event)\cb1 \
-\cb3         code \strokec5 =\strokec4  (params.get(\cf6 \strokec6 "code"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  \cf6 \strokec6 ""\cf4 \strokec4 ).strip().lower()\cb1 \
-\cb3         purpose \strokec5 =\strokec4  (params.get(\cf6 \strokec6 "purpose"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  \cf6 \strokec6 ""\cf4 \strokec4 ).strip()\cb1 \
-\cb3         category \strokec5 =\strokec4  (params.get(\cf6 \strokec6 "category"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  params.get(\cf6 \strokec6 "tag"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  \cf6 \strokec6 ""\cf4 \strokec4 ).strip()\cb1 \
-\cb3         bookmarked_by \strokec5 =\strokec4  (params.get(\cf6 \strokec6 "bookmarkedBy"\cf4 \strokec4 ) \cf7 \strokec7 or\cf4 \strokec4  \cf6 \strokec6 ""\cf4 \strokec4 ).strip()\cb1 \
-\
-\cb3         \cf12 \strokec12 # 1) shareCode \uc0\u26908 \u32034 \u12434 \u26368 \u20778 \u20808 \u65288 \u23436 \u20840 \u19968 \u33268 \u65289 \cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  code:\cb1 \
-\cb3             \cf9 \strokec9 print\cf4 \strokec4 (\cf7 \strokec7 f\cf6 \strokec6 "[get_questions] code search: \cf7 \strokec7 \{\cf4 \strokec4 code\cf7 \strokec7 \}\cf6 \strokec6 "\cf4 \strokec4 )\cb1 \
-\cb3             fe \strokec5 =\strokec4  Attr(\cf6 \strokec6 "shareCode"\cf4 \strokec4 ).eq(code)\cb1 \
-\cb3             \cb1 \
-\cb3             \cf12 \strokec12 # \uc0\u9733  shareCode\u26908 \u32034 \u26178 \u12418  ProjectionExpression \u12434 \u28193 \u12377 \cf4 \cb1 \strokec4 \
-\cb3             scan_kwargs \strokec5 =\strokec4  \{\cb1 \
-\cb3                 \cf6 \strokec6 "FilterExpression"\cf4 \strokec4 : fe\cb1 \
-\cb3             \}\cb1 \
-\cb3             items \strokec5 =\strokec4  _scan_all(questions_table, scan_kwargs)\cb1 \
-\cb3             \cb1 \
-\cb3             items_sorted \strokec5 =\strokec4  \cf9 \strokec9 sorted\cf4 \strokec4 (\cb1 \
-\cb3                 (it \cf2 \strokec2 for\cf4 \strokec4  it \cf2 \strokec2 in\cf4 \strokec4  items \cf2 \strokec2 if\cf4 \strokec4  \cf9 \strokec9 isinstance\cf4 \strokec4 (it.get(\cf6 \strokec6 "createdAt"\cf4 \strokec4 ), \cf8 \strokec8 str\cf4 \strokec4 ) \cf7 \strokec7 and\cf4 \strokec4  it[\cf6 \strokec6 "createdAt"\cf4 \strokec4 ]),\cb1 \
-\cb3                 \cf10 \strokec10 key\cf4 \strokec5 =\cf7 \strokec7 lambda\cf4 \strokec4  \cf10 \strokec10 x\cf4 \strokec4 : x[\cf6 \strokec6 "createdAt"\cf4 \strokec4 ],\cb1 \
-\cb3                 \cf10 \strokec10 reverse\cf4 \strokec5 =\cf7 \strokec7 True\cf4 \strokec4 ,\cb1 \
-\cb3             )\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 200\cf4 \strokec4 , items_sorted)\cb1 \
-\
-\cb3         \cf12 \strokec12 # 2) \uc0\u12502 \u12483 \u12463 \u12510 \u12540 \u12463 \u65288 \u24517 \u35201 \u26178 \u12398 \u12415 \u65289 \cf4 \cb1 \strokec4 \
-\cb3         bookmarked_ids: Optional[Set[\cf8 \strokec8 str\cf4 \strokec4 ]] \strokec5 =\strokec4  \cf7 \strokec7 None\cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  bookmarked_by:\cb1 \
-\cb3             \cf12 \strokec12 # (\uc0\u12502 \u12483 \u12463 \u12510 \u12540 \u12463 \u20966 \u29702 \u12399 \u22793 \u26356 \u12394 \u12375 )\cf4 \cb1 \strokec4 \
-\cb3             \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  bookmarks_table:\cb1 \
-\cb3                 \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 500\cf4 \strokec4 , \{\cf6 \strokec6 "message"\cf4 \strokec4 : \cf6 \strokec6 "BOOKMARKS_TABLE is not set but bookmarkedBy was provided."\cf4 \strokec4 \})\cb1 \
-\cb3             collected: Set[\cf8 \strokec8 str\cf4 \strokec4 ] \strokec5 =\strokec4  \cf8 \strokec8 set\cf4 \strokec4 ()\cb1 \
-\cb3             query_kwargs \strokec5 =\strokec4  \{\cb1 \
-\cb3                 \cf6 \strokec6 "KeyConditionExpression"\cf4 \strokec4 : Key(\cf6 \strokec6 "userId"\cf4 \strokec4 ).eq(bookmarked_by),\cb1 \
-\cb3                 \cf6 \strokec6 "ProjectionExpression"\cf4 \strokec4 : \cf6 \strokec6 "questionId"\cf4 \strokec4 , \cf12 \strokec12 # \uc0\u12371 \u12371 \u12399  questionId \u12384 \u12369 \u12391 OK\cf4 \cb1 \strokec4 \
-\cb3             \}\cb1 \
-\cb3             \cf2 \strokec2 while\cf4 \strokec4  \cf7 \strokec7 True\cf4 \strokec4 :\cb1 \
-\cb3                 resp \strokec5 =\strokec4  bookmarks_table.query(\strokec5 **\strokec4 query_kwargs)\cb1 \
-\cb3                 \cf2 \strokec2 for\cf4 \strokec4  it \cf2 \strokec2 in\cf4 \strokec4  resp.get(\cf6 \strokec6 "Items"\cf4 \strokec4 , []):\cb1 \
-\cb3                     qid \strokec5 =\strokec4  it.get(\cf6 \strokec6 "questionId"\cf4 \strokec4 )\cb1 \
-\cb3                     \cf2 \strokec2 if\cf4 \strokec4  \cf9 \strokec9 isinstance\cf4 \strokec4 (qid, \cf8 \strokec8 str\cf4 \strokec4 ):\cb1 \
-\cb3                         collected.add(qid)\cb1 \
-\cb3                 lek \strokec5 =\strokec4  resp.get(\cf6 \strokec6 "LastEvaluatedKey"\cf4 \strokec4 )\cb1 \
-\cb3                 \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  lek:\cb1 \
-\cb3                     \cf2 \strokec2 break\cf4 \cb1 \strokec4 \
-\cb3                 query_kwargs[\cf6 \strokec6 "ExclusiveStartKey"\cf4 \strokec4 ] \strokec5 =\strokec4  lek\cb1 \
-\cb3             bookmarked_ids \strokec5 =\strokec4  collected\cb1 \
-\cb3             \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  bookmarked_ids:\cb1 \
-\cb3                 \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 200\cf4 \strokec4 , [])\cb1 \
-\
-\cb3         \cf12 \strokec12 # 3) \uc0\u30446 \u30340 \u12354 \u12426 \u12394 \u12425  GSI\u12289 \u12394 \u12369 \u12428 \u12400 Scan\cf4 \cb1 \strokec4 \
-\cb3         use_query \strokec5 =\strokec4  \cf8 \strokec8 bool\cf4 \strokec4 (purpose)\cb1 \
-\cb3         dynamo_kwargs: Dict[\cf8 \strokec8 str\cf4 \strokec4 , Any] \strokec5 =\strokec4  \{\}\cb1 \
-\cb3         filter_expr \strokec5 =\strokec4  \cf7 \strokec7 None\cf4 \cb1 \strokec4 \
-\
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  use_query:\cb1 \
-\cb3             dynamo_kwargs[\cf6 \strokec6 "IndexName"\cf4 \strokec4 ] \strokec5 =\strokec4  purpose_index_name\cb1 \
-\cb3             dynamo_kwargs[\cf6 \strokec6 "KeyConditionExpression"\cf4 \strokec4 ] \strokec5 =\strokec4  Key(\cf6 \strokec6 "purpose"\cf4 \strokec4 ).eq(purpose)\cb1 \
-\
-\cb3         \cf12 \strokec12 # (\uc0\u12479 \u12464 \u12501 \u12451 \u12523 \u12479 \u12289 \u12502 \u12483 \u12463 \u12510 \u12540 \u12463 \u26465 \u20214 \u12399 \u22793 \u26356 \u12394 \u12375 )\cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  category:\cb1 \
-\cb3             fe \strokec5 =\strokec4  Attr(\cf6 \strokec6 "tags"\cf4 \strokec4 ).contains(category)\cb1 \
-\cb3             filter_expr \strokec5 =\strokec4  fe \cf2 \strokec2 if\cf4 \strokec4  filter_expr \cf7 \strokec7 is\cf4 \strokec4  \cf7 \strokec7 None\cf4 \strokec4  \cf2 \strokec2 else\cf4 \strokec4  (filter_expr \strokec5 &\strokec4  fe)\cb1 \
-\
-\cb3         python_filter_bookmarks \strokec5 =\strokec4  \cf7 \strokec7 False\cf4 \cb1 \strokec4 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  bookmarked_ids \cf7 \strokec7 is\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  \cf7 \strokec7 None\cf4 \strokec4 :\cb1 \
-\cb3             \cf2 \strokec2 if\cf4 \strokec4  \cf9 \strokec9 len\cf4 \strokec4 (bookmarked_ids) \strokec5 <=\strokec4  \cf11 \strokec11 100\cf4 \strokec4 :\cb1 \
-\cb3                 fe \strokec5 =\strokec4  Attr(\cf6 \strokec6 "questionId"\cf4 \strokec4 ).is_in(\cf8 \strokec8 list\cf4 \strokec4 (bookmarked_ids))\cb1 \
-\cb3                 filter_expr \strokec5 =\strokec4  fe \cf2 \strokec2 if\cf4 \strokec4  filter_expr \cf7 \strokec7 is\cf4 \strokec4  \cf7 \strokec7 None\cf4 \strokec4  \cf2 \strokec2 else\cf4 \strokec4  (filter_expr \strokec5 &\strokec4  fe)\cb1 \
-\cb3             \cf2 \strokec2 else\cf4 \strokec4 :\cb1 \
-\cb3                 python_filter_bookmarks \strokec5 =\strokec4  \cf7 \strokec7 True\cf4 \cb1 \strokec4 \
-\
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  filter_expr \cf7 \strokec7 is\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  \cf7 \strokec7 None\cf4 \strokec4 :\cb1 \
-\cb3             dynamo_kwargs[\cf6 \strokec6 "FilterExpression"\cf4 \strokec4 ] \strokec5 =\strokec4  filter_expr\cb1 \
-\
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  use_query:\cb1 \
-\cb3             items \strokec5 =\strokec4  _query_all(questions_table, dynamo_kwargs)\cb1 \
-\cb3         \cf2 \strokec2 else\cf4 \strokec4 :\cb1 \
-\cb3             items \strokec5 =\strokec4  _scan_all(questions_table, dynamo_kwargs)\cb1 \
-\
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  python_filter_bookmarks \cf7 \strokec7 and\cf4 \strokec4  bookmarked_ids \cf7 \strokec7 is\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  \cf7 \strokec7 None\cf4 \strokec4 :\cb1 \
-\cb3             items \strokec5 =\strokec4  [it \cf2 \strokec2 for\cf4 \strokec4  it \cf2 \strokec2 in\cf4 \strokec4  items \cf2 \strokec2 if\cf4 \strokec4  it.get(\cf6 \strokec6 "questionId"\cf4 \strokec4 ) \cf7 \strokec7 in\cf4 \strokec4  bookmarked_ids]\cb1 \
-\
-\cb3         items_sorted \strokec5 =\strokec4  \cf9 \strokec9 sorted\cf4 \strokec4 (\cb1 \
-\cb3             (it \cf2 \strokec2 for\cf4 \strokec4  it \cf2 \strokec2 in\cf4 \strokec4  items \cf2 \strokec2 if\cf4 \strokec4  \cf9 \strokec9 isinstance\cf4 \strokec4 (it.get(\cf6 \strokec6 "createdAt"\cf4 \strokec4 ), \cf8 \strokec8 str\cf4 \strokec4 ) \cf7 \strokec7 and\cf4 \strokec4  it[\cf6 \strokec6 "createdAt"\cf4 \strokec4 ]),\cb1 \
-\cb3             \cf10 \strokec10 key\cf4 \strokec5 =\cf7 \strokec7 lambda\cf4 \strokec4  \cf10 \strokec10 x\cf4 \strokec4 : x[\cf6 \strokec6 "createdAt"\cf4 \strokec4 ],\cb1 \
-\cb3             \cf10 \strokec10 reverse\cf4 \strokec5 =\cf7 \strokec7 True\cf4 \strokec4 ,\cb1 \
-\cb3         )\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 200\cf4 \strokec4 , items_sorted)\cb1 \
-\
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf8 \strokec8 Exception\cf4 \strokec4  \cf2 \strokec2 as\cf4 \strokec4  e:\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  _resp(\cf11 \strokec11 500\cf4 \strokec4 , \{\cf6 \strokec6 "message"\cf4 \strokec4 : \cf7 \strokec7 f\cf6 \strokec6 "Internal error: \cf7 \strokec7 \{\cf8 \strokec8 str\cf4 \strokec4 (e)\cf7 \strokec7 \}\cf6 \strokec6 "\cf4 \strokec4 \})\cb1 \
-\
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf9 \strokec9 lambda_handler\cf4 \strokec4 (\cf10 \strokec10 event\cf4 \strokec4 , \cf10 \strokec10 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 return\cf4 \strokec4  handler(event, context)\cb1 \
-}
\ No newline at end of file
+import json
+import os
+import base64
+import binascii
+import bisect
+import decimal
+import gzip
+import hashlib
+import hmac
+import heapq
+import itertools
+import math
+import random
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import boto3
+from boto3.dynamodb.conditions import Attr, ConditionBase, ConditionExpressionBuilder, Key
+from botocore.exceptions import ClientError
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # orjson が無い環境では標準の json を使う
+    orjson = None
+
+# Lambda レイヤー (Backend/layers/common) の共通モジュール
+import response_compression
+
+dynamodb = boto3.resource("dynamodb")
+
+CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "*")
+
+# ページングモード (limit / nextToken 指定時) の設定
+PAGINATION_TOKEN_SECRET = os.environ.get("PAGINATION_TOKEN_SECRET", "")
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "100"))
+# FilterExpression で件数が減った場合に、1リクエスト内で追加読み込みする回数の上限
+MAX_PAGE_READS = int(os.environ.get("MAX_PAGE_READS", "5"))
+
+# shareCode -> questionId の登録テーブル (PK: shareCode)
+SHARE_CODES_TABLE = os.environ.get("SHARE_CODES_TABLE")
+SHARE_CODE_CACHE_SIZE = int(os.environ.get("SHARE_CODE_CACHE_SIZE", "2048"))
+# 見つからなかったコードを覚えておく秒数 (打ち間違いや存在しないコードで毎回テーブルを読まない)
+SHARE_CODE_MISS_TTL = float(os.environ.get("SHARE_CODE_MISS_TTL", "30"))
+# 登録テーブルに無いコードを質問テーブルの Scan で探すか。
+# backfillQuestionIndexesFunction が既存のコードを登録し終えるまでの移行用 (既定は探さない)
+SHARE_CODE_SCAN_FALLBACK = os.environ.get("SHARE_CODE_SCAN_FALLBACK", "false").lower() == "true"
+
+# タグ転置インデックス (PK: tag, SK: sortKey = "createdAt#questionId")
+TAG_INDEX_TABLE = os.environ.get("TAG_INDEX_TABLE")
+# 複数タグの AND/OR で、1タグあたり1回の Query で読む件数
+TAG_POSTINGS_PAGE_SIZE = int(os.environ.get("TAG_POSTINGS_PAGE_SIZE", "200"))
+# purpose とタグの両方で絞るときの複合インデックス (PK: purposeTag = "purpose#tag", SK: sortKey)
+PURPOSE_TAG_INDEX_TABLE = os.environ.get("PURPOSE_TAG_INDEX_TABLE")
+
+# BatchGetItem (100キー/回) を並列に投げる数と、UnprocessedKeys の再試行回数
+BATCH_GET_CONCURRENCY = int(os.environ.get("BATCH_GET_CONCURRENCY", "4"))
+BATCH_GET_MAX_RETRIES = int(os.environ.get("BATCH_GET_MAX_RETRIES", "6"))
+
+# 新着フィード用 GSI (PK: feedShard, SK: createdAt) のシャード数。createQuestionFunction と揃えること
+FEED_SHARD_COUNT = int(os.environ.get("FEED_SHARD_COUNT", "4"))
+
+# 全件 Scan の並列度。テーブルが SCAN_BYTES_PER_SEGMENT 増えるごとに1セグメント増やす (上限 SCAN_MAX_SEGMENTS)
+SCAN_MAX_SEGMENTS = int(os.environ.get("SCAN_MAX_SEGMENTS", "8"))
+SCAN_BYTES_PER_SEGMENT = int(os.environ.get("SCAN_BYTES_PER_SEGMENT", str(4 * 1024 * 1024)))
+TABLE_SIZE_CACHE_TTL = float(os.environ.get("TABLE_SIZE_CACHE_TTL", "3600"))
+
+# 全文検索 (q=...) の転置インデックス (PK: gram, SK: questionId, tf)。文字 bigram で引く
+SEARCH_INDEX_TABLE = os.environ.get("SEARCH_INDEX_TABLE")
+# クエリから使う bigram の上限と、bigram 1つあたりに読む posting の上限
+SEARCH_MAX_QUERY_GRAMS = int(os.environ.get("SEARCH_MAX_QUERY_GRAMS", "16"))
+SEARCH_MAX_POSTINGS = int(os.environ.get("SEARCH_MAX_POSTINGS", "2000"))
+# クエリの bigram のうち、この割合以上を含む質問だけを返す
+SEARCH_MIN_MATCH_RATIO = float(os.environ.get("SEARCH_MIN_MATCH_RATIO", "0.7"))
+SEARCH_CONCURRENCY = int(os.environ.get("SEARCH_CONCURRENCY", "8"))
+SEARCH_BM25_K1 = 1.2
+# 順位付けした結果は (正規化したクエリ, カタログのバージョン) ごとにコンテナ内で持ち、2ページ目以降は読み直さない。
+# 持つのは上位 SEARCH_MAX_RESULTS 件まで (それより後のページは返さない)
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", "1000"))
+SEARCH_RANK_CACHE_SIZE = int(os.environ.get("SEARCH_RANK_CACHE_SIZE", "128"))
+SEARCH_RANK_CACHE_TTL = float(os.environ.get("SEARCH_RANK_CACHE_TTL", "60"))
+
+# 個人向けの除外 (excludeAnswered / excludeBlocked)。回答ログ (GSI: userId) とブロック (PK: blockerId, SK: blockedId)
+ANSWERS_TABLE = os.environ.get("ANSWERS_TABLE", "AnswersLog")
+ANSWERS_USER_INDEX_NAME = os.environ.get("ANSWERS_USER_INDEX_NAME", "UserIndex")
+BLOCKS_TABLE = os.environ.get("BLOCKS_TABLE")
+# logAnswerFunction が書くユーザー x 質問の行 (PK: userId, SK: questionId)。あれば回答ログの代わりにキーだけ読む
+ANSWERED_QUESTIONS_TABLE = os.environ.get("ANSWERED_QUESTIONS_TABLE")
+# backfillQuestionStatsFunction が AnsweredQuestions を作り直し終えると書く完了の印の行。
+# 印が付くまでは回答ログを読む (導入前に回答したユーザーの行がまだ無い)
+ANSWERED_MARKER_KEY = {"userId": "#backfill", "questionId": "#backfill"}
+# ユーザーごとの除外集合をコンテナ内に持つ件数と秒数 (この秒数だけ回答/ブロックの反映が遅れうる)
+EXCLUSION_CACHE_SIZE = int(os.environ.get("EXCLUSION_CACHE_SIZE", "512"))
+EXCLUSION_CACHE_TTL = float(os.environ.get("EXCLUSION_CACHE_TTL", "60"))
+
+# 絞り込みなしフィードのスナップショット (materialize_handler が作る)
+# S3 互換ストレージ (FEED_SNAPSHOT_BUCKET) かローカルディレクトリ (FEED_SNAPSHOT_DIR) に置く
+FEED_SNAPSHOT_BUCKET = os.environ.get("FEED_SNAPSHOT_BUCKET")
+FEED_SNAPSHOT_PREFIX = os.environ.get("FEED_SNAPSHOT_PREFIX", "feed-snapshots")
+FEED_SNAPSHOT_ENDPOINT_URL = os.environ.get("FEED_SNAPSHOT_ENDPOINT_URL")
+FEED_SNAPSHOT_DIR = os.environ.get("FEED_SNAPSHOT_DIR")
+# 先頭から何ページ分 (DEFAULT_PAGE_SIZE 件/ページ) をスナップショットにするか
+FEED_SNAPSHOT_PAGES = int(os.environ.get("FEED_SNAPSHOT_PAGES", "5"))
+# manifest を読み直す間隔 (秒)。更新の反映はこの分だけ遅れうる
+FEED_SNAPSHOT_MANIFEST_TTL = float(os.environ.get("FEED_SNAPSHOT_MANIFEST_TTL", "5"))
+
+# 絞り込み結果のコンテナ内キャッシュ。カタログのバージョン (PK: metaKey = "catalog") が変わったら無効
+CATALOG_META_TABLE = os.environ.get("CATALOG_META_TABLE")
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "64"))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "300"))
+# これより大きい本文はメモリを圧迫するのでキャッシュしない (バイト)
+RESULT_CACHE_MAX_BODY_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BODY_BYTES", str(1024 * 1024)))
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "QuizApp")
+
+
+def _json_default(o: Any) -> Any:
+    # DynamoDB の数値 (Decimal) は整数なら int、それ以外は float にする
+    if type(o) is decimal.Decimal:
+        i = int(o)
+        return i if i == o else float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _dumps(body: Any) -> str:
+    """
+    レスポンス本文の JSON 化。orjson があれば使い、無ければ標準の json (C 実装) に任せる。
+    どちらも Decimal に出会うたびに default (Python) を呼ぶので、数値の多い行では1回のネイティブな走査にはならない。
+    それでも読み込んだ行を先に Python で全部たどって変換するより速い (benchmarks/bench_json_serialization.py)
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(body, default=_json_default).decode("utf-8")
+        except TypeError:
+            # orjson は 64bit を超える整数を扱えない
+            pass
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def _resp(status: int, body: Any) -> Dict[str, Any]:
+    return _raw_resp(status, _dumps(body))
+
+
+def _raw_resp(status: int, body: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return {
+        "statusCode": status,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": CORS_ORIGIN,
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Allow-Methods": "OPTIONS,GET",
+            **(headers or {}),
+        },
+        "body": body,
+    }
+
+
+def _read_query(event: Dict[str, Any]) -> Dict[str, str]:
+    q = event.get("queryStringParameters") or {}
+    return {str(k): str(v) for k, v in q.items()}
+
+
+# --- ★★★ ここから修正 ★★★ ---
+
+# アプリが必要とする属性のリスト (shareCode を含む)
+# GSI (PurposeIndex) がこれらの属性をすべて射影(Project)しているか確認してください。
+# もしGSIがキーのみを射影している場合、GSIのクエリ(use_query=True)では
+# これらの項目（quizItemsなど）は取得できません。
+PROJECTION_FIELDS = [
+    "questionId",
+    "title",
+    "purpose",
+    "tags",
+    "remarks",
+    "authorId",
+    "quizItems",
+    "quizItemsZ", # QUIZ_ITEMS_STORAGE=zlib で保存された quizItems (_decode_quiz_items で quizItems に戻す)
+    "createdAt",
+    "dmInviteMessage",
+    "shareCode" # ★ shareCode を追加
+]
+
+# 属性名を # (予約語) プレースホルダに変換する
+# (例: "createdAt" -> "#createdAt")
+PROJECTION_ATTRIBUTE_NAMES = {f"#{field}": field for field in PROJECTION_FIELDS}
+# 取得する属性のリストを文字列に変換 (例: "#questionId, #title, ...")
+PROJECTION_EXPRESSION_STRING = ", ".join(PROJECTION_ATTRIBUTE_NAMES.keys())
+
+# 一覧用の軽い射影 (quizItems を含めない)。quizItems は GET /questions/{questionId} で取得する
+SUMMARY_FIELDS = [
+    "questionId",
+    "title",
+    "purpose",
+    "tags",
+    "authorId",
+    "createdAt",
+    "quizItemCount",
+]
+SUMMARY_ATTRIBUTE_NAMES = {f"#{field}": field for field in SUMMARY_FIELDS}
+SUMMARY_EXPRESSION_STRING = ", ".join(SUMMARY_ATTRIBUTE_NAMES.keys())
+
+# view パラメータ -> (ProjectionExpression, ExpressionAttributeNames)
+PROJECTIONS = {
+    "full": (PROJECTION_EXPRESSION_STRING, PROJECTION_ATTRIBUTE_NAMES),
+    "summary": (SUMMARY_EXPRESSION_STRING, SUMMARY_ATTRIBUTE_NAMES),
+}
+
+
+def _decode_quiz_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """圧縮して保存された quizItemsZ (zlib + JSON) を quizItems に戻す (その場で書き換える)"""
+    for it in items:
+        packed = it.pop("quizItemsZ", None)
+        if packed is not None:
+            raw = zlib.decompress(bytes(getattr(packed, "value", packed)))
+            it["quizItems"] = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return items
+
+
+_table_stats_cache: Dict[str, Tuple[float, Tuple[int, int]]] = {}
+
+
+def _table_stats(table_name: str) -> Tuple[int, int]:
+    """DescribeTable の (TableSizeBytes, ItemCount)。約6時間ごとに更新される値なのでコンテナ内でキャッシュする"""
+    now = time.monotonic()
+    cached = _table_stats_cache.get(table_name)
+    if cached is None or now - cached[0] >= TABLE_SIZE_CACHE_TTL:
+        try:
+            table = dynamodb.meta.client.describe_table(TableName=table_name)["Table"]
+            stats = (int(table.get("TableSizeBytes", 0)), int(table.get("ItemCount", 0)))
+        except ClientError as e:
+            # 権限が無いなどで取れなければ逐次 Scan のまま
+            print(f"[get_questions] describe_table failed: {e}")
+            stats = (0, 0)
+        cached = (now, stats)
+        _table_stats_cache[table_name] = cached
+    return cached[1]
+
+
+def _scan_segments(table_name: str) -> int:
+    # 小さいテーブルは1セグメント (逐次) のまま。スレッドを立てる分だけ遅くなるため
+    if SCAN_MAX_SEGMENTS <= 1:
+        return 1
+    size, _ = _table_stats(table_name)
+    return max(1, min(SCAN_MAX_SEGMENTS, -(-size // SCAN_BYTES_PER_SEGMENT)))
+
+
+def _expression_strings(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    FilterExpression / KeyConditionExpression の Attr / Key を文字列の式にした kwargs を返す。
+    resource の自動変換はプレースホルダの採番 (ConditionExpressionBuilder) をクライアントで共有していて
+    スレッドセーフではないので、スレッドに渡す前に呼び出し側のスレッドで組み立てておく。
+    """
+    kwargs = dict(kwargs)
+    names = dict(kwargs.get("ExpressionAttributeNames") or {})
+    values = dict(kwargs.get("ExpressionAttributeValues") or {})
+    builder = ConditionExpressionBuilder()
+    for param in ("KeyConditionExpression", "FilterExpression"):
+        condition = kwargs.get(param)
+        if isinstance(condition, ConditionBase):
+            built = builder.build_expression(condition, is_key_condition=param == "KeyConditionExpression")
+            kwargs[param] = built.condition_expression
+            names.update(built.attribute_name_placeholders)
+            values.update(built.attribute_value_placeholders)
+    if names:
+        kwargs["ExpressionAttributeNames"] = names
+    if values:
+        kwargs["ExpressionAttributeValues"] = values
+    return kwargs
+
+
+def _scan_segment(table_name: str, scan_kwargs: Dict[str, Any], segment: int, total_segments: int) -> List[Dict[str, Any]]:
+    # スレッドから使うので Table リソースではなくクライアントで読む。
+    # 式は _expression_strings で文字列にしたものだけを渡す (値の型変換はスレッドセーフ)
+    kwargs = dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=total_segments)
+    items: List[Dict[str, Any]] = []
+    while True:
+        resp = dynamodb.meta.client.scan(**kwargs)
+        items.extend(_decode_quiz_items(resp.get("Items", [])))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return items
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _scan_all(table, scan_kwargs: Dict[str, Any], projection=PROJECTIONS["full"]) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    kwargs = dict(scan_kwargs)
+    
+    # ★ 属性を明示的に指定
+    kwargs["ProjectionExpression"], kwargs["ExpressionAttributeNames"] = projection
+
+    # 大きいテーブルは Segment / TotalSegments で並列に読み、セグメント順につなげる
+    segments = _scan_segments(table.name)
+    if segments > 1:
+        kwargs = _expression_strings(kwargs)
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            parts = list(pool.map(lambda seg: _scan_segment(table.name, kwargs, seg, segments), range(segments)))
+        print(f"[get_questions] parallel scan: {segments} segments")
+        return [it for part in parts for it in part]
+
+    while True:
+        resp = table.scan(**kwargs)
+        items.extend(_decode_quiz_items(resp.get("Items", [])))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        kwargs["ExclusiveStartKey"] = lek
+    return items
+
+
+def _query_all(table, query_kwargs: Dict[str, Any], projection=PROJECTIONS["full"]) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    kwargs = dict(query_kwargs)
+
+    # ★ 属性を明示的に指定
+    kwargs["ProjectionExpression"], kwargs["ExpressionAttributeNames"] = projection
+
+    while True:
+        resp = table.query(**kwargs)
+        items.extend(_decode_quiz_items(resp.get("Items", [])))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        kwargs["ExclusiveStartKey"] = lek
+    return items
+
+# --- ★★★ ここまで修正 ★★★ ---
+
+
+# --- ページング (nextToken) ---
+
+def _b64e(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64d(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: bytes) -> str:
+    return _b64e(hmac.new(PAGINATION_TOKEN_SECRET.encode("utf-8"), payload, hashlib.sha256).digest())
+
+
+def _encode_token(start_key: Dict[str, Any], filters: Dict[str, Any]) -> str:
+    """DynamoDB の開始キーと検索条件を署名付きの不透明なトークンにする"""
+    payload = json.dumps(
+        {"k": start_key, "f": filters},
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+        default=_json_default,
+    ).encode("utf-8")
+    return f"{_b64e(payload)}.{_sign(payload)}"
+
+
+def _decode_token(token: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """署名と検索条件を検証して開始キーを取り出す (改ざん・条件の付け替えは ValueError)"""
+    try:
+        body, sig = token.split(".", 1)
+        payload = _b64d(body)
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid nextToken.")
+    if not hmac.compare_digest(sig, _sign(payload)):
+        raise ValueError("Invalid nextToken.")
+    data = json.loads(payload)
+    if data.get("f") != filters:
+        raise ValueError("nextToken does not match the query parameters.")
+    start_key = data.get("k")
+    if not isinstance(start_key, dict) or not start_key:
+        raise ValueError("Invalid nextToken.")
+    return start_key
+
+
+def _parse_limit(raw: Optional[str]) -> int:
+    if raw is None or raw == "":
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("limit must be an integer.")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def _read_page(
+    read,
+    dynamo_kwargs: Dict[str, Any],
+    limit: int,
+    start_key: Optional[Dict[str, Any]],
+    keep=None,
+    hydrate=None,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    table.scan / table.query を1ページ分だけ実行する。
+    Limit には残り件数を渡すので、返した LastEvaluatedKey は常に「最後に返した項目の直後」になる。
+    FilterExpression (や keep による Python 側の絞り込み) で件数が足りない場合は
+    MAX_PAGE_READS 回まで続きを読み、それでも足りなければ短いページのまま返す。
+    hydrate を渡すと、読んだ行 (ブックマークなど) を質問に置き換えてから keep を適用する。
+    """
+    kwargs = dict(dynamo_kwargs)
+
+    items: List[Dict[str, Any]] = []
+    lek = start_key
+    for _ in range(MAX_PAGE_READS):
+        kwargs["Limit"] = limit - len(items)
+        if lek:
+            kwargs["ExclusiveStartKey"] = lek
+        resp = read(**kwargs)
+        page = _decode_quiz_items(resp.get("Items", []))
+        if hydrate is not None:
+            page = hydrate(page)
+        if keep is not None:
+            page = [it for it in page if keep(it)]
+        items.extend(page)
+        lek = resp.get("LastEvaluatedKey")
+        if not lek or len(items) >= limit:
+            break
+    return items, lek
+
+
+# --- shareCode の解決 ---
+
+class _LRUCache:
+    """コンテナ内 (ウォームスタート間で共有) の小さな LRU キャッシュ"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+_share_code_cache = _LRUCache(SHARE_CODE_CACHE_SIZE)
+# 見つからなかったコード -> 覚えておく期限 (time.monotonic())
+_share_code_misses = _LRUCache(SHARE_CODE_CACHE_SIZE)
+
+
+def _share_code_missed(code: str) -> bool:
+    expires = _share_code_misses.get(code)
+    if expires is None:
+        return False
+    if time.monotonic() < expires:
+        return True
+    _share_code_misses.pop(code)
+    return False
+
+
+def _remember_share_code_miss(code: str) -> None:
+    if SHARE_CODE_MISS_TTL > 0:
+        _share_code_misses.put(code, time.monotonic() + SHARE_CODE_MISS_TTL)
+
+
+def _lookup_share_code(codes_table, code: str) -> Optional[str]:
+    """
+    キャッシュ → 登録テーブルの GetItem の順に questionId を引く。
+    未登録なら None、質問の無い予約行 (以前の createQuestionFunction のプールの残り) なら ""
+    """
+    question_id = _share_code_cache.get(code)
+    if question_id is None and codes_table is not None:
+        if _share_code_missed(code):
+            return None
+        resp = codes_table.get_item(Key={"shareCode": code}, ProjectionExpression="questionId, reservedUntil")
+        item = resp.get("Item")
+        if item is not None:
+            question_id = item.get("questionId") or ""
+        if question_id:
+            _share_code_cache.put(code, question_id)
+    return question_id
+
+
+def _register_legacy_share_code(codes_table, code: str, question_id: str) -> None:
+    """登録テーブルができる前の shareCode を、見つけたタイミングで登録しておく"""
+    _share_code_cache.put(code, question_id)
+    if codes_table is None:
+        return
+    try:
+        codes_table.put_item(
+            Item={"shareCode": code, "questionId": question_id},
+            ConditionExpression="attribute_not_exists(shareCode)",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            print(f"[get_questions] failed to register legacy shareCode {code}: {e}")
+
+
+# --- タグ転置インデックス ---
+
+def _parse_tags(params: Dict[str, str]) -> Tuple[List[str], str]:
+    """tags=a,b (複数) または category / tag (単数) を読み、tagMode (and/or) と一緒に返す"""
+    raw = params.get("tags")
+    if raw:
+        candidates = raw.split(",")
+    else:
+        candidates = [params.get("category") or params.get("tag") or ""]
+    tags = list(dict.fromkeys(t.strip() for t in candidates if t.strip()))
+    tag_mode = (params.get("tagMode") or "and").strip().lower()
+    if tag_mode not in ("and", "or"):
+        raise ValueError("tagMode must be 'and' or 'or'.")
+    return tags, tag_mode
+
+
+def _iter_tag_postings(tag_table, key_name: str, key: str, before: Optional[str], page_size: int) -> Iterator[Tuple[str, str]]:
+    """1タグ (または purpose#tag) 分の (sortKey, questionId) を新しい順に、必要になった分だけ読み出す"""
+    key_cond = Key(key_name).eq(key)
+    if before:
+        key_cond = key_cond & Key("sortKey").lt(before)
+    kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": key_cond,
+        "ScanIndexForward": False,
+        "Limit": page_size,
+        "ProjectionExpression": "sortKey, questionId",
+    }
+    while True:
+        resp = tag_table.query(**kwargs)
+        for it in resp.get("Items", []):
+            yield it["sortKey"], it["questionId"]
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _union_desc(streams: List[Iterator[Tuple[str, str]]]) -> Iterator[Tuple[str, str]]:
+    last = None
+    for posting in heapq.merge(*streams, key=lambda p: p[0], reverse=True):
+        if posting[0] != last:
+            last = posting[0]
+            yield posting
+
+
+def _intersect_desc(streams: List[Iterator[Tuple[str, str]]]) -> Iterator[Tuple[str, str]]:
+    # 降順のリスト同士の共通部分: 先頭の最小値まで他のリストを進める
+    heads = [next(st, None) for st in streams]
+    while all(h is not None for h in heads):
+        target = min(h[0] for h in heads)
+        if all(h[0] == target for h in heads):
+            yield heads[0]
+            heads = [next(st, None) for st in streams]
+            continue
+        for i, st in enumerate(streams):
+            while heads[i] is not None and heads[i][0] > target:
+                heads[i] = next(st, None)
+
+
+def _tag_postings(
+    tag_table, key_name: str, keys: List[str], tag_mode: str, before: Optional[str], page_size: int
+) -> Iterator[Tuple[str, str]]:
+    streams = [_iter_tag_postings(tag_table, key_name, k, before, page_size) for k in keys]
+    if len(streams) == 1:
+        return streams[0]
+    if tag_mode == "or":
+        return _union_desc(streams)
+    return _intersect_desc(streams)
+
+
+def _batch_get_chunk(table_name: str, question_ids: List[str], projection) -> List[Dict[str, Any]]:
+    """100キー以下を1回の BatchGetItem で取得。UnprocessedKeys は指数バックオフで再試行する"""
+    # スレッドから呼ぶので Table リソースではなくクライアントを使う (resource 経由なので型変換は自動)。
+    # 式は文字列だけを渡し、共有の ConditionExpressionBuilder を使わせない
+    client = dynamodb.meta.client
+    request = {
+        table_name: {
+            "Keys": [{"questionId": qid} for qid in question_ids],
+            "ProjectionExpression": projection[0],
+            "ExpressionAttributeNames": projection[1],
+        }
+    }
+    items: List[Dict[str, Any]] = []
+    for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+        resp = client.batch_get_item(RequestItems=request)
+        items.extend(_decode_quiz_items(resp.get("Responses", {}).get(table_name, [])))
+        request = resp.get("UnprocessedKeys") or {}
+        if not request:
+            return items
+        if attempt < BATCH_GET_MAX_RETRIES:
+            time.sleep(random.uniform(0, min(1.0, 0.05 * (2 ** attempt))))
+    raise RuntimeError(f"BatchGetItem left {len(request[table_name]['Keys'])} keys unprocessed.")
+
+
+def _batch_get_questions(questions_table, question_ids: List[str], projection=PROJECTIONS["full"]) -> List[Dict[str, Any]]:
+    """
+    questionId のリストを BatchGetItem (100キーずつ、並列) で取得し、
+    渡した順に並べて返す (削除済みは除く)。コストは件数に比例し、カタログの大きさに依存しない。
+    """
+    unique_ids = list(dict.fromkeys(question_ids))
+    if not unique_ids:
+        return []
+    chunks = [unique_ids[i:i + 100] for i in range(0, len(unique_ids), 100)]
+    if len(chunks) == 1:
+        results = [_batch_get_chunk(questions_table.name, chunks[0], projection)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(BATCH_GET_CONCURRENCY, len(chunks))) as pool:
+            results = list(pool.map(lambda chunk: _batch_get_chunk(questions_table.name, chunk, projection), chunks))
+    found = {it["questionId"]: it for chunk_items in results for it in chunk_items}
+    return [found[qid] for qid in unique_ids if qid in found]
+
+
+def _matches_filters(item: Dict[str, Any], purpose: str, tags: List[str], tag_mode: str) -> bool:
+    """キーで取得した質問 (ブックマークなど) に purpose / タグ条件を Python 側で適用する"""
+    if purpose and item.get("purpose") != purpose:
+        return False
+    if tags:
+        item_tags = set(item.get("tags") or [])
+        if tag_mode == "or":
+            return any(t in item_tags for t in tags)
+        return all(t in item_tags for t in tags)
+    return True
+
+
+# --- 新着フィード (シャード化した createdAt 降順 GSI) ---
+
+def _iter_feed_shard(questions_table, index_name: str, shard: str, start: Optional[Dict[str, Any]], page_size: int, projection) -> Iterator[Dict[str, Any]]:
+    kwargs: Dict[str, Any] = {
+        "IndexName": index_name,
+        "KeyConditionExpression": Key("feedShard").eq(shard),
+        "ScanIndexForward": False,
+        "Limit": page_size,
+    }
+    kwargs["ProjectionExpression"], kwargs["ExpressionAttributeNames"] = projection
+    if start:
+        kwargs["ExclusiveStartKey"] = start
+    while True:
+        resp = questions_table.query(**kwargs)
+        for it in _decode_quiz_items(resp.get("Items", [])):
+            yield it
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            return
+        kwargs["ExclusiveStartKey"] = lek
+
+
+def _feed_page(
+    questions_table,
+    index_name: str,
+    limit: int,
+    cursors: Dict[str, Any],
+    projection,
+    keep=None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any], bool]:
+    """
+    全シャードを createdAt 降順で少しずつ読み、マージして全体で新しい順の1ページを作る。
+    cursors はシャードごとの「最後に読んだ項目のキー」(未読のシャードは含まない)。
+    keep で落とした項目も読んだ扱いにして、ページが limit 件になるまで読み進める。
+    """
+    page_size = limit // FEED_SHARD_COUNT + 2
+    streams = []
+    for n in range(FEED_SHARD_COUNT):
+        shard = str(n)
+        rows = _iter_feed_shard(questions_table, index_name, shard, cursors.get(shard), page_size, projection)
+        streams.append(zip(itertools.repeat(shard), rows))
+    merged = heapq.merge(*streams, key=lambda p: (p[1]["createdAt"], p[1]["questionId"]), reverse=True)
+
+    items: List[Dict[str, Any]] = []
+    next_cursors = dict(cursors)
+    for shard, it in merged:
+        if len(items) == limit:
+            return items, next_cursors, True
+        next_cursors[shard] = {"feedShard": shard, "createdAt": it["createdAt"], "questionId": it["questionId"]}
+        if keep is None or keep(it):
+            items.append(it)
+    return items, next_cursors, False
+
+
+def _fill_page(candidates: Iterator[Tuple[Any, str]], limit: int, hydrate, keep=None) -> Tuple[List[Dict[str, Any]], Any, bool]:
+    """
+    インデックスから来る (位置, questionId) を順に取得し、keep を満たす質問を limit 件集める。
+    返す位置は「最後に読んだ候補」のもので、次のページはその続きから読めばよい。
+    """
+    items: List[Dict[str, Any]] = []
+    cursor = None
+    rest: List[Tuple[Any, str]] = []
+    while len(items) < limit:
+        chunk = list(itertools.islice(candidates, limit - len(items)))
+        if not chunk:
+            return items, cursor, False
+        by_id = {it["questionId"]: it for it in hydrate([qid for _, qid in chunk])}
+        for i, (pos, qid) in enumerate(chunk):
+            cursor = pos
+            item = by_id.get(qid)  # 削除済みなら無い
+            if item is not None and (keep is None or keep(item)):
+                items.append(item)
+                if len(items) == limit:
+                    rest = chunk[i + 1:]
+                    break
+    return items, cursor, bool(rest) or next(candidates, None) is not None
+
+
+# --- 全文検索 ---
+_SEARCH_SPLIT = re.compile(r"[\W_]+")
+
+
+def _search_bigrams(text: str) -> List[str]:
+    """NFKC + 小文字にして記号・空白で区切り、区間ごとの文字 bigram を返す (createQuestionFunction と同じ)"""
+    grams: List[str] = []
+    for segment in _SEARCH_SPLIT.split(unicodedata.normalize("NFKC", text).lower()):
+        grams.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return grams
+
+
+def _search_postings(table_name: str, gram: str) -> List[Tuple[str, float]]:
+    # スレッドから呼ぶので、Key ではなく文字列の式をクライアントに渡す (_expression_strings を参照)
+    kwargs: Dict[str, Any] = {
+        "TableName": table_name,
+        "KeyConditionExpression": "#g = :g",
+        "ExpressionAttributeNames": {"#g": "gram"},
+        "ExpressionAttributeValues": {":g": gram},
+        "ProjectionExpression": "questionId, tf",
+    }
+    postings: List[Tuple[str, float]] = []
+    while len(postings) < SEARCH_MAX_POSTINGS:
+        resp = dynamodb.meta.client.query(**kwargs)
+        postings.extend((row["questionId"], float(row.get("tf", 1))) for row in resp.get("Items", []))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        kwargs["ExclusiveStartKey"] = lek
+    return postings[:SEARCH_MAX_POSTINGS]
+
+
+_search_rank_cache = _LRUCache(SEARCH_RANK_CACHE_SIZE)
+
+
+def _search_rank(questions_table_name: str, query: str, version: Optional[int] = None) -> List[str]:
+    """
+    スコア順 (同点は questionId 順) の questionId を、上位 SEARCH_MAX_RESULTS 件まで返す。
+    同じ bigram になるクエリは、カタログのバージョンが変わるか TTL が切れるまでキャッシュを使う
+    """
+    grams = list(dict.fromkeys(_search_bigrams(query)))[:SEARCH_MAX_QUERY_GRAMS]
+    if not grams:
+        raise ValueError("q must contain at least 2 consecutive characters.")
+    cache_key = " ".join(grams)
+    cached = _search_rank_cache.get(cache_key)
+    if cached is not None and cached[0] == version and time.monotonic() - cached[1] < SEARCH_RANK_CACHE_TTL:
+        return cached[2]
+
+    scores = _search_scores(questions_table_name, grams)
+    ranked = [qid for _, qid in heapq.nsmallest(SEARCH_MAX_RESULTS, ((-score, qid) for qid, score in scores))]
+    _search_rank_cache.put(cache_key, (version, time.monotonic(), ranked))
+    return ranked
+
+
+def _search_scores(questions_table_name: str, grams: List[str]) -> List[Tuple[str, float]]:
+    """bigram ごとに posting を並列に読み、BM25 風のスコアで (questionId, score) を返す"""
+    with ThreadPoolExecutor(max_workers=max(1, min(len(grams), SEARCH_CONCURRENCY))) as pool:
+        results = list(pool.map(lambda gram: _search_postings(SEARCH_INDEX_TABLE, gram), grams))
+
+    # 文書数は DescribeTable の ItemCount (数時間遅れ) なので、少なくとも最大の df より大きくしておく
+    total_docs = max(_table_stats(questions_table_name)[1], max(len(p) for p in results) + 1)
+    scores: Dict[str, float] = {}
+    matched: Dict[str, int] = {}
+    for postings in results:
+        df = len(postings)
+        if not df:
+            continue
+        idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+        for question_id, tf in postings:
+            scores[question_id] = scores.get(question_id, 0.0) + idf * tf * (SEARCH_BM25_K1 + 1) / (tf + SEARCH_BM25_K1)
+            matched[question_id] = matched.get(question_id, 0) + 1
+
+    need = max(1, math.ceil(len(grams) * SEARCH_MIN_MATCH_RATIO))
+    return [(qid, score) for qid, score in scores.items() if matched[qid] >= need]
+
+
+def _iter_ranked(ranked: List[str], offset: int) -> Iterator[Tuple[int, str]]:
+    """順位付け済みの questionId を offset の続きから、読んだ件数と一緒に返す"""
+    for n in range(offset, len(ranked)):
+        yield n + 1, ranked[n]
+
+
+# --- 個人向けの除外 ---
+class _SortedIds:
+    """ソート済みの id 配列。set よりメモリが小さく、bisect で引く"""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids: List[str]):
+        self._ids = sorted(set(ids))
+
+    def __contains__(self, key: Any) -> bool:
+        i = bisect.bisect_left(self._ids, key)
+        return i < len(self._ids) and self._ids[i] == key
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+_exclusion_cache = _LRUCache(EXCLUSION_CACHE_SIZE)
+_answered_backfilled = False  # 印を見たらコンテナが生きている間は読み直さない
+
+
+def _answered_ready() -> bool:
+    global _answered_backfilled
+    if not _answered_backfilled:
+        marker = dynamodb.Table(ANSWERED_QUESTIONS_TABLE).get_item(
+            Key=ANSWERED_MARKER_KEY, ProjectionExpression="completedAt"
+        ).get("Item")
+        _answered_backfilled = bool(marker and marker.get("completedAt"))
+    return _answered_backfilled
+
+
+def _parse_flag(raw: Optional[str], name: str) -> bool:
+    value = (raw or "").strip().lower()
+    if value in ("", "false", "0"):
+        return False
+    if value in ("true", "1"):
+        return True
+    raise ValueError(f"{name} must be 'true' or 'false'.")
+
+
+def _exclusion_ids(kind: str, user_id: str) -> _SortedIds:
+    """kind = "answered" (回答済みの questionId) / "blocked" (ブロックした userId)"""
+    cache_key = f"{kind}:{user_id}"
+    cached = _exclusion_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < EXCLUSION_CACHE_TTL:
+        return cached[1]
+
+    if kind == "answered" and ANSWERED_QUESTIONS_TABLE and _answered_ready():
+        table = dynamodb.Table(ANSWERED_QUESTIONS_TABLE)
+        attr = "questionId"
+        kwargs: Dict[str, Any] = {"KeyConditionExpression": Key("userId").eq(user_id), "ProjectionExpression": attr}
+    elif kind == "answered":
+        table = dynamodb.Table(ANSWERS_TABLE)
+        attr = "questionId"
+        kwargs = {
+            "IndexName": ANSWERS_USER_INDEX_NAME,
+            "KeyConditionExpression": Key("userId").eq(user_id),
+            "ProjectionExpression": attr,
+        }
+    else:
+        table = dynamodb.Table(BLOCKS_TABLE)
+        attr = "blockedId"
+        kwargs = {"KeyConditionExpression": Key("blockerId").eq(user_id), "ProjectionExpression": attr}
+    ids: List[str] = []
+    while True:
+        resp = table.query(**kwargs)
+        ids.extend(it[attr] for it in resp.get("Items", []) if isinstance(it.get(attr), str))
+        lek = resp.get("LastEvaluatedKey")
+        if not lek:
+            break
+        kwargs["ExclusiveStartKey"] = lek
+
+    result = _SortedIds(ids)
+    _exclusion_cache.put(cache_key, (time.monotonic(), result))
+    print(f"[get_questions] {kind} exclusion for {user_id}: {len(result)} ids")
+    return result
+
+
+def _choose_plan(
+    code: str, query_text: str, bookmarked_by: str, purpose: str, tags: List[str], paginated: bool, feed_index_name: Optional[str]
+) -> str:
+    """
+    条件に対して、読む量が最も少ない経路を選ぶ (上から優先)。
+      code       : shareCode の登録テーブル -> GetItem
+      search     : bigram の転置インデックス
+      bookmarks  : ブックマークの questionId で BatchGetItem
+      purposeTag : purpose#tag の複合インデックス (purpose とタグの両方)
+      tag        : タグの転置インデックス (タグのみ)
+      purpose    : PurposeIndex / (purpose, createdAt) の GSI。タグはフィルタ
+      feed       : シャード化した FeedIndex (絞り込みなしのページング)
+      scan       : 上のどれも使えないとき (タグはフィルタ)
+    """
+    if code:
+        return "code"
+    if query_text:
+        return "search"
+    if bookmarked_by:
+        return "bookmarks"
+    if purpose and tags and PURPOSE_TAG_INDEX_TABLE:
+        return "purposeTag"
+    if tags and not purpose and TAG_INDEX_TABLE:
+        return "tag"
+    if purpose:
+        return "purpose"
+    if not tags and paginated and feed_index_name:
+        return "feed"
+    return "scan"
+
+
+def _sort_newest_first(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(
+        (it for it in items if isinstance(it.get("createdAt"), str) and it["createdAt"]),
+        key=lambda x: x["createdAt"],
+        reverse=True,
+    )
+
+
+# --- フィードのスナップショット ---
+# 絞り込みなしのフィードは全ユーザー共通なので、作成/削除のたびに materialize_handler が
+# レスポンス本文をそのまま gzip で保存しておき、一覧はそれを返す (DynamoDB は読まない)。
+# レイアウト: {version}/all.json.gz, {version}/page-N.json.gz と、最後に書く manifest.json
+# 本文は version ごとに不変なので、ETag (sha256) は強い ETag として扱える。
+class _LocalSnapshotStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # manifest の差し替えが途中で読まれないように rename で置き換える
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class _S3SnapshotStore:
+    def __init__(self, bucket: str, prefix: str, endpoint_url: Optional[str] = None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.s3 = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+
+_snapshot_store_instance = None
+
+
+def _snapshot_store():
+    global _snapshot_store_instance
+    if _snapshot_store_instance is None:
+        if FEED_SNAPSHOT_BUCKET:
+            _snapshot_store_instance = _S3SnapshotStore(FEED_SNAPSHOT_BUCKET, FEED_SNAPSHOT_PREFIX, FEED_SNAPSHOT_ENDPOINT_URL)
+        elif FEED_SNAPSHOT_DIR:
+            _snapshot_store_instance = _LocalSnapshotStore(FEED_SNAPSHOT_DIR)
+    return _snapshot_store_instance
+
+
+_manifest_cache: Dict[str, Any] = {"at": 0.0, "value": None}
+# 本文 (展開済みと gzip のまま) は version ごとに不変なのでキーだけでキャッシュしてよい
+_snapshot_bodies = _LRUCache(int(os.environ.get("FEED_SNAPSHOT_CACHE_SIZE", "8")))
+
+
+def _read_manifest(store) -> Optional[Dict[str, Any]]:
+    raw = store.get("manifest.json")
+    return json.loads(raw) if raw else None
+
+
+def _cached_manifest(store) -> Optional[Dict[str, Any]]:
+    now = time.monotonic()
+    if now - _manifest_cache["at"] >= FEED_SNAPSHOT_MANIFEST_TTL:
+        _manifest_cache["value"] = _read_manifest(store)
+        _manifest_cache["at"] = now
+    return _manifest_cache["value"]
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+def _snapshot_name(params: Dict[str, str], paginated: bool, view: str, limit: int) -> Optional[str]:
+    """スナップショットで返せるリクエストなら manifest のエントリ名を返す"""
+    # limit / nextToken / view 以外のパラメータ (絞り込み) が付いていたら対象外
+    if set(params) - {"limit", "nextToken", "view"}:
+        return None
+    if not paginated:
+        return "all" if view == "full" else None
+    if view != "summary" or limit != DEFAULT_PAGE_SIZE:
+        return None
+    token = (params.get("nextToken") or "").strip()
+    return f"token:{_token_digest(token)}" if token else "first"
+
+
+def _serve_snapshot(event: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    store = _snapshot_store()
+    if store is None:
+        return None
+    try:
+        manifest = _cached_manifest(store)
+        entry = (manifest or {}).get("entries", {}).get(name)
+        if not entry:
+            return None
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+        request_headers = {str(k).lower(): v for k, v in (event.get("headers") or {}).items()}
+        # If-None-Match は弱い比較 (W/ や圧縮時に付けた "-gzip" などが付いていても一致とみなす)
+        candidates = [t.strip() for t in (request_headers.get("if-none-match") or "").split(",")]
+        candidates = [t[2:] if t.startswith("W/") else t for t in candidates]
+        candidates = [t.rsplit("-", 1)[0] + '"' if t.endswith(('-gzip"', '-br"')) else t for t in candidates]
+        if entry["etag"] in candidates or "*" in candidates:
+            return _raw_resp(304, "", headers)
+        cached = _snapshot_bodies.get(entry["key"])
+        if cached is None:
+            compressed = store.get(entry["key"])
+            if compressed is None:
+                return None
+            cached = (gzip.decompress(compressed).decode("utf-8"), compressed)
+            _snapshot_bodies.put(entry["key"], cached)
+        body, compressed = cached
+        if len(body) >= response_compression.COMPRESSION_MIN_BYTES and response_compression.negotiate_encoding(event) == "gzip":
+            # 保存してある gzip をそのまま返す (圧縮し直さない)
+            headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding", "ETag": f'{entry["etag"][:-1]}-gzip"'})
+            resp = _raw_resp(200, base64.b64encode(compressed).decode("ascii"), headers)
+            resp["isBase64Encoded"] = True
+            return resp
+        return _raw_resp(200, body, headers)
+    except Exception as e:
+        # スナップショットが読めなくても通常の経路で返せる
+        print(f"[get_questions] snapshot unavailable: {e}")
+        return None
+
+
+# --- 絞り込み結果のキャッシュ ---
+# 同じ条件の一覧はコンテナ内でレスポンス本文ごと使い回す。
+# 作成/削除のたびに createQuestionFunction / deleteQuestionFunction がカタログのバージョンを
+# ADD で上げるので、毎回の確認は GetItem 1回で済む。
+# bookmarkedBy などユーザーごとに変わる条件は対象外。
+RESULT_CACHE_PARAMS = {"q", "code", "purpose", "tags", "category", "tag", "tagMode", "view", "limit", "nextToken"}
+
+_result_cache = _LRUCache(RESULT_CACHE_SIZE)
+_result_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _result_cache_key(params: Dict[str, str]) -> Optional[str]:
+    if not CATALOG_META_TABLE or RESULT_CACHE_SIZE <= 0:
+        return None
+    if set(params) - RESULT_CACHE_PARAMS:
+        return None
+    # 絞り込みなしはスナップショットで返す (ETag / 304 を効かせるためここでは持たない)
+    if _snapshot_store() is not None and not set(params) - {"limit", "nextToken", "view"}:
+        return None
+    try:
+        tags, tag_mode = _parse_tags(params)
+    except ValueError:
+        return None
+    # nextToken には検索条件がそのまま入るので、タグの順序は正規化しない
+    return json.dumps(
+        [
+            (params.get("q") or "").strip(),
+            (params.get("code") or "").strip().lower(),
+            (params.get("purpose") or "").strip(),
+            tags,
+            tag_mode,
+            (params.get("view") or "").strip().lower(),
+            (params.get("limit") or "").strip(),
+            (params.get("nextToken") or "").strip(),
+        ],
+        ensure_ascii=False,
+    )
+
+
+def _catalog_version() -> Optional[int]:
+    try:
+        resp = dynamodb.Table(CATALOG_META_TABLE).get_item(
+            Key={"metaKey": "catalog"},
+            ProjectionExpression="#v",
+            ExpressionAttributeNames={"#v": "version"},
+        )
+    except ClientError as e:
+        print(f"[get_questions] catalog version unavailable: {e}")
+        return None
+    return int((resp.get("Item") or {}).get("version", 0))
+
+
+def _emit_cache_metrics(hit: bool) -> None:
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["FunctionName"]],
+                "Metrics": [{"Name": "ResultCacheHits", "Unit": "Count"}, {"Name": "ResultCacheMisses", "Unit": "Count"}],
+            }],
+        },
+        "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+        "ResultCacheHits": 1 if hit else 0,
+        "ResultCacheMisses": 0 if hit else 1,
+        # コンテナ起動からの累計 (ログで確認する用)
+        "containerHits": _result_cache_stats["hits"],
+        "containerMisses": _result_cache_stats["misses"],
+    }))
+
+
+def _cached_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return handler(event, context)
+    key = _result_cache_key(_read_query(event))
+    version = _catalog_version() if key is not None else None
+    if version is None:
+        return handler(event, context)
+
+    cached = _result_cache.get(key)
+    if cached is not None and cached[0] == version and time.monotonic() - cached[1] < RESULT_CACHE_TTL:
+        _result_cache_stats["hits"] += 1
+        _emit_cache_metrics(True)
+        return _raw_resp(200, cached[2], {"X-Cache": "HIT"})
+
+    _result_cache_stats["misses"] += 1
+    _emit_cache_metrics(False)
+    resp = handler(event, context)
+    body = resp.get("body")
+    if resp.get("statusCode") == 200 and isinstance(body, str) and len(body) <= RESULT_CACHE_MAX_BODY_BYTES:
+        _result_cache.put(key, (version, time.monotonic(), body))
+    return {**resp, "headers": {**(resp.get("headers") or {}), "X-Cache": "MISS"}}
+
+
+def handler(event, context, use_snapshot: bool = True):
+    if event.get("httpMethod") == "OPTIONS":
+        return _resp(200, {"ok": True})
+
+    questions_table_name = os.environ.get("QUESTIONS_TABLE") or os.environ.get("QUESTIONS_TABLE_NAME")
+    bookmarks_table_name = os.environ.get("BOOKMARKS_TABLE") or os.environ.get("BOOKMARKS_TABLE_NAME")
+    purpose_index_name = os.environ.get("PURPOSE_INDEX_NAME", "PurposeIndex")
+    # createdAt をソートキーに持つ GSI (未設定なら従来の Scan / PurposeIndex)
+    feed_index_name = os.environ.get("FEED_INDEX_NAME")
+    purpose_time_index_name = os.environ.get("PURPOSE_TIME_INDEX_NAME")
+
+    if not questions_table_name:
+        return _resp(500, {"message": "Server misconfiguration: QUESTIONS_TABLE is not set."})
+
+    questions_table = dynamodb.Table(questions_table_name)
+    bookmarks_table = dynamodb.Table(bookmarks_table_name) if bookmarks_table_name else None
+
+    try:
+        params = _read_query(event)
+        code = (params.get("code") or "").strip().lower()
+        purpose = (params.get("purpose") or "").strip()
+        tags, tag_mode = _parse_tags(params)
+        bookmarked_by = (params.get("bookmarkedBy") or "").strip()
+        query_text = (params.get("q") or "").strip()
+        exclude_answered = _parse_flag(params.get("excludeAnswered"), "excludeAnswered")
+        exclude_blocked = _parse_flag(params.get("excludeBlocked"), "excludeBlocked")
+
+        # limit / nextToken があればページングモード (旧アプリは従来どおり全件の配列)。検索は常にページング
+        paginated = "limit" in params or "nextToken" in params or bool(query_text)
+        # 一覧は既定で軽い summary。旧アプリ (非ページング) は従来どおり full
+        view = (params.get("view") or ("summary" if paginated else "full")).strip().lower()
+        if view not in PROJECTIONS:
+            raise ValueError("view must be 'summary' or 'full'.")
+        projection = PROJECTIONS[view]
+        limit = 0
+        start_key: Optional[Dict[str, Any]] = None
+        filters = {"purpose": purpose, "tags": tags, "tagMode": tag_mode, "bookmarkedBy": bookmarked_by}
+        if query_text:
+            filters["q"] = query_text
+        if exclude_answered:
+            filters["excludeAnswered"] = True
+        if exclude_blocked:
+            filters["excludeBlocked"] = True
+        if paginated:
+            if not PAGINATION_TOKEN_SECRET:
+                return _resp(500, {"message": "Server misconfiguration: PAGINATION_TOKEN_SECRET is not set."})
+            limit = _parse_limit(params.get("limit"))
+            token = (params.get("nextToken") or "").strip()
+            if token:
+                start_key = _decode_token(token, filters)
+
+        if use_snapshot:
+            snapshot_name = _snapshot_name(params, paginated, view, limit)
+            if snapshot_name:
+                cached = _serve_snapshot(event, snapshot_name)
+                if cached is not None:
+                    return cached
+
+        plan = _choose_plan(code, query_text, bookmarked_by, purpose, tags, paginated, feed_index_name)
+        print(f"[get_questions] plan={plan}")
+
+        # 個人向けの除外: 回答済みの質問はインデックスの段階で、ブロックした作成者は取得後に落とす
+        answered_ids: Optional[_SortedIds] = None
+        blocked_authors: Optional[_SortedIds] = None
+        if exclude_answered or exclude_blocked:
+            claims = (event.get("requestContext") or {}).get("authorizer", {}).get("claims") or {}
+            user_id = claims.get("sub")
+            if not user_id:
+                return _resp(401, {"message": "Unauthorized: excludeAnswered / excludeBlocked require sign-in."})
+            if exclude_answered:
+                answered_ids = _exclusion_ids("answered", user_id)
+            if exclude_blocked:
+                if not BLOCKS_TABLE:
+                    return _resp(500, {"message": "Server misconfiguration: BLOCKS_TABLE is not set."})
+                blocked_authors = _exclusion_ids("blocked", user_id)
+
+        def eligible(it: Dict[str, Any]) -> bool:
+            if answered_ids is not None and it.get("questionId") in answered_ids:
+                return False
+            return blocked_authors is None or it.get("authorId") not in blocked_authors
+
+        personal = eligible if (answered_ids is not None or blocked_authors is not None) else None
+
+        def unanswered(candidates: Iterator[Tuple[Any, str]]) -> Iterator[Tuple[Any, str]]:
+            if answered_ids is None:
+                return candidates
+            return ((pos, qid) for pos, qid in candidates if qid not in answered_ids)
+
+        hydrate_ids = lambda ids: _batch_get_questions(questions_table, ids, projection)
+
+        # 1) shareCode 検索を最優先（完全一致）
+        if plan == "code":
+            print(f"[get_questions] code search: {code}")
+            codes_table = dynamodb.Table(SHARE_CODES_TABLE) if SHARE_CODES_TABLE else None
+            question_id = _lookup_share_code(codes_table, code)
+
+            if question_id:
+                # 登録済みのコードは GetItem 1回で解決
+                resp = questions_table.get_item(
+                    Key={"questionId": question_id},
+                    ProjectionExpression=PROJECTION_EXPRESSION_STRING,
+                    ExpressionAttributeNames=PROJECTION_ATTRIBUTE_NAMES,
+                )
+                item = resp.get("Item")
+                if item:
+                    _decode_quiz_items([item])
+                if item and item.get("shareCode") == code:
+                    items = [item]
+                else:
+                    # 削除済みの質問を指していた
+                    _share_code_cache.pop(code)
+                    items = []
+            elif question_id == "":
+                # 予約済みでまだ使われていないコード
+                items = []
+            elif _share_code_missed(code):
+                # 少し前に見つからなかったコード
+                items = []
+            elif codes_table is None or SHARE_CODE_SCAN_FALLBACK:
+                # 登録テーブルが無いか、既存のコードの登録が終わるまでの移行中だけ従来どおり Scan で探す
+                fe = Attr("shareCode").eq(code)
+
+                # ★ shareCode検索時も ProjectionExpression を渡す
+                scan_kwargs = {
+                    "FilterExpression": fe
+                }
+                items = _scan_all(questions_table, scan_kwargs)
+                if items:
+                    _register_legacy_share_code(codes_table, code, items[0]["questionId"])
+                else:
+                    _remember_share_code_miss(code)
+            else:
+                # 登録テーブルに無いコードは存在しない
+                _remember_share_code_miss(code)
+                items = []
+
+            items_sorted = _sort_newest_first(items)
+            if paginated:
+                return _resp(200, {"items": items_sorted, "nextToken": None})
+            return _resp(200, items_sorted)
+
+        # 2) キーワード検索: bigram の転置インデックスで順位付けし、上位だけ取得する
+        if plan == "search":
+            if purpose or tags or bookmarked_by:
+                raise ValueError("q cannot be combined with purpose, tags or bookmarkedBy.")
+            if not SEARCH_INDEX_TABLE:
+                return _resp(500, {"message": "Server misconfiguration: SEARCH_INDEX_TABLE is not set."})
+            offset = int(start_key.get("offset", 0)) if start_key else 0
+            version = _catalog_version() if CATALOG_META_TABLE else None
+            ranked = _search_rank(questions_table_name, query_text, version)
+            items, consumed, has_next = _fill_page(unanswered(_iter_ranked(ranked, offset)), limit, hydrate_ids, personal)
+            next_token = _encode_token({"offset": consumed}, filters) if has_next else None
+            print(f"[get_questions] search: {len(ranked)} hits, page {len(items)} items, hasNext={next_token is not None}")
+            return _resp(200, {"items": items, "nextToken": next_token})
+
+        # 3) ブックマーク: ブックマークした質問だけをキーで取得する (カタログ全体は読まない)
+        if plan == "bookmarks":
+            if not bookmarks_table:
+                return _resp(500, {"message": "BOOKMARKS_TABLE is not set but bookmarkedBy was provided."})
+            query_kwargs = {
+                "KeyConditionExpression": Key("userId").eq(bookmarked_by),
+                "ProjectionExpression": "questionId", # ここは questionId だけでOK
+            }
+            hydrate = lambda rows: _batch_get_questions(
+                questions_table, [r["questionId"] for r in rows if isinstance(r.get("questionId"), str)], projection
+            )
+            keep = lambda it: _matches_filters(it, purpose, tags, tag_mode) and (personal is None or personal(it))
+
+            if paginated:
+                items, lek = _read_page(bookmarks_table.query, query_kwargs, limit, start_key, keep, hydrate)
+                next_token = _encode_token(lek, filters) if lek else None
+                print(f"[get_questions] bookmark page: {len(items)} items, hasNext={next_token is not None}")
+                return _resp(200, {"items": _sort_newest_first(items), "nextToken": next_token})
+
+            rows: List[Dict[str, Any]] = []
+            while True:
+                resp = bookmarks_table.query(**query_kwargs)
+                rows.extend(resp.get("Items", []))
+                lek = resp.get("LastEvaluatedKey")
+                if not lek:
+                    break
+                query_kwargs["ExclusiveStartKey"] = lek
+            items = [it for it in hydrate(rows) if keep(it)]
+            return _resp(200, _sort_newest_first(items))
+
+        # 4) タグの絞り込みは転置インデックスを Query (createdAt 降順)。purpose もあれば purpose#tag の複合インデックス
+        if plan in ("tag", "purposeTag"):
+            if plan == "purposeTag":
+                tag_table = dynamodb.Table(PURPOSE_TAG_INDEX_TABLE)
+                key_name, keys = "purposeTag", [f"{purpose}#{t}" for t in tags]
+            else:
+                tag_table = dynamodb.Table(TAG_INDEX_TABLE)
+                key_name, keys = "tag", tags
+            if paginated:
+                before = start_key.get("sortKey") if start_key else None
+                page_size = limit + 1 if len(tags) == 1 else TAG_POSTINGS_PAGE_SIZE
+                postings = unanswered(_tag_postings(tag_table, key_name, keys, tag_mode, before, page_size))
+                items, last_sort_key, has_next = _fill_page(postings, limit, hydrate_ids, personal)
+                next_token = _encode_token({"sortKey": last_sort_key}, filters) if has_next else None
+                print(f"[get_questions] tag page: {len(items)} items, hasNext={next_token is not None}")
+                return _resp(200, {"items": _sort_newest_first(items), "nextToken": next_token})
+
+            postings = list(unanswered(_tag_postings(tag_table, key_name, keys, tag_mode, None, 1000)))
+            items = hydrate_ids([qid for _, qid in postings])
+            if personal is not None:
+                items = [it for it in items if personal(it)]
+            return _resp(200, _sort_newest_first(items))
+
+        # 5) 絞り込みなしの新着ページは、シャード化した FeedIndex をマージして表示分だけ読む
+        if plan == "feed":
+            cursors = (start_key or {}).get("shards") or {}
+            items, cursors, has_next = _feed_page(questions_table, feed_index_name, limit, cursors, projection, personal)
+            next_token = _encode_token({"shards": cursors}, filters) if has_next else None
+            print(f"[get_questions] feed page: {len(items)} items, hasNext={next_token is not None}")
+            return _resp(200, {"items": items, "nextToken": next_token})
+
+        # 6) 目的ありなら GSI、なければScan
+        use_query = plan == "purpose"
+        dynamo_kwargs: Dict[str, Any] = {}
+        filter_expr = None
+
+        if use_query:
+            if purpose_time_index_name:
+                # (purpose, createdAt) の GSI なら新しい順に読める
+                dynamo_kwargs["IndexName"] = purpose_time_index_name
+                dynamo_kwargs["ScanIndexForward"] = False
+            else:
+                dynamo_kwargs["IndexName"] = purpose_index_name
+            dynamo_kwargs["KeyConditionExpression"] = Key("purpose").eq(purpose)
+
+        # タグ (転置インデックスを使わない場合) はフィルタで絞る
+        tag_expr = None
+        for tag in tags:
+            fe = Attr("tags").contains(tag)
+            if tag_expr is None:
+                tag_expr = fe
+            elif tag_mode == "or":
+                tag_expr = tag_expr | fe
+            else:
+                tag_expr = tag_expr & fe
+        if tag_expr is not None:
+            filter_expr = tag_expr if filter_expr is None else (filter_expr & tag_expr)
+
+        if filter_expr is not None:
+            dynamo_kwargs["FilterExpression"] = filter_expr
+
+        # ページングモード: 1ページ分だけ読んで、続きは nextToken で返す
+        # (PURPOSE_TIME_INDEX_NAME 以外は DynamoDB の読み出し順。createdAt 降順はページ内のみ)
+        if paginated:
+            read = questions_table.query if use_query else questions_table.scan
+            page_kwargs = dict(dynamo_kwargs)
+            page_kwargs["ProjectionExpression"], page_kwargs["ExpressionAttributeNames"] = projection
+            items, lek = _read_page(read, page_kwargs, limit, start_key, personal)
+            next_token = _encode_token(lek, filters) if lek else None
+            print(f"[get_questions] page: {len(items)} items, hasNext={next_token is not None}")
+            return _resp(200, {"items": _sort_newest_first(items), "nextToken": next_token})
+
+        if use_query:
+            items = _query_all(questions_table, dynamo_kwargs, projection)
+        else:
+            items = _scan_all(questions_table, dynamo_kwargs, projection)
+        if personal is not None:
+            items = [it for it in items if personal(it)]
+
+        items_sorted = _sort_newest_first(items)
+        return _resp(200, items_sorted)
+
+    except ValueError as ve:
+        return _resp(400, {"message": str(ve)})
+    except Exception as e:
+        return _resp(500, {"message": f"Internal error: {str(e)}"})
+
+
+def lambda_handler(event, context):
+    return response_compression.maybe_compress(_cached_handler(event, context), event)
+
+
+def materialize_handler(event, context):
+    """
+    フィードのスナップショットを作り直す (別の Lambda として同じパッケージをデプロイし、
+    ハンドラに lambda_function.materialize_handler を指定する)。
+    createQuestionFunction / deleteQuestionFunction から {"requestedAt": ...} 付きで非同期に呼ばれる。
+    予約同時実行数を 1 にしておけば、連続した更新は1回の再構築にまとまる。
+    """
+    store = _snapshot_store()
+    if store is None:
+        raise Exception("FEED_SNAPSHOT_BUCKET or FEED_SNAPSHOT_DIR must be set")
+
+    requested_at = (event or {}).get("requestedAt")
+    current = _read_manifest(store)
+    if requested_at and current and current.get("builtAt", "") > requested_at:
+        # 依頼より後に読み始めたスナップショットがすでにある
+        print(f"[materialize] skip: built {current['builtAt']} after request {requested_at}")
+        return {"skipped": True, "version": current.get("version")}
+
+    built_at = datetime.now(timezone.utc).isoformat()
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    entries: Dict[str, Dict[str, str]] = {}
+
+    def save(name: str, file_name: str, resp: Dict[str, Any]) -> Dict[str, Any]:
+        if resp["statusCode"] != 200:
+            raise Exception(f"feed build failed for {name}: {resp['body']}")
+        raw = resp["body"].encode("utf-8")
+        key = f"{version}/{file_name}.json.gz"
+        store.put(key, gzip.compress(raw))
+        entries[name] = {"key": key, "etag": '"' + hashlib.sha256(raw).hexdigest() + '"'}
+        return json.loads(resp["body"])
+
+    # 旧アプリ向けの全件配列
+    save("all", "all", handler({"queryStringParameters": None}, context, use_snapshot=False))
+
+    # ページングモードの先頭 FEED_SNAPSHOT_PAGES ページ (nextToken をたどる)
+    token = None
+    for page in range(FEED_SNAPSHOT_PAGES):
+        qs = {"limit": str(DEFAULT_PAGE_SIZE)}
+        if token:
+            qs["nextToken"] = token
+        name = f"token:{_token_digest(token)}" if token else "first"
+        body = save(name, f"page-{page}", handler({"queryStringParameters": qs}, context, use_snapshot=False))
+        token = body.get("nextToken")
+        if not token:
+            break
+
+    # 本文をすべて書いてから manifest を差し替える
+    store.put("manifest.json", json.dumps({"version": version, "builtAt": built_at, "entries": entries}).encode("utf-8"))
+    print(f"[materialize] version={version} entries={len(entries)}")
+    return {"skipped": False, "version": version, "entries": len(entries)}
@@ -5,6 +5,9 @@ from typing import Any, Dict, List, Optional
 import boto3
 from boto3.dynamodb.conditions import Attr
 
+# Lambda レイヤー (Backend/layers/common) の共通モジュール
+import response_compression
+
 dynamodb = boto3.resource("dynamodb")
 CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "*")
 
@@ -76,4 +79,4 @@ def handler(event, context):
         return _resp(500, {"message": f"Internal error: {str(e)}"})
 
 def lambda_handler(event, context):
-    return handler(event, context)
+    return response_compression.maybe_compress(handler(event, context), event)
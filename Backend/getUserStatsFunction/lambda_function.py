@@ -1,68 +1,218 @@
-{\rtf1\ansi\ansicpg932\cocoartf2865
-\cocoatextscaling0\cocoaplatform0{\fonttbl\f0\fnil\fcharset0 Menlo-Regular;}
-{\colortbl;\red255\green255\blue255;\red157\green0\blue210;\red255\green255\blue255;\red45\green45\blue45;
-\red15\green112\blue1;\red0\green0\blue255;\red32\green108\blue135;\red101\green76\blue29;\red0\green0\blue109;
-\red0\green0\blue0;\red19\green118\blue70;\red144\green1\blue18;}
-{\*\expandedcolortbl;;\cssrgb\c68627\c0\c85882;\cssrgb\c100000\c100000\c100000;\cssrgb\c23137\c23137\c23137;
-\cssrgb\c0\c50196\c0;\cssrgb\c0\c0\c100000;\cssrgb\c14902\c49804\c60000;\cssrgb\c47451\c36863\c14902;\cssrgb\c0\c6275\c50196;
-\cssrgb\c0\c0\c0;\cssrgb\c3529\c52549\c34510;\cssrgb\c63922\c8235\c8235;}
-\paperw11900\paperh16840\margl1440\margr1440\vieww11520\viewh8400\viewkind0
-\deftab720
-\pard\pardeftab720\partightenfactor0
-
-\f0\fs24 \cf2 \cb3 \expnd0\expndtw0\kerning0
-\outl0\strokewidth0 \strokec2 import\cf4 \strokec4  json\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  boto3\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  decimal \cf2 \strokec2 import\cf4 \strokec4  Decimal\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  boto3.dynamodb.conditions \cf2 \strokec2 import\cf4 \strokec4  Key, Attr \cf5 \strokec5 # GSI\uc0\u12434 \u20351 \u12358 \u22580 \u21512 \u12399 Key\u12418 \u24517 \u35201 \u12395 \u12394 \u12427 \u21487 \u33021 \u24615 \cf4 \cb1 \strokec4 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf6 \cb3 \strokec6 class\cf4 \strokec4  \cf7 \strokec7 DecimalEncoder\cf4 \strokec4 (\cf7 \strokec7 json\cf4 \strokec4 .\cf7 \strokec7 JSONEncoder\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf6 \strokec6 def\cf4 \strokec4  \cf8 \strokec8 default\cf4 \strokec4 (\cf9 \strokec9 self\cf4 \strokec4 , \cf9 \strokec9 o\cf4 \strokec4 ):\cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf8 \strokec8 isinstance\cf4 \strokec4 (o, Decimal):\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \cf7 \strokec7 int\cf4 \strokec4 (o) \cf2 \strokec2 if\cf4 \strokec4  o \strokec10 %\strokec4  \cf11 \strokec11 1\cf4 \strokec4  \strokec10 ==\strokec4  \cf11 \strokec11 0\cf4 \strokec4  \cf2 \strokec2 else\cf4 \strokec4  \cf7 \strokec7 float\cf4 \strokec4 (o)\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \cf7 \strokec7 super\cf4 \strokec4 (DecimalEncoder, \cf6 \strokec6 self\cf4 \strokec4 ).default(o)\cb1 \
-\
-\cb3 dynamodb \strokec10 =\strokec4  boto3.resource(\cf12 \strokec12 'dynamodb'\cf4 \strokec4 )\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf5 \cb3 \strokec5 # AnswersLog\uc0\u12486 \u12540 \u12502 \u12523 \u12398 UserIndex GSI\u12434 \u20351 \u29992 \cf4 \cb1 \strokec4 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 table \strokec10 =\strokec4  dynamodb.Table(\cf12 \strokec12 'AnswersLog'\cf4 \strokec4 )\cb1 \
-\cb3 user_index_name \strokec10 =\strokec4  \cf12 \strokec12 'UserIndex'\cf4 \strokec4  \cf5 \strokec5 # GSI\uc0\u21517 \u12434 \u23450 \u32681 \cf4 \cb1 \strokec4 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf6 \cb3 \strokec6 def\cf4 \strokec4  \cf8 \strokec8 lambda_handler\cf4 \strokec4 (\cf9 \strokec9 event\cf4 \strokec4 , \cf9 \strokec9 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 try\cf4 \strokec4 :\cb1 \
-\cb3         user_id \strokec10 =\strokec4  event[\cf12 \strokec12 'pathParameters'\cf4 \strokec4 ][\cf12 \strokec12 'userId'\cf4 \strokec4 ]\cb1 \
-\cb3         \cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf6 \strokec6 not\cf4 \strokec4  user_id:\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \{\cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 400\cf4 \strokec4 , \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(\{\cf12 \strokec12 'error'\cf4 \strokec4 : \cf12 \strokec12 'userId is required'\cf4 \strokec4 \})\}\cb1 \
-\
-\cb3         \cf5 \strokec5 # UserIndex GSI\uc0\u12395 \u23550 \u12375 \u12390 \u12463 \u12456 \u12522 \u12434 \u23455 \u34892 \cf4 \cb1 \strokec4 \
-\cb3         response \strokec10 =\strokec4  table.query(\cb1 \
-\cb3             \cf9 \strokec9 IndexName\cf4 \strokec10 =\strokec4 user_index_name,\cb1 \
-\cb3             \cf9 \strokec9 KeyConditionExpression\cf4 \strokec10 =\strokec4 Key(\cf12 \strokec12 'userId'\cf4 \strokec4 ).eq(user_id)\cb1 \
-\cb3         )\cb1 \
-\cb3         items \strokec10 =\strokec4  response.get(\cf12 \strokec12 'Items'\cf4 \strokec4 , [])\cb1 \
-\cb3         \cb1 \
-\cb3         total_answers \strokec10 =\strokec4  \cf8 \strokec8 len\cf4 \strokec4 (items)\cb1 \
-\cb3         correct_answers \strokec10 =\strokec4  \cf8 \strokec8 sum\cf4 \strokec4 (\cf11 \strokec11 1\cf4 \strokec4  \cf2 \strokec2 for\cf4 \strokec4  item \cf2 \strokec2 in\cf4 \strokec4  items \cf2 \strokec2 if\cf4 \strokec4  item.get(\cf12 \strokec12 'isCorrect'\cf4 \strokec4 ))\cb1 \
-\cb3         \cb1 \
-\cb3         accuracy \strokec10 =\strokec4  (correct_answers \strokec10 /\strokec4  total_answers \strokec10 *\strokec4  \cf11 \strokec11 100\cf4 \strokec4 ) \cf2 \strokec2 if\cf4 \strokec4  total_answers \strokec10 >\strokec4  \cf11 \strokec11 0\cf4 \strokec4  \cf2 \strokec2 else\cf4 \strokec4  \cf11 \strokec11 0\cf4 \cb1 \strokec4 \
-\cb3         \cb1 \
-\cb3         stats \strokec10 =\strokec4  \{\cb1 \
-\cb3             \cf12 \strokec12 'totalAnswers'\cf4 \strokec4 : total_answers,\cb1 \
-\cb3             \cf12 \strokec12 'correctAnswers'\cf4 \strokec4 : correct_answers,\cb1 \
-\cb3             \cf12 \strokec12 'accuracy'\cf4 \strokec4 : \cf8 \strokec8 round\cf4 \strokec4 (accuracy, \cf11 \strokec11 2\cf4 \strokec4 )\cb1 \
-\cb3         \}\cb1 \
-\cb3         \cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 200\cf4 \strokec4 ,\cb1 \
-\cb3             \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(stats, \cf9 \strokec9 cls\cf4 \strokec10 =\strokec4 DecimalEncoder)\cb1 \
-\cb3         \}\cb1 \
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf7 \strokec7 Exception\cf4 \strokec4  \cf2 \strokec2 as\cf4 \strokec4  e:\cb1 \
-\cb3         \cf8 \strokec8 print\cf4 \strokec4 (\cf6 \strokec6 f\cf12 \strokec12 "Error: \cf6 \strokec6 \{\cf4 \strokec4 e\cf6 \strokec6 \}\cf12 \strokec12 "\cf4 \strokec4 )\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cf12 \strokec12 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 500\cf4 \strokec4 , \cf12 \strokec12 'body'\cf4 \strokec4 : json.dumps(\{\cf12 \strokec12 'error'\cf4 \strokec4 : \cf7 \strokec7 str\cf4 \strokec4 (e)\})\}\cb1 \
-}
\ No newline at end of file
+import json
+import os
+import boto3
+from datetime import datetime, timedelta
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return int(o) if o % 1 == 0 else float(o)
+        return super(DecimalEncoder, self).default(o)
+
+dynamodb = boto3.resource('dynamodb')
+# AnswersLogテーブルのUserIndex GSIを使用
+table = dynamodb.Table(os.environ.get('ANSWERS_TABLE', 'AnswersLog'))
+user_index_name = os.environ.get('ANSWERS_USER_INDEX_NAME', 'UserIndex') # GSI名を定義
+# logAnswerFunction が更新するユーザーごとの集計 (PK: userId, SK: bucket = "all" / "d#YYYY-MM-DD" / "w#YYYY-Www")。
+# 設定されていれば回答ログを読まずに、通算の行と期間内の日・週の行だけを読む
+USER_STATS_BUCKETS_TABLE = os.environ.get('USER_STATS_BUCKETS_TABLE')
+# backfillUserStatsFunction が全ユーザーを作り直し終えると書く完了の印の行。
+# 印が付くまでは集計の行があっても回答ログを数える (導入前の回答が入っていない行を返さない)
+BACKFILL_MARKER_KEY = {'userId': '#backfill', 'bucket': 'all'}
+_buckets_backfilled = False # 印を見たらコンテナが生きている間は読み直さない
+# logAnswerFunction と同じタイムゾーン (UTC からの時間)
+STATS_UTC_OFFSET_HOURS = float(os.environ.get('STATS_UTC_OFFSET_HOURS', '9'))
+# range (日数) の既定値と上限
+DEFAULT_RANGE_DAYS = int(os.environ.get('DEFAULT_RANGE_DAYS', '30'))
+MAX_RANGE_DAYS = int(os.environ.get('MAX_RANGE_DAYS', '366'))
+
+COUNT_FIELDS = ['answers', 'correctAnswers', 'distinctQuestions']
+
+
+def _local_date(timestamp):
+    """回答の timestamp (UTC の ISO 8601 + "Z") を集計のタイムゾーンの日付にする"""
+    return (datetime.fromisoformat(timestamp.rstrip('Z')) + timedelta(hours=STATS_UTC_OFFSET_HOURS)).date()
+
+
+def _today():
+    return (datetime.utcnow() + timedelta(hours=STATS_UTC_OFFSET_HOURS)).date()
+
+
+def _week_key(day):
+    year, week, _ = day.isocalendar()
+    return f'w#{year}-W{week:02d}'
+
+
+def _parse_range(raw):
+    """?range=30 / 30d / 4w -> 日数"""
+    value = (raw or '').strip().lower()
+    if not value:
+        return DEFAULT_RANGE_DAYS
+    unit = 1
+    if value[-1] in ('d', 'w'):
+        unit = 7 if value[-1] == 'w' else 1
+        value = value[:-1]
+    if not value.isdigit() or int(value) <= 0:
+        raise ValueError('range must be a positive number of days (e.g. 30, 30d, 4w)')
+    return min(int(value) * unit, MAX_RANGE_DAYS)
+
+
+def _query_buckets(user_id, first, last):
+    """bucket が first..last の行 (日・週とも文字列の順序 = 時間の順序)"""
+    query_kwargs = {'KeyConditionExpression': Key('userId').eq(user_id) & Key('bucket').between(first, last)}
+    rows = {}
+    while True:
+        response = dynamodb.Table(USER_STATS_BUCKETS_TABLE).query(**query_kwargs)
+        for row in response.get('Items', []):
+            rows[row['bucket']] = {f: int(row[f]) for f in COUNT_FIELDS if f in row}
+        lek = response.get('LastEvaluatedKey')
+        if not lek:
+            return rows
+        query_kwargs['ExclusiveStartKey'] = lek
+
+
+def _buckets_ready():
+    global _buckets_backfilled
+    if not _buckets_backfilled:
+        marker = dynamodb.Table(USER_STATS_BUCKETS_TABLE).get_item(
+            Key=BACKFILL_MARKER_KEY,
+            ProjectionExpression='completedAt'
+        ).get('Item')
+        _buckets_backfilled = bool(marker and marker.get('completedAt'))
+    return _buckets_backfilled
+
+
+def _load_buckets(user_id, start, today):
+    """(通算, 期間内の bucket -> 集計)。集計の行が無いユーザーと、作り直しが終わる前は None"""
+    if not _buckets_ready():
+        return None
+    lifetime = dynamodb.Table(USER_STATS_BUCKETS_TABLE).get_item(Key={'userId': user_id, 'bucket': 'all'}).get('Item')
+    if not lifetime:
+        return None
+    buckets = _query_buckets(user_id, f'd#{start.isoformat()}', f'd#{today.isoformat()}')
+    buckets.update(_query_buckets(user_id, _week_key(start), _week_key(today)))
+    return {f: int(lifetime[f]) for f in COUNT_FIELDS if f in lifetime}, buckets
+
+
+def _buckets_from_logs(user_id, start):
+    """集計が無いユーザーは回答ログを最後まで読んで同じ形にする"""
+    query_kwargs = {
+        'IndexName': user_index_name,
+        'KeyConditionExpression': Key('userId').eq(user_id),
+        'ProjectionExpression': 'questionId, isCorrect, #ts',
+        'ExpressionAttributeNames': {'#ts': 'timestamp'}
+    }
+    lifetime = {'answers': 0, 'correctAnswers': 0}
+    seen = {'all': set()}
+    buckets = {}
+    while True:
+        response = table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            correct = 1 if item.get('isCorrect') else 0
+            lifetime['answers'] += 1
+            lifetime['correctAnswers'] += correct
+            seen['all'].add(item.get('questionId'))
+            if not item.get('timestamp'):
+                continue
+            day = _local_date(item['timestamp'])
+            if day < start - timedelta(days=6):
+                continue
+            for bucket in (f'd#{day.isoformat()}', _week_key(day)):
+                counts = buckets.setdefault(bucket, {'answers': 0, 'correctAnswers': 0})
+                counts['answers'] += 1
+                counts['correctAnswers'] += correct
+                seen.setdefault(bucket, set()).add(item.get('questionId'))
+        lek = response.get('LastEvaluatedKey')
+        if not lek:
+            break
+        query_kwargs['ExclusiveStartKey'] = lek
+    lifetime['distinctQuestions'] = len(seen['all'])
+    for bucket, counts in buckets.items():
+        counts['distinctQuestions'] = len(seen[bucket])
+    return lifetime, buckets
+
+
+def _series(buckets, start, today):
+    """期間内の日ごと・週ごとの系列 (回答の無い日・週は 0 で埋める)"""
+    daily = []
+    day = start
+    while day <= today:
+        counts = buckets.get(f'd#{day.isoformat()}', {})
+        daily.append({'date': day.isoformat(), **{f: counts.get(f, 0) for f in COUNT_FIELDS}})
+        day += timedelta(days=1)
+    weekly = []
+    week_start = start - timedelta(days=start.weekday())
+    while week_start <= today:
+        key = _week_key(week_start)
+        counts = buckets.get(key, {})
+        weekly.append({'week': key[2:], 'startDate': week_start.isoformat(), **{f: counts.get(f, 0) for f in COUNT_FIELDS}})
+        week_start += timedelta(days=7)
+    return daily, weekly
+
+
+def _streaks(daily):
+    """(連続回答日数, 期間内の最長)。今日まだ回答していなくても昨日まで続いていれば途切れていない扱い"""
+    longest = run = 0
+    for entry in daily:
+        run = run + 1 if entry['answers'] > 0 else 0
+        longest = max(longest, run)
+    current = 0
+    days = list(reversed(daily))
+    if days and days[0]['answers'] == 0:
+        days = days[1:]
+    for entry in days:
+        if entry['answers'] == 0:
+            break
+        current += 1
+    return current, longest
+
+
+def lambda_handler(event, context):
+    try:
+        user_id = event['pathParameters']['userId']
+
+        if not user_id:
+            return {'statusCode': 400, 'body': json.dumps({'error': 'userId is required'})}
+
+        params = event.get('queryStringParameters') or {}
+        try:
+            range_days = _parse_range(params.get('range'))
+        except ValueError as e:
+            return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+        today = _today()
+        start = today - timedelta(days=range_days - 1)
+
+        loaded = _load_buckets(user_id, start, today) if USER_STATS_BUCKETS_TABLE else None
+        lifetime, buckets = loaded if loaded else _buckets_from_logs(user_id, start)
+
+        total_answers = lifetime.get('answers', 0)
+        correct_answers = lifetime.get('correctAnswers', 0)
+        accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
+        daily, weekly = _series(buckets, start, today)
+        current_streak, longest_streak = _streaks(daily)
+
+        stats = {
+            'totalAnswers': total_answers,
+            'correctAnswers': correct_answers,
+            'accuracy': round(accuracy, 2),
+            'range': range_days,
+            'daily': daily,
+            'weekly': weekly,
+            # 期間内の日ごとの集計から数える (range より長い連続は range で頭打ち)
+            'currentStreak': current_streak,
+            'longestStreak': longest_streak
+        }
+        if 'distinctQuestions' in lifetime:
+            stats['distinctQuestions'] = lifetime['distinctQuestions']
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(stats, cls=DecimalEncoder)
+        }
+    except KeyError:
+        return {'statusCode': 400, 'body': json.dumps({'error': 'Missing userId in path parameters'})}
+    except Exception as e:
+        print(f"Error: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
@@ -0,0 +1,238 @@
+# answer_log.py (Lambda レイヤー layers/common)
+# 回答ログ (AnswersLog) に付随する処理のうち、logAnswerFunction と submitQuizAttemptFunction で共通のもの。
+#   record_aggregates … 回答ログの行から集計 (QuestionStats / AnsweredQuestions / QuestionItemStats /
+#                       UserStatsBuckets) を ADD で更新する
+#   attempt_id / attempt_log_id / existing_log_ids … 送り直しても同じ回答が二重に記録されないようにする
+#                       (1回の送信の ID から logId を決め、書き済みの行を読み飛ばす)
+# 集計のテーブルは呼び出す関数の環境変数で指定する (未設定の集計は更新しない)。
+#
+# レイヤーの python/ 以下は Lambda の /opt/python に展開され、そのまま import できる。
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import boto3
+from botocore.exceptions import ClientError
+
+# 質問ごとの集計 (PK: questionId; totalAnswers, correctAnswers, uniqueAnswerers)。未設定なら更新しない
+QUESTION_STATS_TABLE = os.environ.get("QUESTION_STATS_TABLE")
+# ユーザーが回答した質問 (PK: userId, SK: questionId; attempts など)。uniqueAnswerers の判定に使う
+ANSWERED_QUESTIONS_TABLE = os.environ.get("ANSWERED_QUESTIONS_TABLE")
+# quizItem ごとの選択肢の分布 (PK: questionId, SK: quizItemId; answers, correctAnswers, "choice#<choiceId>")。
+# quizItemId 付きの回答だけが数えられる。未設定なら更新しない
+QUESTION_ITEM_STATS_TABLE = os.environ.get("QUESTION_ITEM_STATS_TABLE")
+CHOICE_ATTR_PREFIX = "choice#"
+# ユーザーごとの集計 (PK: userId, SK: bucket)。bucket は "all" (通算)、"d#YYYY-MM-DD" (日)、"w#YYYY-Www" (ISO 週)。
+# answers, correctAnswers, distinctQuestions を ADD で数える。未設定なら更新しない
+USER_STATS_BUCKETS_TABLE = os.environ.get("USER_STATS_BUCKETS_TABLE")
+# 日と週の区切りに使うタイムゾーン (UTC からの時間。既定は日本時間)
+STATS_UTC_OFFSET_HOURS = float(os.environ.get("STATS_UTC_OFFSET_HOURS", "9"))
+
+# 1回の送信の ID から logId を決める名前空間。送り直しで同じ行になる
+ATTEMPT_LOG_ID_NAMESPACE = uuid.UUID("6f1c2a4e-3b5d-4c7e-9a8f-0d1e2f3a4b5c")
+ATTEMPT_ID_MAX_LENGTH = 128
+# BatchGetItem の1回あたりの上限 (DynamoDB の仕様)
+BATCH_GET_CHUNK = 100
+BATCH_GET_MAX_ATTEMPTS = int(os.environ.get("BATCH_WRITE_MAX_ATTEMPTS", "8"))
+BATCH_GET_BASE_DELAY = float(os.environ.get("BATCH_WRITE_BASE_DELAY", "0.05"))
+
+dynamodb = boto3.resource("dynamodb")
+
+
+# --- 送り直し ---
+def attempt_id(event, body):
+    """1回の送信を表す ID (本文の attemptId か Idempotency-Key ヘッダー)。無ければ None、不正なら ValueError"""
+    value = body.get("attemptId")
+    if value is None:
+        headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+        value = headers.get("idempotency-key")
+    if value is not None and (not isinstance(value, str) or not value.strip() or len(value) > ATTEMPT_ID_MAX_LENGTH):
+        raise ValueError(f"attemptId must be a non-empty string of at most {ATTEMPT_ID_MAX_LENGTH} characters")
+    return value.strip() if value else None
+
+
+def attempt_log_id(user_id, attempt, part):
+    """送信の ID と、その中で何番目 (またはどの quizItem) の回答かから決まる logId"""
+    return str(uuid.uuid5(ATTEMPT_LOG_ID_NAMESPACE, f"{user_id}#{attempt}#{part}"))
+
+
+def existing_log_ids(table_name, log_ids):
+    """回答ログに既にある logId (送り直しで書き済みの行)。BatchGetItem で BATCH_GET_CHUNK 件ずつ読む"""
+    found = set()
+    for i in range(0, len(log_ids), BATCH_GET_CHUNK):
+        keys = [{"logId": log_id} for log_id in log_ids[i:i + BATCH_GET_CHUNK]]
+        # 直前の (失敗した) 送信で書いた行を確実に見るため強い整合性で読む
+        pending = {table_name: {"Keys": keys, "ProjectionExpression": "logId", "ConsistentRead": True}}
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY * (2 ** attempt)))
+            resp = dynamodb.meta.client.batch_get_item(RequestItems=pending)
+            found.update(it["logId"] for it in resp.get("Responses", {}).get(table_name, []))
+            pending = resp.get("UnprocessedKeys") or {}
+            if not pending:
+                break
+        else:
+            raise RuntimeError("BatchGetItem left keys unprocessed.")
+    return found
+
+
+# --- 集計 ---
+def _group(items, key):
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return groups
+
+
+def _mark_answered(question_id, user_id, answers):
+    """ユーザー x 質問の行を更新し、更新前の値を返す (attempts が無ければこのユーザーの初めての回答)"""
+    last = answers[-1]
+    resp = dynamodb.Table(ANSWERED_QUESTIONS_TABLE).update_item(
+        Key={"userId": user_id, "questionId": question_id},
+        UpdateExpression=(
+            "ADD attempts :n "
+            "SET firstAnsweredAt = if_not_exists(firstAnsweredAt, :t), lastAnsweredAt = :t, "
+            "lastIsCorrect = :c, lastSelectedChoiceId = :s"
+        ),
+        ExpressionAttributeValues={
+            ":n": len(answers), ":t": last["timestamp"], ":c": last["isCorrect"], ":s": last["selectedChoiceId"]
+        },
+        # 更新前の attempts が無ければ初回 (ADD は原子的なので同時の回答でも初回は1件だけ)
+        ReturnValues="UPDATED_OLD"
+    )
+    return resp.get("Attributes", {})
+
+
+def _previous_answers(items):
+    """(userId, questionId) -> 前回の回答 (_mark_answered の更新前の値)。数えられなければ None"""
+    groups = _group(items, lambda it: (it["userId"], it["questionId"]))
+    previous = {}
+    for (user_id, question_id), answers in groups.items():
+        previous[(user_id, question_id)] = None
+        if not ANSWERED_QUESTIONS_TABLE:
+            continue
+        try:
+            previous[(user_id, question_id)] = _mark_answered(question_id, user_id, answers)
+        except ClientError as e:
+            print(f"Answered marker update failed for {user_id}/{question_id}: {e}")
+    return previous
+
+
+def _update_stats(items, previous):
+    """
+    質問ごとの集計を ADD で更新する (同じ質問への回答はまとめて1回)。
+    失敗しても回答の記録は成功扱い (回答ログから backfillQuestionStatsFunction で作り直せる)
+    """
+    if not QUESTION_STATS_TABLE:
+        return
+    for question_id, answers in _group(items, lambda it: it["questionId"]).items():
+        try:
+            correct = sum(1 for it in answers if it["isCorrect"])
+            update = "ADD totalAnswers :n, correctAnswers :c SET lastAnsweredAt = :t"
+            values = {":n": len(answers), ":c": correct, ":t": answers[-1]["timestamp"]}
+            markers = [previous[(user_id, question_id)] for user_id in {it["userId"] for it in answers}]
+            if all(m is not None for m in markers):
+                update = "ADD totalAnswers :n, correctAnswers :c, uniqueAnswerers :u SET lastAnsweredAt = :t"
+                values[":u"] = sum(1 for m in markers if "attempts" not in m)
+            dynamodb.Table(QUESTION_STATS_TABLE).update_item(
+                Key={"questionId": question_id},
+                UpdateExpression=update,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            print(f"Stats update failed for {question_id}: {e}")
+
+
+def _update_choice_histogram(items):
+    """
+    quizItem の選択肢ごとの回数を ADD で増やす (選択肢は1行の中のトップレベル属性。ADD は入れ子の属性に使えない)。
+    失敗しても回答の記録は成功扱い (回答ログから backfillQuestionStatsFunction で作り直せる)
+    """
+    if not QUESTION_ITEM_STATS_TABLE:
+        return
+    with_item = [it for it in items if it.get("quizItemId")]
+    for (question_id, quiz_item_id), answers in _group(with_item, lambda it: (it["questionId"], it["quizItemId"])).items():
+        try:
+            choices = {}
+            for it in answers:
+                choice = CHOICE_ATTR_PREFIX + str(it["selectedChoiceId"])
+                choices[choice] = choices.get(choice, 0) + 1
+            names = {f"#c{i}": choice for i, choice in enumerate(choices)}
+            values = {":n": len(answers), ":c": sum(1 for it in answers if it["isCorrect"])}
+            values.update({f":c{i}": count for i, count in enumerate(choices.values())})
+            dynamodb.Table(QUESTION_ITEM_STATS_TABLE).update_item(
+                Key={"questionId": question_id, "quizItemId": quiz_item_id},
+                UpdateExpression="ADD answers :n, correctAnswers :c, " + ", ".join(f"{name} :c{i}" for i, name in enumerate(names)),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            print(f"Choice histogram update failed for {question_id}/{quiz_item_id}: {e}")
+
+
+def _local_date(timestamp):
+    """回答の timestamp (UTC の ISO 8601 + "Z") を集計のタイムゾーンの日付にする"""
+    return (datetime.fromisoformat(timestamp.rstrip("Z")) + timedelta(hours=STATS_UTC_OFFSET_HOURS)).date()
+
+
+def _week_key(day):
+    year, week, _ = day.isocalendar()
+    return f"w#{year}-W{week:02d}"
+
+
+def _update_user_buckets(items, previous):
+    """
+    ユーザーの通算・日・週の集計を ADD で更新する (同じ bucket への回答はまとめて1回)。
+    distinctQuestions は、この質問への前回の回答が同じ日 (週) に無ければ数える (前回の回答が分からなければ数えない)。
+    失敗しても回答の記録は成功扱い (回答ログから backfillUserStatsFunction で作り直せる)
+    """
+    if not USER_STATS_BUCKETS_TABLE:
+        return
+    buckets = {}
+    for (user_id, question_id), answers in _group(items, lambda it: (it["userId"], it["questionId"])).items():
+        prev = previous[(user_id, question_id)]
+        last_day = None
+        if prev and prev.get("lastAnsweredAt"):
+            last_day = _local_date(prev["lastAnsweredAt"])
+        # 同じ質問への回答はすべて同じ呼び出しの中 (= 同じ日) のもの
+        day = _local_date(answers[0]["timestamp"])
+        for bucket, distinct in (
+            ("all", prev is not None and "attempts" not in prev),
+            (f"d#{day.isoformat()}", prev is not None and last_day != day),
+            (_week_key(day), prev is not None and (last_day is None or _week_key(last_day) != _week_key(day))),
+        ):
+            counts = buckets.setdefault((user_id, bucket), {"answers": 0, "correctAnswers": 0, "distinctQuestions": 0, "known": True, "lastAnsweredAt": ""})
+            counts["answers"] += len(answers)
+            counts["correctAnswers"] += sum(1 for it in answers if it["isCorrect"])
+            counts["distinctQuestions"] += 1 if distinct else 0
+            counts["known"] = counts["known"] and prev is not None
+            counts["lastAnsweredAt"] = max(counts["lastAnsweredAt"], answers[-1]["timestamp"])
+
+    stats_table = dynamodb.Table(USER_STATS_BUCKETS_TABLE)
+    for (user_id, bucket), counts in buckets.items():
+        try:
+            update = "ADD answers :n, correctAnswers :c"
+            values = {":n": counts["answers"], ":c": counts["correctAnswers"]}
+            if counts["known"]:
+                update += ", distinctQuestions :d"
+                values[":d"] = counts["distinctQuestions"]
+            if bucket == "all":
+                update += " SET lastAnsweredAt = :t"
+                values[":t"] = counts["lastAnsweredAt"]
+            stats_table.update_item(
+                Key={"userId": user_id, "bucket": bucket},
+                UpdateExpression=update,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            print(f"User stats update failed for {user_id}/{bucket}: {e}")
+
+
+def record_aggregates(items):
+    """回答ログに付随する集計をまとめて更新する (1件でも複数件でも同じ)"""
+    previous = _previous_answers(items)
+    _update_stats(items, previous)
+    _update_choice_histogram(items)
+    _update_user_buckets(items, previous)
@@ -0,0 +1,124 @@
+# response_compression.py (Lambda レイヤー layers/common)
+# getQuestions / createQuestion / getQuestionDetail / getThreads のレスポンス圧縮。
+# Accept-Encoding に応じて gzip / brotli (モジュールがあれば) で圧縮し、base64 で返す。
+# REST API の場合は binaryMediaTypes に "*/*" を登録しておくこと (HTTP API は不要)。
+# API Gateway の圧縮 (minimumCompressionSize) や CloudFront で圧縮できる構成なら
+# COMPRESSION_ENABLED=false にしてそちらに任せる。
+#
+# レイヤーの python/ 以下は Lambda の /opt/python に展開され、そのまま import できる。
+import base64
+import gzip
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # brotli が無い環境では gzip のみ
+    brotli = None
+
+# false なら圧縮しない (API Gateway / CloudFront に任せる場合)
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+# これより小さい本文は圧縮しない (バイト)
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "5"))
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "QuizApp")
+
+
+def accepted_encodings(event: Dict[str, Any]) -> Dict[str, float]:
+    headers = {str(k).lower(): v for k, v in (event.get("headers") or {}).items()}
+    accepted: Dict[str, float] = {}
+    for part in (headers.get("accept-encoding") or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(event: Dict[str, Any]) -> Optional[str]:
+    accepted = accepted_encodings(event)
+    best, best_q = None, 0.0
+    # 同じ q なら brotli を優先する
+    for encoding in (["br"] if brotli is not None else []) + ["gzip"]:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def vary_on_encoding(headers: Dict[str, str]) -> Dict[str, str]:
+    """Vary に Accept-Encoding を足す (既にあればそのまま)"""
+    vary = headers.get("Vary", "")
+    names = [v.strip().lower() for v in vary.split(",") if v.strip()]
+    if "accept-encoding" in names or "*" in names:
+        return headers
+    return {**headers, "Vary": f"{vary}, Accept-Encoding" if names else "Accept-Encoding"}
+
+
+def emit_compression_metrics(encoding: str, raw_bytes: int, sent_bytes: int, cpu_ms: float) -> None:
+    """CloudWatch Embedded Metric Format でログに出す (閾値の調整用)"""
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["FunctionName", "Encoding"]],
+                "Metrics": [
+                    {"Name": "ResponseBytes", "Unit": "Bytes"},
+                    {"Name": "SentBytes", "Unit": "Bytes"},
+                    {"Name": "CompressionRatio", "Unit": "None"},
+                    {"Name": "CompressionCpuMs", "Unit": "Milliseconds"},
+                ],
+            }],
+        },
+        "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+        "Encoding": encoding,
+        "ResponseBytes": raw_bytes,
+        "SentBytes": sent_bytes,
+        "CompressionRatio": round(raw_bytes / sent_bytes, 3) if sent_bytes else 1.0,
+        "CompressionCpuMs": round(cpu_ms, 3),
+    }))
+
+
+def maybe_compress(resp: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    body = resp.get("body")
+    headers = resp.get("headers") or {}
+    if not isinstance(body, str) or resp.get("isBase64Encoded") or "Content-Encoding" in headers:
+        return resp
+    raw = body.encode("utf-8")
+    if not COMPRESSION_ENABLED or len(raw) < COMPRESSION_MIN_BYTES:
+        return resp
+    # ここから先は Accept-Encoding によって返す表現が変わるので、圧縮しなかったときも Vary を付ける
+    # (付けないとキャッシュが圧縮した表現を gzip 非対応のクライアントに返しうる)
+    headers = vary_on_encoding(headers)
+    encoding = negotiate_encoding(event)
+    if encoding is None:
+        return {**resp, "headers": headers}
+
+    started = time.process_time()
+    if encoding == "br":
+        data = brotli.compress(raw, quality=COMPRESSION_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(raw, compresslevel=COMPRESSION_GZIP_LEVEL)
+    cpu_ms = (time.process_time() - started) * 1000
+    if len(data) >= len(raw):
+        return {**resp, "headers": headers}
+    # メトリクスは実際に圧縮して返したときだけ出す (小さい本文ごとにログを増やさない)
+    emit_compression_metrics(encoding, len(raw), len(data), cpu_ms)
+
+    headers = {**headers, "Content-Encoding": encoding}
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        # 強い ETag は表現 (符号化) ごとに変える
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    return {**resp, "headers": headers, "body": base64.b64encode(data).decode("ascii"), "isBase64Encoded": True}
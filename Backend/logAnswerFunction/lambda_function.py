@@ -1,58 +1,162 @@
-{\rtf1\ansi\ansicpg932\cocoartf2865
-\cocoatextscaling0\cocoaplatform0{\fonttbl\f0\fnil\fcharset0 Menlo-Regular;}
-{\colortbl;\red255\green255\blue255;\red157\green0\blue210;\red255\green255\blue255;\red45\green45\blue45;
-\red0\green0\blue0;\red144\green1\blue18;\red0\green0\blue255;\red101\green76\blue29;\red0\green0\blue109;
-\red15\green112\blue1;\red19\green118\blue70;\red32\green108\blue135;}
-{\*\expandedcolortbl;;\cssrgb\c68627\c0\c85882;\cssrgb\c100000\c100000\c100000;\cssrgb\c23137\c23137\c23137;
-\cssrgb\c0\c0\c0;\cssrgb\c63922\c8235\c8235;\cssrgb\c0\c0\c100000;\cssrgb\c47451\c36863\c14902;\cssrgb\c0\c6275\c50196;
-\cssrgb\c0\c50196\c0;\cssrgb\c3529\c52549\c34510;\cssrgb\c14902\c49804\c60000;}
-\paperw11900\paperh16840\margl1440\margr1440\vieww11520\viewh8400\viewkind0
-\deftab720
-\pard\pardeftab720\partightenfactor0
-
-\f0\fs24 \cf2 \cb3 \expnd0\expndtw0\kerning0
-\outl0\strokewidth0 \strokec2 import\cf4 \strokec4  json\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  boto3\cb1 \
-\cf2 \cb3 \strokec2 import\cf4 \strokec4  uuid\cb1 \
-\cf2 \cb3 \strokec2 from\cf4 \strokec4  datetime \cf2 \strokec2 import\cf4 \strokec4  datetime\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3 dynamodb \strokec5 =\strokec4  boto3.resource(\cf6 \strokec6 'dynamodb'\cf4 \strokec4 )\cb1 \
-\cb3 table \strokec5 =\strokec4  dynamodb.Table(\cf6 \strokec6 'AnswersLog'\cf4 \strokec4 )\cb1 \
-\
-\pard\pardeftab720\partightenfactor0
-\cf7 \cb3 \strokec7 def\cf4 \strokec4  \cf8 \strokec8 lambda_handler\cf4 \strokec4 (\cf9 \strokec9 event\cf4 \strokec4 , \cf9 \strokec9 context\cf4 \strokec4 ):\cb1 \
-\pard\pardeftab720\partightenfactor0
-\cf4 \cb3     \cf2 \strokec2 try\cf4 \strokec4 :\cb1 \
-\cb3         body \strokec5 =\strokec4  json.loads(event[\cf6 \strokec6 'body'\cf4 \strokec4 ])\cb1 \
-\
-\cb3         \cf10 \strokec10 # \uc0\u24517 \u38920 \u38917 \u30446 \u12434 \u12481 \u12455 \u12483 \u12463 \cf4 \cb1 \strokec4 \
-\cb3         required_fields \strokec5 =\strokec4  [\cf6 \strokec6 'questionId'\cf4 \strokec4 , \cf6 \strokec6 'userId'\cf4 \strokec4 , \cf6 \strokec6 'selectedChoiceId'\cf4 \strokec4 , \cf6 \strokec6 'isCorrect'\cf4 \strokec4 ]\cb1 \
-\cb3         \cf2 \strokec2 if\cf4 \strokec4  \cf7 \strokec7 not\cf4 \strokec4  \cf8 \strokec8 all\cf4 \strokec4 (field \cf2 \strokec2 in\cf4 \strokec4  body \cf2 \strokec2 for\cf4 \strokec4  field \cf2 \strokec2 in\cf4 \strokec4  required_fields):\cb1 \
-\cb3             \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3                 \cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 400\cf4 \strokec4 ,\cb1 \
-\cb3                 \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'error'\cf4 \strokec4 : \cf6 \strokec6 'Missing required parameters'\cf4 \strokec4 \})\cb1 \
-\cb3             \}\cb1 \
-\
-\cb3         item \strokec5 =\strokec4  \{\cb1 \
-\cb3             \cf6 \strokec6 'logId'\cf4 \strokec4 : \cf12 \strokec12 str\cf4 \strokec4 (uuid.uuid4()), \cf10 \strokec10 # \uc0\u12518 \u12491 \u12540 \u12463 \u12394 ID\u12434 \u20027 \u12461 \u12540 \u12392 \u12375 \u12390 \u36861 \u21152 \cf4 \cb1 \strokec4 \
-\cb3             \cf6 \strokec6 'questionId'\cf4 \strokec4 : body[\cf6 \strokec6 'questionId'\cf4 \strokec4 ],\cb1 \
-\cb3             \cf6 \strokec6 'userId'\cf4 \strokec4 : body[\cf6 \strokec6 'userId'\cf4 \strokec4 ],\cb1 \
-\cb3             \cf6 \strokec6 'selectedChoiceId'\cf4 \strokec4 : body[\cf6 \strokec6 'selectedChoiceId'\cf4 \strokec4 ],\cb1 \
-\cb3             \cf6 \strokec6 'isCorrect'\cf4 \strokec4 : body[\cf6 \strokec6 'isCorrect'\cf4 \strokec4 ],\cb1 \
-\cb3             \cf6 \strokec6 'timestamp'\cf4 \strokec4 : datetime.utcnow().isoformat() \strokec5 +\strokec4  \cf6 \strokec6 "Z"\cf4 \cb1 \strokec4 \
-\cb3         \}\cb1 \
-\
-\cb3         table.put_item(\cf9 \strokec9 Item\cf4 \strokec5 =\strokec4 item)\cb1 \
-\
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 201\cf4 \strokec4 ,\cb1 \
-\cb3             \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'message'\cf4 \strokec4 : \cf6 \strokec6 'Answer logged successfully'\cf4 \strokec4 \})\cb1 \
-\cb3         \}\cb1 \
-\cb3     \cf2 \strokec2 except\cf4 \strokec4  \cf12 \strokec12 Exception\cf4 \strokec4  \cf2 \strokec2 as\cf4 \strokec4  e:\cb1 \
-\cb3         \cf8 \strokec8 print\cf4 \strokec4 (\cf7 \strokec7 f\cf6 \strokec6 "Error: \cf7 \strokec7 \{\cf4 \strokec4 e\cf7 \strokec7 \}\cf6 \strokec6 "\cf4 \strokec4 )\cb1 \
-\cb3         \cf2 \strokec2 return\cf4 \strokec4  \{\cb1 \
-\cb3             \cf6 \strokec6 'statusCode'\cf4 \strokec4 : \cf11 \strokec11 500\cf4 \strokec4 ,\cb1 \
-\cb3             \cf6 \strokec6 'body'\cf4 \strokec4 : json.dumps(\{\cf6 \strokec6 'error'\cf4 \strokec4 : \cf12 \strokec12 str\cf4 \strokec4 (e)\})\cb1 \
-\cb3         \}\cb1 \
-}
\ No newline at end of file
+import json
+import os
+import boto3
+import uuid
+import random
+import time
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+# Lambda レイヤー (Backend/layers/common) の共通モジュール。集計のテーブル (QUESTION_STATS_TABLE など) もそちらで読む
+import answer_log
+
+dynamodb = boto3.resource('dynamodb')
+table = dynamodb.Table(os.environ.get('ANSWERS_TABLE', 'AnswersLog'))
+
+# POST .../batch で一度に記録できる回答の数
+BATCH_MAX_ANSWERS = int(os.environ.get('BATCH_MAX_ANSWERS', '100'))
+# BatchWriteItem の1回あたりの上限 (DynamoDB の仕様)
+BATCH_WRITE_CHUNK = 25
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get('BATCH_WRITE_MAX_ATTEMPTS', '8'))
+BATCH_WRITE_BASE_DELAY = float(os.environ.get('BATCH_WRITE_BASE_DELAY', '0.05'))
+
+
+def _write_chunk(requests):
+    """BatchWriteItem を1チャンク (25件以下) 書く。UnprocessedItems は指数バックオフ (ジッター付き) で書き直す"""
+    pending = requests
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY * (2 ** attempt)))
+        try:
+            resp = dynamodb.meta.client.batch_write_item(RequestItems={table.name: pending})
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'):
+                raise
+            continue
+        pending = (resp.get('UnprocessedItems') or {}).get(table.name) or []
+        if not pending:
+            return
+    raise RuntimeError(f"BatchWriteItem left {len(pending)} answers unprocessed.")
+
+
+def _validate_batch(body, attempt_id=None):
+    """
+    POST .../batch の本文を回答ログの行のリストにする。不正なら ValueError (1件も書かない)。
+    attempt_id があれば logId を (userId, attempt_id, 何番目の回答か) から決める (送り直しても同じ logId)
+    """
+    user_id = body.get('userId')
+    if not isinstance(user_id, str) or not user_id:
+        raise ValueError('userId is required')
+    answers = body.get('answers')
+    if not isinstance(answers, list) or not answers:
+        raise ValueError('answers must be a non-empty array')
+    if len(answers) > BATCH_MAX_ANSWERS:
+        raise ValueError(f'answers accepts at most {BATCH_MAX_ANSWERS} entries')
+
+    # 1回の呼び出しの回答は同じ時刻で記録する
+    timestamp = datetime.utcnow().isoformat() + "Z"
+    items = []
+    for i, answer in enumerate(answers):
+        if not isinstance(answer, dict):
+            raise ValueError(f'answers[{i}] must be an object')
+        # 質問 (クイズ) 1つ分の回答なら questionId は本文の先頭に1回だけでよい
+        question_id = answer.get('questionId', body.get('questionId'))
+        if not isinstance(question_id, str) or not question_id:
+            raise ValueError(f'answers[{i}].questionId is required')
+        if answer.get('selectedChoiceId') in (None, ''):
+            raise ValueError(f'answers[{i}].selectedChoiceId is required')
+        if not isinstance(answer.get('isCorrect'), bool):
+            raise ValueError(f'answers[{i}].isCorrect must be a boolean')
+        if attempt_id:
+            log_id = answer_log.attempt_log_id(user_id, attempt_id, i)
+        else:
+            log_id = str(uuid.uuid4())
+        item = {
+            'logId': log_id,
+            'questionId': question_id,
+            'userId': user_id,
+            'selectedChoiceId': answer['selectedChoiceId'],
+            'isCorrect': answer['isCorrect'],
+            'timestamp': timestamp
+        }
+        if answer.get('quizItemId'):
+            item['quizItemId'] = str(answer['quizItemId'])
+        items.append(item)
+    return items
+
+
+def _log_batch(event, body):
+    """
+    25件ずつ書き、書けたチャンクごとに集計を更新する (途中で失敗しても、書いた回答は集計に入っている)。
+    attemptId 付きなら送り直しで書き済みの回答を読み飛ばすので、失敗した後に同じ本文で送り直してよい
+    """
+    try:
+        attempt_id = answer_log.attempt_id(event, body)
+        items = _validate_batch(body, attempt_id)
+    except ValueError as e:
+        return {'statusCode': 400, 'body': json.dumps({'error': str(e)})}
+
+    skipped = 0
+    for i in range(0, len(items), BATCH_WRITE_CHUNK):
+        chunk = items[i:i + BATCH_WRITE_CHUNK]
+        if attempt_id:
+            existing = answer_log.existing_log_ids(table.name, [it['logId'] for it in chunk])
+            skipped += len(existing)
+            chunk = [it for it in chunk if it['logId'] not in existing]
+        if not chunk:
+            continue
+        _write_chunk([{'PutRequest': {'Item': item}} for item in chunk])
+        answer_log.record_aggregates(chunk)
+
+    return {
+        'statusCode': 201,
+        'body': json.dumps({'message': 'Answers logged successfully', 'logged': len(items), 'alreadyLogged': skipped})
+    }
+
+
+def _is_batch_request(event):
+    path = event.get('resource') or event.get('path') or event.get('rawPath') or ''
+    return path.rstrip('/').endswith('/batch')
+
+
+def lambda_handler(event, context):
+    try:
+        body = json.loads(event['body'])
+
+        # 1回のクイズの回答をまとめて記録する: POST .../batch {"userId", "questionId"?, "attemptId"?, "answers": [...]}
+        if _is_batch_request(event):
+            return _log_batch(event, body)
+
+        # 必須項目をチェック
+        required_fields = ['questionId', 'userId', 'selectedChoiceId', 'isCorrect']
+        if not all(field in body for field in required_fields):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'Missing required parameters'})
+            }
+
+        item = {
+            'logId': str(uuid.uuid4()), # ユニークなIDを主キーとして追加
+            'questionId': body['questionId'],
+            'userId': body['userId'],
+            'selectedChoiceId': body['selectedChoiceId'],
+            'isCorrect': body['isCorrect'],
+            'timestamp': datetime.utcnow().isoformat() + "Z"
+        }
+        # 任意: どの quizItem への回答か (選択肢の分布と項目分析に使う)
+        if body.get('quizItemId'):
+            item['quizItemId'] = str(body['quizItemId'])
+
+        table.put_item(Item=item)
+        answer_log.record_aggregates([item])
+
+        return {
+            'statusCode': 201,
+            'body': json.dumps({'message': 'Answer logged successfully'})
+        }
+    except Exception as e:
+        print(f"Error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
@@ -31,21 +31,44 @@ except KeyError as e:
     logger.error(f"環境変数が設定されていません: {e}")
     raise Exception(f"環境変数の設定エラー: {e}")
 
+# API 経由でクライアントが申告した score を受け付けるか (既定は受け付ける。受け付けるたびに非推奨の警告を出す)。
+# 今の版のアプリは submitQuizAttemptFunction に送り、そちらが採点して直接 (非同期で) 呼ぶ。
+# 古いアプリが使われなくなったら false にする
+ACCEPT_CLIENT_SCORES = os.environ.get('ACCEPT_CLIENT_SCORES', 'true').lower() == 'true'
+
 questions_table = dynamodb.Table(QUESTIONS_TABLE_NAME)
 users_table = dynamodb.Table(USERS_TABLE_NAME)
 # ★ 2. devices_table を初期化
 devices_table = dynamodb.Table(DEVICES_TABLE_NAME)
 
+def _is_api_request(event):
+    """API Gateway 経由の呼び出しか。直接の呼び出し (lambda:InvokeFunction の権限が要る) には requestContext が無い"""
+    return any(k in event for k in ('requestContext', 'httpMethod', 'routeKey'))
+
+
 def lambda_handler(event, context):
     logger.info(f"Received event: {json.dumps(event)}")
 
     try:
         # 1. パラメータの取得
-        body = json.loads(event.get('body', '{}'))
-        score = body.get('score')
-        total_questions = body.get('totalQuestions')
-        question_id = event.get('pathParameters', {}).get('questionId')
-        solver_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
+        # 採点済みかどうかは呼ばれ方で決める (本文やイベントの項目はクライアントが付けられるので見ない)
+        graded = not _is_api_request(event)
+        if graded:
+            # submitQuizAttemptFunction からの非同期呼び出し (サーバーで採点済み。作成者とタイトルも付いてくる)
+            score = event.get('score')
+            total_questions = event.get('totalQuestions')
+            question_id = event.get('questionId')
+            solver_id = event.get('solverId')
+        else:
+            if not ACCEPT_CLIENT_SCORES:
+                logger.info("Client-reported scores are disabled. No notification sent.")
+                return {'statusCode': 403, 'body': json.dumps({'error': 'Submit the attempt to be graded instead.'})}
+            logger.warning("Deprecated: accepting a client-reported score. Clients should POST /questions/{questionId}/attempts instead.")
+            body = json.loads(event.get('body', '{}'))
+            score = body.get('score')
+            total_questions = body.get('totalQuestions')
+            question_id = event.get('pathParameters', {}).get('questionId')
+            solver_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
 
         if not all([score is not None, total_questions is not None, question_id, solver_id]):
             raise ValueError("Missing required parameters (score, totalQuestions, questionId, or solverId)")
@@ -57,12 +80,19 @@ def lambda_handler(event, context):
 
         logger.info("Perfect score achieved! Processing notification.")
 
-        # 3. 質問情報 (作成者ID, タイトル) を取得
-        question_item = questions_table.get_item(Key={'questionId': question_id}).get('Item')
-        if not question_item:
-            raise Exception("Question not found")
-        author_id = question_item.get('authorId')
-        question_title = question_item.get('title', '無題')
+        # 3. 質問情報 (作成者ID, タイトル) を取得 (採点済みの呼び出しなら付いてきたものを使う)
+        if graded and event.get('authorId'):
+            author_id = event['authorId']
+            question_title = event.get('title') or '無題'
+        else:
+            question_item = questions_table.get_item(
+                Key={'questionId': question_id},
+                ProjectionExpression='authorId, title'
+            ).get('Item')
+            if not question_item:
+                raise Exception("Question not found")
+            author_id = question_item.get('authorId')
+            question_title = question_item.get('title', '無題')
         
         # もし解答者=作成者なら通知しない
         if solver_id == author_id:
@@ -129,7 +159,7 @@ def lambda_handler(event, context):
         for device in devices:
             device_endpoint_arn = device.get('endpointArn')
             if not device_endpoint_arn:
-                logger.warning(f"デバイスにendpointArnがありません。スキップします。")
+                logger.warning("デバイスにendpointArnがありません。スキップします。")
                 failure_count += 1
                 continue
 
@@ -0,0 +1,314 @@
+# lambda_function.py for submitQuizAttemptFunction
+# クイズ1回分の回答を受け取り、サーバー側で採点して記録する。
+#   POST /questions/{questionId}/attempts
+#   {"answers": {"<quizItemId>": "<choiceId>", ...}, "attemptId"?: "..."}
+#   または {"answers": [{"quizItemId": "...", "selectedChoiceId": "..."}, ...]}
+# 正解は quizItems[].correctAnswerId (コンテナ内にキャッシュした解答キー) と照らし合わせる。
+# 回答ログ (と QUIZ_ATTEMPTS_TABLE があれば受験の記録) は1回の BatchWriteItem で書き、
+# 集計は logAnswerFunction と同じ共通モジュール (レイヤーの answer_log) で更新する。
+# attemptId (または Idempotency-Key ヘッダー) があれば logId をそこから決め、書き済みの回答は書かず集計もしない
+# (送り直しても二重に記録されない。logAnswerFunction の一括記録と同じ方法)。
+# 全問正解なら onQuizCompleteFunction を非同期で呼ぶ (作成者とタイトルを渡すので、向こうで質問を読み直さない)。
+import json
+import os
+import random
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+# Lambda レイヤー (Backend/layers/common) の共通モジュール。集計のテーブル (QUESTION_STATS_TABLE など) もそちらで読む
+import answer_log
+
+QUESTIONS_TABLE = os.environ.get("QUESTIONS_TABLE") or os.environ.get("QUESTIONS_TABLE_NAME")
+ANSWERS_TABLE = os.environ.get("ANSWERS_TABLE", "AnswersLog")
+# 受験ごとの記録 (PK: userId, SK: attemptId)。未設定なら回答ログだけを書く
+QUIZ_ATTEMPTS_TABLE = os.environ.get("QUIZ_ATTEMPTS_TABLE")
+# 全問正解の通知 (onQuizCompleteFunction の関数名か ARN)。未設定なら呼ばない
+ON_QUIZ_COMPLETE_FUNCTION = os.environ.get("ON_QUIZ_COMPLETE_FUNCTION")
+
+# 解答キーをコンテナ内に持つ件数と秒数 (質問は作成後に編集されないので、削除の反映が遅れるだけ)
+ANSWER_KEY_CACHE_SIZE = int(os.environ.get("ANSWER_KEY_CACHE_SIZE", "1024"))
+ANSWER_KEY_CACHE_TTL = float(os.environ.get("ANSWER_KEY_CACHE_TTL", "300"))
+
+# BatchWriteItem の1回あたりの上限 (DynamoDB の仕様)
+BATCH_WRITE_CHUNK = 25
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get("BATCH_WRITE_MAX_ATTEMPTS", "8"))
+BATCH_WRITE_BASE_DELAY = float(os.environ.get("BATCH_WRITE_BASE_DELAY", "0.05"))
+
+CORS_ORIGIN = os.environ.get("CORS_ORIGIN", "*")
+
+dynamodb = boto3.resource("dynamodb")
+lambda_client = boto3.client("lambda")
+
+
+def _resp(status: int, body: Any) -> Dict[str, Any]:
+    return {
+        "statusCode": status,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": CORS_ORIGIN,
+        },
+        "body": json.dumps(body, ensure_ascii=False),
+    }
+
+
+# --- 解答キー ---
+class _LRUCache:
+    """コンテナ内 (ウォームスタート間で共有) の小さな LRU キャッシュ"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+_answer_keys = _LRUCache(ANSWER_KEY_CACHE_SIZE)
+
+
+def _load_answer_key(question_id: str) -> Optional[Dict[str, Any]]:
+    """{"authorId", "title", "items": [(quizItemId, correctAnswerId, {choiceId, ...}), ...]}。質問が無ければ None"""
+    item = dynamodb.Table(QUESTIONS_TABLE).get_item(
+        Key={"questionId": question_id},
+        ProjectionExpression="authorId, title, quizItems, quizItemsZ",
+    ).get("Item")
+    if item is None:
+        return None
+    quiz_items = item.get("quizItems") or []
+    packed = item.get("quizItemsZ")
+    if packed is not None:
+        quiz_items = json.loads(zlib.decompress(bytes(getattr(packed, "value", packed))))
+    return {
+        "authorId": item.get("authorId"),
+        "title": item.get("title"),
+        "items": [
+            (qi["id"], qi.get("correctAnswerId"), {c["id"] for c in qi.get("choices") or []})
+            for qi in quiz_items
+        ],
+    }
+
+
+def _answer_key(question_id: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    cached = _answer_keys.get(question_id)
+    if not refresh and cached is not None and time.monotonic() - cached[0] < ANSWER_KEY_CACHE_TTL:
+        return cached[1]
+    key = _load_answer_key(question_id)
+    if key is None:
+        _answer_keys.pop(question_id)
+    else:
+        _answer_keys.put(question_id, (time.monotonic(), key))
+    return key
+
+
+def _submitted_choices(body: Dict[str, Any]) -> Dict[str, str]:
+    """quizItemId -> 選んだ choiceId。不正なら ValueError"""
+    answers = body.get("answers")
+    if isinstance(answers, dict):
+        pairs = list(answers.items())
+    elif isinstance(answers, list):
+        pairs = []
+        for i, answer in enumerate(answers):
+            if not isinstance(answer, dict):
+                raise ValueError(f"answers[{i}] must be an object.")
+            pairs.append((answer.get("quizItemId"), answer.get("selectedChoiceId")))
+    else:
+        raise ValueError("answers must be an object or an array.")
+    choices: Dict[str, str] = {}
+    for quiz_item_id, choice_id in pairs:
+        if not isinstance(quiz_item_id, str) or not quiz_item_id:
+            raise ValueError("Each answer needs a quizItemId.")
+        if not isinstance(choice_id, str) or not choice_id:
+            raise ValueError(f"answers[{quiz_item_id}] must be a choice id.")
+        if quiz_item_id in choices:
+            raise ValueError(f"quizItem {quiz_item_id} is answered more than once.")
+        choices[quiz_item_id] = choice_id
+    if not choices:
+        raise ValueError("answers must not be empty.")
+    return choices
+
+
+def _unknown_answers(key: Dict[str, Any], choices: Dict[str, str]) -> List[str]:
+    valid = {item_id: choice_ids for item_id, _, choice_ids in key["items"]}
+    return [item_id for item_id, choice_id in choices.items() if choice_id not in valid.get(item_id, ())]
+
+
+def _grade(key: Dict[str, Any], choices: Dict[str, str]) -> List[Dict[str, Any]]:
+    """quizItems の順に採点する。答えていない項目は不正解として数える"""
+    results = []
+    for item_id, correct_id, _ in key["items"]:
+        selected = choices.get(item_id)
+        results.append({
+            "quizItemId": item_id,
+            "selectedChoiceId": selected,
+            "correctAnswerId": correct_id,
+            "isCorrect": selected is not None and selected == correct_id,
+        })
+    return results
+
+
+# --- 書き込み ---
+def _write_chunk(requests: Dict[str, List[Dict[str, Any]]]) -> None:
+    """BatchWriteItem を1回分 (全テーブルで25件以下) 書く。UnprocessedItems は指数バックオフ (ジッター付き) で書き直す"""
+    pending = requests
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY * (2 ** attempt)))
+        try:
+            resp = dynamodb.meta.client.batch_write_item(RequestItems=pending)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"):
+                raise
+            continue
+        pending = resp.get("UnprocessedItems") or {}
+        if not pending:
+            return
+    raise RuntimeError(f"BatchWriteItem left {sum(len(v) for v in pending.values())} requests unprocessed.")
+
+
+def _write_attempt(logs: List[Dict[str, Any]], attempt: Optional[Dict[str, Any]]) -> None:
+    """回答ログと受験の記録を BatchWriteItem で書く (1回のクイズは通常 25 件以下なので1回で済む)"""
+    requests = [(ANSWERS_TABLE, {"PutRequest": {"Item": log}}) for log in logs]
+    if attempt is not None:
+        requests.append((QUIZ_ATTEMPTS_TABLE, {"PutRequest": {"Item": attempt}}))
+    for i in range(0, len(requests), BATCH_WRITE_CHUNK):
+        chunk: Dict[str, List[Dict[str, Any]]] = {}
+        for table_name, request in requests[i:i + BATCH_WRITE_CHUNK]:
+            chunk.setdefault(table_name, []).append(request)
+        _write_chunk(chunk)
+
+
+# --- 全問正解の通知 ---
+def _notify_perfect_score(question_id: str, user_id: str, key: Dict[str, Any], score: int, total: int) -> None:
+    """onQuizCompleteFunction を非同期で呼ぶ。失敗しても受験の記録は成功扱い"""
+    if not ON_QUIZ_COMPLETE_FUNCTION or user_id == key.get("authorId"):
+        return
+    payload = {
+        "source": "submitQuizAttempt",
+        "questionId": question_id,
+        "solverId": user_id,
+        "score": score,
+        "totalQuestions": total,
+        "authorId": key.get("authorId"),
+        "title": key.get("title"),
+    }
+    try:
+        lambda_client.invoke(
+            FunctionName=ON_QUIZ_COMPLETE_FUNCTION,
+            InvocationType="Event",
+            Payload=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        )
+    except ClientError as e:
+        print(f"[submit_attempt] could not invoke {ON_QUIZ_COMPLETE_FUNCTION} for {question_id}: {e}")
+
+
+def lambda_handler(event, context):
+    if not QUESTIONS_TABLE:
+        return _resp(500, {"message": "Server misconfigured: QUESTIONS_TABLE is not set."})
+
+    try:
+        claims = (((event or {}).get("requestContext") or {}).get("authorizer") or {}).get("claims") or {}
+        user_id = claims.get("sub")
+        if not user_id:
+            return _resp(401, {"message": "Unauthorized."})
+        question_id = ((event or {}).get("pathParameters") or {}).get("questionId")
+        if not question_id:
+            return _resp(400, {"message": "questionId is required in path parameters."})
+        try:
+            body = json.loads(event.get("body") or "{}")
+            if not isinstance(body, dict):
+                raise ValueError("Body must be a JSON object.")
+            choices = _submitted_choices(body)
+            client_attempt_id = answer_log.attempt_id(event, body)
+        except json.JSONDecodeError:
+            return _resp(400, {"message": "Body must be valid JSON."})
+        except ValueError as e:
+            return _resp(400, {"message": str(e)})
+
+        key = _answer_key(question_id)
+        if key is not None and _unknown_answers(key, choices):
+            # キャッシュが古い可能性があるので一度だけ読み直す
+            key = _answer_key(question_id, refresh=True)
+        if key is None:
+            return _resp(404, {"message": "Question not found."})
+        unknown = _unknown_answers(key, choices)
+        if unknown:
+            return _resp(400, {"message": f"Unknown quizItem or choice: {', '.join(sorted(unknown))}"})
+
+        results = _grade(key, choices)
+        score = sum(1 for r in results if r["isCorrect"])
+        total = len(results)
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        attempt_id = client_attempt_id or f"{timestamp}#{uuid.uuid4().hex[:12]}"
+        logs = [
+            {
+                # 送り直しで同じ行になるよう、クライアントの attemptId と quizItemId から決める
+                "logId": answer_log.attempt_log_id(user_id, attempt_id, r["quizItemId"]) if client_attempt_id else str(uuid.uuid4()),
+                "questionId": question_id,
+                "userId": user_id,
+                "quizItemId": r["quizItemId"],
+                "selectedChoiceId": r["selectedChoiceId"],
+                "isCorrect": r["isCorrect"],
+                "timestamp": timestamp,
+                "attemptId": attempt_id,
+            }
+            for r in results
+            if r["selectedChoiceId"] is not None
+        ]
+        attempt = None
+        if QUIZ_ATTEMPTS_TABLE:
+            attempt = {
+                "userId": user_id,
+                "attemptId": attempt_id,
+                "questionId": question_id,
+                "score": score,
+                "totalQuestions": total,
+                "answers": choices,
+                "submittedAt": timestamp,
+            }
+        already_logged = 0
+        if client_attempt_id and logs:
+            existing = answer_log.existing_log_ids(ANSWERS_TABLE, [log["logId"] for log in logs])
+            already_logged = len(existing)
+            logs = [log for log in logs if log["logId"] not in existing]
+        # 受験の記録は同じキーへの上書きなので、送り直しでも書く (前回書けていなかった場合のため)
+        _write_attempt(logs, attempt)
+        if logs:
+            answer_log.record_aggregates(logs)
+            # 前回の送信で回答を書き終えていれば、通知も済んでいるものとして送らない
+            if total > 0 and score == total:
+                _notify_perfect_score(question_id, user_id, key, score, total)
+
+        return _resp(201, {
+            "attemptId": attempt_id,
+            "alreadyLogged": already_logged,
+            "questionId": question_id,
+            "score": score,
+            "totalQuestions": total,
+            "perfect": total > 0 and score == total,
+            "results": results,
+        })
+    except ClientError as e:
+        print(f"[submit_attempt] DynamoDB error: {e}")
+        return _resp(500, {"message": "Internal server error."})
+    except Exception as e:
+        print(f"[submit_attempt] unexpected error: {e}")
+        return _resp(500, {"message": "Internal server error."})
@@ -0,0 +1,108 @@
+"""
+Backend の Lambda 関数のテスト。
+
+各関数は lambda_function.py という同じ名前の独立したファイルなので、パスを指定して読み込む。
+モジュールは import 時に環境変数を読み boto3 のリソースを作るため、moto の mock_aws の中で
+環境変数を設定してから読み込む (テストごとに新しく読み込むのでコンテナ内のキャッシュも毎回空)。
+Lambda レイヤー (layers/common/python) の共通モジュールも、関数と一緒に読み込み直す。
+
+    python -m pytest Backend/tests
+"""
+import base64
+import gzip
+import importlib.util
+import json
+import os
+import sys
+
+import boto3
+import pytest
+from moto import mock_aws
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGION = "ap-northeast-1"
+
+# Lambda では /opt/python に展開されるレイヤーのモジュール
+LAYER_DIR = os.path.join(BACKEND_DIR, "layers", "common", "python")
+sys.path.insert(0, LAYER_DIR)
+LAYER_MODULES = [name[:-3] for name in os.listdir(LAYER_DIR) if name.endswith(".py")]
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        yield
+
+
+@pytest.fixture
+def load_lambda(aws, monkeypatch):
+    """load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions") -> モジュール"""
+
+    def load(function_dir, **env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        for name in LAYER_MODULES:
+            sys.modules.pop(name, None)
+        path = os.path.join(BACKEND_DIR, function_dir, "lambda_function.py")
+        spec = importlib.util.spec_from_file_location(f"{function_dir}_lambda", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    return load
+
+
+@pytest.fixture
+def make_table(aws):
+    """make_table("Answers", "logId", indexes=[("UserIndex", "userId", "timestamp")]) -> Table リソース"""
+
+    def make(name, pk, sk=None, indexes=()):
+        key_schema = [{"AttributeName": pk, "KeyType": "HASH"}]
+        attributes = {pk: "S"}
+        if sk:
+            key_schema.append({"AttributeName": sk, "KeyType": "RANGE"})
+            attributes[sk] = "S"
+        kwargs = {}
+        if indexes:
+            gsis = []
+            for index_name, index_pk, index_sk in indexes:
+                index_keys = [{"AttributeName": index_pk, "KeyType": "HASH"}]
+                attributes[index_pk] = "S"
+                if index_sk:
+                    index_keys.append({"AttributeName": index_sk, "KeyType": "RANGE"})
+                    attributes[index_sk] = "S"
+                gsis.append({"IndexName": index_name, "KeySchema": index_keys, "Projection": {"ProjectionType": "ALL"}})
+            kwargs["GlobalSecondaryIndexes"] = gsis
+        boto3.client("dynamodb").create_table(
+            TableName=name,
+            KeySchema=key_schema,
+            AttributeDefinitions=[{"AttributeName": a, "AttributeType": t} for a, t in attributes.items()],
+            BillingMode="PAY_PER_REQUEST",
+            **kwargs,
+        )
+        return boto3.resource("dynamodb").Table(name)
+
+    return make
+
+
+def response_body(resp):
+    """_resp の本文 (圧縮されていれば戻す)"""
+    body = resp["body"]
+    if resp.get("isBase64Encoded"):
+        body = gzip.decompress(base64.b64decode(body)).decode("utf-8")
+    return json.loads(body) if body else None
+
+
+class FakeContext:
+    """Lambda の context の代わり。remaining_ms を減らせば引き継ぎの経路を通せる"""
+
+    invoked_function_arn = "arn:aws:lambda:ap-northeast-1:123456789012:function:test"
+
+    def __init__(self, remaining_ms=900000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
@@ -0,0 +1,210 @@
+"""cascadeDeleteQuestionFunction の段階的な削除 (フェーズと開始キーの引き継ぎ、ユーザー集計の作り直し)"""
+import json
+from decimal import Decimal
+
+import pytest
+
+from conftest import FakeContext
+
+ENV = {
+    "TAG_INDEX_TABLE": "TagIndex",
+    "SHARE_CODES_TABLE": "ShareCodes",
+    "BOOKMARKS_TABLE": "Bookmarks",
+    "BOOKMARKS_QUESTION_INDEX_NAME": "QuestionIndex",
+    "ANSWERS_TABLE": "AnswersLog",
+    "ANSWERS_QUESTION_INDEX_NAME": "QuestionIndex",
+    "QUESTION_STATS_TABLE": "QuestionStats",
+    "ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions",
+    "USER_STATS_BACKFILL_FUNCTION": "backfillUserStats",
+    "QUERY_PAGE_SIZE": "4",
+    "BATCH_WRITE_CONCURRENCY": "2",
+}
+
+JOB = {"questionId": "q1", "shareCode": "code000001", "createdAt": "2026-01-01T00:00:00Z", "tags": ["a", "b"]}
+
+
+@pytest.fixture
+def tables(make_table):
+    tables = {
+        "tags": make_table("TagIndex", "tag", "sortKey"),
+        "codes": make_table("ShareCodes", "shareCode"),
+        "bookmarks": make_table("Bookmarks", "userId", "questionId", indexes=[("QuestionIndex", "questionId", "userId")]),
+        "answers": make_table(
+            "AnswersLog", "logId",
+            indexes=[("QuestionIndex", "questionId", None), ("UserIndex", "userId", "timestamp")],
+        ),
+        "stats": make_table("QuestionStats", "questionId"),
+        "answered": make_table("AnsweredQuestions", "userId", "questionId"),
+        "buckets": make_table("UserStatsBuckets", "userId", "bucket"),
+        "users": make_table("Users", "userId"),
+    }
+    for tag in JOB["tags"]:
+        tables["tags"].put_item(Item={"tag": tag, "sortKey": "2026-01-01T00:00:00Z#q1", "questionId": "q1"})
+    tables["tags"].put_item(Item={"tag": "a", "sortKey": "2026-01-02T00:00:00Z#q2", "questionId": "q2"})
+    tables["codes"].put_item(Item={"shareCode": "code000001", "questionId": "q1"})
+    tables["stats"].put_item(Item={"questionId": "q1", "answers": 12})
+    for i in range(10):
+        tables["bookmarks"].put_item(Item={"userId": f"u{i}", "questionId": "q1"})
+    tables["bookmarks"].put_item(Item={"userId": "u0", "questionId": "q2"})
+    # u0..u5 が q1 に2回ずつ、u0 は q2 にも回答している
+    for i in range(12):
+        user_id = f"u{i % 6}"
+        tables["answers"].put_item(Item={
+            "logId": f"l{i:02d}", "questionId": "q1", "userId": user_id,
+            "isCorrect": True, "timestamp": f"2026-01-05T00:00:{i:02d}Z",
+        })
+        tables["answered"].put_item(Item={"userId": user_id, "questionId": "q1"})
+    tables["answers"].put_item(Item={
+        "logId": "other", "questionId": "q2", "userId": "u0", "isCorrect": False, "timestamp": "2026-01-06T00:00:00Z",
+    })
+    tables["answered"].put_item(Item={"userId": "u0", "questionId": "q2"})
+    return tables
+
+
+@pytest.fixture
+def cascade(load_lambda, tables):
+    return load_lambda("cascadeDeleteQuestionFunction", **ENV)
+
+
+@pytest.fixture
+def invocations(cascade, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        cascade.lambda_client, "invoke",
+        lambda FunctionName, InvocationType, Payload: calls.append((FunctionName, json.loads(Payload))),
+    )
+    return calls
+
+
+def _keys(table, *names):
+    return sorted(tuple(it[n] for n in names) for it in table.scan()["Items"])
+
+
+def _assert_only_other_question_left(tables):
+    assert _keys(tables["tags"], "questionId") == [("q2",)]
+    assert tables["codes"].scan()["Items"] == []
+    assert tables["stats"].scan()["Items"] == []
+    assert _keys(tables["bookmarks"], "userId", "questionId") == [("u0", "q2")]
+    assert _keys(tables["answers"], "logId") == [("other",)]
+    assert _keys(tables["answered"], "userId", "questionId") == [("u0", "q2")]
+
+
+def test_runs_every_phase_in_one_invocation(cascade, tables, invocations):
+    result = cascade.lambda_handler(dict(JOB), FakeContext())
+    assert result["done"] is True
+    _assert_only_other_question_left(tables)
+    # 回答していたユーザーの集計だけ作り直させる
+    assert invocations == [("backfillUserStats", {"userIds": [f"u{i}" for i in range(6)]})]
+
+
+def test_hands_off_with_phase_and_start_key(cascade, tables, invocations):
+    context = FakeContext(remaining_ms=0)
+    result = cascade.lambda_handler(dict(JOB), context)
+    hops = 1
+    while not result["done"]:
+        target, payload = invocations.pop(0)
+        assert target == context.invoked_function_arn
+        result = cascade.lambda_handler(payload, context)
+        hops += 1
+    # indexes の後、ブックマーク 10 件と回答ログ 12 件を4件ずつ読むたびに引き継ぐ
+    assert hops >= 1 + 3 + 3
+    _assert_only_other_question_left(tables)
+    # 引き継いでもユーザーは持ち回られる
+    assert invocations == [("backfillUserStats", {"userIds": [f"u{i}" for i in range(6)]})]
+
+
+def test_rerun_after_completion_is_harmless(cascade, tables, invocations):
+    cascade.lambda_handler(dict(JOB), FakeContext())
+    assert cascade.lambda_handler(dict(JOB), FakeContext())["done"] is True
+    _assert_only_other_question_left(tables)
+    # 消すログが無ければ作り直しも頼まない
+    assert len(invocations) == 1
+
+
+@pytest.mark.parametrize("remaining_ms", [0, 600000])
+def test_many_users_are_rebuilt_in_chunks(load_lambda, tables, monkeypatch, remaining_ms):
+    cascade = load_lambda("cascadeDeleteQuestionFunction", **dict(ENV, AFFECTED_USERS_MAX="3"))
+    context = FakeContext(remaining_ms=remaining_ms)
+    handoffs = []
+    rebuilds = []
+
+    def invoke(FunctionName, InvocationType, Payload):
+        payload = json.loads(Payload)
+        if FunctionName == context.invoked_function_arn:
+            handoffs.append(payload)
+            return
+        # 頼んだ時点でそのユーザーに残っている q1 のログ
+        left = {it["userId"] for it in tables["answers"].scan()["Items"] if it["questionId"] == "q1"}
+        rebuilds.append((payload["userIds"], left & set(payload["userIds"])))
+
+    monkeypatch.setattr(cascade.lambda_client, "invoke", invoke)
+    result = cascade.lambda_handler(dict(JOB), context)
+    while not result["done"]:
+        payload = handoffs.pop(0)
+        # 引き継ぎのイベントに持ち回るユーザーは上限 + 1ページ分まで
+        assert len(payload.get("affectedUserIds") or []) < 3 + 4
+        result = cascade.lambda_handler(payload, context)
+    _assert_only_other_question_left(tables)
+
+    assert len(rebuilds) > 2 and all(len(user_ids) <= 3 for user_ids, _ in rebuilds)
+    assert set().union(*(user_ids for user_ids, _ in rebuilds)) == {f"u{i}" for i in range(6)}
+    # どのユーザーも、最後の作り直しはそのユーザーのログをすべて消した後に頼んでいる
+    last = {}
+    for user_ids, left in rebuilds:
+        for user_id in user_ids:
+            last[user_id] = user_id in left
+    assert not any(last.values())
+
+
+def test_handoff_keeps_numeric_start_keys(cascade, invocations):
+    start_key = {"logId": "l03", "questionId": "q1", "seq": Decimal("12"), "score": Decimal("0.25")}
+    cascade._invoke_self(FakeContext(), {"questionId": "q1", "phase": "answers", "startKey": start_key})
+    (_, payload), = invocations
+    assert payload["startKey"] == {"logId": "l03", "questionId": "q1", "seq": 12, "score": 0.25}
+
+    restored = cascade._restore_start_key(payload["startKey"])
+    assert restored == start_key
+    assert isinstance(restored["score"], Decimal)
+
+
+def test_bookmarks_without_index_are_not_scanned(load_lambda, tables, monkeypatch, capsys):
+    env = dict(ENV)
+    del env["BOOKMARKS_QUESTION_INDEX_NAME"]
+    cascade = load_lambda("cascadeDeleteQuestionFunction", **env)
+    monkeypatch.setattr(cascade.lambda_client, "invoke", lambda **kwargs: None)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("bookmarks must not be scanned")
+
+    monkeypatch.setattr(cascade.dynamodb.meta.client, "scan", no_scan)
+    assert cascade.lambda_handler(dict(JOB), FakeContext())["done"] is True
+    assert "skipping bookmarks" in capsys.readouterr().out
+    assert len(tables["bookmarks"].scan()["Items"]) == 11
+    assert _keys(tables["answers"], "logId") == [("other",)]
+
+
+def test_rebuild_request_refreshes_user_buckets(cascade, tables, invocations, load_lambda):
+    backfill = load_lambda("backfillUserStatsFunction", USER_STATS_BUCKETS_TABLE="UserStatsBuckets")
+    # 削除前に logAnswerFunction が積み上げていた集計
+    backfill._rebuild([f"u{i}" for i in range(6)])
+    before = tables["buckets"].get_item(Key={"userId": "u0", "bucket": "all"})["Item"]
+    assert (before["answers"], before["distinctQuestions"]) == (3, 2)
+
+    cascade.lambda_handler(dict(JOB), FakeContext())
+    _, payload = invocations.pop()
+    assert backfill.lambda_handler(payload, FakeContext())["done"] is True
+
+    after = tables["buckets"].get_item(Key={"userId": "u0", "bucket": "all"})["Item"]
+    assert (after["answers"], after["correctAnswers"], after["distinctQuestions"]) == (1, 0, 1)
+    # q1 にしか回答していないユーザーの行は消える
+    assert tables["buckets"].query(KeyConditionExpression="userId = :u", ExpressionAttributeValues={":u": "u1"})["Items"] == []
+
+
+def test_listed_rebuild_hands_off_remaining_users(load_lambda, tables, monkeypatch):
+    backfill = load_lambda("backfillUserStatsFunction", USER_STATS_BUCKETS_TABLE="UserStatsBuckets", SCAN_PAGE_SIZE="2")
+    calls = []
+    monkeypatch.setattr(backfill.lambda_client, "invoke", lambda **kwargs: calls.append(json.loads(kwargs["Payload"])))
+    result = backfill.lambda_handler({"userIds": ["u0", "u1", "u0", "u2"]}, FakeContext(remaining_ms=0))
+    assert (result["done"], result["pending"]) == (False, 1)
+    assert calls == [{"userIds": ["u2"]}]
+    assert backfill.lambda_handler(calls[0], FakeContext(remaining_ms=0))["done"] is True
@@ -0,0 +1,104 @@
+"""checkAnswerStatusFunction (キー指定の確認、一括確認とコンテナ内キャッシュ)"""
+import json
+
+import pytest
+
+
+@pytest.fixture
+def tables(make_table):
+    answers = make_table("AnswersLog", "logId", indexes=[("UserIndex", "userId", "timestamp")])
+    answered = make_table("AnsweredQuestions", "userId", "questionId")
+    for i in range(30):
+        answers.put_item(Item={"logId": f"l{i}", "userId": "u1", "questionId": f"q{i}", "timestamp": f"2026-01-01T00:00:{i:02d}Z"})
+        answered.put_item(Item={"userId": "u1", "questionId": f"q{i}"})
+    answered.put_item(Item={"userId": "#backfill", "questionId": "#backfill", "completedAt": "2026-01-02T00:00:00Z"})
+    return answers, answered
+
+
+def _event(sub="u1", **params):
+    return {"requestContext": {"authorizer": {"claims": {"sub": sub}}}, "queryStringParameters": params}
+
+
+def _call(module, **params):
+    resp = module.lambda_handler(_event(**params), None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+
+@pytest.fixture(params=["markers", "logs"])
+def check(request, load_lambda, tables):
+    env = {"ANSWERS_TABLE": "AnswersLog"}
+    if request.param == "markers":
+        env["ANSWERED_QUESTIONS_TABLE"] = "AnsweredQuestions"
+    return load_lambda("checkAnswerStatusFunction", **env)
+
+
+def test_single_question(check):
+    assert _call(check, questionId="q29") == (200, {"hasAnswered": True})
+    assert _call(check, questionId="q99") == (200, {"hasAnswered": False})
+
+
+def test_bulk_questions(check):
+    status, body = _call(check, questionIds="q0, q15,q99,,q29")
+    assert status == 200
+    assert body == {"answered": {"q0": True, "q15": True, "q99": False, "q29": True}}
+
+
+def test_bulk_validation(check):
+    assert _call(check, questionIds=" , ")[0] == 400
+    assert _call(check, questionIds=",".join(f"q{i}" for i in range(101)))[0] == 400
+    assert _call(check)[0] == 400
+
+
+def test_marker_lookup_is_a_single_get(load_lambda, tables, monkeypatch):
+    check = load_lambda("checkAnswerStatusFunction", ANSWERS_TABLE="AnswersLog", ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    monkeypatch.setattr(check.table, "query", lambda **kwargs: pytest.fail("answer logs must not be read"))
+    assert _call(check, questionId="q3") == (200, {"hasAnswered": True})
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"questionId": "q40"}, {"hasAnswered": True}),
+    ({"questionIds": "q40,q3"}, {"answered": {"q40": True, "q3": True}}),
+])
+def test_answer_logs_are_read_until_the_backfill_completes(load_lambda, tables, params, expected):
+    answers, answered = tables
+    answered.delete_item(Key={"userId": "#backfill", "questionId": "#backfill"})
+    # 導入前の回答 (回答ログにだけある)
+    answers.put_item(Item={"logId": "l40", "userId": "u1", "questionId": "q40", "timestamp": "2025-12-31T00:00:00Z"})
+    check = load_lambda("checkAnswerStatusFunction", ANSWERS_TABLE="AnswersLog", ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    assert _call(check, **params) == (200, expected)
+    assert check._answered_backfilled is False
+
+    # 印が付いたら AnsweredQuestions を読む (ここでは q40 の行をわざと作っていない)
+    answered.put_item(Item={"userId": "#backfill", "questionId": "#backfill", "completedAt": "2026-01-02T00:00:00Z"})
+    check = load_lambda("checkAnswerStatusFunction", ANSWERS_TABLE="AnswersLog", ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    assert _call(check, questionId="q40") == (200, {"hasAnswered": False})
+    assert check._answered_backfilled is True
+
+
+def test_bulk_set_is_cached_and_refreshed_by_a_newer_answer(load_lambda, tables):
+    _, answered = tables
+    check = load_lambda("checkAnswerStatusFunction", ANSWERS_TABLE="AnswersLog", ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    assert _call(check, questionIds="q99")[1] == {"answered": {"q99": False}}
+
+    answered.put_item(Item={"userId": "u1", "questionId": "q99"})
+    # キャッシュした集合を返す (TTL の間は反映が遅れる)
+    assert _call(check, questionIds="q99")[1] == {"answered": {"q99": False}}
+    # キー指定の確認で新しい回答が見つかったらキャッシュを捨てる
+    assert _call(check, questionId="q99")[1] == {"hasAnswered": True}
+    assert _call(check, questionIds="q99")[1] == {"answered": {"q99": True}}
+
+
+def test_cache_is_bounded(load_lambda, tables):
+    check = load_lambda(
+        "checkAnswerStatusFunction", ANSWERS_TABLE="AnswersLog", ANSWERED_QUESTIONS_TABLE="AnsweredQuestions",
+        ANSWERED_SET_CACHE_SIZE="2",
+    )
+    for user_id in ("u1", "u2", "u3"):
+        check.lambda_handler(_event(sub=user_id, questionIds="q1"), None)
+    assert list(check._answered_sets) == ["u2", "u3"]
+
+
+def test_sorted_ids(check):
+    ids = check._SortedIds(["q3", "q1", "q3", "q10"])
+    assert len(ids) == 3
+    assert ["q1" in ids, "q10" in ids, "q2" in ids, "" in ids, "q9" in ids] == [True, True, False, False, False]
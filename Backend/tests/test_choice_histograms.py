@@ -0,0 +1,102 @@
+"""quizItem ごとの選択肢の分布 (logAnswerFunction の ADD、backfillQuestionStatsFunction、getQuestionAnalyticsFunction)"""
+import json
+
+import pytest
+
+from conftest import FakeContext
+
+ENV = {
+    "ANSWERS_TABLE": "AnswersLog",
+    "QUESTION_STATS_TABLE": "QuestionStats",
+    "ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions",
+    "QUESTION_ITEM_STATS_TABLE": "QuestionItemStats",
+}
+
+ANSWERS = [
+    # (userId, quizItemId, selectedChoiceId, isCorrect)
+    ("u1", "i1", "a", True),
+    ("u1", "i2", "c", False),
+    ("u2", "i1", "b", False),
+    ("u2", "i2", "d", True),
+    ("u3", "i1", "a", True),
+    ("u3", "i2", "c", False),
+]
+
+
+@pytest.fixture
+def tables(make_table):
+    return {
+        "questions": make_table("Questions", "questionId"),
+        "answers": make_table("AnswersLog", "logId", indexes=[("QuestionIndex", "questionId", None)]),
+        "stats": make_table("QuestionStats", "questionId"),
+        "answered": make_table("AnsweredQuestions", "userId", "questionId"),
+        "items": make_table("QuestionItemStats", "questionId", "quizItemId"),
+    }
+
+
+@pytest.fixture
+def log_answer(load_lambda, tables):
+    return load_lambda("logAnswerFunction", **ENV)
+
+
+def _log_all(module):
+    for user_id, quiz_item_id, choice, correct in ANSWERS:
+        body = {"questionId": "q1", "userId": user_id, "quizItemId": quiz_item_id, "selectedChoiceId": choice, "isCorrect": correct}
+        assert module.lambda_handler({"body": json.dumps(body)}, None)["statusCode"] == 201
+
+
+def _rows(tables):
+    rows = {it["quizItemId"]: it for it in tables["items"].scan()["Items"]}
+    return {
+        k: {a: int(v) for a, v in row.items() if a in ("answers", "correctAnswers") or a.startswith("choice#")}
+        for k, row in rows.items()
+    }
+
+
+EXPECTED = {
+    "i1": {"answers": 3, "correctAnswers": 2, "choice#a": 2, "choice#b": 1},
+    "i2": {"answers": 3, "correctAnswers": 1, "choice#c": 2, "choice#d": 1},
+}
+
+
+def test_histogram_is_counted_per_item(log_answer, tables):
+    _log_all(log_answer)
+    # quizItemId の無い回答は分布に入らない
+    body = {"questionId": "q1", "userId": "u4", "selectedChoiceId": "a", "isCorrect": True}
+    log_answer.lambda_handler({"body": json.dumps(body)}, None)
+    assert _rows(tables) == EXPECTED
+
+
+def test_batch_writes_one_update_per_item(log_answer, tables):
+    body = {"userId": "u1", "questionId": "q1", "answers": [
+        {"quizItemId": "i1", "selectedChoiceId": "a", "isCorrect": True},
+        {"quizItemId": "i1", "selectedChoiceId": "b", "isCorrect": False},
+    ]}
+    assert log_answer.lambda_handler({"resource": "/answers/batch", "body": json.dumps(body)}, None)["statusCode"] == 201
+    assert _rows(tables) == {"i1": {"answers": 2, "correctAnswers": 1, "choice#a": 1, "choice#b": 1}}
+
+
+def test_backfill_rebuilds_the_same_histogram(log_answer, load_lambda, tables):
+    _log_all(log_answer)
+    live = _rows(tables)
+    tables["items"].delete_item(Key={"questionId": "q1", "quizItemId": "i2"})
+    tables["questions"].put_item(Item={"questionId": "q1"})
+    backfill = load_lambda("backfillQuestionStatsFunction", QUESTIONS_TABLE="Questions", **ENV)
+    assert backfill.lambda_handler({}, FakeContext())["done"] is True
+    assert _rows(tables) == live == EXPECTED
+
+
+def test_analytics_returns_items(log_answer, load_lambda, tables):
+    _log_all(log_answer)
+    tables["items"].update_item(
+        Key={"questionId": "q1", "quizItemId": "i1"},
+        UpdateExpression="SET difficulty = :p, analyzedAt = :t",
+        ExpressionAttributeValues={":p": 1, ":t": "2026-01-01T00:00:00+00:00"},
+    )
+    analytics = load_lambda("getQuestionAnalyticsFunction", **ENV)
+    resp = analytics.lambda_handler({"pathParameters": {"questionId": "q1"}}, None)
+    items = {it["quizItemId"]: it for it in json.loads(resp["body"])["items"]}
+    assert items["i1"]["choiceCounts"] == {"a": 2, "b": 1}
+    assert items["i1"]["accuracy"] == 66.67
+    assert items["i1"]["difficulty"] == 1
+    assert "difficulty" not in items["i2"]
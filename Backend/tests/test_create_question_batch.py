@@ -0,0 +1,113 @@
+"""createQuestionFunction の一括作成 (POST /questions/batch)"""
+import json
+
+import pytest
+
+from conftest import response_body
+
+
+def _question(i, **overrides):
+    question = {
+        "title": f"問題 {i} english",
+        "authorId": "u1",
+        "tags": ["英語", "t"],
+        "purpose": "学習",
+        "quizItems": [{
+            "id": "1",
+            "questionText": "hello world",
+            "choices": [{"id": "a", "text": "x"}, {"id": "b", "text": "y"}],
+            "correctAnswerId": "a",
+        }],
+    }
+    question.update(overrides)
+    return question
+
+
+def _event(body, path="/questions/batch"):
+    return {
+        "httpMethod": "POST",
+        "resource": path,
+        "body": json.dumps(body),
+        "requestContext": {"authorizer": {"claims": {"sub": "u1"}}},
+    }
+
+
+@pytest.fixture
+def tables(make_table):
+    return {
+        "questions": make_table("Questions", "questionId"),
+        "codes": make_table("ShareCodes", "shareCode"),
+        "tags": make_table("TagIndex", "tag", "sortKey"),
+        "purpose_tags": make_table("PurposeTagIndex", "purposeTag", "sortKey"),
+        "search": make_table("SearchIndex", "gram", "questionId"),
+        "meta": make_table("CatalogMeta", "metaKey"),
+    }
+
+
+@pytest.fixture
+def create(load_lambda, tables):
+    return load_lambda(
+        "createQuestionFunction",
+        QUESTIONS_TABLE="Questions",
+        SHARE_CODES_TABLE="ShareCodes",
+        TAG_INDEX_TABLE="TagIndex",
+        PURPOSE_TAG_INDEX_TABLE="PurposeTagIndex",
+        SEARCH_INDEX_TABLE="SearchIndex",
+        CATALOG_META_TABLE="CatalogMeta",
+    )
+
+
+def _count(table):
+    return table.scan(Select="COUNT")["Count"]
+
+
+def test_batch_creates_valid_questions_and_reports_errors(create, tables):
+    questions = [_question(i) for i in range(60)]
+    questions[3] = _question(3, authorId="other")
+    questions[7] = {"title": ""}
+    questions[9] = _question(9, questionId="dup")
+    questions[10] = _question(10, questionId="dup")
+
+    resp = create.lambda_handler(_event({"questions": questions}), None)
+    body = response_body(resp)
+    assert resp["statusCode"] == 207
+    assert sorted(e["index"] for e in body["errors"]) == [3, 7, 10]
+    assert len(body["created"]) == 57
+    assert len({c["shareCode"] for c in body["created"]}) == 57
+
+    assert _count(tables["questions"]) == 57
+    assert _count(tables["codes"]) >= 57
+    assert _count(tables["tags"]) == 57 * 2
+    assert _count(tables["purpose_tags"]) == 57 * 2
+    assert _count(tables["search"]) > 0
+    # 1回の一括作成でカタログのバージョンは1回だけ上がる
+    assert tables["meta"].get_item(Key={"metaKey": "catalog"})["Item"]["version"] == 1
+
+
+def test_batch_limits(create, monkeypatch):
+    assert create.lambda_handler(_event({"questions": []}), None)["statusCode"] == 400
+    monkeypatch.setattr(create, "BATCH_CREATE_MAX_ITEMS", 2)
+    assert create.lambda_handler(_event({"questions": [_question(i) for i in range(3)]}), None)["statusCode"] == 400
+
+
+def test_unprocessed_items_are_retried(create, tables, monkeypatch):
+    client = create.dynamodb.meta.client
+    real_write = client.batch_write_item
+    calls = []
+
+    def flaky_write(RequestItems):
+        (table_name, requests), = RequestItems.items()
+        calls.append(len(requests))
+        if len(calls) % 2 == 1 and len(requests) > 1:
+            real_write(RequestItems={table_name: requests[:1]})
+            return {"UnprocessedItems": {table_name: requests[1:]}}
+        return real_write(RequestItems=RequestItems)
+
+    monkeypatch.setattr(client, "batch_write_item", flaky_write)
+    monkeypatch.setattr(create.time, "sleep", lambda _: None)
+    monkeypatch.setattr(create, "BATCH_WRITE_CONCURRENCY", 1)
+
+    resp = create.lambda_handler(_event({"questions": [_question(i, questionId=f"r{i}") for i in range(30)]}), None)
+    assert resp["statusCode"] == 201
+    assert len(response_body(resp)["created"]) == 30
+    assert _count(tables["questions"]) == 30
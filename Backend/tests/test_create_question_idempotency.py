@@ -0,0 +1,133 @@
+"""createQuestionFunction の冪等な作成 (client questionId と Idempotency-Key)"""
+import json
+import time
+
+import pytest
+
+from conftest import response_body
+
+
+def _body(title="t", **overrides):
+    body = {
+        "title": title,
+        "authorId": overrides.pop("authorId", "u1"),
+        "quizItems": [{"id": "1", "questionText": "q", "choices": [{"id": "a", "text": "A"}, {"id": "b", "text": "B"}], "correctAnswerId": "a"}],
+    }
+    body.update(overrides)
+    return body
+
+
+def _event(body, key=None, sub="u1", path="/questions"):
+    event = {"resource": path, "requestContext": {"authorizer": {"claims": {"sub": sub}}}, "body": json.dumps(body)}
+    if key:
+        event["headers"] = {"Idempotency-Key": key}
+    return event
+
+
+@pytest.fixture
+def tables(make_table):
+    return make_table("Questions", "questionId"), make_table("Idempotency", "idempotencyKey")
+
+
+@pytest.fixture
+def create(load_lambda, tables):
+    return load_lambda("createQuestionFunction", QUESTIONS_TABLE="Questions", IDEMPOTENCY_TABLE="Idempotency")
+
+
+def _count(table):
+    return table.scan(Select="COUNT")["Count"]
+
+
+def test_client_question_id_replay_returns_original(create, tables):
+    questions, _ = tables
+    first = create.lambda_handler(_event(_body(questionId="q1")), None)
+    again = create.lambda_handler(_event(_body(questionId="q1")), None)
+    assert (first["statusCode"], again["statusCode"]) == (201, 201)
+    assert again["headers"]["Idempotent-Replayed"] == "true"
+    assert response_body(again)["shareCode"] == response_body(first)["shareCode"]
+    assert _count(questions) == 1
+
+
+def test_client_question_id_of_another_user_conflicts(create, tables):
+    create.lambda_handler(_event(_body(questionId="q1")), None)
+    resp = create.lambda_handler(_event(_body(questionId="q1", authorId="u2"), sub="u2"), None)
+    assert resp["statusCode"] == 409
+
+
+def test_idempotency_key_replays_recorded_response(create, tables):
+    questions, records = tables
+    first = create.lambda_handler(_event(_body(), key="k1"), None)
+    again = create.lambda_handler(_event(_body(), key="k1"), None)
+    assert first["statusCode"] == again["statusCode"] == 201
+    assert response_body(again) == response_body(first)
+    assert again["headers"]["Idempotent-Replayed"] == "true"
+    assert _count(questions) == 1
+    record = records.get_item(Key={"idempotencyKey": "u1#k1"})["Item"]
+    assert record["state"] == "COMPLETED"
+    assert "lockedUntil" not in record
+
+
+def test_keys_are_scoped_per_user(create, tables):
+    questions, _ = tables
+    create.lambda_handler(_event(_body(), key="k1"), None)
+    resp = create.lambda_handler(_event(_body(authorId="u2"), key="k1", sub="u2"), None)
+    assert resp["statusCode"] == 201
+    assert _count(questions) == 2
+
+
+def test_same_key_with_different_body_is_422(create, tables):
+    create.lambda_handler(_event(_body(), key="k1"), None)
+    resp = create.lambda_handler(_event(_body(title="changed"), key="k1"), None)
+    assert resp["statusCode"] == 422
+
+
+def test_same_key_on_another_path_is_422(create, tables):
+    create.lambda_handler(_event(_body(), key="k1"), None)
+    resp = create.lambda_handler(_event({"questions": [_body()]}, key="k1", path="/questions/batch"), None)
+    assert resp["statusCode"] == 422
+
+
+def _in_progress(create, records, locked_until):
+    now = int(time.time())
+    records.put_item(Item={
+        "idempotencyKey": "u1#k1",
+        "requestHash": create._request_hash(_event(_body(), key="k1"), _body()),
+        "state": "IN_PROGRESS",
+        "lockedUntil": locked_until,
+        "expiresAt": now + 3600,
+    })
+
+
+def test_concurrent_request_in_progress_is_409(create, tables):
+    questions, records = tables
+    _in_progress(create, records, int(time.time()) + 60)
+    resp = create.lambda_handler(_event(_body(), key="k1"), None)
+    assert resp["statusCode"] == 409
+    assert _count(questions) == 0
+
+
+def test_stale_lock_is_taken_over(create, tables):
+    questions, records = tables
+    _in_progress(create, records, int(time.time()) - 1)
+    assert create.lambda_handler(_event(_body(), key="k1"), None)["statusCode"] == 201
+    assert _count(questions) == 1
+
+
+def test_failed_creation_releases_the_key(create, tables):
+    questions, records = tables
+    resp = create.lambda_handler(_event(_body(authorId="someone-else"), key="k1"), None)
+    assert resp["statusCode"] == 403
+    assert _count(records) == 0
+    # 直して同じキーで送り直せる
+    assert create.lambda_handler(_event(_body(), key="k1"), None)["statusCode"] == 201
+
+
+def test_exception_releases_the_key(create, tables, monkeypatch):
+    _, records = tables
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(create, "_create_one", boom)
+    assert create.lambda_handler(_event(_body(), key="k1"), None)["statusCode"] == 500
+    assert _count(records) == 0
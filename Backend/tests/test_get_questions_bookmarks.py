@@ -0,0 +1,89 @@
+"""getQuestionsFunction のブックマーク (BatchGetItem でのキー取得)"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def get_questions(load_lambda, make_table):
+    questions = make_table("Questions", "questionId")
+    bookmarks = make_table("Bookmarks", "userId", "questionId")
+    with questions.batch_writer() as batch:
+        for i in range(250):
+            batch.put_item(Item={
+                "questionId": f"q{i:03d}",
+                "purpose": "p" if i % 2 else "r",
+                "createdAt": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+                "title": "t",
+            })
+    with bookmarks.batch_writer() as batch:
+        # q250..q259 は削除済みの質問
+        for i in range(260):
+            batch.put_item(Item={"userId": "u1", "questionId": f"q{i:03d}"})
+    return load_lambda(
+        "getQuestionsFunction",
+        QUESTIONS_TABLE="Questions",
+        BOOKMARKS_TABLE="Bookmarks",
+        PAGINATION_TOKEN_SECRET="secret",
+        BATCH_GET_CONCURRENCY="3",
+    )
+
+
+def test_all_bookmarks_are_hydrated(get_questions):
+    resp = get_questions.lambda_handler({"queryStringParameters": {"bookmarkedBy": "u1"}}, None)
+    ids = [it["questionId"] for it in response_body(resp)]
+    assert ids == [f"q{i:03d}" for i in range(249, -1, -1)]
+
+
+def test_bookmark_pages_with_purpose(get_questions):
+    ids, token = [], None
+    while True:
+        params = {"bookmarkedBy": "u1", "purpose": "p", "limit": "40"}
+        if token:
+            params["nextToken"] = token
+        body = response_body(get_questions.lambda_handler({"queryStringParameters": params}, None))
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if not token:
+            break
+    assert sorted(ids) == [f"q{i:03d}" for i in range(1, 250, 2)]
+
+
+def test_batch_get_keeps_requested_order(get_questions):
+    table = get_questions.dynamodb.Table("Questions")
+    ids = ["q200", "q003", "missing", "q120", "q003"]
+    found = get_questions._batch_get_questions(table, ids)
+    assert [it["questionId"] for it in found] == ["q200", "q003", "q120"]
+
+
+def test_unprocessed_keys_are_retried(get_questions, monkeypatch):
+    client = get_questions.dynamodb.meta.client
+    real_batch_get = client.batch_get_item
+    calls = []
+
+    def flaky_batch_get(RequestItems):
+        calls.append(len(RequestItems["Questions"]["Keys"]))
+        if len(calls) > 1:
+            return real_batch_get(RequestItems=RequestItems)
+        # 1回目は半分だけ返す
+        request = RequestItems["Questions"]
+        half = len(request["Keys"]) // 2
+        resp = real_batch_get(RequestItems={"Questions": dict(request, Keys=request["Keys"][:half])})
+        resp["UnprocessedKeys"] = {"Questions": dict(request, Keys=request["Keys"][half:])}
+        return resp
+
+    monkeypatch.setattr(client, "batch_get_item", flaky_batch_get)
+    monkeypatch.setattr(get_questions.time, "sleep", lambda _: None)
+    items = get_questions._batch_get_chunk("Questions", [f"q{i:03d}" for i in range(10)], get_questions.PROJECTIONS["summary"])
+    assert sorted(it["questionId"] for it in items) == [f"q{i:03d}" for i in range(10)]
+    assert calls == [10, 5]
+
+
+def test_unprocessed_keys_give_up(get_questions, monkeypatch):
+    client = get_questions.dynamodb.meta.client
+    monkeypatch.setattr(
+        client, "batch_get_item", lambda RequestItems: {"Responses": {}, "UnprocessedKeys": RequestItems}
+    )
+    monkeypatch.setattr(get_questions.time, "sleep", lambda _: None)
+    with pytest.raises(RuntimeError, match="unprocessed"):
+        get_questions._batch_get_chunk("Questions", ["q001"], get_questions.PROJECTIONS["summary"])
@@ -0,0 +1,71 @@
+"""getQuestionsFunction の新着フィード (シャード化した FeedIndex のマージ)"""
+import pytest
+
+from conftest import response_body
+
+SHARDS = 4
+
+
+@pytest.fixture
+def feed(load_lambda, make_table):
+    questions = make_table("Questions", "questionId", indexes=[("FeedIndex", "feedShard", "createdAt")])
+    with questions.batch_writer() as batch:
+        for i in range(30):
+            batch.put_item(Item={
+                "questionId": f"q{i:02d}",
+                # 同じ createdAt の組 (q(2n), q(2n+1)) は questionId の降順になる
+                "createdAt": f"2026-01-{i // 2 + 1:02d}T00:00:00Z",
+                # シャードの偏りもあるようにする
+                "feedShard": str(i % 3 if i < 20 else 3),
+                "authorId": "blocked" if i % 5 == 0 else "author",
+                "title": "t",
+            })
+    return load_lambda(
+        "getQuestionsFunction",
+        QUESTIONS_TABLE="Questions",
+        FEED_INDEX_NAME="FeedIndex",
+        FEED_SHARD_COUNT=str(SHARDS),
+        PAGINATION_TOKEN_SECRET="secret",
+    )
+
+
+def _pages(module, limit, event=None):
+    ids, token, sizes = [], None, []
+    while True:
+        params = {"limit": str(limit), **({"nextToken": token} if token else {})}
+        resp = module.lambda_handler({**(event or {}), "queryStringParameters": params}, None)
+        body = response_body(resp)
+        assert resp["statusCode"] == 200, body
+        sizes.append(len(body["items"]))
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if not token:
+            return ids, sizes
+
+
+NEWEST_FIRST = [f"q{i:02d}" for i in range(29, -1, -1)]
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 7, 30, 50])
+def test_feed_pages_are_globally_newest_first(feed, limit):
+    ids, sizes = _pages(feed, limit)
+    assert ids == NEWEST_FIRST
+    assert all(size == limit for size in sizes[:-1])
+
+
+def test_feed_pages_skip_blocked_authors_but_stay_full(feed, make_table):
+    blocks = make_table("Blocks", "blockerId", "blockedId")
+    blocks.put_item(Item={"blockerId": "me", "blockedId": "blocked"})
+    feed.BLOCKS_TABLE = "Blocks"
+    event = {"requestContext": {"authorizer": {"claims": {"sub": "me"}}}}
+    ids, token = [], None
+    while True:
+        params = {"limit": "4", "excludeBlocked": "true", **({"nextToken": token} if token else {})}
+        body = response_body(feed.lambda_handler({**event, "queryStringParameters": params}, None))
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if token:
+            assert len(body["items"]) == 4
+        else:
+            break
+    assert ids == [qid for qid in NEWEST_FIRST if int(qid[1:]) % 5]
@@ -0,0 +1,107 @@
+"""getQuestionsFunction の nextToken (署名付きの開始キー) と limit の検証"""
+import base64
+import json
+
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def get_questions(load_lambda, make_table):
+    questions = make_table("Questions", "questionId", indexes=[("PurposeIndex", "purpose", None)])
+    for i in range(25):
+        questions.put_item(Item={
+            "questionId": f"q{i:02d}",
+            "title": f"title {i}",
+            "purpose": "p" if i % 2 else "r",
+            "tags": ["a"],
+            "createdAt": f"2026-01-{i + 1:02d}T00:00:00Z",
+            "authorId": "author",
+        })
+    return load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions", PAGINATION_TOKEN_SECRET="secret")
+
+
+def _get(module, **params):
+    resp = module.lambda_handler({"queryStringParameters": params or None}, None)
+    return resp["statusCode"], response_body(resp)
+
+
+def _pages(module, **params):
+    ids, token = [], None
+    while True:
+        query = dict(params, **({"nextToken": token} if token else {}))
+        status, body = _get(module, **query)
+        assert status == 200, body
+        assert len(body["items"]) <= int(params["limit"])
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if not token:
+            return ids
+
+
+def test_pages_cover_every_question_once(get_questions):
+    ids = _pages(get_questions, limit="10")
+    assert sorted(ids) == [f"q{i:02d}" for i in range(25)]
+
+
+def test_pages_with_purpose_filter(get_questions):
+    ids = _pages(get_questions, limit="3", purpose="p")
+    assert sorted(ids) == [f"q{i:02d}" for i in range(1, 25, 2)]
+
+
+def test_legacy_request_returns_plain_array(get_questions):
+    status, body = _get(get_questions)
+    assert status == 200
+    assert isinstance(body, list) and len(body) == 25
+
+
+def test_token_round_trip(get_questions):
+    token = get_questions._encode_token({"questionId": "q03"}, {"purpose": ""})
+    assert get_questions._decode_token(token, {"purpose": ""}) == {"questionId": "q03"}
+
+
+def test_tampered_payload_is_rejected(get_questions):
+    _, first = _get(get_questions, limit="5")
+    payload, sig = first["nextToken"].split(".", 1)
+    data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    data["k"] = {"questionId": "q00"}
+    forged = base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+
+    status, body = _get(get_questions, limit="5", nextToken=f"{forged}.{sig}")
+    assert status == 400
+    assert body["message"] == "Invalid nextToken."
+
+
+def test_token_signed_with_another_secret_is_rejected(get_questions, monkeypatch):
+    monkeypatch.setattr(get_questions, "PAGINATION_TOKEN_SECRET", "other")
+    token = get_questions._encode_token({"questionId": "q03"}, {"purpose": ""})
+    monkeypatch.setattr(get_questions, "PAGINATION_TOKEN_SECRET", "secret")
+    with pytest.raises(ValueError, match="Invalid nextToken"):
+        get_questions._decode_token(token, {"purpose": ""})
+
+
+def test_token_replayed_with_other_filters_is_rejected(get_questions):
+    _, first = _get(get_questions, limit="5")
+    status, body = _get(get_questions, limit="5", purpose="p", nextToken=first["nextToken"])
+    assert status == 400
+    assert "does not match" in body["message"]
+
+
+@pytest.mark.parametrize("token", ["garbage", "a.b", ".", "%%%.sig"])
+def test_malformed_token_is_rejected(get_questions, token):
+    status, _ = _get(get_questions, limit="5", nextToken=token)
+    assert status == 400
+
+
+@pytest.mark.parametrize("limit", ["0", "101", "ten"])
+def test_invalid_limit_is_rejected(get_questions, limit):
+    status, _ = _get(get_questions, limit=limit)
+    assert status == 400
+
+
+def test_pagination_requires_secret(get_questions, monkeypatch):
+    monkeypatch.setattr(get_questions, "PAGINATION_TOKEN_SECRET", "")
+    status, body = _get(get_questions, limit="5")
+    assert status == 500
+    assert "PAGINATION_TOKEN_SECRET" in body["message"]
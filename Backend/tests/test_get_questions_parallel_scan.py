@@ -0,0 +1,65 @@
+"""getQuestionsFunction の並列 Segment Scan"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def get_questions(load_lambda, make_table):
+    questions = make_table("Questions", "questionId")
+    with questions.batch_writer() as batch:
+        for i in range(120):
+            batch.put_item(Item={
+                "questionId": f"q{i:03d}",
+                "tags": ["even"] if i % 2 == 0 else ["odd"],
+                "createdAt": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+            })
+    module = load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions", SCAN_MAX_SEGMENTS="4")
+    return module
+
+
+@pytest.fixture
+def scan_calls(get_questions, monkeypatch):
+    # DescribeTable の値を大きく見せて並列にする
+    monkeypatch.setattr(get_questions, "_table_stats", lambda name: (10 * get_questions.SCAN_BYTES_PER_SEGMENT, 120))
+    client = get_questions.dynamodb.meta.client
+    real_scan = client.scan
+    calls = []
+
+    def scan(**kwargs):
+        calls.append(kwargs)
+        return real_scan(**kwargs)
+
+    monkeypatch.setattr(client, "scan", scan)
+    return calls
+
+
+def test_parallel_scan_reads_every_segment(get_questions, scan_calls):
+    resp = get_questions.lambda_handler({"queryStringParameters": None}, None)
+    ids = [it["questionId"] for it in response_body(resp)]
+    assert sorted(ids) == [f"q{i:03d}" for i in range(120)]
+    assert sorted(c["Segment"] for c in scan_calls) == [0, 1, 2, 3]
+
+
+def test_workers_get_string_expressions(get_questions, scan_calls):
+    resp = get_questions.lambda_handler({"queryStringParameters": {"category": "odd"}}, None)
+    ids = [it["questionId"] for it in response_body(resp)]
+    assert sorted(ids) == [f"q{i:03d}" for i in range(1, 120, 2)]
+    assert len(scan_calls) == 4
+    for call in scan_calls:
+        assert isinstance(call["FilterExpression"], str)
+        assert call["ExpressionAttributeValues"] == {":v0": "odd"}
+
+
+def test_expression_strings_keeps_existing_placeholders(get_questions):
+    kwargs = {
+        "FilterExpression": get_questions.Attr("tags").contains("a") | get_questions.Attr("tags").contains("b"),
+        "ProjectionExpression": "#questionId",
+        "ExpressionAttributeNames": {"#questionId": "questionId"},
+    }
+    built = get_questions._expression_strings(kwargs)
+    assert built["FilterExpression"] == "(contains(#n0, :v0) OR contains(#n1, :v1))"
+    assert built["ExpressionAttributeNames"] == {"#questionId": "questionId", "#n0": "tags", "#n1": "tags"}
+    assert built["ExpressionAttributeValues"] == {":v0": "a", ":v1": "b"}
+    # 元の kwargs は書き換えない
+    assert not isinstance(kwargs["FilterExpression"], str)
@@ -0,0 +1,95 @@
+"""getQuestionsFunction の excludeAnswered / excludeBlocked"""
+import pytest
+
+from conftest import response_body
+
+SIGNED_IN = {"requestContext": {"authorizer": {"claims": {"sub": "me"}}}}
+
+
+@pytest.fixture
+def tables(make_table):
+    questions = make_table("Questions", "questionId")
+    answers = make_table("AnswersLog", "logId", indexes=[("UserIndex", "userId", None)])
+    answered = make_table("AnsweredQuestions", "userId", "questionId")
+    blocks = make_table("Blocks", "blockerId", "blockedId")
+    for i in range(10):
+        questions.put_item(Item={
+            "questionId": f"q{i}",
+            "authorId": "troll" if i in (7, 8) else "author",
+            "createdAt": f"2026-01-01T00:00:0{i}Z",
+        })
+    for qid in ("q1", "q2", "q5"):
+        answers.put_item(Item={"logId": f"log-{qid}", "userId": "me", "questionId": qid})
+        answered.put_item(Item={"userId": "me", "questionId": qid})
+    blocks.put_item(Item={"blockerId": "me", "blockedId": "troll"})
+    return answers, answered
+
+
+def _mark_backfilled(answered):
+    answered.put_item(Item={"userId": "#backfill", "questionId": "#backfill", "completedAt": "2026-01-02T00:00:00Z"})
+
+
+def _load(load_lambda, **env):
+    return load_lambda(
+        "getQuestionsFunction",
+        QUESTIONS_TABLE="Questions",
+        PAGINATION_TOKEN_SECRET="secret",
+        BLOCKS_TABLE="Blocks",
+        **env,
+    )
+
+
+def _ids(module, event=SIGNED_IN, **params):
+    resp = module.lambda_handler({**event, "queryStringParameters": params}, None)
+    body = response_body(resp)
+    assert resp["statusCode"] == 200, body
+    return sorted(it["questionId"] for it in (body["items"] if isinstance(body, dict) else body))
+
+
+@pytest.mark.parametrize("env", [{"ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions"}, {}])
+def test_exclude_answered(load_lambda, tables, env):
+    _mark_backfilled(tables[1])
+    module = _load(load_lambda, **env)
+    assert _ids(module, excludeAnswered="true", limit="20") == ["q0", "q3", "q4", "q6", "q7", "q8", "q9"]
+
+
+def test_answer_logs_are_read_until_the_backfill_completes(load_lambda, tables):
+    answers, answered = tables
+    # 導入前の回答 (回答ログにだけある)
+    answers.put_item(Item={"logId": "log-q4", "userId": "me", "questionId": "q4"})
+    module = _load(load_lambda, ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    assert "q4" not in _ids(module, excludeAnswered="true")
+
+    # 印が付いたら AnsweredQuestions を読む (ここでは q4 の行をわざと作っていない)
+    _mark_backfilled(answered)
+    module = _load(load_lambda, ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    assert "q4" in _ids(module, excludeAnswered="true")
+
+
+def test_exclude_blocked_and_answered(load_lambda, tables):
+    _mark_backfilled(tables[1])
+    module = _load(load_lambda, ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    assert _ids(module, excludeAnswered="true", excludeBlocked="1") == ["q0", "q3", "q4", "q6", "q9"]
+
+
+def test_answered_set_is_cached_per_user(load_lambda, tables):
+    _, answered = tables
+    _mark_backfilled(answered)
+    module = _load(load_lambda, ANSWERED_QUESTIONS_TABLE="AnsweredQuestions")
+    _ids(module, excludeAnswered="true")
+    answered.put_item(Item={"userId": "me", "questionId": "q0"})
+    assert "q0" in _ids(module, excludeAnswered="true")
+    module.EXCLUSION_CACHE_TTL = 0
+    assert "q0" not in _ids(module, excludeAnswered="true")
+
+
+def test_requires_sign_in(load_lambda, tables):
+    module = _load(load_lambda)
+    resp = module.lambda_handler({"queryStringParameters": {"excludeAnswered": "true"}}, None)
+    assert resp["statusCode"] == 401
+
+
+def test_invalid_flag(load_lambda, tables):
+    module = _load(load_lambda)
+    resp = module.lambda_handler({**SIGNED_IN, "queryStringParameters": {"excludeBlocked": "yes"}}, None)
+    assert resp["statusCode"] == 400
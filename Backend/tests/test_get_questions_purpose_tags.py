@@ -0,0 +1,62 @@
+"""getQuestionsFunction の purpose + タグの複合インデックス (purposeTag = "purpose#tag")"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def get_questions(load_lambda, make_table):
+    questions = make_table("Questions", "questionId", indexes=[("PurposeIndex", "purpose", None)])
+    index = make_table("PurposeTagIndex", "purposeTag", "sortKey")
+    for i in range(16):
+        question = {
+            "questionId": f"q{i:02d}",
+            "purpose": "p" if i % 2 else "r",
+            "tags": ["a"] + (["b"] if i % 3 == 0 else []),
+            "createdAt": f"2026-01-{i + 1:02d}T00:00:00Z",
+        }
+        questions.put_item(Item=question)
+        for tag in question["tags"]:
+            index.put_item(Item={
+                "purposeTag": f"{question['purpose']}#{tag}",
+                "sortKey": f"{question['createdAt']}#{question['questionId']}",
+                "questionId": question["questionId"],
+            })
+    return load_lambda(
+        "getQuestionsFunction",
+        QUESTIONS_TABLE="Questions",
+        PURPOSE_TAG_INDEX_TABLE="PurposeTagIndex",
+        PAGINATION_TOKEN_SECRET="secret",
+    )
+
+
+def _pages(module, limit, **params):
+    ids, token = [], None
+    while True:
+        query = dict(params, limit=str(limit), **({"nextToken": token} if token else {}))
+        body = response_body(module.lambda_handler({"queryStringParameters": query}, None))
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if not token:
+            return ids
+
+
+def test_plan_uses_composite_index(get_questions):
+    assert get_questions._choose_plan("", "", "", "p", ["a"], True, None) == "purposeTag"
+    assert get_questions._choose_plan("", "", "", "p", [], True, None) == "purpose"
+
+
+@pytest.mark.parametrize("limit", [1, 3, 10])
+def test_purpose_and_tag(get_questions, limit):
+    assert _pages(get_questions, limit, purpose="p", tag="a") == [f"q{i:02d}" for i in range(15, 0, -2)]
+
+
+@pytest.mark.parametrize("limit", [1, 2])
+def test_purpose_and_two_tags(get_questions, limit):
+    assert _pages(get_questions, limit, purpose="p", tags="a,b") == ["q15", "q09", "q03"]
+    assert _pages(get_questions, limit, purpose="r", tags="a,b", tagMode="or") == [f"q{i:02d}" for i in range(14, -1, -2)]
+
+
+def test_unpaginated_purpose_and_tag(get_questions):
+    body = response_body(get_questions.lambda_handler({"queryStringParameters": {"purpose": "r", "tag": "b"}}, None))
+    assert [it["questionId"] for it in body] == ["q12", "q06", "q00"]
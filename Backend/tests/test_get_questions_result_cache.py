@@ -0,0 +1,57 @@
+"""getQuestionsFunction の絞り込み結果キャッシュ (カタログのバージョンで無効化)"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def tables(make_table):
+    questions = make_table("Questions", "questionId", indexes=[("PurposeIndex", "purpose", None)])
+    meta = make_table("CatalogMeta", "metaKey")
+    questions.put_item(Item={"questionId": "q1", "purpose": "p", "createdAt": "2026-01-01T00:00:00Z"})
+    meta.put_item(Item={"metaKey": "catalog", "version": 1})
+    return questions, meta
+
+
+@pytest.fixture
+def get_questions(load_lambda, tables):
+    return load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions", CATALOG_META_TABLE="CatalogMeta")
+
+
+def _get(module, **params):
+    resp = module.lambda_handler({"queryStringParameters": params}, None)
+    return resp["headers"].get("X-Cache"), [it["questionId"] for it in response_body(resp)]
+
+
+def test_second_request_is_a_hit(get_questions, tables):
+    questions, _ = tables
+    assert _get(get_questions, purpose="p") == ("MISS", ["q1"])
+    questions.put_item(Item={"questionId": "q2", "purpose": "p", "createdAt": "2026-01-02T00:00:00Z"})
+    # バージョンが同じ間はキャッシュした本文のまま
+    assert _get(get_questions, purpose="p") == ("HIT", ["q1"])
+
+
+def test_version_bump_invalidates(get_questions, tables):
+    questions, meta = tables
+    _get(get_questions, purpose="p")
+    questions.put_item(Item={"questionId": "q2", "purpose": "p", "createdAt": "2026-01-02T00:00:00Z"})
+    meta.update_item(Key={"metaKey": "catalog"}, UpdateExpression="ADD #v :one",
+                     ExpressionAttributeNames={"#v": "version"}, ExpressionAttributeValues={":one": 1})
+    assert _get(get_questions, purpose="p") == ("MISS", ["q2", "q1"])
+
+
+def test_ttl_expiry(get_questions, monkeypatch):
+    _get(get_questions, purpose="p")
+    monkeypatch.setattr(get_questions, "RESULT_CACHE_TTL", 0)
+    assert _get(get_questions, purpose="p")[0] == "MISS"
+
+
+def test_per_user_requests_are_not_cached(get_questions, make_table):
+    make_table("Bookmarks", "userId", "questionId")
+    resp = get_questions.lambda_handler({"queryStringParameters": {"bookmarkedBy": "u1"}}, None)
+    assert "X-Cache" not in (resp.get("headers") or {})
+
+
+def test_errors_are_not_cached(get_questions):
+    assert get_questions.lambda_handler({"queryStringParameters": {"purpose": "p", "view": "bad"}}, None)["statusCode"] == 400
+    assert len(get_questions._result_cache._data) == 0
@@ -0,0 +1,140 @@
+"""getQuestionsFunction の全文検索 (bigram の転置インデックスと順位のキャッシュ)"""
+import json
+
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def modules(load_lambda, make_table):
+    make_table("Questions", "questionId")
+    make_table("SearchIndex", "gram", "questionId")
+    make_table("CatalogMeta", "metaKey")
+    env = dict(
+        QUESTIONS_TABLE="Questions",
+        SEARCH_INDEX_TABLE="SearchIndex",
+        PAGINATION_TOKEN_SECRET="secret",
+        CATALOG_META_TABLE="CatalogMeta",
+        # 絞り込み結果のキャッシュを通さず、毎回検索の経路を通す
+        RESULT_CACHE_SIZE="0",
+    )
+    create = load_lambda("createQuestionFunction", **env)
+    get = load_lambda("getQuestionsFunction", **env)
+    return create, get
+
+
+def _create(create, question_id, title, remarks="", texts=("問題",)):
+    body = {
+        "questionId": question_id,
+        "title": title,
+        "authorId": "u1",
+        "remarks": remarks,
+        "tags": [],
+        "quizItems": [
+            {"id": f"i{k}", "questionText": t, "choices": [{"id": "a", "text": "A"}, {"id": "b", "text": "B"}], "correctAnswerId": "a"}
+            for k, t in enumerate(texts)
+        ],
+    }
+    event = {"requestContext": {"authorizer": {"claims": {"sub": "u1"}}}, "body": json.dumps(body)}
+    assert create.lambda_handler(event, None)["statusCode"] == 201
+
+
+@pytest.fixture
+def catalog(modules):
+    create, get = modules
+    _create(create, "q1", "英単語クイズ 前置詞編")
+    _create(create, "q2", "日本史クイズ", remarks="江戸時代の問題")
+    _create(create, "q3", "英単語 (TOEIC)", texts=("英単語の意味を選べ", "英単語"))
+    _create(create, "q4", "Python 入門")
+    return get
+
+
+@pytest.fixture
+def posting_reads(catalog, monkeypatch):
+    real = catalog._search_postings
+    reads = []
+
+    def counted(table_name, gram):
+        reads.append(gram)
+        return real(table_name, gram)
+
+    monkeypatch.setattr(catalog, "_search_postings", counted)
+    return reads
+
+
+def _search(get, q, **params):
+    resp = get.lambda_handler({"queryStringParameters": dict(params, q=q)}, None)
+    body = response_body(resp)
+    assert resp["statusCode"] == 200, body
+    return [it["questionId"] for it in body["items"]], body["nextToken"]
+
+
+def test_ranking_and_normalization(catalog):
+    assert _search(catalog, "英単語")[0] == ["q3", "q1"]
+    assert _search(catalog, "ＰＹＴＨＯＮ")[0] == ["q4"]
+    assert _search(catalog, "江戸")[0] == ["q2"]
+
+
+def test_pages_use_offset_and_rank_once(catalog, posting_reads):
+    first, token = _search(catalog, "英単語", limit="1")
+    assert len(posting_reads) == 2  # 英単, 単語
+    second, token = _search(catalog, "英単語", limit="1", nextToken=token)
+    assert first + second == ["q3", "q1"]
+    assert token is None
+    # 2ページ目は順位付けした結果をそのまま使う
+    assert len(posting_reads) == 2
+
+
+def test_equivalent_queries_share_the_ranking(catalog, posting_reads):
+    _search(catalog, "英単語")
+    _search(catalog, " 英単語 ")
+    _search(catalog, "「英単語」！")
+    assert len(posting_reads) == 2
+
+
+def test_catalog_version_change_reranks(catalog, modules, posting_reads):
+    create, _ = modules
+    _search(catalog, "英単語")
+    # createQuestionFunction がカタログのバージョンを上げる
+    _create(create, "q5", "英単語 上級")
+    assert "q5" in _search(catalog, "英単語")[0]
+    assert len(posting_reads) == 4
+
+
+def test_ttl_expiry_reranks(catalog, posting_reads, monkeypatch):
+    _search(catalog, "江戸")
+    monkeypatch.setattr(catalog, "SEARCH_RANK_CACHE_TTL", 0)
+    _search(catalog, "江戸")
+    assert len(posting_reads) == 2
+
+
+def test_results_are_capped(catalog, monkeypatch):
+    monkeypatch.setattr(catalog, "SEARCH_MAX_RESULTS", 1)
+    ids, token = _search(catalog, "英単語", limit="5")
+    assert (ids, token) == (["q3"], None)
+
+
+def test_deleted_questions_are_skipped(catalog):
+    _search(catalog, "英単語")
+    catalog.dynamodb.Table("Questions").delete_item(Key={"questionId": "q3"})
+    assert _search(catalog, "英単語")[0] == ["q1"]
+
+
+def test_postings_are_read_with_string_expressions(catalog, monkeypatch):
+    client = catalog.dynamodb.meta.client
+    real_query = client.query
+    calls = []
+
+    def query(**kwargs):
+        calls.append(kwargs)
+        return real_query(**kwargs)
+
+    monkeypatch.setattr(client, "query", query)
+    _search(catalog, "日本史")
+    assert calls and all(isinstance(c["KeyConditionExpression"], str) for c in calls)
+
+
+@pytest.mark.parametrize("params", [{"q": "英"}, {"q": "英単", "purpose": "x"}])
+def test_invalid_search(catalog, params):
+    assert catalog.lambda_handler({"queryStringParameters": params}, None)["statusCode"] == 400
@@ -0,0 +1,80 @@
+"""getQuestionsFunction の shareCode 解決 (登録テーブル + LRU キャッシュ)"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def tables(make_table):
+    questions = make_table("Questions", "questionId")
+    codes = make_table("ShareCodes", "shareCode")
+    return questions, codes
+
+
+@pytest.fixture
+def get_questions(load_lambda, tables):
+    return load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions", SHARE_CODES_TABLE="ShareCodes")
+
+
+def _by_code(module, code):
+    resp = module.lambda_handler({"queryStringParameters": {"code": code}}, None)
+    assert resp["statusCode"] == 200
+    return [it["questionId"] for it in response_body(resp)]
+
+
+def test_registered_code_is_resolved_and_cached(get_questions, tables):
+    questions, codes = tables
+    questions.put_item(Item={"questionId": "q1", "shareCode": "abc123", "createdAt": "2026-01-01T00:00:00Z"})
+    codes.put_item(Item={"shareCode": "abc123", "questionId": "q1"})
+
+    assert _by_code(get_questions, "ABC123") == ["q1"]
+    # 2回目は登録テーブルを読まない
+    codes.delete_item(Key={"shareCode": "abc123"})
+    assert _by_code(get_questions, "abc123") == ["q1"]
+
+
+def test_reserved_code_without_question(get_questions, tables):
+    _, codes = tables
+    codes.put_item(Item={"shareCode": "resv01", "reservedUntil": 9999999999})
+    assert _by_code(get_questions, "resv01") == []
+
+
+def test_unregistered_code_is_not_scanned_by_default(get_questions, tables, monkeypatch):
+    questions, _ = tables
+    questions.put_item(Item={"questionId": "q2", "shareCode": "old999", "createdAt": "2026-01-01T00:00:00Z"})
+    monkeypatch.setattr(get_questions, "_scan_all", lambda *args, **kwargs: pytest.fail("must not scan"))
+    assert _by_code(get_questions, "old999") == []
+
+
+def test_miss_is_cached_briefly(get_questions, tables):
+    _, codes = tables
+    assert _by_code(get_questions, "nope01") == []
+    # 覚えている間は登録テーブルを読まない
+    codes.put_item(Item={"shareCode": "nope01", "questionId": "q1"})
+    assert _by_code(get_questions, "nope01") == []
+
+    # 期限が切れたら読み直す
+    get_questions._share_code_misses.put("nope01", 0)
+    assert get_questions._lookup_share_code(codes, "nope01") == "q1"
+
+
+def test_legacy_code_is_found_by_scan_and_registered(load_lambda, tables):
+    questions, codes = tables
+    get_questions = load_lambda(
+        "getQuestionsFunction", QUESTIONS_TABLE="Questions", SHARE_CODES_TABLE="ShareCodes", SHARE_CODE_SCAN_FALLBACK="true",
+    )
+    questions.put_item(Item={"questionId": "q2", "shareCode": "old999", "createdAt": "2026-01-01T00:00:00Z"})
+
+    assert _by_code(get_questions, "old999") == ["q2"]
+    assert codes.get_item(Key={"shareCode": "old999"})["Item"]["questionId"] == "q2"
+    # Scan でも見つからなかったコードは覚えておき、続けて Scan しない
+    assert _by_code(get_questions, "none99") == []
+    assert get_questions._share_code_missed("none99")
+
+
+def test_code_of_deleted_question_is_evicted(get_questions, tables):
+    _, codes = tables
+    codes.put_item(Item={"shareCode": "gone01", "questionId": "q3"})
+
+    assert _by_code(get_questions, "gone01") == []
+    assert get_questions._share_code_cache.get("gone01") is None
@@ -0,0 +1,99 @@
+"""getQuestionsFunction のフィードのスナップショット (materialize_handler と ETag / 304)"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def questions(make_table):
+    table = make_table("Questions", "questionId")
+    with table.batch_writer() as batch:
+        for i in range(45):
+            batch.put_item(Item={"questionId": f"q{i:02d}", "createdAt": f"2026-02-01T00:00:{i:02d}Z", "title": "t" * 40})
+    return table
+
+
+@pytest.fixture
+def get_questions(load_lambda, questions, tmp_path):
+    return load_lambda(
+        "getQuestionsFunction",
+        QUESTIONS_TABLE="Questions",
+        PAGINATION_TOKEN_SECRET="secret",
+        FEED_SNAPSHOT_DIR=str(tmp_path),
+        FEED_SNAPSHOT_MANIFEST_TTL="0",
+        DEFAULT_PAGE_SIZE="20",
+    )
+
+
+def _get(module, params=None, headers=None):
+    return module.lambda_handler({"queryStringParameters": params, "headers": headers or {}}, None)
+
+
+def test_snapshot_matches_live_response(get_questions):
+    live = [response_body(get_questions.handler({"queryStringParameters": None}, None, use_snapshot=False))]
+    result = get_questions.materialize_handler({}, None)
+    assert result["skipped"] is False
+    # all + 3ページ (20, 20, 5)
+    assert result["entries"] == 4
+
+    resp = _get(get_questions)
+    assert resp["statusCode"] == 200
+    assert resp["headers"]["ETag"].startswith('"')
+    assert [response_body(resp)] == live
+
+
+def test_snapshot_pages_follow_next_token(get_questions):
+    get_questions.materialize_handler({}, None)
+    ids, token = [], None
+    while True:
+        params = {"limit": "20", **({"nextToken": token} if token else {})}
+        resp = _get(get_questions, params)
+        assert "ETag" in resp["headers"]
+        body = response_body(resp)
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if not token:
+            break
+    assert sorted(ids) == [f"q{i:02d}" for i in range(45)]
+
+
+def test_if_none_match_returns_304(get_questions):
+    get_questions.materialize_handler({}, None)
+    etag = _get(get_questions)["headers"]["ETag"]
+
+    resp = _get(get_questions, headers={"If-None-Match": etag})
+    assert resp["statusCode"] == 304
+    assert resp["body"] == ""
+    # 圧縮した表現の ETag や弱い比較でも一致とみなす
+    assert _get(get_questions, headers={"if-none-match": f'W/{etag[:-1]}-gzip"'})["statusCode"] == 304
+    assert _get(get_questions, headers={"If-None-Match": '"other"'})["statusCode"] == 200
+
+
+def test_stored_gzip_is_served_as_is(get_questions):
+    get_questions.materialize_handler({}, None)
+    resp = _get(get_questions, headers={"Accept-Encoding": "gzip"})
+    assert resp["isBase64Encoded"] is True
+    assert resp["headers"]["Content-Encoding"] == "gzip"
+    assert resp["headers"]["ETag"].endswith('-gzip"')
+    assert len(response_body(resp)) == 45
+
+
+def test_new_version_changes_etag(get_questions, questions):
+    get_questions.materialize_handler({}, None)
+    before = _get(get_questions)["headers"]["ETag"]
+    questions.put_item(Item={"questionId": "new", "createdAt": "2026-03-01T00:00:00Z", "title": "t"})
+    get_questions.materialize_handler({}, None)
+    resp = _get(get_questions, headers={"If-None-Match": before})
+    assert resp["statusCode"] == 200
+    assert response_body(resp)[0]["questionId"] == "new"
+
+
+def test_materialize_skips_outdated_request(get_questions):
+    get_questions.materialize_handler({}, None)
+    assert get_questions.materialize_handler({"requestedAt": "2000-01-01T00:00:00+00:00"}, None)["skipped"] is True
+
+
+def test_filtered_requests_bypass_snapshot(get_questions):
+    get_questions.materialize_handler({}, None)
+    resp = _get(get_questions, {"category": "x"})
+    assert "ETag" not in (resp.get("headers") or {})
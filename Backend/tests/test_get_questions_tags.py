@@ -0,0 +1,133 @@
+"""getQuestionsFunction のタグ転置インデックス (共通部分/和集合のマージとページの詰め方)"""
+import pytest
+
+from conftest import response_body
+
+
+@pytest.fixture
+def get_questions(load_lambda):
+    return load_lambda("getQuestionsFunction", PAGINATION_TOKEN_SECRET="secret")
+
+
+def _stream(*sort_keys):
+    return iter([(k, f"q-{k}") for k in sort_keys])
+
+
+def test_intersect_desc(get_questions):
+    merged = get_questions._intersect_desc([_stream("9", "7", "5", "3", "1"), _stream("8", "7", "3", "2"), _stream("7", "6", "3")])
+    assert [k for k, _ in merged] == ["7", "3"]
+
+
+@pytest.mark.parametrize("streams", [
+    [("3", "2"), ()],
+    [("5", "3"), ("4", "2")],
+    [("1",), ("9", "8")],
+])
+def test_intersect_desc_without_common_postings(get_questions, streams):
+    assert list(get_questions._intersect_desc([_stream(*s) for s in streams])) == []
+
+
+def test_intersect_desc_last_posting_matches(get_questions):
+    merged = get_questions._intersect_desc([_stream("9", "1"), _stream("5", "1")])
+    assert [k for k, _ in merged] == ["1"]
+
+
+def test_union_desc_drops_duplicates(get_questions):
+    merged = get_questions._union_desc([_stream("9", "5", "1"), _stream("8", "5", "2")])
+    assert [k for k, _ in merged] == ["9", "8", "5", "2", "1"]
+
+
+def _hydrate(missing=()):
+    calls = []
+
+    def hydrate(ids):
+        calls.append(list(ids))
+        return [{"questionId": qid} for qid in ids if qid not in missing]
+
+    return hydrate, calls
+
+
+def _candidates(n):
+    return iter([(pos, f"q{pos}") for pos in range(1, n + 1)])
+
+
+def test_fill_page_exact_fit_has_no_next_page(get_questions):
+    hydrate, _ = _hydrate()
+    items, cursor, has_next = get_questions._fill_page(_candidates(3), 3, hydrate)
+    assert [it["questionId"] for it in items] == ["q1", "q2", "q3"]
+    assert (cursor, has_next) == (3, False)
+
+
+def test_fill_page_one_extra_candidate_has_next_page(get_questions):
+    hydrate, _ = _hydrate()
+    items, cursor, has_next = get_questions._fill_page(_candidates(4), 3, hydrate)
+    assert len(items) == 3
+    assert (cursor, has_next) == (3, True)
+
+
+def test_fill_page_skips_deleted_and_filtered(get_questions):
+    hydrate, calls = _hydrate(missing={"q2"})
+    keep = lambda it: it["questionId"] != "q3"
+    items, cursor, has_next = get_questions._fill_page(_candidates(6), 3, hydrate, keep)
+    assert [it["questionId"] for it in items] == ["q1", "q4", "q5"]
+    # カーソルは最後に返した候補で、読みすぎた分 (q6) は次のページに残る
+    assert (cursor, has_next) == (5, True)
+    # 足りない分だけ追加で取得する
+    assert calls == [["q1", "q2", "q3"], ["q4", "q5"]]
+
+
+def test_fill_page_cursor_advances_past_trailing_skips(get_questions):
+    hydrate, _ = _hydrate(missing={"q3", "q4"})
+    items, cursor, has_next = get_questions._fill_page(_candidates(4), 3, hydrate)
+    assert [it["questionId"] for it in items] == ["q1", "q2"]
+    assert (cursor, has_next) == (4, False)
+
+
+def test_fill_page_empty(get_questions):
+    hydrate, calls = _hydrate()
+    assert get_questions._fill_page(iter([]), 3, hydrate) == ([], None, False)
+    assert calls == []
+
+
+@pytest.fixture
+def tagged(load_lambda, make_table):
+    questions = make_table("Questions", "questionId")
+    tag_index = make_table("TagIndex", "tag", "sortKey")
+    for i in range(12):
+        created_at = f"2026-01-{i + 1:02d}T00:00:00Z"
+        tags = ["a"] + (["b"] if i % 2 else []) + (["c"] if i % 3 == 0 else [])
+        questions.put_item(Item={"questionId": f"q{i:02d}", "createdAt": created_at, "tags": tags, "title": "t"})
+        for tag in tags:
+            tag_index.put_item(Item={"tag": tag, "sortKey": f"{created_at}#q{i:02d}", "questionId": f"q{i:02d}"})
+    return load_lambda(
+        "getQuestionsFunction", QUESTIONS_TABLE="Questions", TAG_INDEX_TABLE="TagIndex", PAGINATION_TOKEN_SECRET="secret"
+    )
+
+
+def _tag_pages(module, limit, **params):
+    ids, token = [], None
+    while True:
+        query = dict(params, limit=str(limit), **({"nextToken": token} if token else {}))
+        resp = module.lambda_handler({"queryStringParameters": query}, None)
+        body = response_body(resp)
+        assert resp["statusCode"] == 200, body
+        ids += [it["questionId"] for it in body["items"]]
+        token = body["nextToken"]
+        if not token:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 6, 12, 20])
+def test_single_tag_pages_newest_first(tagged, limit):
+    assert _tag_pages(tagged, limit, tag="a") == [f"q{i:02d}" for i in range(11, -1, -1)]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5])
+def test_tag_and_pages(tagged, limit):
+    assert _tag_pages(tagged, limit, tags="b,c") == ["q09", "q03"]
+
+
+@pytest.mark.parametrize("limit", [1, 4])
+def test_tag_or_pages(tagged, limit):
+    expected = [f"q{i:02d}" for i in range(11, -1, -1) if i % 2 or i % 3 == 0]
+    assert _tag_pages(tagged, limit, tags="b,c", tagMode="or") == expected
@@ -0,0 +1,169 @@
+"""analyzeQuestionItemsFunction の項目分析 (NumPy の実装と、NumPy が無いときの Python の実装の両方)"""
+import math
+import random
+import statistics
+
+import pytest
+
+from conftest import FakeContext
+
+QUIZ_ITEMS = [
+    {"id": f"i{j}", "choices": [{"id": c} for c in "abc"], "correctAnswerId": "a"} for j in range(3)
+]
+
+
+@pytest.fixture
+def tables(make_table):
+    return {
+        "questions": make_table("Questions", "questionId"),
+        "answers": make_table("AnswersLog", "logId", indexes=[("QuestionIndex", "questionId", None)]),
+        "stats": make_table("QuestionStats", "questionId"),
+        "items": make_table("QuestionItemStats", "questionId", "quizItemId"),
+    }
+
+
+@pytest.fixture(params=["numpy", "python"])
+def analyze(request, load_lambda, tables, monkeypatch):
+    module = load_lambda(
+        "analyzeQuestionItemsFunction",
+        QUESTIONS_TABLE="Questions",
+        ANSWERS_TABLE="AnswersLog",
+        QUESTION_STATS_TABLE="QuestionStats",
+        QUESTION_ITEM_STATS_TABLE="QuestionItemStats",
+        ITEM_ANALYSIS_MIN_RESPONDENTS="4",
+    )
+    if request.param == "numpy":
+        if module.np is None:
+            pytest.skip("numpy is not installed")
+    else:
+        # NumPy が入っていても Python の実装で計算させる
+        monkeypatch.setattr(module, "np", None)
+    return module
+
+
+def _statistics(analyze, correct, choices, n_choices):
+    """モジュールが使う方の実装で計算し、結果をリストにそろえる"""
+    if analyze.np is None:
+        return analyze.item_statistics_py(correct, choices, n_choices)
+    np = analyze.np
+    stats = analyze.item_statistics(np.array(correct, dtype=float), np.array(choices, dtype=np.int64), n_choices)
+    return {key: value.tolist() for key, value in stats.items()}
+
+
+NAN = math.nan
+CORRECT = [
+    [1, 1, 1],
+    [1, 1, 0],
+    [1, 0, NAN],
+    [0, 0, 0],
+    [0, 1, 0],
+]
+
+
+def _choices(correct):
+    """正答は選択肢 0、誤答は選択肢 1、未回答は -1"""
+    return [[-1 if math.isnan(v) else 0 if v == 1 else 1 for v in row] for row in correct]
+
+
+def test_item_statistics_matches_direct_computation(analyze):
+    choices = _choices(CORRECT)
+    choices[4][2] = 2
+    stats = _statistics(analyze, CORRECT, choices, 3)
+
+    assert list(stats["respondents"]) == [5, 5, 4]
+    assert stats["difficulty"] == pytest.approx([0.6, 0.6, 0.25])
+    # 識別力: 項目の正誤と、残りの項目の正答率の相関 (その項目に答えた人だけ)
+    for j in range(3):
+        rows = [row for row in CORRECT if not math.isnan(row[j])]
+        rest = [statistics.fmean(v for k, v in enumerate(row) if k != j and not math.isnan(v)) for row in rows]
+        expected = statistics.correlation([row[j] for row in rows], rest)
+        assert stats["discrimination"][j] == pytest.approx(expected)
+    assert stats["choiceRate"][2] == pytest.approx([0.25, 0.5, 0.25])
+    # 誤答の選択肢の点双列相関: 選んだかどうかと、残りの項目の正答率の相関
+    rows = [i for i, row in enumerate(CORRECT) if not math.isnan(row[2])]
+    rest = [statistics.fmean(CORRECT[i][:2]) for i in rows]
+    expected = statistics.correlation([1.0 if choices[i][2] == 1 else 0.0 for i in rows], rest)
+    assert stats["choiceDiscrimination"][2][1] == pytest.approx(expected)
+
+
+def test_python_implementation_matches_numpy(load_lambda, tables):
+    np = pytest.importorskip("numpy")
+    module = load_lambda("analyzeQuestionItemsFunction", QUESTIONS_TABLE="Questions", QUESTION_ITEM_STATS_TABLE="QuestionItemStats")
+    rng = random.Random(7)
+    choices = [[rng.choice([-1, 0, 1, 2, 3]) for _ in range(6)] for _ in range(40)]
+    correct = [[NAN if k < 0 else float(k == 0) for k in row] for row in choices]
+
+    expected = module.item_statistics(np.array(correct), np.array(choices, dtype=np.int64), 4)
+    actual = module.item_statistics_py(correct, choices, 4)
+    for key, value in expected.items():
+        assert np.allclose(np.array(actual[key], dtype=float), value, equal_nan=True), key
+
+
+def test_constant_item_has_no_discrimination(analyze):
+    correct = [[1, 1], [1, 0], [1, 1]]
+    stats = _statistics(analyze, correct, [[0, 0]] * 3, 2)
+    assert math.isnan(stats["discrimination"][0])
+    assert analyze._num(stats["discrimination"][0]) is None
+
+
+def _log(tables, n, user_id, quiz_item_id, choice, correct, ts="2026-01-01T00:00:00Z"):
+    tables["answers"].put_item(Item={
+        "logId": f"l{n}", "questionId": "q1", "userId": user_id, "quizItemId": quiz_item_id,
+        "selectedChoiceId": choice, "isCorrect": correct, "timestamp": ts,
+    })
+
+
+def _seed(tables, users):
+    tables["questions"].put_item(Item={"questionId": "q1", "quizItems": QUIZ_ITEMS})
+    tables["stats"].put_item(Item={"questionId": "q1", "lastAnsweredAt": "2026-01-02T00:00:00Z"})
+    n = 0
+    for u in range(users):
+        for j in range(3):
+            right = (u + j) % 3 != 0
+            _log(tables, n, f"u{u}", f"i{j}", "a" if right else "bc"[u % 2], right)
+            n += 1
+    return n
+
+
+def test_analyze_writes_results_and_marks_progress(analyze, tables):
+    n = _seed(tables, 6)
+    # 2回目の回答は使わない (最初の回答だけ)
+    _log(tables, n, "u0", "i0", "a", True, ts="2026-01-02T00:00:00Z")
+
+    assert analyze.lambda_handler({}, FakeContext()) == {"done": True, "questions": 1, "items": 3}
+    row = tables["items"].get_item(Key={"questionId": "q1", "quizItemId": "i0"})["Item"]
+    assert row["respondents"] == 6
+    assert float(row["difficulty"]) == pytest.approx(4 / 6, abs=1e-4)
+    assert set(row["distractors"]) == {"b", "c"}
+    assert tables["stats"].get_item(Key={"questionId": "q1"})["Item"]["analyzedThrough"] == "2026-01-02T00:00:00Z"
+
+    # 回答が増えるまでは分析し直さない
+    assert analyze.lambda_handler({}, FakeContext())["questions"] == 0
+
+
+def test_too_few_respondents_are_not_written(analyze, tables):
+    _seed(tables, 3)
+    assert analyze.lambda_handler({"questionIds": ["q1"]}, FakeContext())["items"] == {"q1": 0}
+    assert tables["items"].scan()["Items"] == []
+    assert tables["stats"].get_item(Key={"questionId": "q1"})["Item"]["analyzedThrough"]
+
+
+def test_edited_items_and_choices_are_ignored(analyze, tables):
+    responses = {
+        ("u1", "i0"): {"selectedChoiceId": "a", "isCorrect": True},
+        ("u1", "gone"): {"selectedChoiceId": "a", "isCorrect": True},
+        ("u2", "i1"): {"selectedChoiceId": "z", "isCorrect": False},
+    }
+    correct, choices = analyze._answer_matrix(responses, QUIZ_ITEMS)
+    assert (len(correct), len(correct[0])) == (2, 3)
+    assert correct[0][0] == 1 and math.isnan(correct[1][1])
+    assert choices[1][1] == -1
+
+
+def test_backfill_marker_row_is_not_analyzed(analyze, tables, monkeypatch):
+    tables["stats"].put_item(Item={"questionId": "#backfill", "completedAt": "2026-01-01T00:00:00Z"})
+    analyzed = []
+    monkeypatch.setattr(analyze, "_analyze", lambda qid: analyzed.append(qid) or 0)
+    analyze.lambda_handler({}, FakeContext())
+    assert analyzed == []
+
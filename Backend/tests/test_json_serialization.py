@@ -0,0 +1,43 @@
+"""_dumps (orjson があれば orjson、無ければ標準 json) が従来の DecimalEncoder と同じ値を返すこと"""
+import json
+from decimal import Decimal
+
+import pytest
+
+FUNCTIONS = ["getQuestionsFunction", "getQuestionDetailFunction", "getQuestionsByAuthorFunction"]
+
+ROWS = [
+    {"questionId": "q1", "title": "日本語", "count": Decimal("3"), "ratio": Decimal("0.25"), "tags": ["a", "b"]},
+    {"questionId": "q2", "nested": {"n": Decimal("-7"), "f": Decimal("1.5")}, "empty": None, "flag": True},
+]
+
+
+@pytest.fixture(params=FUNCTIONS)
+def module(request, load_lambda):
+    return load_lambda(request.param)
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def dumps(request, module, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(module, "orjson", None)
+    elif module.orjson is None:
+        pytest.skip("orjson is not installed")
+    return module._dumps
+
+
+def test_decimals_become_int_or_float(dumps):
+    assert json.loads(dumps(ROWS)) == [
+        {"questionId": "q1", "title": "日本語", "count": 3, "ratio": 0.25, "tags": ["a", "b"]},
+        {"questionId": "q2", "nested": {"n": -7, "f": 1.5}, "empty": None, "flag": True},
+    ]
+    assert "日本語" in dumps(ROWS)
+
+
+def test_integers_beyond_64_bits(dumps):
+    assert json.loads(dumps({"big": 2 ** 70, "dec": Decimal(2 ** 70)})) == {"big": 2 ** 70, "dec": 2 ** 70}
+
+
+def test_unsupported_types_still_fail(dumps):
+    with pytest.raises(TypeError):
+        dumps({"s": object()})
@@ -0,0 +1,128 @@
+"""logAnswerFunction の POST .../batch (チャンクごとの集計と attemptId での送り直し)"""
+import json
+
+import pytest
+
+ENV = {
+    "ANSWERS_TABLE": "AnswersLog",
+    "QUESTION_STATS_TABLE": "QuestionStats",
+    "ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions",
+    "BATCH_WRITE_MAX_ATTEMPTS": "2",
+}
+
+
+@pytest.fixture
+def tables(make_table):
+    return {
+        "answers": make_table("AnswersLog", "logId"),
+        "stats": make_table("QuestionStats", "questionId"),
+        "answered": make_table("AnsweredQuestions", "userId", "questionId"),
+    }
+
+
+@pytest.fixture
+def log_answer(load_lambda, tables, monkeypatch):
+    module = load_lambda("logAnswerFunction", **ENV)
+    monkeypatch.setattr(module.time, "sleep", lambda _: None)
+    return module
+
+
+def _body(n, **extra):
+    answers = [{"questionId": f"q{i % 3}", "selectedChoiceId": "a", "isCorrect": i % 2 == 0} for i in range(n)]
+    return {"userId": "u1", "answers": answers, **extra}
+
+
+def _post(module, body, headers=None):
+    event = {"resource": "/answers/batch", "body": json.dumps(body)}
+    if headers:
+        event["headers"] = headers
+    resp = module.lambda_handler(event, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+
+def _total_answers(tables):
+    return sum(int(it["totalAnswers"]) for it in tables["stats"].scan()["Items"])
+
+
+def _log_count(tables):
+    return tables["answers"].scan(Select="COUNT")["Count"]
+
+
+def test_batch_logs_and_aggregates(log_answer, tables):
+    status, body = _post(log_answer, _body(60))
+    assert (status, body["logged"], body["alreadyLogged"]) == (201, 60, 0)
+    assert _log_count(tables) == 60
+    assert _total_answers(tables) == 60
+
+
+def test_retry_with_attempt_id_is_not_double_counted(log_answer, tables):
+    assert _post(log_answer, _body(30, attemptId="a1"))[0] == 201
+    status, body = _post(log_answer, _body(30, attemptId="a1"))
+    assert (status, body["alreadyLogged"]) == (201, 30)
+    assert _log_count(tables) == 30
+    assert _total_answers(tables) == 30
+    assert int(tables["answered"].get_item(Key={"userId": "u1", "questionId": "q0"})["Item"]["attempts"]) == 10
+
+
+def test_idempotency_key_header_is_an_attempt_id(log_answer, tables):
+    _post(log_answer, _body(5), headers={"Idempotency-Key": "k1"})
+    _post(log_answer, _body(5, attemptId="k1"))
+    assert _log_count(tables) == 5
+
+
+def test_attempt_ids_are_scoped_per_user(log_answer, tables):
+    _post(log_answer, _body(5, attemptId="a1"))
+    _post(log_answer, dict(_body(5, attemptId="a1"), userId="u2"))
+    assert _log_count(tables) == 10
+
+
+def test_partial_failure_keeps_written_chunks_aggregated(log_answer, tables, monkeypatch):
+    client = log_answer.dynamodb.meta.client
+    real_write = client.batch_write_item
+    calls = []
+
+    def fail_second_chunk(RequestItems):
+        calls.append(1)
+        if len(calls) > 1:
+            return {"UnprocessedItems": RequestItems}
+        return real_write(RequestItems=RequestItems)
+
+    monkeypatch.setattr(client, "batch_write_item", fail_second_chunk)
+    status, _ = _post(log_answer, _body(40, attemptId="a1"))
+    assert status == 500
+    # 書けた1チャンク目 (25件) は集計にも入っている
+    assert _log_count(tables) == 25
+    assert _total_answers(tables) == 25
+
+    monkeypatch.setattr(client, "batch_write_item", real_write)
+    status, body = _post(log_answer, _body(40, attemptId="a1"))
+    assert (status, body["alreadyLogged"]) == (201, 25)
+    assert _log_count(tables) == 40
+    assert _total_answers(tables) == 40
+
+
+@pytest.mark.parametrize("attempt_id", ["", "   ", 5, "x" * 129])
+def test_bad_attempt_id_is_400(log_answer, tables, attempt_id):
+    assert _post(log_answer, _body(2, attemptId=attempt_id))[0] == 400
+    assert _log_count(tables) == 0
+
+
+@pytest.mark.parametrize("body", [
+    {"answers": [{"questionId": "q1", "selectedChoiceId": "a", "isCorrect": True}]},
+    {"userId": "u1", "answers": []},
+    {"userId": "u1", "answers": [{"questionId": "q1", "selectedChoiceId": "a", "isCorrect": "yes"}]},
+    {"userId": "u1", "answers": [{"selectedChoiceId": "a", "isCorrect": True}]},
+    {"userId": "u1", "answers": [{"questionId": "q1", "selectedChoiceId": "a", "isCorrect": True}] * 101},
+])
+def test_invalid_batch_writes_nothing(log_answer, tables, body):
+    assert _post(log_answer, body)[0] == 400
+    assert _log_count(tables) == 0
+
+
+def test_question_id_can_be_given_once(log_answer, tables):
+    body = {"userId": "u1", "questionId": "q7", "answers": [
+        {"selectedChoiceId": "a", "isCorrect": True},
+        {"questionId": "q8", "selectedChoiceId": "b", "isCorrect": False},
+    ]}
+    assert _post(log_answer, body)[0] == 201
+    assert sorted(it["questionId"] for it in tables["answers"].scan()["Items"]) == ["q7", "q8"]
@@ -0,0 +1,81 @@
+"""一覧の summary / full の射影 (getQuestionsFunction と getQuestionsByAuthorFunction)"""
+import pytest
+
+from conftest import response_body
+
+QUESTION = {
+    "questionId": "q1",
+    "title": "t",
+    "purpose": "p",
+    "tags": ["a"],
+    "remarks": "r",
+    "authorId": "author",
+    "quizItems": [{"id": "i1", "text": "x" * 100}],
+    "quizItemCount": 1,
+    "createdAt": "2026-01-01T00:00:00Z",
+    "shareCode": "abc123",
+}
+SUMMARY_KEYS = {"questionId", "title", "purpose", "tags", "authorId", "createdAt", "quizItemCount"}
+
+
+@pytest.fixture
+def questions(make_table):
+    table = make_table("Questions", "questionId", indexes=[("AuthorIdIndex", "authorId", None)])
+    table.put_item(Item=QUESTION)
+    return table
+
+
+@pytest.fixture
+def get_questions(load_lambda, questions):
+    return load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions", PAGINATION_TOKEN_SECRET="secret")
+
+
+@pytest.fixture
+def by_author(load_lambda, questions):
+    return load_lambda("getQuestionsByAuthorFunction", QUESTIONS_TABLE="Questions", PAGINATION_TOKEN_SECRET="secret")
+
+
+def _list(module, **params):
+    resp = module.lambda_handler({"queryStringParameters": params or None}, None)
+    assert resp["statusCode"] == 200
+    return response_body(resp)
+
+
+def test_paginated_list_defaults_to_summary(get_questions):
+    assert set(_list(get_questions, limit="10")["items"][0]) == SUMMARY_KEYS
+
+
+def test_legacy_list_stays_full(get_questions):
+    item = _list(get_questions)[0]
+    assert item["quizItems"] == QUESTION["quizItems"]
+    assert item["shareCode"] == "abc123"
+
+
+def test_full_view_on_request(get_questions):
+    assert "quizItems" in _list(get_questions, limit="10", view="full")["items"][0]
+
+
+def test_unknown_view_is_rejected(get_questions):
+    resp = get_questions.lambda_handler({"queryStringParameters": {"view": "all"}}, None)
+    assert resp["statusCode"] == 400
+
+
+def _by_author(module, **params):
+    event = {"pathParameters": {"userId": "author"}, "queryStringParameters": params or None}
+    resp = module.lambda_handler(event, None)
+    return resp["statusCode"], response_body(resp)
+
+
+def test_author_list_summary_and_full(by_author):
+    status, page = _by_author(by_author, limit="5")
+    assert status == 200
+    assert set(page["items"][0]) == SUMMARY_KEYS
+    status, items = _by_author(by_author)
+    assert status == 200
+    assert items[0]["quizItems"] == QUESTION["quizItems"]
+
+
+def test_author_list_rejects_foreign_token(by_author, get_questions):
+    token = get_questions._encode_token({"questionId": "q1"}, {"purpose": ""})
+    status, _ = _by_author(by_author, limit="5", nextToken=token)
+    assert status == 400
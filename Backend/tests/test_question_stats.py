@@ -0,0 +1,166 @@
+"""質問ごとの集計 (logAnswerFunction の ADD、backfillQuestionStatsFunction、getQuestionAnalyticsFunction)"""
+import json
+
+import pytest
+
+from conftest import FakeContext
+
+ENV = {
+    "ANSWERS_TABLE": "AnswersLog",
+    "QUESTION_STATS_TABLE": "QuestionStats",
+    "ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions",
+}
+
+
+@pytest.fixture
+def tables(make_table):
+    return {
+        "questions": make_table("Questions", "questionId"),
+        "answers": make_table("AnswersLog", "logId", indexes=[("QuestionIndex", "questionId", None)]),
+        "stats": make_table("QuestionStats", "questionId"),
+        "answered": make_table("AnsweredQuestions", "userId", "questionId"),
+    }
+
+
+@pytest.fixture
+def log_answer(load_lambda, tables):
+    return load_lambda("logAnswerFunction", **ENV)
+
+
+def _answer(module, user_id, question_id="q1", correct=True, choice="a"):
+    body = {"questionId": question_id, "userId": user_id, "selectedChoiceId": choice, "isCorrect": correct}
+    resp = module.lambda_handler({"body": json.dumps(body)}, None)
+    assert resp["statusCode"] == 201
+
+
+def _stats(tables, question_id="q1"):
+    return tables["stats"].get_item(Key={"questionId": question_id})["Item"]
+
+
+def test_first_and_repeat_answers(log_answer, tables):
+    _answer(log_answer, "u1", correct=False, choice="b")
+    stats = _stats(tables)
+    assert (stats["totalAnswers"], stats["correctAnswers"], stats["uniqueAnswerers"]) == (1, 0, 1)
+    first = tables["answered"].get_item(Key={"userId": "u1", "questionId": "q1"})["Item"]
+    assert first["attempts"] == 1
+
+    # 同じユーザーの2回目は uniqueAnswerers を増やさない
+    _answer(log_answer, "u1")
+    stats = _stats(tables)
+    assert (stats["totalAnswers"], stats["correctAnswers"], stats["uniqueAnswerers"]) == (2, 1, 1)
+    marker = tables["answered"].get_item(Key={"userId": "u1", "questionId": "q1"})["Item"]
+    assert marker["attempts"] == 2
+    assert marker["firstAnsweredAt"] == first["firstAnsweredAt"]
+    assert (marker["lastIsCorrect"], marker["lastSelectedChoiceId"]) == (True, "a")
+
+    _answer(log_answer, "u2")
+    assert _stats(tables)["uniqueAnswerers"] == 2
+
+
+def test_batch_groups_answers_per_user_and_question(log_answer, tables):
+    body = {"userId": "u1", "answers": [
+        {"questionId": "q1", "selectedChoiceId": "a", "isCorrect": True},
+        {"questionId": "q1", "selectedChoiceId": "b", "isCorrect": False},
+        {"questionId": "q2", "selectedChoiceId": "a", "isCorrect": True},
+    ]}
+    resp = log_answer.lambda_handler({"resource": "/answers/batch", "body": json.dumps(body)}, None)
+    assert resp["statusCode"] == 201
+    stats = _stats(tables)
+    assert (stats["totalAnswers"], stats["correctAnswers"], stats["uniqueAnswerers"]) == (2, 1, 1)
+    assert tables["answered"].get_item(Key={"userId": "u1", "questionId": "q1"})["Item"]["attempts"] == 2
+    assert _stats(tables, "q2")["uniqueAnswerers"] == 1
+
+
+def test_unique_answerers_not_counted_without_markers(load_lambda, tables):
+    env = dict(ENV)
+    del env["ANSWERED_QUESTIONS_TABLE"]
+    log_answer = load_lambda("logAnswerFunction", **env)
+    _answer(log_answer, "u1")
+    _answer(log_answer, "u1")
+    stats = _stats(tables)
+    # 初回かどうか分からないので数えない (backfillQuestionStatsFunction で作り直す)
+    assert stats["totalAnswers"] == 2
+    assert "uniqueAnswerers" not in stats
+
+
+@pytest.fixture
+def analytics(load_lambda, tables):
+    return load_lambda("getQuestionAnalyticsFunction", ANSWERS_TABLE="AnswersLog", QUESTION_STATS_TABLE="QuestionStats")
+
+
+def _analytics(module, question_id="q1"):
+    resp = module.lambda_handler({"pathParameters": {"questionId": question_id}}, None)
+    assert resp["statusCode"] == 200
+    return json.loads(resp["body"])
+
+
+def _legacy_logs(tables):
+    # 集計の導入前に記録された回答
+    for i, user_id in enumerate(["u1", "u1", "u2"]):
+        tables["answers"].put_item(Item={
+            "logId": f"old{i}", "questionId": "q1", "userId": user_id,
+            "isCorrect": i != 1, "selectedChoiceId": "a", "timestamp": f"2026-01-01T00:00:0{i}Z",
+        })
+
+
+def test_stats_row_is_not_trusted_before_backfill(log_answer, analytics, tables):
+    _legacy_logs(tables)
+    tables["questions"].put_item(Item={"questionId": "q1"})
+    # 導入後の最初の回答が集計の行を作る (それより前の3件は入っていない)
+    _answer(log_answer, "u3")
+    assert _stats(tables)["totalAnswers"] == 1
+
+    result = _analytics(analytics)
+    assert (result["totalAnswers"], result["correctAnswers"], result["uniqueAnswerers"]) == (4, 3, 3)
+
+
+def test_stats_row_is_used_after_backfill(load_lambda, log_answer, analytics, tables):
+    _legacy_logs(tables)
+    tables["questions"].put_item(Item={"questionId": "q1"})
+    _answer(log_answer, "u3")
+
+    backfill = load_lambda("backfillQuestionStatsFunction", QUESTIONS_TABLE="Questions", **ENV)
+    result = backfill.lambda_handler({}, FakeContext())
+    assert (result["done"], result["completed"]) == (True, True)
+    stats = _stats(tables)
+    assert (stats["totalAnswers"], stats["correctAnswers"], stats["uniqueAnswerers"]) == (4, 3, 3)
+    assert _stats(tables, "#backfill")["completedAt"]
+
+    _answer(log_answer, "u1")
+    result = _analytics(analytics)
+    assert (result["totalAnswers"], result["uniqueAnswerers"], result["accuracy"]) == (5, 3, 80.0)
+    # 行から読んでいる (回答ログを読み直していない)
+    tables["stats"].update_item(Key={"questionId": "q1"}, UpdateExpression="SET totalAnswers = :n", ExpressionAttributeValues={":n": 50})
+    assert _analytics(analytics)["totalAnswers"] == 50
+
+
+def test_backfill_completes_after_every_segment(load_lambda, tables, monkeypatch):
+    for i in range(6):
+        tables["questions"].put_item(Item={"questionId": f"q{i}"})
+    backfill = load_lambda("backfillQuestionStatsFunction", QUESTIONS_TABLE="Questions", **ENV)
+    calls = []
+    monkeypatch.setattr(backfill.lambda_client, "invoke", lambda **kwargs: calls.append(json.loads(kwargs["Payload"])))
+
+    assert backfill.lambda_handler({"totalSegments": 2}, FakeContext())["segments"] == 2
+    assert [c["segment"] for c in calls] == [0, 1]
+    assert calls[0]["runId"] == calls[1]["runId"]
+    assert backfill.lambda_handler(calls[0], FakeContext())["completed"] is False
+    assert "completedAt" not in _stats(tables, "#backfill")
+    assert "Item" not in tables["answered"].get_item(Key={"userId": "#backfill", "questionId": "#backfill"})
+    assert backfill.lambda_handler(calls[1], FakeContext())["completed"] is True
+    assert _stats(tables, "#backfill")["completedAt"]
+    # AnsweredQuestions にも完了の印を書く (checkAnswerStatusFunction / getQuestionsFunction が見る)
+    assert tables["answered"].get_item(Key={"userId": "#backfill", "questionId": "#backfill"})["Item"]["completedAt"]
+
+
+def test_superseded_run_does_not_complete(load_lambda, tables, monkeypatch):
+    backfill = load_lambda("backfillQuestionStatsFunction", QUESTIONS_TABLE="Questions", **ENV)
+    calls = []
+    monkeypatch.setattr(backfill.lambda_client, "invoke", lambda **kwargs: calls.append(json.loads(kwargs["Payload"])))
+    backfill.lambda_handler({"totalSegments": 2}, FakeContext())
+    old = calls[:]
+    # 途中で実行し直した
+    backfill.lambda_handler({"totalSegments": 1}, FakeContext())
+    completed_at = _stats(tables, "#backfill")["completedAt"]
+    assert [backfill.lambda_handler(c, FakeContext())["completed"] for c in old] == [False, False]
+    assert _stats(tables, "#backfill")["completedAt"] == completed_at
@@ -0,0 +1,104 @@
+"""quizItems の圧縮保存 (QUIZ_ITEMS_STORAGE=zlib) と読み出し・移行"""
+import json
+import zlib
+from decimal import Decimal
+
+import pytest
+
+from conftest import response_body, FakeContext
+
+QUIZ_ITEMS = [
+    {"id": "1", "questionText": "日本の首都は？", "choices": [{"id": "a", "text": "東京"}, {"id": "b", "text": "大阪"}], "correctAnswerId": "a"},
+    {"id": "2", "questionText": "1 + 1 = ?", "choices": [{"id": "a", "text": "2"}, {"id": "b", "text": "3"}], "correctAnswerId": "a"},
+]
+# 作成時は正規化で消える数値属性を含む、既存データ相当の quizItems
+LEGACY_QUIZ_ITEMS = [dict(QUIZ_ITEMS[0]), dict(QUIZ_ITEMS[1], points=2)]
+
+
+@pytest.fixture
+def questions(make_table):
+    return make_table("Questions", "questionId", indexes=[("AuthorIdIndex", "authorId", "createdAt")])
+
+
+def _create(module, question_id):
+    body = {"questionId": question_id, "title": "t", "authorId": "u1", "quizItems": QUIZ_ITEMS}
+    event = {"requestContext": {"authorizer": {"claims": {"sub": "u1"}}}, "body": json.dumps(body)}
+    resp = module.lambda_handler(event, None)
+    assert resp["statusCode"] == 201
+    return response_body(resp)
+
+
+def test_zlib_storage_round_trip(load_lambda, questions):
+    create = load_lambda("createQuestionFunction", QUESTIONS_TABLE="Questions", QUIZ_ITEMS_STORAGE="zlib")
+    created = _create(create, "q1")
+    # レスポンスは従来どおりのリスト
+    assert created["quizItems"] == QUIZ_ITEMS
+
+    stored = questions.get_item(Key={"questionId": "q1"})["Item"]
+    assert "quizItems" not in stored
+    assert json.loads(zlib.decompress(stored["quizItemsZ"].value)) == QUIZ_ITEMS
+    assert stored["quizItemCount"] == 2
+
+    detail = load_lambda("getQuestionDetailFunction", QUESTIONS_TABLE="Questions")
+    resp = detail.lambda_handler({"pathParameters": {"questionId": "q1"}}, None)
+    assert response_body(resp)["quizItems"] == QUIZ_ITEMS
+    assert "quizItemsZ" not in response_body(resp)
+
+    listing = load_lambda("getQuestionsFunction", QUESTIONS_TABLE="Questions")
+    items = response_body(listing.lambda_handler({"queryStringParameters": None}, None))
+    assert [it["quizItems"] for it in items] == [QUIZ_ITEMS]
+
+    by_author = load_lambda("getQuestionsByAuthorFunction", QUESTIONS_TABLE="Questions")
+    items = response_body(by_author.lambda_handler({"pathParameters": {"userId": "u1"}}, None))
+    assert [it["quizItems"] for it in items] == [QUIZ_ITEMS]
+    assert "quizItemsZ" not in items[0]
+
+
+def test_default_storage_is_a_list(load_lambda, questions):
+    create = load_lambda("createQuestionFunction", QUESTIONS_TABLE="Questions")
+    _create(create, "q1")
+    stored = questions.get_item(Key={"questionId": "q1"})["Item"]
+    assert "quizItemsZ" not in stored
+    assert stored["quizItems"] == QUIZ_ITEMS
+
+
+def test_replay_of_compressed_question_is_decoded(load_lambda, questions):
+    create = load_lambda("createQuestionFunction", QUESTIONS_TABLE="Questions", QUIZ_ITEMS_STORAGE="zlib")
+    _create(create, "q1")
+    replayed = _create(create, "q1")
+    assert replayed["quizItems"] == QUIZ_ITEMS
+
+
+def test_backfill_converts_both_ways(load_lambda, questions):
+    questions.put_item(Item={"questionId": "q1", "createdAt": "2026-01-01T00:00:00Z", "quizItems": LEGACY_QUIZ_ITEMS})
+    questions.put_item(Item={"questionId": "q2", "createdAt": "2026-01-02T00:00:00Z", "quizItems": LEGACY_QUIZ_ITEMS[:1]})
+    backfill = load_lambda("backfillQuestionIndexesFunction", QUESTIONS_TABLE="Questions")
+
+    result = backfill.lambda_handler({"convertQuizItems": "zlib"}, FakeContext())
+    assert (result["done"], result["converted"]) == (True, 2)
+    stored = questions.get_item(Key={"questionId": "q1"})["Item"]
+    assert "quizItems" not in stored
+    # DynamoDB の数値 (Decimal) も JSON の整数に戻る
+    assert json.loads(zlib.decompress(stored["quizItemsZ"].value)) == LEGACY_QUIZ_ITEMS
+    # 移行済みの項目は書き換えない
+    assert backfill.lambda_handler({"convertQuizItems": "zlib"}, FakeContext())["converted"] == 0
+
+    assert backfill.lambda_handler({"convertQuizItems": "list"}, FakeContext())["converted"] == 2
+    stored = questions.get_item(Key={"questionId": "q1"})["Item"]
+    assert "quizItemsZ" not in stored
+    assert stored["quizItems"] == LEGACY_QUIZ_ITEMS
+    assert stored["quizItems"][1]["points"] == Decimal(2)
+
+
+def test_backfill_rejects_unknown_format(load_lambda, questions):
+    backfill = load_lambda("backfillQuestionIndexesFunction", QUESTIONS_TABLE="Questions")
+    with pytest.raises(ValueError):
+        backfill.lambda_handler({"convertQuizItems": "gzip"}, FakeContext())
+
+
+def test_conversion_skips_question_deleted_after_read(load_lambda, questions):
+    backfill = load_lambda("backfillQuestionIndexesFunction", QUESTIONS_TABLE="Questions")
+    # スキャンで読んだ後に削除された質問
+    converted = backfill._convert_quiz_items(questions, [{"questionId": "gone", "quizItems": QUIZ_ITEMS}], "zlib")
+    assert converted == 0
+    assert "Item" not in questions.get_item(Key={"questionId": "gone"})
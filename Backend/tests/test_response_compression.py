@@ -0,0 +1,96 @@
+"""レスポンス圧縮 (layers/common の response_compression。getQuestions / createQuestion / getQuestionDetail / getThreads が使う)"""
+import base64
+import gzip
+import json
+import os
+
+import pytest
+
+FUNCTIONS = ["getQuestionsFunction", "createQuestionFunction", "getQuestionDetailFunction", "getThreadsFunction"]
+
+
+@pytest.fixture
+def compression(load_lambda):
+    return load_lambda("getThreadsFunction").response_compression
+
+
+@pytest.mark.parametrize("function_dir", FUNCTIONS)
+def test_every_handler_compresses_through_the_layer(load_lambda, monkeypatch, function_dir):
+    module = load_lambda(function_dir)
+    calls = []
+    monkeypatch.setattr(module.response_compression, "maybe_compress", lambda resp, event: calls.append(resp) or resp)
+    resp = module.lambda_handler({"httpMethod": "OPTIONS"}, None)
+    assert calls == [resp]
+
+
+def _resp(body, headers=None):
+    return {"statusCode": 200, "headers": dict(headers or {"Content-Type": "application/json"}), "body": body}
+
+
+def _metric_lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{"_aws"')]
+
+
+LARGE = json.dumps([{"questionId": f"q{i}", "title": "タイトル" * 5} for i in range(100)], ensure_ascii=False)
+
+
+def test_large_body_is_gzipped_and_measured(compression, monkeypatch, capsys):
+    monkeypatch.setattr(compression, "brotli", None)
+    event = {"headers": {"Accept-Encoding": "gzip, deflate"}}
+    resp = compression.maybe_compress(_resp(LARGE, {"ETag": '"abc"'}), event)
+
+    assert resp["isBase64Encoded"] is True
+    assert resp["headers"]["Content-Encoding"] == "gzip"
+    assert resp["headers"]["Vary"] == "Accept-Encoding"
+    assert resp["headers"]["ETag"] == '"abc-gzip"'
+    assert gzip.decompress(base64.b64decode(resp["body"])).decode("utf-8") == LARGE
+
+    (metric,) = _metric_lines(capsys)
+    assert metric["Encoding"] == "gzip"
+    assert metric["ResponseBytes"] == len(LARGE.encode("utf-8"))
+    assert metric["SentBytes"] < metric["ResponseBytes"]
+
+
+@pytest.mark.parametrize("headers", [{}, {"Accept-Encoding": "gzip;q=0"}, {"Accept-Encoding": "identity"}])
+def test_uncompressed_variant_still_varies_on_encoding(compression, capsys, headers):
+    resp = compression.maybe_compress(_resp(LARGE), {"headers": headers})
+    assert resp["body"] == LARGE
+    assert "Content-Encoding" not in resp["headers"]
+    assert resp["headers"]["Vary"] == "Accept-Encoding"
+    assert _metric_lines(capsys) == []
+
+
+def test_small_body_does_not_depend_on_encoding(compression, capsys):
+    original = _resp("{}")
+    assert compression.maybe_compress(original, {"headers": {"Accept-Encoding": "gzip"}}) is original
+    assert _metric_lines(capsys) == []
+
+
+@pytest.mark.parametrize("vary, expected", [
+    ("Origin", "Origin, Accept-Encoding"),
+    ("accept-encoding", "accept-encoding"),
+    ("*", "*"),
+])
+def test_existing_vary_is_kept(compression, vary, expected):
+    assert compression.vary_on_encoding({"Vary": vary})["Vary"] == expected
+
+
+def test_incompressible_body_is_sent_as_is(compression, monkeypatch, capsys):
+    monkeypatch.setattr(compression, "brotli", None)
+    noise = base64.b64encode(os.urandom(3000)).decode("ascii")
+    monkeypatch.setattr(compression, "COMPRESSION_GZIP_LEVEL", 0)
+    resp = compression.maybe_compress(_resp(noise), {"headers": {"Accept-Encoding": "gzip"}})
+    assert (resp["body"], resp["headers"]["Vary"]) == (noise, "Accept-Encoding")
+    assert _metric_lines(capsys) == []
+
+
+def test_compression_can_be_disabled(load_lambda, capsys):
+    compression = load_lambda("getThreadsFunction", COMPRESSION_ENABLED="false").response_compression
+    original = _resp(LARGE)
+    assert compression.maybe_compress(original, {"headers": {"Accept-Encoding": "gzip"}}) is original
+    assert _metric_lines(capsys) == []
+
+
+def test_already_encoded_response_is_untouched(compression):
+    original = {**_resp(LARGE), "isBase64Encoded": True}
+    assert compression.maybe_compress(original, {"headers": {"Accept-Encoding": "gzip"}}) is original
@@ -0,0 +1,121 @@
+"""shareCode の確保 (登録テーブルへの条件付き書き込み) と既存コードの登録 (バックフィル)"""
+import json
+import time
+
+import pytest
+
+from conftest import FakeContext, response_body
+
+
+def _create_event(question_id=None):
+    body = {
+        "title": "t",
+        "authorId": "u1",
+        "quizItems": [{"id": "1", "questionText": "q", "choices": [{"id": "a", "text": "A"}, {"id": "b", "text": "B"}], "correctAnswerId": "a"}],
+    }
+    if question_id:
+        body["questionId"] = question_id
+    return {"requestContext": {"authorizer": {"claims": {"sub": "u1"}}}, "body": json.dumps(body)}
+
+
+@pytest.fixture
+def tables(make_table):
+    return make_table("Questions", "questionId"), make_table("ShareCodes", "shareCode")
+
+
+@pytest.fixture
+def create(load_lambda, tables):
+    return load_lambda("createQuestionFunction", QUESTIONS_TABLE="Questions", SHARE_CODES_TABLE="ShareCodes")
+
+
+@pytest.fixture
+def code_puts(create, monkeypatch):
+    """登録テーブルへの put_item を数える"""
+    client = create.dynamodb.meta.client
+    real_put = client.put_item
+    puts = []
+
+    def put_item(**kwargs):
+        if kwargs.get("TableName") == "ShareCodes":
+            puts.append(kwargs["Item"])
+        return real_put(**kwargs)
+
+    monkeypatch.setattr(client, "put_item", put_item)
+    return puts
+
+
+def _rows(codes_table):
+    return {row["shareCode"]: row for row in codes_table.scan()["Items"]}
+
+
+def test_each_create_is_one_conditional_put(create, tables, code_puts):
+    _, codes_table = tables
+    created = []
+    for n in range(4):
+        resp = create.lambda_handler(_create_event(f"q{n}"), None)
+        assert resp["statusCode"] == 201
+        created.append(response_body(resp)["shareCode"])
+        # 作成ごとに登録テーブルへの書き込みは1回だけ (予約もまとめての補充もしない)
+        assert len(code_puts) == n + 1
+
+    rows = _rows(codes_table)
+    assert len(set(created)) == 4
+    assert len(rows) == 4
+    for n, code in enumerate(created):
+        assert rows[code]["questionId"] == f"q{n}"
+
+
+def test_collisions_are_retried_and_counted(create, tables, monkeypatch, capsys):
+    _, codes_table = tables
+    codes_table.put_item(Item={"shareCode": "taken00001", "questionId": "other"})
+    generated = iter(["taken00001", "taken00001", "fresh00001"])
+    monkeypatch.setattr(create, "_gen_share_code", lambda length=10: next(generated))
+
+    assert create._register_share_code("q1", "2026-01-01T00:00:00Z") == "fresh00001"
+    assert _rows(codes_table)["taken00001"]["questionId"] == "other"
+
+    create._emit_share_code_metrics(1)
+    metric = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert (metric["ShareCodeAttempts"], metric["ShareCodeCollisions"]) == (3, 2)
+
+
+def test_collisions_are_bounded(create, tables, monkeypatch):
+    _, codes_table = tables
+    codes_table.put_item(Item={"shareCode": "taken00001", "questionId": "other"})
+    monkeypatch.setattr(create, "_gen_share_code", lambda length=10: "taken00001")
+    with pytest.raises(RuntimeError, match="unique shareCode"):
+        create._register_share_code("q1", "2026-01-01T00:00:00Z")
+
+
+@pytest.fixture
+def backfill(load_lambda, tables):
+    return load_lambda("backfillQuestionIndexesFunction", QUESTIONS_TABLE="Questions", SHARE_CODES_TABLE="ShareCodes")
+
+
+def test_backfill_registers_existing_codes(backfill, tables, capsys):
+    questions, codes_table = tables
+    questions.put_item(Item={"questionId": "q1", "shareCode": "legacy0001", "createdAt": "2026-01-01T00:00:00Z"})
+    questions.put_item(Item={"questionId": "q2", "shareCode": "legacy0002", "createdAt": "2026-01-02T00:00:00Z"})
+    questions.put_item(Item={"questionId": "q3", "createdAt": "2026-01-03T00:00:00Z"})
+    # 登録済み (同じ質問) と、以前のプールの予約行とぶつかったコードと、別の質問が使っているコード
+    codes_table.put_item(Item={"shareCode": "legacy0001", "questionId": "q1"})
+    codes_table.put_item(Item={"shareCode": "legacy0002", "reservedUntil": int(time.time()) + 3600})
+    questions.put_item(Item={"questionId": "q4", "shareCode": "dupe000001", "createdAt": "2026-01-04T00:00:00Z"})
+    codes_table.put_item(Item={"shareCode": "dupe000001", "questionId": "q9"})
+
+    result = backfill.lambda_handler({}, FakeContext())
+    assert result["done"] is True
+    assert result["duplicateShareCodes"] == 1
+    assert "DUPLICATE shareCode dupe000001: q4 conflicts with registered q9" in capsys.readouterr().out
+
+    rows = _rows(codes_table)
+    assert rows["legacy0001"]["questionId"] == "q1"
+    assert rows["legacy0002"]["questionId"] == "q2"
+    assert "reservedUntil" not in rows["legacy0002"]
+    # 重複は書き換えない
+    assert rows["dupe000001"]["questionId"] == "q9"
+    assert len(rows) == 3
+
+    # 何度実行しても同じ
+    assert backfill.lambda_handler({}, FakeContext())["duplicateShareCodes"] == 1
+    assert _rows(codes_table) == rows
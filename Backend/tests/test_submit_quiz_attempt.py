@@ -0,0 +1,259 @@
+"""submitQuizAttemptFunction (サーバー側の採点、記録と集計、全問正解の通知) と onQuizCompleteFunction の受け口"""
+import json
+
+import pytest
+
+ENV = {
+    "QUESTIONS_TABLE": "Questions",
+    "ANSWERS_TABLE": "AnswersLog",
+    "QUIZ_ATTEMPTS_TABLE": "QuizAttempts",
+    "QUESTION_STATS_TABLE": "QuestionStats",
+    "ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions",
+    "QUESTION_ITEM_STATS_TABLE": "QuestionItemStats",
+    "USER_STATS_BUCKETS_TABLE": "UserStatsBuckets",
+    "ON_QUIZ_COMPLETE_FUNCTION": "onQuizComplete",
+}
+
+QUIZ_ITEMS = [
+    {"id": "i1", "correctAnswerId": "a", "choices": [{"id": "a"}, {"id": "b"}]},
+    {"id": "i2", "correctAnswerId": "d", "choices": [{"id": "c"}, {"id": "d"}]},
+    {"id": "i3", "correctAnswerId": "e", "choices": [{"id": "e"}, {"id": "f"}]},
+]
+
+@pytest.fixture
+def tables(make_table):
+    tables = {
+        "questions": make_table("Questions", "questionId"),
+        "answers": make_table("AnswersLog", "logId"),
+        "attempts": make_table("QuizAttempts", "userId", "attemptId"),
+        "stats": make_table("QuestionStats", "questionId"),
+        "answered": make_table("AnsweredQuestions", "userId", "questionId"),
+        "items": make_table("QuestionItemStats", "questionId", "quizItemId"),
+        "buckets": make_table("UserStatsBuckets", "userId", "bucket"),
+    }
+    tables["questions"].put_item(Item={"questionId": "q1", "authorId": "author", "title": "T", "quizItems": QUIZ_ITEMS})
+    return tables
+
+
+@pytest.fixture
+def submit(load_lambda, tables, monkeypatch):
+    module = load_lambda("submitQuizAttemptFunction", **ENV)
+    invoked = []
+    monkeypatch.setattr(module.lambda_client, "invoke", lambda **kwargs: invoked.append(kwargs))
+    module.invoked = invoked
+    return module
+
+
+def _post(module, answers, sub="u1", question_id="q1", headers=None, **fields):
+    event = {"pathParameters": {"questionId": question_id}, "body": json.dumps({"answers": answers, **fields})}
+    if headers:
+        event["headers"] = headers
+    if sub:
+        event["requestContext"] = {"authorizer": {"claims": {"sub": sub}}}
+    resp = module.lambda_handler(event, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+
+def test_grade_counts_unanswered_items_as_wrong(submit):
+    key = submit._load_answer_key("q1")
+    results = submit._grade(key, {"i1": "a", "i3": "f"})
+    assert [(r["quizItemId"], r["selectedChoiceId"], r["isCorrect"]) for r in results] == [
+        ("i1", "a", True), ("i2", None, False), ("i3", "f", False),
+    ]
+
+
+def test_grade_ignores_items_not_in_the_key(submit):
+    # 未知の項目はハンドラーが先に 400 にする。_grade は解答キーの項目だけを順に採点する
+    key = submit._load_answer_key("q1")
+    assert [r["quizItemId"] for r in submit._grade(key, {"zz": "a", "i2": "d"})] == ["i1", "i2", "i3"]
+
+
+def test_unknown_answers(submit):
+    key = submit._load_answer_key("q1")
+    assert submit._unknown_answers(key, {"i1": "a", "i2": "a", "zz": "a"}) == ["i2", "zz"]
+
+
+def test_attempt_is_graded_logged_and_recorded(submit, tables):
+    status, body = _post(submit, {"i1": "a", "i2": "c"})
+    assert status == 201
+    assert (body["score"], body["totalQuestions"], body["perfect"]) == (1, 3, False)
+    # 答えていない i3 はログに書かない
+    logs = tables["answers"].scan()["Items"]
+    assert sorted((it["quizItemId"], it["isCorrect"]) for it in logs) == [("i1", True), ("i2", False)]
+    assert {it["attemptId"] for it in logs} == {body["attemptId"]}
+    attempt = tables["attempts"].get_item(Key={"userId": "u1", "attemptId": body["attemptId"]})["Item"]
+    assert (int(attempt["score"]), int(attempt["totalQuestions"]), attempt["answers"]) == (1, 3, {"i1": "a", "i2": "c"})
+    assert submit.invoked == []
+
+
+def test_list_form_of_answers(submit):
+    status, body = _post(submit, [{"quizItemId": "i2", "selectedChoiceId": "d"}])
+    assert (status, body["score"]) == (201, 1)
+
+
+def test_aggregates_match_log_answer(submit, tables):
+    _post(submit, {"i1": "a", "i2": "c"})
+    _post(submit, {"i1": "b", "i2": "d", "i3": "e"})
+    stats = tables["stats"].get_item(Key={"questionId": "q1"})["Item"]
+    # 5件の回答、同じユーザーなので uniqueAnswerers は1
+    assert (int(stats["totalAnswers"]), int(stats["correctAnswers"]), int(stats["uniqueAnswerers"])) == (5, 3, 1)
+    assert int(tables["answered"].get_item(Key={"userId": "u1", "questionId": "q1"})["Item"]["attempts"]) == 5
+    i1 = tables["items"].get_item(Key={"questionId": "q1", "quizItemId": "i1"})["Item"]
+    assert (int(i1["answers"]), int(i1["choice#a"]), int(i1["choice#b"])) == (2, 1, 1)
+    lifetime = tables["buckets"].get_item(Key={"userId": "u1", "bucket": "all"})["Item"]
+    assert (int(lifetime["answers"]), int(lifetime["correctAnswers"]), int(lifetime["distinctQuestions"])) == (5, 3, 1)
+
+
+@pytest.mark.parametrize("function_dir, event", [
+    ("submitQuizAttemptFunction", {
+        "pathParameters": {"questionId": "q1"},
+        "requestContext": {"authorizer": {"claims": {"sub": "u1"}}},
+        "body": json.dumps({"answers": {"i1": "a"}}),
+    }),
+    ("logAnswerFunction", {"body": json.dumps({"questionId": "q1", "userId": "u1", "selectedChoiceId": "a", "isCorrect": True})}),
+])
+def test_both_entry_points_aggregate_through_the_layer(load_lambda, tables, monkeypatch, function_dir, event):
+    module = load_lambda(function_dir, **ENV)
+    recorded = []
+    monkeypatch.setattr(module.answer_log, "record_aggregates", recorded.append)
+    assert module.lambda_handler(event, None)["statusCode"] == 201
+    [[log]] = recorded
+    assert (log["questionId"], log["userId"], log["isCorrect"]) == ("q1", "u1", True)
+
+
+def _counts(tables):
+    stats = tables["stats"].get_item(Key={"questionId": "q1"})["Item"]
+    lifetime = tables["buckets"].get_item(Key={"userId": "u1", "bucket": "all"})["Item"]
+    return (
+        tables["answers"].scan(Select="COUNT")["Count"],
+        int(stats["totalAnswers"]),
+        int(tables["answered"].get_item(Key={"userId": "u1", "questionId": "q1"})["Item"]["attempts"]),
+        int(lifetime["answers"]),
+    )
+
+
+@pytest.mark.parametrize("retry", [{"attemptId": "a-1"}, {"headers": {"Idempotency-Key": "a-1"}}])
+def test_resubmitted_attempt_is_recorded_once(submit, tables, retry):
+    status, first = _post(submit, {"i1": "a", "i2": "d", "i3": "e"}, **retry)
+    assert (status, first["attemptId"], first["alreadyLogged"]) == (201, "a-1", 0)
+    counts = _counts(tables)
+    assert counts == (3, 3, 3, 3)
+
+    status, again = _post(submit, {"i1": "a", "i2": "d", "i3": "e"}, **retry)
+    assert (status, again["score"], again["alreadyLogged"]) == (201, 3, 3)
+    assert _counts(tables) == counts
+    assert [it["attemptId"] for it in tables["attempts"].scan()["Items"]] == ["a-1"]
+    # 全問正解の通知も1回だけ
+    assert len(submit.invoked) == 1
+
+
+def test_partly_written_attempt_writes_only_the_rest(submit, tables):
+    _post(submit, {"i1": "a", "i2": "d", "i3": "e"}, attemptId="a-1")
+    # 前回は i3 の回答だけ書けなかったことにする
+    i3 = submit.answer_log.attempt_log_id("u1", "a-1", "i3")
+    tables["answers"].delete_item(Key={"logId": i3})
+
+    status, body = _post(submit, {"i1": "a", "i2": "d", "i3": "e"}, attemptId="a-1")
+    assert (status, body["alreadyLogged"]) == (201, 2)
+    assert tables["answers"].get_item(Key={"logId": i3})["Item"]["quizItemId"] == "i3"
+    assert int(tables["stats"].get_item(Key={"questionId": "q1"})["Item"]["totalAnswers"]) == 4
+
+
+def test_different_attempts_are_both_recorded(submit, tables):
+    _post(submit, {"i1": "a"}, attemptId="a-1")
+    _post(submit, {"i1": "a"}, attemptId="a-2")
+    assert tables["answers"].scan(Select="COUNT")["Count"] == 2
+
+
+@pytest.mark.parametrize("attempt_id", ["", "  ", 7, "x" * 129])
+def test_invalid_attempt_id_is_400(submit, tables, attempt_id):
+    assert _post(submit, {"i1": "a"}, attemptId=attempt_id)[0] == 400
+    assert tables["answers"].scan(Select="COUNT")["Count"] == 0
+
+
+@pytest.mark.parametrize("answers", [{"zz": "a"}, {"i1": "zz"}])
+def test_unknown_item_or_choice_is_400(submit, tables, answers):
+    assert _post(submit, answers)[0] == 400
+    assert tables["answers"].scan(Select="COUNT")["Count"] == 0
+
+
+def test_stale_answer_key_is_reloaded_once(submit, tables):
+    assert _post(submit, {"i1": "a"})[0] == 201
+    tables["questions"].put_item(Item={
+        "questionId": "q1", "authorId": "author", "title": "T",
+        "quizItems": QUIZ_ITEMS + [{"id": "i4", "correctAnswerId": "g", "choices": [{"id": "g"}]}],
+    })
+    status, body = _post(submit, {"i4": "g"})
+    assert (status, body["totalQuestions"]) == (201, 4)
+
+
+@pytest.mark.parametrize("answers", [{}, [], "a", {"i1": ""}, [{"quizItemId": "i1", "selectedChoiceId": "a"}] * 2])
+def test_invalid_answers_are_400(submit, answers):
+    assert _post(submit, answers)[0] == 400
+
+
+def test_missing_question_is_404(submit):
+    assert _post(submit, {"i1": "a"}, question_id="q9")[0] == 404
+
+
+def test_missing_claims_is_401(submit):
+    assert _post(submit, {"i1": "a"}, sub=None)[0] == 401
+
+
+def test_perfect_score_notifies_the_author(submit):
+    status, body = _post(submit, {"i1": "a", "i2": "d", "i3": "e"})
+    assert (status, body["perfect"]) == (201, True)
+    [call] = submit.invoked
+    assert (call["FunctionName"], call["InvocationType"]) == ("onQuizComplete", "Event")
+    assert json.loads(call["Payload"]) == {
+        "source": "submitQuizAttempt", "questionId": "q1", "solverId": "u1", "score": 3, "totalQuestions": 3,
+        "authorId": "author", "title": "T",
+    }
+
+
+def test_author_is_not_notified(submit):
+    assert _post(submit, {"i1": "a", "i2": "d", "i3": "e"}, sub="author")[1]["perfect"] is True
+    assert submit.invoked == []
+
+
+@pytest.fixture
+def quiz_complete_env(make_table):
+    make_table("Questions", "questionId")
+    make_table("Users", "userId")
+    make_table("Devices", "userId")
+    return {"QUESTIONS_TABLE_NAME": "Questions", "USERS_TABLE_NAME": "Users", "DEVICES_TABLE_NAME": "Devices"}
+
+
+def _client_report(score=1, total=3):
+    return {
+        "pathParameters": {"questionId": "q1"},
+        "requestContext": {"authorizer": {"claims": {"sub": "u1"}}},
+        "body": json.dumps({"score": score, "totalQuestions": total}),
+    }
+
+
+GRADED = {"source": "submitQuizAttempt", "questionId": "q1", "solverId": "u1", "score": 1, "totalQuestions": 3}
+
+
+def test_client_reported_scores_are_accepted_by_default_with_a_warning(load_lambda, quiz_complete_env, monkeypatch, caplog):
+    monkeypatch.delenv("ACCEPT_CLIENT_SCORES", raising=False)
+    on_complete = load_lambda("onQuizCompleteFunction", **quiz_complete_env)
+    assert on_complete.lambda_handler(_client_report(), None)["statusCode"] == 200
+    assert any(r.levelname == "WARNING" and "Deprecated" in r.getMessage() for r in caplog.records)
+
+
+def test_client_reported_scores_can_be_disabled(load_lambda, quiz_complete_env):
+    on_complete = load_lambda("onQuizCompleteFunction", ACCEPT_CLIENT_SCORES="false", **quiz_complete_env)
+    assert on_complete.lambda_handler(_client_report(), None)["statusCode"] == 403
+    # 直接の呼び出し (submitQuizAttemptFunction) は採点済みとして受け付ける
+    assert on_complete.lambda_handler(dict(GRADED), None)["statusCode"] == 200
+
+
+def test_trust_comes_from_how_it_was_invoked(load_lambda, quiz_complete_env):
+    on_complete = load_lambda("onQuizCompleteFunction", ACCEPT_CLIENT_SCORES="false", **quiz_complete_env)
+    # API 経由ならイベントに source を付けても採点済みにはならない
+    spoofed = {**_client_report(), **GRADED}
+    assert on_complete.lambda_handler(spoofed, None)["statusCode"] == 403
+    # source が無くても直接の呼び出しなら採点済み
+    graded = {k: v for k, v in GRADED.items() if k != "source"}
+    assert on_complete.lambda_handler(graded, None)["statusCode"] == 200
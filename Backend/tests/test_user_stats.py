@@ -0,0 +1,177 @@
+"""ユーザーごとの日・週の集計 (logAnswerFunction の ADD、backfillUserStatsFunction、getUserStatsFunction)"""
+import json
+from datetime import date
+
+import pytest
+
+from conftest import FakeContext
+
+ENV = {
+    "ANSWERS_TABLE": "AnswersLog",
+    "ANSWERED_QUESTIONS_TABLE": "AnsweredQuestions",
+    "USER_STATS_BUCKETS_TABLE": "UserStatsBuckets",
+}
+
+
+@pytest.fixture
+def tables(make_table):
+    return {
+        "users": make_table("Users", "userId"),
+        "answers": make_table("AnswersLog", "logId", indexes=[("UserIndex", "userId", "timestamp")]),
+        "answered": make_table("AnsweredQuestions", "userId", "questionId"),
+        "buckets": make_table("UserStatsBuckets", "userId", "bucket"),
+    }
+
+
+def _rows(tables, user_id="u1"):
+    items = tables["buckets"].query(KeyConditionExpression="userId = :u", ExpressionAttributeValues={":u": user_id})["Items"]
+    return {it["bucket"]: (int(it["answers"]), int(it["correctAnswers"]), int(it.get("distinctQuestions", -1))) for it in items}
+
+
+def _answer(module, question_id, correct=True, user_id="u1"):
+    body = {"questionId": question_id, "userId": user_id, "selectedChoiceId": "a", "isCorrect": correct}
+    assert module.lambda_handler({"body": json.dumps(body)}, None)["statusCode"] == 201
+
+
+def test_live_answers_update_every_bucket(load_lambda, tables):
+    log_answer = load_lambda("logAnswerFunction", **ENV)
+    _answer(log_answer, "q1")
+    _answer(log_answer, "q1", correct=False)
+    _answer(log_answer, "q2")
+    rows = _rows(tables)
+    assert sorted(b[:2] for b in rows) == ["al", "d#", "w#"]
+    # 同じ日の同じ質問への2回目は distinctQuestions を増やさない
+    assert set(rows.values()) == {(3, 2, 2)}
+    lifetime = tables["buckets"].get_item(Key={"userId": "u1", "bucket": "all"})["Item"]
+    assert lifetime["lastAnsweredAt"].endswith("Z")
+
+
+def test_repeat_on_another_day_counts_for_that_day(load_lambda, tables):
+    log_answer = load_lambda("logAnswerFunction", **ENV)
+    # 前回の回答は去年
+    tables["answered"].put_item(Item={
+        "userId": "u1", "questionId": "q1", "attempts": 1,
+        "firstAnsweredAt": "2025-01-01T00:00:00Z", "lastAnsweredAt": "2025-01-01T00:00:00Z",
+    })
+    _answer(log_answer, "q1")
+    rows = _rows(tables)
+    assert rows["all"] == (1, 1, 0)
+    assert [v for b, v in rows.items() if b != "all"] == [(1, 1, 1), (1, 1, 1)]
+
+
+def test_distinct_questions_skipped_without_markers(load_lambda, tables):
+    env = dict(ENV)
+    del env["ANSWERED_QUESTIONS_TABLE"]
+    log_answer = load_lambda("logAnswerFunction", **env)
+    _answer(log_answer, "q1")
+    assert set(_rows(tables).values()) == {(1, 1, -1)}
+
+
+def _log(tables, n, question_id, ts, correct=True, user_id="u1"):
+    tables["answers"].put_item(Item={
+        "logId": f"l{n}", "userId": user_id, "questionId": question_id, "isCorrect": correct, "timestamp": ts,
+    })
+
+
+@pytest.fixture
+def history(tables):
+    tables["users"].put_item(Item={"userId": "u1"})
+    # 日本時間で 2026-03-01 (日) から 03-03 (火) まで毎日、03-05 (木) にも回答
+    _log(tables, 0, "q1", "2026-02-28T15:00:00Z")
+    _log(tables, 1, "q2", "2026-03-01T14:59:59Z", correct=False)
+    _log(tables, 2, "q1", "2026-03-02T01:00:00Z")
+    _log(tables, 3, "q3", "2026-03-03T01:00:00Z")
+    _log(tables, 4, "q3", "2026-03-05T01:00:00Z")
+    _log(tables, 5, "q9", "2025-12-01T01:00:00Z", correct=False)
+    return tables
+
+
+@pytest.fixture
+def user_stats(load_lambda, history, monkeypatch):
+    module = load_lambda("getUserStatsFunction", **ENV)
+    monkeypatch.setattr(module, "_today", lambda: date(2026, 3, 6))
+    return module
+
+
+def _get(module, user_id="u1", **params):
+    resp = module.lambda_handler({"pathParameters": {"userId": user_id}, "queryStringParameters": params}, None)
+    return resp["statusCode"], json.loads(resp["body"])
+
+
+def _check_history(body):
+    assert (body["totalAnswers"], body["correctAnswers"], body["distinctQuestions"]) == (6, 4, 4)
+    daily = {d["date"]: (d["answers"], d["distinctQuestions"]) for d in body["daily"] if d["answers"]}
+    assert daily == {"2026-03-01": (2, 2), "2026-03-02": (1, 1), "2026-03-03": (1, 1), "2026-03-05": (1, 1)}
+    assert [(w["week"], w["startDate"], w["answers"]) for w in body["weekly"]] == [
+        ("2026-W09", "2026-02-23", 2), ("2026-W10", "2026-03-02", 3),
+    ]
+    # 今日 (03-06) はまだ回答していないが 03-05 まで続いている。最長は 03-01..03-03
+    assert (body["currentStreak"], body["longestStreak"]) == (1, 3)
+
+
+def test_falls_back_to_logs_before_backfill(user_stats, history):
+    # 集計の導入後の回答で行だけはある (それより前の回答は入っていない)
+    history["buckets"].put_item(Item={"userId": "u1", "bucket": "all", "answers": 1, "correctAnswers": 1, "distinctQuestions": 1})
+    status, body = _get(user_stats, range="7")
+    assert status == 200
+    assert len(body["daily"]) == 7
+    _check_history(body)
+
+
+def test_uses_buckets_after_backfill(user_stats, history, load_lambda):
+    backfill = load_lambda("backfillUserStatsFunction", **ENV)
+    result = backfill.lambda_handler({}, FakeContext())
+    assert (result["done"], result["completed"], result["answers"]) == (True, True, 6)
+    assert history["buckets"].get_item(Key={"userId": "#backfill", "bucket": "all"})["Item"]["completedAt"]
+
+    _check_history(_get(user_stats, range="1w")[1])
+    # 行から読んでいる (回答ログを読み直していない)
+    history["buckets"].update_item(
+        Key={"userId": "u1", "bucket": "all"}, UpdateExpression="SET answers = :n", ExpressionAttributeValues={":n": 60},
+    )
+    assert _get(user_stats, range="7")[1]["totalAnswers"] == 60
+
+
+def test_user_without_rows_reads_logs_after_backfill(user_stats, history, load_lambda):
+    load_lambda("backfillUserStatsFunction", **ENV).lambda_handler({}, FakeContext())
+    _log(history, 9, "q1", "2026-03-05T02:00:00Z", user_id="u2")
+    status, body = _get(user_stats, user_id="u2", range="7")
+    assert (status, body["totalAnswers"], body["currentStreak"]) == (200, 1, 1)
+
+
+@pytest.mark.parametrize("raw,days", [(None, 30), ("14", 14), ("2w", 14), ("3D", 3), ("9999", 366)])
+def test_parse_range(user_stats, raw, days):
+    assert user_stats._parse_range(raw) == days
+
+
+@pytest.mark.parametrize("raw", ["0", "-1", "abc", "w"])
+def test_bad_range_is_400(user_stats, raw):
+    assert _get(user_stats, range=raw)[0] == 400
+
+
+def _days(*answers):
+    return [{"answers": n} for n in answers]
+
+
+@pytest.mark.parametrize("answers,expected", [
+    ((), (0, 0)),
+    ((0, 0, 0), (0, 0)),
+    ((1, 1, 0, 1, 1, 1), (3, 3)),
+    ((1, 1, 1, 0, 1, 0), (1, 3)),
+    ((1, 1, 0, 0), (0, 2)),
+])
+def test_streaks(user_stats, answers, expected):
+    assert user_stats._streaks(_days(*answers)) == expected
+
+
+def test_backfill_segments_complete_once(load_lambda, tables, monkeypatch):
+    for i in range(5):
+        tables["users"].put_item(Item={"userId": f"u{i}"})
+    backfill = load_lambda("backfillUserStatsFunction", **ENV)
+    calls = []
+    monkeypatch.setattr(backfill.lambda_client, "invoke", lambda **kwargs: calls.append(json.loads(kwargs["Payload"])))
+    backfill.lambda_handler({"totalSegments": 2}, FakeContext())
+    assert [backfill.lambda_handler(c, FakeContext())["completed"] for c in calls] == [False, True]
+    # ユーザーを指定した作り直しは印に触れない
+    backfill.lambda_handler({"userIds": ["u1"]}, FakeContext())
+    assert int(tables["buckets"].get_item(Key={"userId": "#backfill", "bucket": "all"})["Item"]["doneSegments"]) == 2